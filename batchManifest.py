@@ -0,0 +1,294 @@
+# Batch manifest for the workscope exhibit generator tool
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies only upon the Python standard library (and 'workbookValidator.py',
+#      which does too).
+#
+# A batch manifest is a durable record of the outcome of processing each .xlsx file
+# in a batch run (see 'workscope_exhibit_batch.py'). It allows a batch run that was
+# interrupted (e.g., by a locked file or a reboot) to be re-started without redoing
+# the work that was completed: a workbook is skipped if it was processed successfully,
+# with the same options (see below), has not changed since, and its output files are still
+# present and unchanged. Workbooks that failed are retried.
+#
+# The options of a run that affect the output files (e.g., whether the stylesheet is inlined)
+# are given when the manifest is opened, and recorded in each entry; a workbook processed with
+# different options is not up to date, and is processed again.
+#
+# Whether an output file is unchanged is decided, first, by its size and modification time,
+# as recorded when the entry was written; only if its size is unchanged but its modification
+# time has changed is it read, and its hash compared with that recorded.
+#
+# Whether a workbook has changed is decided by the hash of its content (see hash_workbook),
+# rather than of the bytes of the .xlsx file: each time Excel saves a workbook, it updates
+# the timestamps in its document properties (and may re-order the parts of the .xlsx file),
+# so a workbook that was merely opened and saved again would otherwise count as changed.
+#
+# The manifest is a single 'JSON lines' file: each line is a JSON object recording
+# the outcome of processing one workbook. Lines are only ever appended, and each is
+# flushed to disk as soon as it is written; so the manifest is 'checkpointed' after
+# every workbook, and at most the line being written when a run dies is lost.
+# When a workbook appears in more than one line, the last line wins.
+#
+# Each line contains the following items:
+#   fullpath - absolute path to the .xlsx file
+#   content_hash - hash of the content of the .xlsx file (see hash_workbook), or '' if the
+#                  file could not be read (the workbook then failed, in the 'load' stage)
+#   status - 'ok' or 'failed'
+#   errors - text of error message(s), or '' if none
+#   warnings - text of warning(s), e.g., for totals that do not add up, or '' if none
+#   stage - the stage of processing reached; for a workbook that failed, the stage in which
+#           it failed: 'load', 'extract', or 'render' (see 'workscope_exhibit_batch.py')
+#   outputs - dictionary: absolute path to each output file -> hash of its contents
+#   output_stats - dictionary: absolute path to each output file -> [size, modification time],
+#                  when the entry was written
+#   options - dictionary: the options with which the workbook was processed (see batchManifest)
+#   parse_secs - time taken to read the .xlsx file
+#   rss_kb - resident set size, in kilobytes, of the worker process that read the .xlsx file,
+#            after releasing it, or None if unknown; this should stay steady from one workbook
+#            to the next
+#   render_secs - time taken to generate and write the output files
+#   finished - time at which processing of the workbook was finished (seconds since the epoch)
+#
+# Internals of this Module
+# ========================
+#
+# batchManifest - class for reading and appending to a manifest file
+#
+# hash_workbook - returns the hash of the parts of an .xlsx file that affect its exhibits
+#
+# get_workscope_sheet_parts - returns the parts of an .xlsx file containing the worksheets
+#                             that contain workscope exhibits
+#
+# hash_file - returns the hash of the contents of a file
+#
+# hash_bytes - returns the hash of a string of bytes
+#
+###############################################################################
+
+import io
+import os
+import re
+import json
+import hashlib
+import zipfile
+import threading
+from workbookValidator import read_workbook_xml, read_sheet_parts, find_workscope_sheets
+
+# Matches the names of the parts of an .xlsx file (i.e., the members of the zip archive) other than
+# the worksheets whose contents affect the exhibits: the workbook (which contains the defined names),
+# the styles (which contain the fills), and the shared strings. Other parts, e.g., the document
+# properties ('docProps/core.xml', containing the time of the last save), the theme, and the
+# calculation chain, are ignored; as are the worksheets that do not contain workscope exhibits.
+WORKBOOK_CONTENT_PART_RE = re.compile(r'^xl/(workbook\.xml|styles\.xml|sharedStrings\.xml)$')
+
+# Matches the names of the parts of an .xlsx file containing worksheets; all of them are hashed if
+# those containing workscope exhibits cannot be found (see get_workscope_sheet_parts).
+WORKSHEET_PART_RE = re.compile(r'^xl/worksheets/[^/]+\.xml$')
+
+# Return the (hex) hash of a string of bytes.
+def hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+# end_def hash_bytes()
+
+# Return the (hex) hash of the contents of the file 'fullpath'.
+def hash_file(fullpath):
+    h = hashlib.sha1()
+    f = open(fullpath, 'rb')
+    try:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if chunk == '':
+                break
+            # end_if
+            h.update(chunk)
+        # end_while
+    finally:
+        f.close()
+    # end_try
+    return h.hexdigest()
+# end_def hash_file()
+
+# Return a dictionary: name of each part of the .xlsx file open as the zipfile.ZipFile 'zf' that
+# contains a worksheet containing workscope exhibits -> name of the worksheet; or None if they
+# cannot be found (e.g., if the workbook has no such worksheet, or is not well-formed). See
+# find_workscope_sheets and read_sheet_parts in 'workbookValidator.py'.
+def get_workscope_sheet_parts(zf):
+    try:
+        (sheet_names, defined_names) = read_workbook_xml(zf)
+        sheet_parts = read_sheet_parts(zf)
+        retval = {}
+        for sheet_name in find_workscope_sheets(sheet_names, defined_names):
+            retval[sheet_parts[sheet_name]] = sheet_name
+        # end_for
+    except (KeyError, SyntaxError):
+        return None
+    # end_try
+    return retval if len(retval) > 0 else None
+# end_def get_workscope_sheet_parts()
+
+# Return the (hex) hash of the content of the .xlsx file 'fullpath': i.e., of the names, CRC-32s, and
+# (uncompressed) sizes of the parts of it that affect the exhibits, in order of name: those matching
+# WORKBOOK_CONTENT_PART_RE, and those containing the worksheets containing workscope exhibits (see
+# get_workscope_sheet_parts), along with the names of those worksheets. Apart from the directory of
+# the zip archive, only the (small) workbook part and its relationships are read. So a workbook
+# re-saved without changes to its contents (or one whose parts were re-ordered, or re-compressed)
+# has the same hash as before; and so does one in which only other worksheets have changed.
+# N.B. Excel may rewrite a worksheet (e.g., to record which cell was selected) when it is saved
+#      without other changes; that counts as a change, if it contains workscope exhibits.
+#      If the worksheets containing workscope exhibits cannot be found, all the worksheets are
+#      included; the workbook will fail to be read in any case.
+# If the file is not a zip archive, the hash of its contents (see hash_file) is returned; it will
+# fail to be read as a workbook in any case. Raises IOError if the file cannot be read.
+# If 'data' is not None, it is the contents of the file (e.g., read from a bundle: see
+# 'workbookBundle.py'), and 'fullpath' is not read.
+def hash_workbook(fullpath, data=None):
+    try:
+        zf = zipfile.ZipFile(fullpath if data == None else io.BytesIO(data))
+    except zipfile.BadZipfile:
+        return hash_file(fullpath) if data == None else hash_bytes(data)
+    # end_try
+    try:
+        sheet_parts = get_workscope_sheet_parts(zf)
+        parts = []
+        for info in zf.infolist():
+            name = info.filename.encode('UTF-8') if isinstance(info.filename, unicode) else info.filename
+            if WORKBOOK_CONTENT_PART_RE.match(info.filename) or \
+               (sheet_parts == None and WORKSHEET_PART_RE.match(info.filename)):
+                parts.append('%s %08x %d\n' % (name, info.CRC, info.file_size))
+            elif sheet_parts != None and info.filename in sheet_parts:
+                sheet_name = sheet_parts[info.filename]
+                sheet_name = sheet_name.encode('UTF-8') if isinstance(sheet_name, unicode) else sheet_name
+                parts.append('%s %08x %d %s\n' % (name, info.CRC, info.file_size, sheet_name))
+            # end_if
+        # end_for
+    finally:
+        zf.close()
+    # end_try
+    if len(parts) == 0:
+        return hash_file(fullpath) if data == None else hash_bytes(data)
+    # end_if
+    parts.sort()
+    return hash_bytes(''.join(parts))
+# end_def hash_workbook()
+
+# N.B. The 'options' passed to the constructor is a dictionary of the options of the run that affect
+#      the output files; it must contain only values that survive a round trip through JSON.
+class batchManifest:
+    # Open (or create) the manifest file 'filename', and read the entries already in it.
+    # 'options' are the options of this run (see above), recorded in each entry written.
+    def __init__(self, filename, options=None):
+        self.filename = filename
+        self.options = options if options != None else {}
+        self.lock = threading.Lock()
+        # Dictionary: absolute path to .xlsx file -> most recent entry for it
+        self.entries = {}
+        if os.path.exists(filename):
+            f = open(filename, 'r')
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Partially-written last line of a run that died: ignore it
+                    continue
+                # end_try
+                self.entries[entry['fullpath']] = entry
+            # end_for
+            f.close()
+        # end_if
+        self.f = open(filename, 'a')
+    # end_def __init__()
+
+    # Return the most recent entry for the .xlsx file 'fullpath', or None if there is none.
+    def lookup(self, fullpath):
+        return self.entries.get(os.path.abspath(fullpath))
+    # end_def lookup()
+
+    # Return True if the .xlsx file 'fullpath', whose contents now have the hash 'content_hash',
+    # was processed successfully, with the options of this run, has not changed since, and its
+    # output files still exist and are unchanged. Otherwise, return False.
+    def is_up_to_date(self, fullpath, content_hash):
+        entry = self.lookup(fullpath)
+        if entry == None or entry['status'] != 'ok' or entry['content_hash'] != content_hash or \
+           entry.get('options') != self.options:
+            return False
+        # end_if
+        output_stats = entry.get('output_stats', {})
+        for (out_fn, out_hash) in entry['outputs'].items():
+            try:
+                st = os.stat(out_fn)
+            except OSError:
+                return False
+            # end_try
+            recorded = output_stats.get(out_fn)
+            if recorded != None and st.st_size != recorded[0]:
+                return False
+            # end_if
+            if recorded == None or st.st_mtime != recorded[1]:
+                # The same size, but touched since: compare the contents
+                if hash_file(out_fn) != out_hash:
+                    return False
+                # end_if
+            # end_if
+        # end_for
+        return True
+    # end_def is_up_to_date()
+
+    # Return the options recorded in the most recent entry for the .xlsx file 'fullpath', or None if
+    # there is no entry, or it records no options.
+    def get_options(self, fullpath):
+        entry = self.lookup(fullpath)
+        if entry == None:
+            return None
+        # end_if
+        return entry.get('options')
+    # end_def get_options()
+
+    # Return the hash recorded for the output file 'out_fn' when the .xlsx file 'fullpath' was
+    # last processed successfully, or None if there is none.
+    def get_output_hash(self, fullpath, out_fn):
+        entry = self.lookup(fullpath)
+        if entry == None or entry['status'] != 'ok':
+            return None
+        # end_if
+        return entry['outputs'].get(os.path.abspath(out_fn))
+    # end_def get_output_hash()
+
+    # Append an entry to the manifest, and flush it to disk. See the top of this module
+    # for the items in an entry; 'fullpath' and the keys of 'outputs' are made absolute here,
+    # and the 'output_stats' and 'options' are added.
+    def record(self, entry):
+        entry = dict(entry)
+        entry['fullpath'] = os.path.abspath(entry['fullpath'])
+        outputs = {}
+        output_stats = {}
+        for (out_fn, out_hash) in entry['outputs'].items():
+            out_fn = os.path.abspath(out_fn)
+            outputs[out_fn] = out_hash
+            try:
+                st = os.stat(out_fn)
+                output_stats[out_fn] = [st.st_size, st.st_mtime]
+            except OSError:
+                pass
+            # end_try
+        # end_for
+        entry['outputs'] = outputs
+        entry['output_stats'] = output_stats
+        entry['options'] = self.options
+        line = json.dumps(entry, sort_keys=True) + '\n'
+        self.lock.acquire()
+        try:
+            self.f.write(line)
+            self.f.flush()
+            os.fsync(self.f.fileno())
+            self.entries[entry['fullpath']] = entry
+        finally:
+            self.lock.release()
+        # end_try
+    # end_def record()
+
+    def close(self):
+        self.f.close()
+    # end_def close()
+# end_class batchManifest
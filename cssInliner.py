@@ -0,0 +1,286 @@
+# Stylesheet inliner for the workscope exhibit generator tool
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies only upon the Python standard library.
+#
+# The generated exhibits normally link to a stylesheet ('ctps_work_scope_print.css'),
+# which must be published beside them. To make an exhibit self-contained, the link can be
+# replaced by a <style> element containing a copy of the stylesheet (see inline_stylesheet
+# in 'workscope_exhibit_tool.py'). The copy is:
+#   1. pruned to the rules whose selectors can match an element of the exhibit: a selector
+#      matches if every element type, id, and class it names is used somewhere in the
+#      exhibit (so, e.g., the rules for the schedule table are dropped from Exhibit 2, and
+#      those for the salary cost table from Exhibit 1); this is conservative, in that a
+#      rule is kept if it might apply, and
+#   2. minified: comments and redundant white space are removed.
+# Each stylesheet is read and parsed once per process, and the CSS for each distinct set of
+# element types, ids, and classes is pruned once; both are cached. Only the names that the
+# stylesheet's selectors mention can affect the pruning, so the pruned CSS is cached by the
+# used names among those: an exhibit uses many ids that no selector mentions (e.g., 'row12' or
+# 'taskHeader12'), which differ from one workbook to the next. So in a batch run the work is
+# done a handful of times, rather than once per file, and the cache stays small.
+#
+# Only the subset of CSS used by the stylesheets of this tool is understood: rules, and
+# at-rules containing rules (e.g., @media) or not (e.g., @charset, which is dropped, as the
+# exhibits are encoded as UTF-8). Selectors which are not understood are kept.
+#
+# Internals of this Module
+# ========================
+#
+# get_pruned_css - returns the pruned, minified contents of a stylesheet for a given
+#                  set of element types, ids, and classes; cached
+#
+# get_stylesheet - returns the parsed contents of a stylesheet; cached
+#
+# get_selector_names - returns the element types, ids, and classes named in the selectors
+#                      of a stylesheet
+#
+# get_used_names - returns the element types, ids, and classes used in a string of HTML
+#
+# parse_css - parses the text of a stylesheet into a list of rules
+#
+# selector_matches - returns True if a selector can match an element in a document using
+#                    given element types, ids, and classes
+#
+###############################################################################
+
+import re
+import threading
+
+# Matches a comment
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+# Matches runs of white space
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Matches white space around punctuation where it is not needed
+PUNCTUATION_SPACE_RE = re.compile(r'\s*([{};:,>+~])\s*')
+
+# Matches pseudo-classes and pseudo-elements (e.g., ':hover', '::before'), and attribute selectors
+# (e.g., '[type=text]'), which are ignored when deciding whether a selector can match
+IGNORED_SELECTOR_PARTS_RE = re.compile(r'::?[A-Za-z-]+(\([^)]*\))?|\[[^\]]*\]')
+
+# Matches one simple selector: an element type, '#id', '.class', or '*'
+SIMPLE_SELECTOR_RE = re.compile(r'([#.]?)([A-Za-z_][A-Za-z0-9_-]*|\*)')
+
+# Matches the start tags, ids, and classes in HTML. N.B. The generated HTML does not always
+# quote attribute values (e.g., '<tr id=taskHeader1>').
+START_TAG_RE = re.compile(r'<([A-Za-z][A-Za-z0-9]*)')
+ID_ATTR_RE = re.compile(r'\sid\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+CLASS_ATTR_RE = re.compile(r'\sclass\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+
+# Cache of parsed stylesheets: filename -> (list of rules (see parse_css), names named in
+# their selectors (see get_selector_names))
+stylesheets = {}
+
+# Cache of pruned stylesheets: (filename, used names named in its selectors) -> CSS text
+pruned_stylesheets = {}
+
+# Guards both caches, as the 'render' stage of a batch run uses several threads
+cache_lock = threading.Lock()
+
+# Parse the text of a stylesheet. Return a list of rules, each a dictionary:
+#   type - 'rule' or 'at-rule'
+#   For a 'rule':
+#       selectors - list of the selectors (in the comma-separated list), minified
+#       declarations - the declarations (the text between the braces), minified
+#   For an 'at-rule':
+#       prelude - e.g., '@media print', minified
+#       rules - list of the rules it contains (parsed recursively), or None if it has no block
+def parse_css(text):
+    text = COMMENT_RE.sub('', text)
+    (rules, pos) = parse_rules(text, 0)
+    return rules
+# end_def parse_css()
+
+# Helper for parse_css: parse the rules in 'text' starting at 'pos', up to the end of 'text' or
+# the '}' closing the enclosing block. Return a tuple (rules, position after the closing '}').
+def parse_rules(text, pos):
+    rules = []
+    while pos < len(text):
+        brace = text.find('{', pos)
+        semicolon = text.find(';', pos)
+        close = text.find('}', pos)
+        if close != -1 and (brace == -1 or close < brace) and (semicolon == -1 or close < semicolon):
+            # End of the enclosing block
+            return (rules, close + 1)
+        # end_if
+        prelude = minify(text[pos:brace if brace != -1 else len(text)])
+        if prelude.startswith('@') and semicolon != -1 and (brace == -1 or semicolon < brace):
+            # At-rule without a block, e.g., @charset or @import
+            rule = {}
+            rule['type'] = 'at-rule'
+            rule['prelude'] = minify(text[pos:semicolon])
+            rule['rules'] = None
+            rules.append(rule)
+            pos = semicolon + 1
+            continue
+        # end_if
+        if brace == -1:
+            # Trailing white space (or garbage) at the end of the stylesheet
+            break
+        # end_if
+        if prelude.startswith('@'):
+            rule = {}
+            rule['type'] = 'at-rule'
+            rule['prelude'] = prelude
+            (rule['rules'], pos) = parse_rules(text, brace + 1)
+        else:
+            end = text.find('}', brace + 1)
+            end = end if end != -1 else len(text)
+            rule = {}
+            rule['type'] = 'rule'
+            rule['selectors'] = [s for s in prelude.split(',') if s != '']
+            rule['declarations'] = minify(text[brace + 1:end]).rstrip(';')
+            pos = end + 1
+        # end_if
+        rules.append(rule)
+    # end_while
+    return (rules, pos)
+# end_def parse_rules()
+
+# Return the CSS text 's' with redundant white space removed.
+def minify(s):
+    s = WHITESPACE_RE.sub(' ', s).strip()
+    return PUNCTUATION_SPACE_RE.sub(r'\1', s)
+# end_def minify()
+
+# Return a tuple (tags, ids, classes) of the frozensets of the element types (in lower case), ids,
+# and classes used in the string of HTML 'html'.
+def get_used_names(html):
+    tags = frozenset([tag.lower() for tag in START_TAG_RE.findall(html)])
+    ids = frozenset([''.join(m) for m in ID_ATTR_RE.findall(html)])
+    classes = set()
+    for m in CLASS_ATTR_RE.findall(html):
+        classes.update(''.join(m).split())
+    # end_for
+    return (tags, ids, frozenset(classes))
+# end_def get_used_names()
+
+# Return True if the (minified) selector 'selector' can match an element in a document using
+# the element types, ids, and classes in 'used' (as returned by get_used_names): i.e., if each
+# element type, id, and class it names is used in the document.
+def selector_matches(selector, used):
+    (tags, ids, classes) = used
+    selector = IGNORED_SELECTOR_PARTS_RE.sub('', selector)
+    for (prefix, name) in SIMPLE_SELECTOR_RE.findall(selector):
+        if name == '*':
+            continue
+        elif prefix == '#':
+            if name not in ids:
+                return False
+            # end_if
+        elif prefix == '.':
+            if name not in classes:
+                return False
+            # end_if
+        elif name.lower() not in tags:
+            return False
+        # end_if
+    # end_for
+    return True
+# end_def selector_matches()
+
+# Return a tuple (tags, ids, classes) of the frozensets of the element types (in lower case), ids,
+# and classes named in the selectors of the list of rules 'rules' (see parse_css), including
+# those of the rules in at-rules.
+def get_selector_names(rules):
+    tags = set()
+    ids = set()
+    classes = set()
+    for rule in rules:
+        if rule['type'] == 'rule':
+            for selector in rule['selectors']:
+                for (prefix, name) in SIMPLE_SELECTOR_RE.findall(IGNORED_SELECTOR_PARTS_RE.sub('', selector)):
+                    if name == '*':
+                        continue
+                    elif prefix == '#':
+                        ids.add(name)
+                    elif prefix == '.':
+                        classes.add(name)
+                    else:
+                        tags.add(name.lower())
+                    # end_if
+                # end_for
+            # end_for
+        elif rule['rules'] != None:
+            (rule_tags, rule_ids, rule_classes) = get_selector_names(rule['rules'])
+            tags.update(rule_tags)
+            ids.update(rule_ids)
+            classes.update(rule_classes)
+        # end_if
+    # end_for
+    return (frozenset(tags), frozenset(ids), frozenset(classes))
+# end_def get_selector_names()
+
+# Return the CSS text for the list of rules 'rules', keeping only the rules with a selector that can
+# match an element in a document using the names in 'used' (see selector_matches), and at-rules
+# containing at least one such rule.
+def format_pruned_rules(rules, used):
+    retval = ''
+    for rule in rules:
+        if rule['type'] == 'rule':
+            selectors = [s for s in rule['selectors'] if selector_matches(s, used)]
+            if len(selectors) > 0 and rule['declarations'] != '':
+                retval += ','.join(selectors) + '{' + rule['declarations'] + '}'
+            # end_if
+        elif rule['rules'] == None:
+            if not rule['prelude'].lower().startswith('@charset'):
+                retval += rule['prelude'] + ';'
+            # end_if
+        else:
+            contents = format_pruned_rules(rule['rules'], used)
+            if contents != '':
+                retval += rule['prelude'] + '{' + contents + '}'
+            # end_if
+        # end_if
+    # end_for
+    return retval
+# end_def format_pruned_rules()
+
+# Return a tuple: the list of rules in the stylesheet 'filename' (see parse_css), and the names
+# named in their selectors (see get_selector_names); the stylesheet is read and parsed only the
+# first time it is asked for. Raises IOError if it cannot be read.
+def get_stylesheet(filename):
+    cache_lock.acquire()
+    try:
+        if filename not in stylesheets:
+            f = open(filename, 'rb')
+            try:
+                text = f.read().decode('UTF-8')
+            finally:
+                f.close()
+            # end_try
+            rules = parse_css(text)
+            stylesheets[filename] = (rules, get_selector_names(rules))
+        # end_if
+        return stylesheets[filename]
+    finally:
+        cache_lock.release()
+    # end_try
+# end_def get_stylesheet()
+
+# Return the minified contents of the stylesheet 'filename', pruned to the rules that can apply to
+# a document using the element types, ids, and classes in 'used' (as returned by get_used_names).
+def get_pruned_css(filename, used):
+    (rules, selector_names) = get_stylesheet(filename)
+    # N.B. Names not named in any selector cannot affect the pruning (see selector_matches)
+    key = (filename, tuple([names & names_in_selectors for (names, names_in_selectors) in zip(used, selector_names)]))
+    cache_lock.acquire()
+    try:
+        retval = pruned_stylesheets.get(key)
+    finally:
+        cache_lock.release()
+    # end_try
+    if retval == None:
+        retval = format_pruned_rules(rules, used)
+        cache_lock.acquire()
+        try:
+            pruned_stylesheets[key] = retval
+        finally:
+            cache_lock.release()
+        # end_try
+    # end_if
+    return retval
+# end_def get_pruned_css()
@@ -24,6 +24,14 @@
 # 1. The worksheet containing the workscope exhibits MUST be named 'workscope_exhibits'.
 #    Other worksheets may be present; their contents are ignored by this script.
 #
+#    Alternatively, a workbook may contain the exhibits for several workscopes (e.g., the 
+#    sub-studies of a program), each in a worksheet of its own, with any name. In this case,
+#    each such worksheet MUST have its own copy of the defined names listed below, 'scoped'
+#    to that worksheet (in Excel's Name Manager, 'Scope' is the worksheet rather than
+#    'Workbook'). A defined name scoped to a worksheet takes precedence over a workbook-scoped
+#    defined name with the same name. See find_workscope_sheets in 'workbookValidator.py'
+#    for how the worksheets containing workscope exhibits are identified.
+#
 # 2. These 'defined names' MUST be present in the workbook and be defined as described
 #    below: (the following list is in alphabetical order)
 #
@@ -88,11 +96,37 @@
 # Internals of this Module: Top-level Functions
 # =============================================
 #
-# initExcelFile - Reads a completed .xlsx workscope exhibit template; extracts the row-
-#                 and colum-indices (and a couple of other things) of interest/use, 
-#                 which are stored in a dictionary object. This object is subsequently
-#                 used throughout the 'workscope_exhibit_tool.py' module; it is the most 
-#                 important data structure in the program as a whole.
+# initExcelWorkbook - Reads a completed .xlsx workscope exhibit template, and calls
+#                     init_workscope_sheet for each worksheet in it containing workscope
+#                     exhibits; the workbook is loaded only once.
+#
+# init_workscope_sheet - Extracts the row- and colum-indices (and a couple of other things)
+#                        of interest/use for one worksheet, which are stored in a dictionary
+#                        object ('xlsInfo'). This object is subsequently used throughout the
+#                        'workscope_exhibit_tool.py' module; it is the most important data
+#                        structure in the program as a whole.
+#
+# workbookSession - Context manager which reads a workbook with initExcelWorkbook, and then,
+#                   once the data for the exhibits has been extracted from it, releases it;
+#                   reports the memory used by the process before and after.
+#
+# initExcelFile - Reads a completed .xlsx workscope exhibit template containing a single
+#                 'workscope_exhibits' worksheet, and returns its xlsInfo.
+#
+# get_workbook_errors - Collects the error messages for a workbook and all its worksheets.
+#
+# extract_exhibit_data - Reads every value needed to render Exhibits 1 and 2 out of the
+#                        worksheet located by initExcelFile, and returns them in a compact
+#                        dictionary ('exData') that holds no OpenPyXl objects. The exhibit
+#                        generators work exclusively from this dictionary, so it can be
+#                        handed between processes (e.g., in batch runs) by pickling.
+#
+# check_exhibit_totals - Checks that the totals in the data extracted by extract_exhibit_data
+#                        add up, and returns the text of warning(s) for any that do not.
+#
+# get_exhibit_warnings - Collects the warnings for a workbook and all its worksheets.
+#
+# get_rss_kb - Returns the resident set size of this process, i.e., the memory it is using.
 #
 # dump_xlsInfo - Dumps contents of data structure generated by initExcelFile in 
 #                human-readable format.
@@ -100,13 +134,38 @@
 # Internals of this Module: Utility Functions
 # ===========================================
 #
+# open_workbook - loads a workbook with OpenPyXl, from a copy of the .xlsx file read into memory
+#
+# read_workbook_bytes - reads an .xlsx file into memory, in one sequential read
+#
+# get_defined_name - return the defined name with a given name in effect for a worksheet
+#
 # get_column_index - return the column index for a defined name assigned to a single cell
 #
 # get_row_index - return the row index for a defined name assigned to a single cell
 #
+# find_workscope_sheets - return the names of the worksheets containing workscope exhibits
+#
 # get_cell_contents - returns the contents of a cell, given a worksheet name, row index,
 #                     and column index
 #
+# cell_has_magic_fill - returns True if a cell is filled-in with MAGIC_FILL_STYLE, i.e.,
+#                       is part of a bar in the schedule exhibit
+#
+# get_magic_fill_style_ids - returns the set of the workbook's style ids whose fill is
+#                            MAGIC_FILL_STYLE, so that cells can be classified by style id
+#
+# read_sheet_grid - reads the contents of the cells of interest in the workscope_exhibits
+#                   worksheet into a sheetGrid object; only the rectangle of cells bounded
+#                   by the defined names is read (see below)
+#
+# N.B. Worksheets in completed templates frequently have a 'used range' far larger than
+#      the cells actually used, e.g., because formatting was applied to entire rows or
+#      columns. To avoid reading (and holding in memory) every cell in the used range,
+#      the workbook is opened in OpenPyXl's read_only mode, and only the rows and columns
+#      spanned by the cells referred to by the defined names are read. The workbook is
+#      closed once this has been done.
+#
 #
 # A Guide for the Perplexed (with apologies to Maimonides),
 #                           or
@@ -115,6 +174,8 @@
 #
 # Open an .xlsx workbook:
 #   wb = openpyxl.load_workbook(full_path_to_workbook_file, data_only=True)
+# or, to read cells only on demand (as this module does):
+#   wb = openpyxl.load_workbook(full_path_to_workbook_file, read_only=True, data_only=True)
 #
 # Get list of worksheets in workbook:
 #   ws_list = wb.sheetnames
@@ -127,6 +188,9 @@
 #
 # Get value of a defined name, e.g., 'foobar'
 #   dn_val = wb.defined_names['foobar'].value
+# N.B. This finds only workbook-scoped names. To get a name scoped to a worksheet, pass
+#      the (0-based) index of the worksheet in wb.sheetnames:
+#   dn_val = wb.defined_names.get('foobar', sheet_ix).value
 #
 # Get the worksheet and cell indices for a defined name,
 # and get the value of the cell it refers to
@@ -147,43 +211,169 @@
 # N.B. The 'magic' fill patternType indicating a filled-in cell in the 
 #      schedule exhibit is 'gray125'
 #
+# N.B. Getting the fill of a cell resolves the cell's style id through the workbook's
+#      tables of styles and fills each time. Rather than doing so for every cell read,
+#      this module finds the style ids having the 'magic' fill once per workbook, and
+#      compares the (raw) style id of each cell with them: see get_magic_fill_style_ids.
+#
 ###############################################################################
 
-import openpyxl
+# N.B. OpenPyXl is imported by open_workbook, rather than here: importing it takes a
+#      noticeable fraction of a second, which code paths that never open a workbook
+#      (e.g., validation, or starting the GUI) should not have to pay.
+import io
+import os
 import re
+import gc
+import workbookValidator
+from workbookValidator import parse_cell_reference, WORKSCOPE_SHEET_NAME, REQUIRED_DEFINED_NAMES
 
 # Fill style of filled-in cells in the schedule exhibit 
 MAGIC_FILL_STYLE = 'gray125'
 
+# Keys (in xlsInfo) of the columns of the salary cost table containing person-weeks
+# for each salary grade, in the order in which they appear in Exhibit 2.
+SALARY_GRADE_COLUMNS = ['m1_col_ix', 'p5_col_ix', 'p4_col_ix', 'p3_col_ix', 'p2_col_ix', 
+                        'p1_col_ix', 'sp3_col_ix', 'sp1_col_ix', 'temp_col_ix']
+
+# Keys (in xlsInfo) of all the columns of the salary cost table that are read for each task:
+# the salary grades, followed by 'Total [person weeks]', 'Direct Salary', 'Overhead', and 'Total Cost'.
+COST_TABLE_COLUMNS = SALARY_GRADE_COLUMNS + ['total_col_ix', 'direct_salary_col_ix', 'overhead_col_ix', 'total_cost_col_ix']
+
+# Number of rows below the first row of the milestones list that are read along with
+# the rest of the cells of interest. If the milestones list turns out to be longer,
+# the rest of it is read in one more pass. See read_sheet_grid.
+MILESTONE_CRAWL_MARGIN = 50
+
+# Names of the columns of the salary cost table other than those for the salary grades,
+# in the order of COST_TABLE_COLUMNS, as used in the warnings given by check_exhibit_totals.
+COST_TABLE_SUMMARY_NAMES = ['Total', 'Direct Salary', 'Overhead', 'Total Cost']
+
+# Tolerances used by check_exhibit_totals. Exhibit 2 shows person-weeks to a tenth of a week,
+# and dollars to the dollar; and the overhead rate is given to a hundredth of a percent.
+PERSON_WEEKS_TOLERANCE = 0.05
+DOLLARS_TOLERANCE = 1.0
+OVERHEAD_RATE_TOLERANCE = 0.0001
+
+# Matches the overhead rate as it appears in the cost table header, e.g., '@ 95.39%'
+OVERHEAD_RATE_RE = re.compile(r'([0-9]+(?:\.[0-9]*)?)\s*%')
+
+# The contents of the cells of interest in the 'workscope_exhibits' worksheet: those within
+# the rectangle implied by the defined names (see read_sheet_grid). Only non-empty cells
+# and cells with the 'magic' fill are stored; all others are treated as empty.
+# A sheetGrid contains only plain Python data, and so may be pickled.
+class sheetGrid:
+    def __init__(self):
+        # Dictionary: (row index, column index) -> value, for non-empty cells
+        self.values = {}
+        # Set of (row index, column index) of cells with the 'magic' fill
+        self.filled = set()
+        # Index of the last row read
+        self.max_row = 0
+    # end_def __init__()
+
+    # Read the cells in the given rectangle of the OpenPyXl worksheet 'ws'. 'magic_style_ids' is as
+    # returned by get_magic_fill_style_ids for its workbook; if it is None, the fill of each cell is
+    # looked up instead.
+    def read(self, ws, min_row, max_row, min_col, max_col, magic_style_ids=None):
+        for row in ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+            self.read_row(row, magic_style_ids)
+        # end_for
+        self.max_row = max(self.max_row, max_row)
+    # end_def read()
+
+    # Store the cells of interest in 'row' (a row of cells returned by iter_rows). N.B. This does
+    # not update max_row: see read.
+    def read_row(self, row, magic_style_ids=None):
+        from openpyxl.cell.read_only import EMPTY_CELL
+        for cell in row:
+            # N.B. Cells missing from the .xlsx file are returned as EMPTY_CELL, with 
+            #      neither a value nor a fill (nor a row or column index, or style id).
+            if cell is EMPTY_CELL:
+                continue
+            # end_if
+            if cell.value != None:
+                self.values[(cell.row, cell.column)] = cell.value
+            # end_if
+            if magic_style_ids != None:
+                filled = cell._style_id in magic_style_ids
+            else:
+                filled = cell.fill != None and cell.fill.patternType == MAGIC_FILL_STYLE
+            # end_if
+            if filled:
+                self.filled.add((cell.row, cell.column))
+            # end_if
+        # end_for
+    # end_def read_row()
+
+    # Return the value of a cell, or None if it is empty.
+    def get_value(self, row_ix, col_ix):
+        return self.values.get((row_ix, col_ix))
+    # end_def get_value()
+
+    # Return True if a cell has the 'magic' fill, False otherwise.
+    def has_magic_fill(self, row_ix, col_ix):
+        return (row_ix, col_ix) in self.filled
+    # end_def has_magic_fill()
+
+    # Return the values of a block of cells, as a list of rows (each a list of values),
+    # one per index in 'row_ixs', each containing one value per index in 'col_ixs'.
+    # Empty cells are returned as 'empty_value'.
+    def get_block(self, row_ixs, col_ixs, empty_value=None):
+        get = self.values.get
+        return [[get((row_ix, col_ix), empty_value) for col_ix in col_ixs] for row_ix in row_ixs]
+    # end_def get_block()
+# end_class sheetGrid
+
+# Return the defined name 'name' in effect in the worksheet with (0-based) index 'scope' in
+# wb.sheetnames: the one scoped to that worksheet, if there is one, or else the workbook-scoped one.
+# If 'scope' is None, only the workbook-scoped name is considered.
+# Raises KeyError if there is no such name.
+def get_defined_name(wb, name, scope=None):
+    if scope != None:
+        defn = wb.defined_names.get(name, scope)
+        if defn != None:
+            return defn
+        # end_if
+    # end_if
+    return wb.defined_names[name]
+# end_def get_defined_name()
+
 # Return the column index for a defined name assigned to A SINGLE CELL.
-# Note: In Excel, the scope of 'defined names' is the entire workBOOK, not a particular workSHEET.
-def get_column_index(wb, name):
-    ws = wb['workscope_exhibits']
-    x = wb.defined_names[name].value
-    temp = x.split('!')
-    # temp[0] is the worksheet reference, temp[1] is the cell reference
-    cell = ws[temp[1]]
-    col_ix = cell.col_idx
+# Note: In Excel, the scope of 'defined names' is by default the entire workBOOK, not a particular 
+#       workSHEET; but a name may also be scoped to a worksheet: see get_defined_name.
+# N.B. The index is parsed from the value of the defined name (e.g., 'workscope_exhibits!$B$2')
+#      rather than by looking the cell up in the worksheet, which would require reading it.
+def get_column_index(wb, name, scope=None):
+    x = get_defined_name(wb, name, scope).value
+    # temp[0] is the worksheet name, temp[1] the row index, temp[2] the column index
+    temp = parse_cell_reference(x)
+    col_ix = temp[2]
     return col_ix
 # end_def get_column_index()
 
 # Return the row index for a defined name assigned to A SINGLE CELL.
-# Note: In Excel, the scope of 'defined names' is the workBOOK, not a particular workSHEET.
-def get_row_index(wb, name):
-    ws = wb['workscope_exhibits']
-    x = wb.defined_names[name].value
-    temp = x.split('!')
-    # temp[0] is the worksheet reference, temp[1] is the cell reference
-    cell = ws[temp[1]]
-    row = cell.row
+# Note: See get_column_index.
+def get_row_index(wb, name, scope=None):
+    x = get_defined_name(wb, name, scope).value
+    # temp[0] is the worksheet name, temp[1] the row index, temp[2] the column index
+    temp = parse_cell_reference(x)
+    row = temp[1]
     return row
 # end_def get_row_index()
 
-# Return the contents of a cell.
-# If OpenPyXl cell accessor raises exception OR value returned by OpenPyXl accessor is None, return the empty string.
+# Return the list of the names of the worksheets in the workbook 'wb' that contain workscope
+# exhibits, in the order in which they appear in the workbook.
+def find_workscope_sheets(wb):
+    defined_names = [(defn.name, defn.localSheetId, defn.value) for defn in wb.defined_names.definedName]
+    return workbookValidator.find_workscope_sheets(wb.sheetnames, defined_names)
+# end_def find_workscope_sheets()
+
+# Return the contents of a cell in a sheetGrid.
+# If the accessor raises exception OR the cell is empty, return the empty string.
 def get_cell_contents(ws, row_ix, col_ix):
     try:
-        temp = ws.cell(row_ix, col_ix).value
+        temp = ws.get_value(row_ix, col_ix)
     except:
         temp = ''
     if temp == None:
@@ -193,6 +383,88 @@ def get_cell_contents(ws, row_ix, col_ix):
     return retval
 # end_def get_cell_contents()
 
+# Return True if a cell in a sheetGrid is filled-in with the 'magic' fill pattern, False otherwise.
+def cell_has_magic_fill(ws, row_ix, col_ix):
+    return ws.has_magic_fill(row_ix, col_ix)
+# end_def cell_has_magic_fill()
+
+# Return the set of the style ids (indices in the workbook's table of cell styles, as found in each
+# cell of the .xlsx file) of the styles in the OpenPyXl workbook 'wb' whose fill has the pattern
+# MAGIC_FILL_STYLE. A cell read from 'wb' then has the 'magic' fill if its style id is in the set.
+# N.B. The tables of styles and fills, and the style id of a cell, are internals of OpenPyXl's
+#      workbooks opened in read_only mode; if they are not found, None is returned, and the
+#      fill of each cell is looked up instead (see sheetGrid).
+def get_magic_fill_style_ids(wb):
+    try:
+        if not wb.read_only:
+            return None
+        # end_if
+        fills = wb._fills
+        return set([style_id for (style_id, style) in enumerate(wb._cell_styles)
+                    if fills[style.fillId].patternType == MAGIC_FILL_STYLE])
+    except (AttributeError, IndexError):
+        return None
+    # end_try
+# end_def get_magic_fill_style_ids()
+
+# Read the cells of interest in the OpenPyXl worksheet 'ws' into a sheetGrid, and return it.
+# 'xlsInfo' is the (incomplete) dictionary being built by initExcelFile, containing
+# the row and column indices of all the cells identified by defined names.
+#
+# Only the cells within the rectangle bounding those cells are read: this includes the
+# task list, schedule columns, cost table columns, ODC and funding rows, the row above the
+# task list containing the salary grade abbreviations, and the first MILESTONE_CRAWL_MARGIN
+# rows of the milestones list. Workbooks that have been copied around often carry formatting
+# down to row 1,048,576 or out to column XFD; the cells outside the rectangle are skipped, 
+# and, in particular, no rows beyond the rectangle are read at all. So the cost of reading
+# a workbook is proportional to the size of its exhibits rather than the nominal size of
+# the worksheet.
+#
+# The length of the milestones list isn't known in advance: it is found by crawling down
+# milestone_label_column until the first empty cell (see extract_exhibit_data). If the
+# milestones list reaches the bottom of the rectangle, the rest of it is read in one more
+# pass over the milestone columns, which stops at the first row whose label is empty.
+# N.B. Each call of iter_rows parses the worksheet's XML from the top; so the list is read
+#      in a single pass, rather than in chunks, which would take time quadratic in its length.
+# 'magic_style_ids' is as returned by get_magic_fill_style_ids for the workbook (see sheetGrid).
+def read_sheet_grid(ws, xlsInfo, magic_style_ids=None):
+    row_ixs = []
+    col_ixs = []
+    for key in xlsInfo:
+        if key.endswith('_row_ix') or key.endswith('_line_ix'):
+            row_ixs.append(xlsInfo[key])
+        elif key.endswith('_col_ix'):
+            col_ixs.append(xlsInfo[key])
+        # end_if
+    # end_for
+    min_row = min(row_ixs + [xlsInfo['task_list_top_row_ix'] - 1])
+    max_row = max(row_ixs + [xlsInfo['milestones_list_first_row_ix'] + MILESTONE_CRAWL_MARGIN])
+    min_col = min(col_ixs)
+    max_col = max(col_ixs)
+    grid = sheetGrid()
+    grid.read(ws, max(min_row, 1), max_row, max(min_col, 1), max_col, magic_style_ids)
+    
+    label_col = xlsInfo['milestone_label_col_ix']
+    name_col = xlsInfo['milestone_name_col_ix']
+    row_ix = xlsInfo['milestones_list_first_row_ix'] + 1
+    while row_ix <= grid.max_row and str(get_cell_contents(grid, row_ix, label_col)).strip() != '':
+        row_ix += 1
+    # end_while
+    if row_ix > grid.max_row:
+        # N.B. The rows are parsed lazily, as they are iterated over, so none are parsed
+        #      beyond the end of the list.
+        for row in ws.iter_rows(min_row=row_ix, min_col=min(label_col, name_col), max_col=max(label_col, name_col)):
+            grid.read_row(row, magic_style_ids)
+            grid.max_row = row_ix
+            if str(get_cell_contents(grid, row_ix, label_col)).strip() == '':
+                break
+            # end_if
+            row_ix += 1
+        # end_for
+    # end_if
+    return grid
+# end_def read_sheet_grid()
+
 # Return the column index of the right-most schedule column
 # that is either filled-in as part of a task duration or
 # contains an upper-case character indicating a milestone.
@@ -210,11 +482,8 @@ def get_last_used_sched_column(xlsInfo):
     for col in range(last_col - 1, first_col -1 , -1):
         bv = ''
         for row in range(first_row+1,last_row):
-            cell = ws.cell(row,col)
-            fill = cell.fill
-            patternType = fill.patternType
             contents = get_cell_contents(ws,row,col)
-            if patternType == MAGIC_FILL_STYLE or str(contents).isupper():
+            if cell_has_magic_fill(ws,row,col) or str(contents).isupper():
                 bv += '1'
             else:
                 bv += '0'
@@ -242,7 +511,8 @@ def dump_xlsInfo(xlsInfo):
     # end_for()
 # end_def dump_xlsInfo()
 
-# Open the workbook (.xlsx file) inidicated by the "fullpath" parameter.
+# Locate the cells of interest in the worksheet 'sheet_name' of the workbook 'wb', which
+# must have been opened by open_workbook, and read their contents.
 # Return a dictionary containing the items listed below, which is in
 # (almost) alphabetical order. The meaning of most of these entries
 # is self-evident from their names, or from consulting the comment
@@ -292,11 +562,14 @@ def dump_xlsInfo(xlsInfo):
 #   p5_col_ix
 #   project_name_cell_col_ix
 #   project_name_cell_row_ix
+#   sched_major_units_cell_col_ix
+#   sched_major_units_cell_row_ix
 #   sched_major_units - the 'major scheduling unit' used in the input .xlsx file;
 #                       legal value can only be 'Quarter', 'Month', or 'Week'
 #   sched_minor_units - the 'minor scheduling unit' implied by the major 
 #                       scheduling unit selected by the user; legal value 
 #                       can only be 'Months', 'Weeks', or 'Days'
+#   sheet_name - the name of the worksheet
 #   sp1_col_ix
 #   sp3_col_ix
 #   task_list_bottom_row_ix
@@ -309,203 +582,242 @@ def dump_xlsInfo(xlsInfo):
 #   total_cost_cell_row_ix
 #   total_cost_col_ix
 #   total_line_row_ix
-#   wb - the .xlsx workbook that was opened
-#   ws - the 'workscope_exhibits' worksheet
+#   wb - the .xlsx workbook; N.B. it is closed by initExcelWorkbook (or initExcelFile) 
+#        once all its worksheets have been read, as everything needed from it has been 
+#        read into 'ws'
+#   ws - a sheetGrid containing the contents of the cells of interest in the
+#        worksheet (see read_sheet_grid)
+#
+# The defined names used are those in effect in the worksheet: see get_defined_name.
+# If the worksheet or any of the defined names cannot be found, or a defined name refers to
+# a cell in some other worksheet, the dictionary is returned as soon as this has been
+# determined, without reading any cells; 'errors' reports what could not be found.
+#
+# 'magic_style_ids' is as returned by get_magic_fill_style_ids for 'wb' (which need only be
+# called once for all of the worksheets in a workbook); if it is None, it is found here.
 #
-def initExcelFile(fullpath):
+def init_workscope_sheet(wb, sheet_name, magic_style_ids=None):
     # retval dictionary
     retval = {}
     retval['errors'] = ''
+    retval['sheet_name'] = sheet_name
     
-    # Workbook MUST be opened with the data_only parameter set to True.
-    # This ensures that we read the computed value in cells containing a formula, not the formula itself.
-    try:
-        wb = openpyxl.load_workbook(fullpath, data_only=True)
-        retval['wb'] = wb
-    except:
-        retval['errors'] += 'Failed to open and/or load input .xlsx file.\n'
-    # 
-    # N.B. The worksheet containing the workscope exhibits is named 'workscope_exhibits'.
+    # N.B. Neither the workbook nor the worksheet is stored in the dictionary: it holds only the
+    #      contents of the cells of interest (see read_sheet_grid), so that none of OpenPyXl's
+    #      objects are kept alive by it once the workbook has been closed.
     try:
-        ws = wb['workscope_exhibits']
-        retval['ws'] = ws
+        ws = wb[sheet_name]
+        # Index of the worksheet, as used to identify the scope of defined names
+        scope = wb.sheetnames.index(sheet_name)
     except:
-        retval['errors'] += 'Failed to find workscope_exhibits worksheet.\n'
+        retval['errors'] += 'Failed to find ' + sheet_name + ' worksheet.\n'
+        return retval
+    # end_try
     # Collect row and column indices for cells of interest for Exhibit 2
     #
     try:
-        retval['project_name_cell_row_ix'] = get_row_index(wb, 'project_name_cell')
-        retval['project_name_cell_col_ix'] = get_column_index(wb, 'project_name_cell')
+        retval['project_name_cell_row_ix'] = get_row_index(wb, 'project_name_cell', scope)
+        retval['project_name_cell_col_ix'] = get_column_index(wb, 'project_name_cell', scope)
     except:
         retval['errors'] += 'Failed to find defined name: project_name_cell.\n'
     try:
-        retval['direct_salary_cell_row_ix'] = get_row_index(wb, 'direct_salary_cell')
-        retval['direct_salary_cell_col_ix'] = get_column_index(wb, 'direct_salary_cell')
+        retval['direct_salary_cell_row_ix'] = get_row_index(wb, 'direct_salary_cell', scope)
+        retval['direct_salary_cell_col_ix'] = get_column_index(wb, 'direct_salary_cell', scope)
     except:
         retval['errors'] += 'Failed to find defined name: direct_salary_cell.\n'
     try:
-        retval['odc_cell_row_ix'] = get_row_index(wb, 'odc_cell')
-        retval['odc_cell_col_ix'] = get_column_index(wb, 'odc_cell')
+        retval['odc_cell_row_ix'] = get_row_index(wb, 'odc_cell', scope)
+        retval['odc_cell_col_ix'] = get_column_index(wb, 'odc_cell', scope)
     except:
         retval['errors'] += 'Failed to find defined name: odc_cell.\n'
     try:
-        retval['total_cost_cell_row_ix'] = get_row_index(wb, 'total_cost_cell')
-        retval['total_cost_cell_col_ix'] = get_column_index(wb, 'total_cost_cell')
+        retval['total_cost_cell_row_ix'] = get_row_index(wb, 'total_cost_cell', scope)
+        retval['total_cost_cell_col_ix'] = get_column_index(wb, 'total_cost_cell', scope)
     except:
         retval['errors'] += 'Failed to find defined name: total_cost_cell.\n'
     # Overhead rate cell.
     try:
-        retval['overhead_cell_row_ix'] = get_row_index(wb, 'overhead_cell')
-        retval['overhead_cell_col_ix'] = get_column_index(wb, 'overhead_cell')
+        retval['overhead_cell_row_ix'] = get_row_index(wb, 'overhead_cell', scope)
+        retval['overhead_cell_col_ix'] = get_column_index(wb, 'overhead_cell', scope)
     except:
         retval['errors'] += ' Failed to find defined name: overhead_cell.\n'
     #       
     # Collect useful row indices for Exhibit 2
     #
     try:
-        retval['task_list_top_row_ix'] = get_row_index(wb, 'task_list_top')
+        retval['task_list_top_row_ix'] = get_row_index(wb, 'task_list_top', scope)
     except:
         retval['errors'] += 'Failed to find defined name: task_list_top.\n'
     try:
-        retval['task_list_bottom_row_ix'] = get_row_index(wb, 'task_list_bottom')
+        retval['task_list_bottom_row_ix'] = get_row_index(wb, 'task_list_bottom', scope)
     except:
         retval['errors'] += 'Failed to find defined name: task_list_bottom.\n'
     try:
-        retval['total_line_row_ix'] = get_row_index(wb, 'total_line')   
+        retval['total_line_row_ix'] = get_row_index(wb, 'total_line', scope)   
     except:
         retval['errors'] += 'Failed to find defined name: total_line.\n'
     # Rows containing other direct costs
     try:
-        retval['odc_travel_line_ix'] =  get_row_index(wb, 'odc_travel_line')
+        retval['odc_travel_line_ix'] =  get_row_index(wb, 'odc_travel_line', scope)
     except:
         retval['errors'] += 'Failed to find defined name: odc_travel_line.\n'
     try:
-        retval['odc_office_equipment_line_ix'] = get_row_index(wb, 'odc_office_equipment_line')
+        retval['odc_office_equipment_line_ix'] = get_row_index(wb, 'odc_office_equipment_line', scope)
     except:
         retval['errors'] += 'Failed to find odc_office_equipment_line.\n'
     try:
-        retval['odc_dp_equipment_line_ix'] = get_row_index(wb, 'odc_dp_equipment_line')
+        retval['odc_dp_equipment_line_ix'] = get_row_index(wb, 'odc_dp_equipment_line', scope)
     except:
-        retval['errors'] = 'Failed to find defined name: odc_dp_equipment_line.\n'
+        retval['errors'] += 'Failed to find defined name: odc_dp_equipment_line.\n'
     try:
-        retval['odc_consultants_line_ix'] = get_row_index(wb, 'odc_consultants_line')
+        retval['odc_consultants_line_ix'] = get_row_index(wb, 'odc_consultants_line', scope)
     except:
         retval['errors'] += 'Failed to find defined name: odc_consultants_line.\n'
     try:
-        retval['odc_printing_line_ix'] = get_row_index(wb, 'odc_printing_line')
+        retval['odc_printing_line_ix'] = get_row_index(wb, 'odc_printing_line', scope)
     except:
         retval['errors'] += 'Failed to find defined name:  odc_printing_line.\n'
     try:
-        retval['odc_other_line_ix'] = get_row_index(wb, 'odc_other_line')   
+        retval['odc_other_line_ix'] = get_row_index(wb, 'odc_other_line', scope)   
     except:
         retval['errors'] += 'Failed to find defined name:  odc_other_line.\n'
     # Rows containing info on funding source(s)
     try:
-        retval['funding_list_top_row_ix'] = get_row_index(wb, 'funding_list_top')
+        retval['funding_list_top_row_ix'] = get_row_index(wb, 'funding_list_top', scope)
     except:
         retval['errors'] += 'Failed to find defined name: funding_list_top.\n'
     try:
-        retval['funding_list_bottom_row_ix'] = get_row_index(wb, 'funding_list_bottom')
+        retval['funding_list_bottom_row_ix'] = get_row_index(wb, 'funding_list_bottom', scope)
     except:
         retval['errors'] += 'Failed to find defined name: funding_list_bottom.\n'
     #
     # Collect useful column indices for Exhibit 2
     #
     try:
-        retval['task_number_col_ix'] = get_column_index(wb, 'task_number_column')
+        retval['task_number_col_ix'] = get_column_index(wb, 'task_number_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: task_number_column.\n'
     try:
-        retval['task_name_col_ix'] = get_column_index(wb, 'task_name_column')
+        retval['task_name_col_ix'] = get_column_index(wb, 'task_name_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: task_name_column.\n'
     try:
-        retval['m1_col_ix'] = get_column_index(wb, 'm1_column')
+        retval['m1_col_ix'] = get_column_index(wb, 'm1_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: m1_column.\n'
     try:
-        retval['p5_col_ix'] = get_column_index(wb, 'p5_column')
+        retval['p5_col_ix'] = get_column_index(wb, 'p5_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: p5_column.\n'
     try:    
-        retval['p4_col_ix'] = get_column_index(wb, 'p4_column')
+        retval['p4_col_ix'] = get_column_index(wb, 'p4_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: p4_column.\n'
     try:
-        retval['p3_col_ix'] = get_column_index(wb, 'p3_column')
+        retval['p3_col_ix'] = get_column_index(wb, 'p3_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: p3_column.\n'
     try:
-        retval['p2_col_ix'] = get_column_index(wb, 'p2_column')
+        retval['p2_col_ix'] = get_column_index(wb, 'p2_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: p2_column.\n'
     try:
-        retval['p1_col_ix'] = get_column_index(wb, 'p1_column')
+        retval['p1_col_ix'] = get_column_index(wb, 'p1_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: p1_column.\n'
     try:
-        retval['sp3_col_ix'] = get_column_index(wb, 'sp3_column')
+        retval['sp3_col_ix'] = get_column_index(wb, 'sp3_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name:  sp3_column.\n'
     try:
-        retval['sp1_col_ix'] = get_column_index(wb, 'sp1_column')
+        retval['sp1_col_ix'] = get_column_index(wb, 'sp1_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: sp1_column.\n'
     try:
-        retval['temp_col_ix'] = get_column_index(wb, 'temp_column')
+        retval['temp_col_ix'] = get_column_index(wb, 'temp_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: temp_column.\n'
     # The following statement refers to the column for total labor cost before overhead
     try:
-        retval['total_col_ix'] = get_column_index(wb, 'total_column')
+        retval['total_col_ix'] = get_column_index(wb, 'total_column', scope)
     except:
         retval['errors'] += 'Failed to find defined_name: total_column.\n'
     try:
-        retval['direct_salary_col_ix'] = get_column_index(wb, 'direct_salary_column')
+        retval['direct_salary_col_ix'] = get_column_index(wb, 'direct_salary_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: direct_salary_column.\n'
     try:
-        retval['overhead_col_ix'] = get_column_index(wb, 'overhead_column')
+        retval['overhead_col_ix'] = get_column_index(wb, 'overhead_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: overhead_column.\n'
     try:
-        retval['total_cost_col_ix'] = get_column_index(wb, 'total_cost_column')
+        retval['total_cost_col_ix'] = get_column_index(wb, 'total_cost_column', scope)
     except:
         retval['errors'] += 'Failed to find defined_name: total_cost_column.\n'
     #
     # C'est un petit hacque: The column index for funding source names is the same as that for task names.
     #
-    retval['funding_source_name_col_ix'] = retval['task_name_col_ix']
+    if 'task_name_col_ix' in retval:
+        retval['funding_source_name_col_ix'] = retval['task_name_col_ix']
+    # end_if
     
     # Collect row and column indices for cells of interest for Exhibit 1
     #
     try:
-        retval['first_schedule_col_ix'] = get_column_index(wb, 'first_schedule_column')
+        retval['first_schedule_col_ix'] = get_column_index(wb, 'first_schedule_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: first_schedule_column.\n'
     try:
-        retval['last_schedule_col_ix'] = get_column_index(wb, 'last_schedule_column')
+        retval['last_schedule_col_ix'] = get_column_index(wb, 'last_schedule_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: last_schedule_column.\n'
     try:
-        retval['milestone_label_col_ix'] = get_column_index(wb, 'milestone_label_column')
+        retval['milestone_label_col_ix'] = get_column_index(wb, 'milestone_label_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: milestone_label_column.\n'
     try:
-        retval['milestone_name_col_ix'] = get_column_index(wb, 'milestone_name_column')
+        retval['milestone_name_col_ix'] = get_column_index(wb, 'milestone_name_column', scope)
     except:
         retval['errors'] += 'Failed to find defined name: milestone_name_column.\n'
     try:
-        retval['milestones_list_first_row_ix'] = get_row_index(wb, 'milestones_list_first_row')
+        retval['milestones_list_first_row_ix'] = get_row_index(wb, 'milestones_list_first_row', scope)
     except:
         retval['errors'] += 'Failed to find defined name: milestones_list_first_row.\n'
     # N.B. The last row of the milestones list is found programmatically by crawling down
     #      milestone_label_column until the first row containing a blank cell is found.
+    try:
+        retval['sched_major_units_cell_row_ix'] = get_row_index(wb, 'sched_major_units_cell', scope)
+        retval['sched_major_units_cell_col_ix'] = get_column_index(wb, 'sched_major_units_cell', scope)
+    except:
+        retval['errors'] += 'Failed to find defined name: sched_major_units_cell.\n'
+    
+    # Each of the defined names must refer to a cell in this worksheet.
+    for name in REQUIRED_DEFINED_NAMES:
+        try:
+            ref = parse_cell_reference(get_defined_name(wb, name, scope).value)
+        except:
+            # Already reported
+            continue
+        # end_try
+        if ref != None and ref[0] != sheet_name:
+            retval['errors'] += 'Defined name ' + name + ' does not refer to a cell in the ' + sheet_name + ' worksheet.\n'
+        # end_if
+    # end_for
+    
+    # If anything is missing, there's no point in reading any cells.
+    if retval['errors'] != '':
+        return retval
+    # end_if
+    
+    # Read the cells of interest.
+    if magic_style_ids == None:
+        magic_style_ids = get_magic_fill_style_ids(wb)
+    # end_if
+    ws = read_sheet_grid(ws, retval, magic_style_ids)
+    retval['ws'] = ws
     
     try:
-        row_ix = get_row_index(wb, 'sched_major_units_cell')
-        col_ix = get_column_index(wb, 'sched_major_units_cell')
-        maj_units = get_cell_contents(ws, row_ix, col_ix)
+        maj_units = get_cell_contents(ws, retval['sched_major_units_cell_row_ix'], retval['sched_major_units_cell_col_ix'])
         retval['sched_major_units'] = maj_units
         if maj_units == 'Quarter':
             min_units = 'Month'
@@ -521,7 +833,7 @@ def initExcelFile(fullpath):
         retval['sched_minor_units'] = min_units
         retval['num_sched_subdivisions'] = num_subdivisions
     except:
-        retval['errors'] += 'Failed to find defined name: sched_major_units_cell.\n'
+        retval['errors'] += 'Failed to read contents of sched_major_units_cell.\n'
     #
     # N.B. The slightly incomplete 'retval' is now passed to get_last_used_sched_column
     last_used_schedule_col_ix = get_last_used_sched_column(retval)
@@ -539,4 +851,495 @@ def initExcelFile(fullpath):
     
     retval['num_sched_col_header_cells'] = num_major_sched_units
     return retval
+# end_def init_workscope_sheet()
+
+# Open the workbook (.xlsx file) inidicated by the "fullpath" parameter, and return it.
+# "fullpath" may instead be a file-like object (e.g., an io.BytesIO) containing the .xlsx file.
+# Raises an exception if the workbook cannot be opened.
+def open_workbook(fullpath):
+    # Workbook MUST be opened with the data_only parameter set to True.
+    # This ensures that we read the computed value in cells containing a formula, not the formula itself.
+    # The workbook is opened in read_only mode: in this mode, OpenPyXl reads cells from the
+    # .xlsx file only when asked to, rather than reading every cell of every worksheet up front.
+    import openpyxl
+    if isinstance(fullpath, basestring):
+        # OpenPyXl reads an .xlsx file (i.e., a zip archive) in many small reads, each preceded
+        # by a seek; on a network share, each is a round trip to the server, and these, rather
+        # than parsing, dominate the time taken. So the file is read in one go, and loaded from memory.
+        fullpath = io.BytesIO(read_workbook_bytes(fullpath))
+    # end_if
+    return openpyxl.load_workbook(fullpath, read_only=True, data_only=True)
+# end_def open_workbook()
+
+# Return the contents of the .xlsx file 'fullpath', read in one sequential read, as a string of bytes.
+# The workbook can then be loaded from an io.BytesIO containing them (see open_workbook), e.g., in
+# another process, or after it has been read ahead of time (see 'workscope_exhibit_batch.py').
+# Raises IOError if the file cannot be read.
+def read_workbook_bytes(fullpath):
+    f = open(fullpath, 'rb')
+    try:
+        return f.read()
+    finally:
+        f.close()
+    # end_try
+# end_def read_workbook_bytes()
+
+# Open the workbook (.xlsx file) inidicated by the "fullpath" parameter, and read each of the
+# worksheets in it containing workscope exhibits (see find_workscope_sheets); the workbook is
+# loaded only once, and is closed before returning.
+# Return a dictionary containing:
+#   errors - string with text of error message(s) for any error(s) encountered when reading
+#            the workbook as a whole; errors in individual worksheets are reported in their
+#            'xlsInfo' (but see get_workbook_errors)
+#   sheets - list of the dictionaries returned by init_workscope_sheet, one per worksheet,
+#            in the order in which the worksheets appear in the workbook
+def initExcelWorkbook(fullpath):
+    retval = {}
+    retval['errors'] = ''
+    retval['sheets'] = []
+    try:
+        wb = open_workbook(fullpath)
+    except MemoryError:
+        # Let the caller know the real reason the workbook could not be loaded,
+        # e.g., when it is being read under a memory limit in a batch run.
+        raise
+    except:
+        retval['errors'] += 'Failed to open and/or load input .xlsx file.\n'
+        return retval
+    # end_try
+    try:
+        sheet_names = find_workscope_sheets(wb)
+        if len(sheet_names) == 0:
+            retval['errors'] += 'Failed to find ' + WORKSCOPE_SHEET_NAME + ' worksheet.\n'
+        # end_if
+        # The style ids with the 'magic' fill are the same for all the worksheets
+        magic_style_ids = get_magic_fill_style_ids(wb)
+        for sheet_name in sheet_names:
+            retval['sheets'].append(init_workscope_sheet(wb, sheet_name, magic_style_ids))
+        # end_for
+    finally:
+        wb.close()
+    # end_try
+    return retval
+# end_def initExcelWorkbook()
+
+# A 'session' for reading the workbook (.xlsx file) 'fullpath': a context manager, for use in a 'with'
+# statement, which reads the workbook (see initExcelWorkbook) on entry, and releases everything read
+# from it (other than the data extracted by extract_exhibit_data) on exit, e.g.:
+#     with workbookSession(fullpath) as session:
+#         if session.errors == '':
+#             exDatas = session.extract()
+#         # end_if
+#     # end_with
+#     print session.get_memory_report()
+# Only the data extracted should be kept after the 'with' statement: in long-running processes
+# (the GUI, the daemon, batch workers), nothing read from one workbook then survives to be
+# carried along while the next is read. The resident set size of the process is measured on
+# entry and exit, so that this can be checked (see get_rss_kb).
+# The attributes of a session are:
+#   fullpath
+#   wbInfo - as returned by initExcelWorkbook, while in the 'with' statement; None after it
+#   errors - as returned by get_workbook_errors
+#   rss_before_kb - resident set size before reading the workbook (see get_rss_kb)
+#   rss_after_kb - resident set size after releasing it, or None while in the 'with' statement
+class workbookSession:
+    def __init__(self, fullpath):
+        self.fullpath = fullpath
+        self.wbInfo = None
+        self.errors = ''
+        self.rss_before_kb = None
+        self.rss_after_kb = None
+    # end_def __init__()
+
+    def __enter__(self):
+        self.rss_before_kb = get_rss_kb()
+        self.wbInfo = initExcelWorkbook(self.fullpath)
+        self.errors = get_workbook_errors(self.wbInfo)
+        return self
+    # end_def __enter__()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        # Do not suppress any exception
+        return False
+    # end_def __exit__()
+
+    # Return the data read by extract_exhibit_data from each of the xlsInfo dictionaries in the list
+    # 'sheets' (by default, every worksheet containing workscope exhibits), as a list.
+    def extract(self, sheets=None):
+        if sheets == None:
+            sheets = self.wbInfo['sheets']
+        # end_if
+        return [extract_exhibit_data(xlsInfo) for xlsInfo in sheets]
+    # end_def extract()
+
+    # Release everything read from the workbook. N.B. OpenPyXl's objects refer to each other, and
+    # are freed only by the garbage collector, which is run now, rather than whenever it next runs.
+    def close(self):
+        self.wbInfo = None
+        gc.collect()
+        self.rss_after_kb = get_rss_kb()
+    # end_def close()
+
+    # Return a line of text reporting the resident set size before and after the session.
+    def get_memory_report(self):
+        return 'Memory (resident set size) when reading ' + str(self.fullpath) + ': ' + \
+               format_rss(self.rss_before_kb) + ' before, ' + format_rss(self.rss_after_kb) + ' after.'
+    # end_def get_memory_report()
+# end_class workbookSession
+
+# Return the resident set size of this process, i.e., the memory it is actually using, in kilobytes;
+# or None if it cannot be found on this platform (it is read from /proc, which only Linux has).
+def get_rss_kb():
+    try:
+        f = open('/proc/self/statm')
+        try:
+            fields = f.read().split()
+        finally:
+            f.close()
+        # end_try
+    except IOError:
+        return None
+    # end_try
+    return int(fields[1]) * (os.sysconf('SC_PAGE_SIZE') / 1024)
+# end_def get_rss_kb()
+
+# Format a resident set size returned by get_rss_kb for output.
+def format_rss(rss_kb):
+    if rss_kb == None:
+        return 'unknown'
+    # end_if
+    return '%.1f MB' % (rss_kb / 1024.0)
+# end_def format_rss()
+
+# Return a string with the text of the error message(s) for the workbook read by
+# initExcelWorkbook and all of its worksheets, or '' if none were found. When the workbook
+# contains more than one worksheet containing workscope exhibits, the errors for each 
+# worksheet are preceeded by its name.
+def get_workbook_errors(wbInfo):
+    retval = wbInfo['errors']
+    for xlsInfo in wbInfo['sheets']:
+        if xlsInfo['errors'] != '' and len(wbInfo['sheets']) > 1:
+            retval += 'Worksheet ' + xlsInfo['sheet_name'] + ':\n'
+        # end_if
+        retval += xlsInfo['errors']
+    # end_for
+    return retval
+# end_def get_workbook_errors()
+
+# Open the workbook (.xlsx file) inidicated by the "fullpath" parameter, which contains a 
+# single worksheet containing workscope exhibits, named 'sheet_name'. Return the dictionary
+# returned by init_workscope_sheet for it; the workbook is closed before returning.
+def initExcelFile(fullpath, sheet_name=WORKSCOPE_SHEET_NAME):
+    try:
+        wb = open_workbook(fullpath)
+    except MemoryError:
+        raise
+    except:
+        retval = {}
+        retval['errors'] = 'Failed to open and/or load input .xlsx file.\n'
+        return retval
+    # end_try
+    try:
+        retval = init_workscope_sheet(wb, sheet_name)
+    finally:
+        wb.close()
+    # end_try
+    return retval
 # end_def initExcelFile()
+
+
+# Return the list of 'schedule items' (bars and milestones) for the task in row task_row_ix
+# of the schedule exhibit. Each item is a dictionary:
+#     'type'      : 'bar' or 'milestone'
+#     'start'     : start column index
+#     'end'       : end column index   ('start' == 'end' for milestones)
+#     'milestone' : if item is a milestone, the milestone letter, otherwise ''
+# The list is sorted on (1) the 'start' value and (2) the 'type'.
+# N.B. 'bar' appears before 'milestone' in the sort order for 'type', 
+#      and so thereby ensures that the HTML for task bars are generated before
+#      the HTML for any milesones occuring within them.
+def get_sched_items(xlsInfo, task_row_ix):
+    ws = xlsInfo['ws']
+    first_col = xlsInfo['first_schedule_col_ix']
+    last_col = xlsInfo['last_used_schedule_col_ix']
+    
+    # Build the list of 'bars'
+    # Prep work: Generate a string of 0's and 1's indicating the cells in the schedule
+    # bar chart that have been 'filled in' with the magic fill pattern 'gray125'.
+    # Logically, we're creating a bit vector; it's implemented, however as a vector
+    # of '0' and '1' characters in a string.
+    my_pseudo_bv = ''
+    for col in range(first_col, last_col+1):
+        my_pseudo_bv += '1' if cell_has_magic_fill(ws, task_row_ix, col) else '0'
+    # end_for
+    bars = []
+    for match in re.finditer('1+', my_pseudo_bv):
+        my_span = match.span()
+        # To get the actual column indices of the first and last cell, bias the indices
+        # in the (logical) bitvector by the index of the first column in the schedule table
+        temp = {}
+        temp['type'] = 'bar'
+        temp['start'] = my_span[0] + first_col
+        temp['end'] = my_span[1] + first_col - 1
+        temp['milestone'] = ''
+        bars.append(temp)
+    # end_for
+    
+    # Build the list of 'milestones'
+    milestones = []
+    for col in range(first_col, last_col+1):
+        val = get_cell_contents(ws, task_row_ix, col)
+        if str(val).isupper():
+            temp = {}
+            temp['type'] = 'milestone'
+            temp['start'] = col
+            temp['end'] = col
+            temp['milestone'] = val
+            milestones.append(temp)
+        # end_if
+    # end_for
+    
+    return sorted(bars + milestones, key=lambda x: (x['start'], x['type']))
+# end_def get_sched_items()
+
+# Read everything needed to generate Exhibits 1 and 2 from the worksheet located by init_workscope_sheet.
+# Return a dictionary containing the items listed below. Apart from the 'schedule items' 
+# (see get_sched_items), the values are the cell contents as returned by get_cell_contents.
+# The dictionary contains only plain Python data, and in particular no references to the 
+# workbook or worksheet, so it may be pickled, cached, or passed to another process.
+#
+#   cost_block - list with one entry per task, parallel to 'tasks'; each entry is the list
+#                of the task's values in the cost table columns listed in COST_TABLE_COLUMNS
+#   cost_col_headers - list of the salary grade abbreviations (e.g., 'P-5') heading the
+#                      cost table columns listed in SALARY_GRADE_COLUMNS
+#   cost_totals - list of the values in the 'total' line of the cost table, for the
+#                 columns listed in COST_TABLE_COLUMNS
+#   direct_salary_total - contents of direct_salary_cell
+#   first_schedule_col_ix
+#   funding_sources - list of the names of the funding source(s)
+#   last_used_schedule_col_ix
+#   milestones - list of dictionaries, one per entry in the milestones list:
+#                'label' (e.g., 'A:') and 'name'
+#   num_sched_col_header_cells
+#   num_sched_subdivisions
+#   odc_total - contents of odc_cell
+#   odcs - list of dictionaries, one per line of other direct costs (whether or not it is 0): 
+#          'name' and 'cost'
+#   overhead_rate - contents of overhead_cell
+#   project_name
+#   sched_major_units
+#   sched_minor_units
+#   sheet_name - the name of the worksheet
+#   tasks - list of dictionaries, one per task: 'number' (contents of the task number cell),
+#           'name', and 'sched_items' (see get_sched_items)
+#   total_cost - contents of total_cost_cell
+#
+def extract_exhibit_data(xlsInfo):
+    ws = xlsInfo['ws']
+    retval = {}
+    for key in ['first_schedule_col_ix', 'last_used_schedule_col_ix', 'num_sched_col_header_cells', 
+                'num_sched_subdivisions', 'sched_major_units', 'sched_minor_units', 'sheet_name']:
+        retval[key] = xlsInfo[key]
+    # end_for
+    
+    retval['project_name'] = get_cell_contents(ws, xlsInfo['project_name_cell_row_ix'], xlsInfo['project_name_cell_col_ix'])
+    retval['direct_salary_total'] = get_cell_contents(ws, xlsInfo['direct_salary_cell_row_ix'], xlsInfo['direct_salary_cell_col_ix'])
+    retval['odc_total'] = get_cell_contents(ws, xlsInfo['odc_cell_row_ix'], xlsInfo['odc_cell_col_ix'])
+    retval['total_cost'] = get_cell_contents(ws, xlsInfo['total_cost_cell_row_ix'], xlsInfo['total_cost_cell_col_ix'])
+    retval['overhead_rate'] = get_cell_contents(ws, xlsInfo['overhead_cell_row_ix'], xlsInfo['overhead_cell_col_ix'])
+    
+    # The tasks
+    tasks = []
+    for task_row_ix in range(xlsInfo['task_list_top_row_ix']+1,xlsInfo['task_list_bottom_row_ix']):
+        task = {}
+        task['number'] = get_cell_contents(ws, task_row_ix, xlsInfo['task_number_col_ix'])
+        task['name'] = get_cell_contents(ws, task_row_ix, xlsInfo['task_name_col_ix'])
+        task['sched_items'] = get_sched_items(xlsInfo, task_row_ix)
+        tasks.append(task)
+    # end_for
+    retval['tasks'] = tasks
+    
+    # The salary cost table: the rows for the tasks followed by the total line, read as one block.
+    # N.B. As for get_cell_contents, empty cells are returned as ' '.
+    cost_row_ixs = range(xlsInfo['task_list_top_row_ix']+1,xlsInfo['task_list_bottom_row_ix']) + [xlsInfo['total_line_row_ix']]
+    cost_block = ws.get_block(cost_row_ixs, [xlsInfo[col] for col in COST_TABLE_COLUMNS], ' ')
+    retval['cost_block'] = cost_block[:-1]
+    retval['cost_totals'] = cost_block[-1]
+    # *** TBD: Need 'named range' for row containing job classification abbreviations.
+    retval['cost_col_headers'] = [get_cell_contents(ws, xlsInfo['task_list_top_row_ix']-1, xlsInfo[col]) for col in SALARY_GRADE_COLUMNS]
+    
+    # Other direct costs; the description of 'other' other direct costs is found in the task name column.
+    odcs = []
+    for (name_key, line_key) in [('Travel', 'odc_travel_line_ix'),
+                                 ('General Office Equipment', 'odc_office_equipment_line_ix'),
+                                 ('Data Processing Equipent', 'odc_dp_equipment_line_ix'),
+                                 ('Consultants', 'odc_consultants_line_ix'),
+                                 ('Printing', 'odc_printing_line_ix'),
+                                 (None, 'odc_other_line_ix')]:
+        odc = {}
+        if name_key == None:
+            odc['name'] = get_cell_contents(ws, xlsInfo[line_key], xlsInfo['task_name_col_ix'])
+        else:
+            odc['name'] = name_key
+        # end_if
+        odc['cost'] = get_cell_contents(ws, xlsInfo[line_key], xlsInfo['total_cost_col_ix'])
+        odcs.append(odc)
+    # end_for
+    retval['odcs'] = odcs
+    
+    retval['funding_sources'] = [get_cell_contents(ws, fs_row, xlsInfo['funding_source_name_col_ix'])
+                                 for fs_row in range(xlsInfo['funding_list_top_row_ix']+1,xlsInfo['funding_list_bottom_row_ix'])]
+    
+    # Dumb little predicate to return True if string is empty or only contains blanks, False otherwise.
+    def is_empty(s):
+        return s.strip() == ''
+    # end_def is_empty()
+    
+    # Find the last row of the milestones list: crawl down milestone_label_column
+    # until the first row containing an 'empty' cell is found. 
+    first_milestone_ix = xlsInfo['milestones_list_first_row_ix']
+    last_milestone_ix = first_milestone_ix + 1
+    while is_empty(get_cell_contents(ws, last_milestone_ix, xlsInfo['milestone_label_col_ix'])) == False:
+        last_milestone_ix += 1
+    # end_while
+    milestones = []
+    for milestone_ix in range(first_milestone_ix, last_milestone_ix):
+        milestone = {}
+        milestone['label'] = get_cell_contents(ws, milestone_ix, xlsInfo['milestone_label_col_ix'])
+        milestone['name'] = get_cell_contents(ws, milestone_ix, xlsInfo['milestone_name_col_ix'])
+        milestones.append(milestone)
+    # end_for
+    retval['milestones'] = milestones
+    
+    # Warnings for any totals that do not add up: see check_exhibit_totals
+    retval['warnings'] = check_exhibit_totals(retval)
+    return retval
+# end_def extract_exhibit_data()
+
+# Return the value of a cell containing a quantity as a number: 0 for an empty cell, or None
+# if the cell contains text.
+def get_number(value):
+    if isinstance(value, (int, long, float)) and not isinstance(value, bool):
+        return value
+    elif value == None or (isinstance(value, basestring) and value.strip() == ''):
+        return 0
+    # end_if
+    return None
+# end_def get_number()
+
+# Return the overhead rate (as a fraction, e.g., 0.9539), given the contents of the cell containing
+# it: either a number, or text such as '@ 95.39%'. Return None if it cannot be parsed.
+def parse_overhead_rate(value):
+    if isinstance(value, (int, long, float)) and not isinstance(value, bool):
+        return value
+    elif isinstance(value, basestring):
+        m = OVERHEAD_RATE_RE.search(value)
+        if m != None:
+            return float(m.group(1)) / 100.0
+        # end_if
+    # end_if
+    return None
+# end_def parse_overhead_rate()
+
+# Check that the totals in 'exData' (as returned by extract_exhibit_data) add up. The values
+# shown in the exhibits are those cached in the workbook when it was last saved; a workbook
+# saved by a tool other than Excel may contain stale values, which would be published as is.
+# The checks are:
+#   1. For each column of the salary cost table, the task rows sum to the value in the total line
+#   2. For each task (and the total line), the person-weeks for the salary grades sum to
+#      the total, and the direct salary and overhead sum to the total cost
+#   3. For each task (and the total line), the overhead is the direct salary at the overhead rate
+#   4. The total direct salary and overhead is that in the total line of the salary cost table
+#   5. The other direct costs sum to their total
+#   6. The total direct salary and overhead plus the other direct costs is the total cost
+# Cells containing text (rather than numbers) are skipped; empty cells count as 0.
+# Return a string with the text of warning(s) for any mismatch(es) found, or '' if none.
+# N.B. The salary cost table is checked column by column, on the block read by extract_exhibit_data:
+#      each column of the (transposed) block is summed in one go.
+def check_exhibit_totals(exData):
+    warnings = ''
+    col_names = [str(header).strip() for header in exData['cost_col_headers']] + COST_TABLE_SUMMARY_NAMES
+    num_grades = len(SALARY_GRADE_COLUMNS)
+    tolerances = [PERSON_WEEKS_TOLERANCE] * (num_grades + 1) + [DOLLARS_TOLERANCE] * 3
+    
+    def mismatch(expected, actual, tolerance):
+        return expected != None and actual != None and abs(expected - actual) > tolerance
+    # end_def mismatch()
+    
+    def fmt(value, tolerance):
+        return ('{0:.1f}' if tolerance == PERSON_WEEKS_TOLERANCE else '${0:,.2f}').format(value)
+    # end_def fmt()
+    
+    # 1. Column sums: transpose the block, and sum each column
+    rows = [[get_number(value) for value in row] for row in exData['cost_block']]
+    totals = [get_number(value) for value in exData['cost_totals']]
+    columns = zip(*rows) if len(rows) > 0 else [()] * len(COST_TABLE_COLUMNS)
+    for (col_name, column, total, tolerance) in zip(col_names, columns, totals, tolerances):
+        if None in column:
+            continue
+        # end_if
+        col_sum = sum(column)
+        if mismatch(col_sum, total, tolerance):
+            warnings += 'Total line, ' + col_name + ' column: the tasks sum to ' + fmt(col_sum, tolerance) + \
+                        ', but the total line contains ' + fmt(total, tolerance) + '.\n'
+        # end_if
+    # end_for
+    
+    # 2. and 3. Row sums, and overhead
+    overhead_rate = parse_overhead_rate(exData['overhead_rate'])
+    labels = ['Task ' + unicode(task['number']).strip() for task in exData['tasks']] + ['Total line']
+    for (label, row) in zip(labels, rows + [totals]):
+        grades = row[:num_grades]
+        (total_person_weeks, direct_salary, overhead, total_cost) = row[num_grades:]
+        if None not in grades and mismatch(sum(grades), total_person_weeks, PERSON_WEEKS_TOLERANCE):
+            warnings += label + ': the salary grades sum to ' + fmt(sum(grades), PERSON_WEEKS_TOLERANCE) + \
+                        ' person-weeks, but the Total column contains ' + fmt(total_person_weeks, PERSON_WEEKS_TOLERANCE) + '.\n'
+        # end_if
+        if direct_salary != None and overhead != None and mismatch(direct_salary + overhead, total_cost, DOLLARS_TOLERANCE):
+            warnings += label + ': Direct Salary plus Overhead is ' + fmt(direct_salary + overhead, DOLLARS_TOLERANCE) + \
+                        ', but the Total Cost column contains ' + fmt(total_cost, DOLLARS_TOLERANCE) + '.\n'
+        # end_if
+        if overhead_rate != None and direct_salary != None and \
+           mismatch(direct_salary * overhead_rate, overhead, DOLLARS_TOLERANCE + direct_salary * OVERHEAD_RATE_TOLERANCE):
+            warnings += label + ': Direct Salary at the overhead rate of ' + ('%.2f%%' % (overhead_rate * 100.0)) + ' is ' + \
+                        fmt(direct_salary * overhead_rate, DOLLARS_TOLERANCE) + ', but the Overhead column contains ' + \
+                        fmt(overhead, DOLLARS_TOLERANCE) + '.\n'
+        # end_if
+    # end_for
+    
+    # 4., 5., and 6. The totals shown outside the salary cost table
+    direct_salary_total = get_number(exData['direct_salary_total'])
+    odc_total = get_number(exData['odc_total'])
+    total_cost = get_number(exData['total_cost'])
+    if mismatch(totals[-1], direct_salary_total, DOLLARS_TOLERANCE):
+        warnings += 'Direct Salary and Overhead is ' + fmt(direct_salary_total, DOLLARS_TOLERANCE) + \
+                    ', but the total line of the salary cost table contains ' + fmt(totals[-1], DOLLARS_TOLERANCE) + '.\n'
+    # end_if
+    odc_costs = [get_number(odc['cost']) for odc in exData['odcs']]
+    if None not in odc_costs and mismatch(sum(odc_costs), odc_total, DOLLARS_TOLERANCE):
+        warnings += 'Other Direct Costs: the items sum to ' + fmt(sum(odc_costs), DOLLARS_TOLERANCE) + \
+                    ', but the total is ' + fmt(odc_total, DOLLARS_TOLERANCE) + '.\n'
+    # end_if
+    if direct_salary_total != None and odc_total != None and \
+       mismatch(direct_salary_total + odc_total, total_cost, DOLLARS_TOLERANCE):
+        warnings += 'Direct Salary and Overhead plus Other Direct Costs is ' + \
+                    fmt(direct_salary_total + odc_total, DOLLARS_TOLERANCE) + ', but TOTAL COST is ' + \
+                    fmt(total_cost, DOLLARS_TOLERANCE) + '.\n'
+    # end_if
+    return warnings
+# end_def check_exhibit_totals()
+
+# Collect the warnings for a workbook, given the list 'exDatas' of the data extracted from each of
+# its worksheets containing workscope exhibits; each is prefixed by the name of the worksheet to which
+# it applies if there are several. Return a string with the text of warning(s), or '' if none.
+def get_exhibit_warnings(exDatas):
+    retval = ''
+    for exData in exDatas:
+        if exData['warnings'] != '' and len(exDatas) > 1:
+            retval += 'Worksheet ' + exData['sheet_name'] + ':\n'
+        # end_if
+        retval += exData['warnings']
+    # end_for
+    return retval
+# end_def get_exhibit_warnings()
@@ -0,0 +1,79 @@
+# Compiled HTML element templates for the workscope exhibit generator tool
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies only upon the Python standard library.
+#
+# A template is a string of HTML for one element (or a short run of elements), e.g., a row
+# of the salary cost table, containing named fields in braces, e.g.:
+#     '<div class="taskNameDiv">{name}</div>'
+# compile_template parses a template once, and returns a function which, called with a
+# keyword argument for each field, returns the HTML with the value of each field filled in.
+# The value of each field is HTML-escaped ('&', '<', '>', and '"'), so that, e.g., a task
+# name containing '&' or '<' does not produce broken markup; a field written as {name:raw}
+# is filled in as is (for values that are already HTML). Values that are not strings
+# (e.g., numbers) are converted with str().
+#
+# The function returned is generated Python code that fills in all the fields with a single
+# '%' formatting operation, so rendering an element builds no intermediate strings other
+# than the escaped values.
+#
+# Internals of this Module
+# ========================
+#
+# compile_template - parses a template, and returns a function that renders it
+#
+# escape_html - HTML-escapes a value
+#
+# raw_html - converts a value to be filled in as is to a string
+#
+###############################################################################
+
+import re
+
+# Matches a field in a template: {name} or {name:raw}
+FIELD_RE = re.compile(r'\{([A-Za-z_][A-Za-z0-9_]*)(:raw)?\}')
+
+# Return 'value' as a string, HTML-escaped for use in text or in a (double-quoted) attribute value.
+def escape_html(value):
+    if not isinstance(value, basestring):
+        value = str(value)
+    # end_if
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+# end_def escape_html()
+
+# Return the value of a field to be filled in as is, as a string.
+def raw_html(value):
+    if not isinstance(value, basestring):
+        value = str(value)
+    # end_if
+    return value
+# end_def raw_html()
+
+# Parse the template 'template' (see the top of this module), and return a function that takes
+# a keyword argument for each of its fields, and returns the HTML with the fields filled in.
+def compile_template(template):
+    # The template, with each field replaced by a '%(name)s' conversion, for the '%' operator
+    fmt = ''
+    # Dictionary: field name -> True if its value is to be escaped
+    fields = {}
+    pos = 0
+    for m in FIELD_RE.finditer(template):
+        fmt += template[pos:m.start()].replace('%', '%%') + '%(' + m.group(1) + ')s'
+        escaped = m.group(2) == None
+        if fields.get(m.group(1), escaped) != escaped:
+            raise ValueError('Field ' + m.group(1) + ' is both escaped and raw in template: ' + template)
+        # end_if
+        fields[m.group(1)] = escaped
+        pos = m.end()
+    # end_for
+    fmt += template[pos:].replace('%', '%%')
+    names = sorted(fields.keys())
+    # Generate: def render(a, b): return fmt % {'a': escape_html(a), 'b': raw_html(b)}
+    source = 'def render(' + ', '.join(names) + '):\n'
+    source += '    return fmt % {' + ', '.join(["'" + name + "': " + ('escape_html' if fields[name] else 'raw_html') +
+                                               '(' + name + ')' for name in names]) + '}\n'
+    namespace = {'fmt': fmt, 'escape_html': escape_html, 'raw_html': raw_html}
+    exec compile(source, '<template>', 'exec') in namespace
+    return namespace['render']
+# end_def compile_template()
@@ -0,0 +1,337 @@
+# Portfolio index for the workscope exhibit generator tool
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies upon the 'excelFileManager.py' and 'workscope_exhibit_tool.py'
+#      modules to read workbooks, and upon the 'sqlite3' module of the Python standard library.
+#
+# The portfolio index is a local SQLite database containing the data shown in the workscope
+# exhibits of many workbooks: tasks, person-weeks by salary grade, costs, schedule spans,
+# milestones, other direct costs and funding sources. Questions about the portfolio as a
+# whole, e.g., "which studies use SP-1 staff?", or "what is the total of consultant costs
+# across all workscopes?", can then be answered by a query taking milliseconds, rather than
+# by opening each workbook.
+#
+# The data for a workbook is keyed by the hash of its contents (see hash_workbook in
+# 'batchManifest.py', which ignores, e.g., the time of the last save); the 'files' table maps
+# the path of each workbook ingested to the hash of its contents. Ingestion is incremental:
+# a workbook whose size and modification time (or, failing that, contents) are unchanged since
+# it was last ingested is skipped, as is one whose contents are identical to those of a
+# workbook already in the index (e.g., a copy, or the same workbook saved again unchanged).
+#
+# The index also serves as a cache of the data extracted from workbooks, keyed by the hash
+# of their contents: get_workbook_data returns the data for a workbook, reading it only if
+# it is not already in the index (see, e.g., 'workscope_exhibit_diff.py').
+#
+# Tables (see SCHEMA):
+#   files - path, content_hash, size, mtime, errors ('' if none), ingested (time)
+#   sheets - content_hash, sheet_name, sheet_ix, project_name, overhead_rate, direct_salary_total,
+#            other_direct_costs_total, total_cost, sched_major_units, sched_minor_units,
+#            data (the data returned by gen_exhibit_data, as JSON)
+#   tasks - content_hash, sheet_name, task_ix, number, name, total_person_weeks,
+#           direct_salary, overhead, total_cost
+#   task_grades - content_hash, sheet_name, task_ix, grade, person_weeks
+#   schedule_items - content_hash, sheet_name, task_ix, type, milestone, start_ix, end_ix,
+#                    start_label, end_label
+#   milestones - content_hash, sheet_name, label, name
+#   other_direct_costs - content_hash, sheet_name, name, cost
+#   funding_sources - content_hash, sheet_name, name
+# The meaning of the columns is as for the data exported by gen_exhibit_data (see
+# 'workscope_exhibit_tool.py'); 'sheet_ix' is the 0-based index of a worksheet among the
+# workscope worksheets of its workbook, 'task_ix' is the 0-based index of a task in its worksheet,
+# and 'start_ix' and 'end_ix' are the 'start' and 'end' of a schedule item.
+# The view 'current_sheets' contains the rows of 'sheets' for workbooks that are (still)
+# present in 'files', along with the path of (one of) the workbook(s).
+#
+# Example queries:
+#   Which studies use SP-1 staff?
+#     SELECT DISTINCT s.path, s.project_name FROM current_sheets s JOIN task_grades g
+#       USING (content_hash, sheet_name) WHERE g.grade = 'SP-1' AND g.person_weeks > 0;
+#   Total of consultant costs across all workscopes:
+#     SELECT SUM(o.cost) FROM current_sheets s JOIN other_direct_costs o
+#       USING (content_hash, sheet_name) WHERE o.name = 'Consultants';
+#
+# Usage:
+#   <Python_installation_folder>/python.exe portfolioIndex.py ingest --db index.sqlite path [path ...]
+#   <Python_installation_folder>/python.exe portfolioIndex.py query --db index.sqlite "SELECT ..."
+# where each 'path' is either an .xlsx file or a folder, all of whose .xlsx files (including
+# those in sub-folders) are ingested. Run with '--help' for the options.
+#
+# Internals of this Module
+# ========================
+#
+# portfolioIndex - class for ingesting workbooks into, querying, and reading data from the index
+#
+# main - parses the command line, and ingests workbooks or runs a query
+#
+###############################################################################
+
+import os
+import sys
+import time
+import json
+import sqlite3
+import argparse
+import traceback
+from batchManifest import hash_workbook
+from excelFileManager import workbookSession
+from workscope_exhibit_tool import gen_exhibit_data
+
+# Version of the schema below; an index created with a different version is rebuilt.
+# Version 3: content_hash is that returned by hash_workbook, rather than the hash of the whole file.
+# Version 4: hash_workbook covers only the worksheets containing workscope exhibits.
+SCHEMA_VERSION = 4
+
+SCHEMA = ["CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, content_hash TEXT, size INTEGER, "
+          "mtime REAL, errors TEXT, ingested REAL)",
+          "CREATE INDEX IF NOT EXISTS files_content_hash ON files (content_hash)",
+          "CREATE TABLE IF NOT EXISTS sheets (content_hash TEXT, sheet_name TEXT, sheet_ix INTEGER, project_name TEXT, "
+          "overhead_rate TEXT, direct_salary_total REAL, other_direct_costs_total REAL, total_cost REAL, "
+          "sched_major_units TEXT, sched_minor_units TEXT, data TEXT, PRIMARY KEY (content_hash, sheet_name))",
+          "CREATE TABLE IF NOT EXISTS tasks (content_hash TEXT, sheet_name TEXT, task_ix INTEGER, number TEXT, "
+          "name TEXT, total_person_weeks REAL, direct_salary REAL, overhead REAL, total_cost REAL, "
+          "PRIMARY KEY (content_hash, sheet_name, task_ix))",
+          "CREATE TABLE IF NOT EXISTS task_grades (content_hash TEXT, sheet_name TEXT, task_ix INTEGER, "
+          "grade TEXT, person_weeks REAL)",
+          "CREATE INDEX IF NOT EXISTS task_grades_grade ON task_grades (grade)",
+          "CREATE INDEX IF NOT EXISTS task_grades_sheet ON task_grades (content_hash, sheet_name)",
+          "CREATE TABLE IF NOT EXISTS schedule_items (content_hash TEXT, sheet_name TEXT, task_ix INTEGER, "
+          "type TEXT, milestone TEXT, start_ix INTEGER, end_ix INTEGER, start_label TEXT, end_label TEXT)",
+          "CREATE INDEX IF NOT EXISTS schedule_items_sheet ON schedule_items (content_hash, sheet_name)",
+          "CREATE TABLE IF NOT EXISTS milestones (content_hash TEXT, sheet_name TEXT, label TEXT, name TEXT)",
+          "CREATE INDEX IF NOT EXISTS milestones_sheet ON milestones (content_hash, sheet_name)",
+          "CREATE TABLE IF NOT EXISTS other_direct_costs (content_hash TEXT, sheet_name TEXT, name TEXT, cost REAL)",
+          "CREATE INDEX IF NOT EXISTS other_direct_costs_sheet ON other_direct_costs (content_hash, sheet_name)",
+          "CREATE TABLE IF NOT EXISTS funding_sources (content_hash TEXT, sheet_name TEXT, name TEXT)",
+          "CREATE INDEX IF NOT EXISTS funding_sources_sheet ON funding_sources (content_hash, sheet_name)",
+          "CREATE VIEW IF NOT EXISTS current_sheets AS SELECT f.path AS path, s.* FROM sheets s JOIN "
+          "(SELECT content_hash, MIN(path) AS path FROM files WHERE errors = '' GROUP BY content_hash) f "
+          "USING (content_hash)"]
+
+# Tables containing the data for workbooks, keyed by content_hash
+DATA_TABLES = ['sheets', 'tasks', 'task_grades', 'schedule_items', 'milestones', 'other_direct_costs', 'funding_sources']
+
+class portfolioIndex:
+    # Open (or create) the index in the SQLite database file 'filename'.
+    def __init__(self, filename):
+        self.conn = sqlite3.connect(filename)
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # An index created by another version of this module: start afresh
+            for table in DATA_TABLES + ['files']:
+                self.conn.execute('DROP TABLE IF EXISTS ' + table)
+            # end_for
+            self.conn.execute('DROP VIEW IF EXISTS current_sheets')
+            self.conn.execute('PRAGMA user_version = ' + str(SCHEMA_VERSION))
+        # end_if
+        for stmt in SCHEMA:
+            self.conn.execute(stmt)
+        # end_for
+        self.conn.commit()
+    # end_def __init__()
+
+    # Ingest the workbook 'fullpath', unless it is unchanged since it was last ingested.
+    # Return a tuple (outcome, errors), where 'outcome' is one of:
+    #   'unchanged' - the workbook has not changed since it was last ingested
+    #   'copy' - the workbook has the same contents as one already in the index, and was not read
+    #   'ingested' - the workbook was read, and its data added to the index
+    #   'failed' - the workbook could not be read; 'errors' contains the error message(s)
+    # A workbook that failed is not retried until it changes.
+    def ingest(self, fullpath):
+        path = os.path.abspath(fullpath)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return ('failed', 'Failed to open input .xlsx file.\n')
+        # end_try
+        row = self.conn.execute('SELECT content_hash, size, mtime, errors FROM files WHERE path = ?', (path,)).fetchone()
+        if row != None and row[1] == st.st_size and row[2] == st.st_mtime:
+            return ('unchanged', row[3])
+        # end_if
+        try:
+            content_hash = hash_workbook(path)
+        except IOError:
+            return ('failed', 'Failed to open input .xlsx file.\n')
+        # end_try
+        if row != None and row[0] == content_hash:
+            self.record_file(path, content_hash, st, row[3])
+            return ('unchanged', row[3])
+        # end_if
+        if self.has_workbook(content_hash):
+            self.record_file(path, content_hash, st, '')
+            return ('copy', '')
+        # end_if
+
+        errors = ''
+        try:
+            with workbookSession(path) as session:
+                errors = session.errors
+                if errors == '':
+                    exported = [gen_exhibit_data(exData, path) for exData in session.extract()]
+                # end_if
+            # end_with
+        except:
+            errors = 'Unexpected error when reading input .xlsx file:\n' + traceback.format_exc()
+        # end_try
+        if errors == '':
+            self.add_workbook(content_hash, exported)
+        # end_if
+        self.record_file(path, content_hash, st, errors)
+        return ('ingested' if errors == '' else 'failed', errors)
+    # end_def ingest()
+
+    # Return True if the data for a workbook whose contents have the hash 'content_hash' is in the index.
+    def has_workbook(self, content_hash):
+        return self.conn.execute('SELECT 1 FROM sheets WHERE content_hash = ? LIMIT 1', (content_hash,)).fetchone() != None
+    # end_def has_workbook()
+
+    # Record the outcome of ingesting the workbook 'path' ('st' is the result of os.stat for it),
+    # and commit. If this replaces other contents of 'path', their data is removed, unless another
+    # file has the same contents. N.B. Only the replaced contents are checked, so that recording a
+    # file takes time independent of the size of the index; see prune for a full sweep.
+    def record_file(self, path, content_hash, st, errors):
+        row = self.conn.execute('SELECT content_hash FROM files WHERE path = ?', (path,)).fetchone()
+        self.conn.execute('INSERT OR REPLACE INTO files (path, content_hash, size, mtime, errors, ingested) '
+                          'VALUES (?, ?, ?, ?, ?, ?)', (path, content_hash, st.st_size, st.st_mtime, errors, time.time()))
+        if row != None and row[0] != content_hash:
+            self.remove_workbook(row[0])
+        # end_if
+        self.conn.commit()
+    # end_def record_file()
+
+    # Add the data for the workbook whose contents have the hash 'content_hash' to the index:
+    # 'exported' is the list of the data returned by gen_exhibit_data for each of its worksheets.
+    # N.B. This is not committed until record_file is called.
+    def add_workbook(self, content_hash, exported):
+        for (sheet_ix, data) in enumerate(exported):
+            key = (content_hash, data['sheet_name'])
+            self.conn.execute('INSERT OR REPLACE INTO sheets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                              key + (sheet_ix, data['project_name'], data['overhead_rate'], data['direct_salary_total'],
+                                     data['other_direct_costs_total'], data['total_cost'],
+                                     data['sched_major_units'], data['sched_minor_units'], json.dumps(data)))
+            for (task_ix, task) in enumerate(data['tasks']):
+                self.conn.execute('INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                  key + (task_ix, task['number'], task['name'], task['total_person_weeks'],
+                                         task['direct_salary'], task['overhead'], task['total_cost']))
+                self.conn.executemany('INSERT INTO task_grades VALUES (?, ?, ?, ?, ?)',
+                                      [key + (task_ix, grade, person_weeks)
+                                       for (grade, person_weeks) in sorted(task['person_weeks'].items())])
+                self.conn.executemany('INSERT INTO schedule_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                      [key + (task_ix, item['type'], item['milestone'], item['start'], item['end'],
+                                              item['start_label'], item['end_label']) for item in task['schedule']])
+            # end_for
+            self.conn.executemany('INSERT INTO milestones VALUES (?, ?, ?, ?)',
+                                  [key + (m['label'], m['name']) for m in data['milestones']])
+            self.conn.executemany('INSERT INTO other_direct_costs VALUES (?, ?, ?, ?)',
+                                  [key + (odc['name'], odc['cost']) for odc in data['other_direct_costs']])
+            self.conn.executemany('INSERT INTO funding_sources VALUES (?, ?, ?)',
+                                  [key + (name,) for name in data['funding_sources']])
+        # end_for
+    # end_def add_workbook()
+
+    # Return the data for the workbook 'fullpath', ingesting it first if it is not already in the
+    # index, or has changed since it was. Return a tuple (errors, exported) where 'errors' is the text
+    # of error message(s), or '' if none, and 'exported' is the list of the data returned by
+    # gen_exhibit_data for each of its workscope worksheets (or [] if there were errors).
+    # N.B. The 'source' item of the data is that of the file from which it was first ingested.
+    def get_workbook_data(self, fullpath):
+        (outcome, errors) = self.ingest(fullpath)
+        if errors != '':
+            return (errors, [])
+        # end_if
+        row = self.conn.execute('SELECT content_hash FROM files WHERE path = ?', (os.path.abspath(fullpath),)).fetchone()
+        exported = [json.loads(r[0]) for r in
+                    self.conn.execute('SELECT data FROM sheets WHERE content_hash = ? ORDER BY sheet_ix', (row[0],))]
+        return ('', exported)
+    # end_def get_workbook_data()
+
+    # Remove the data for the workbook whose contents have the hash 'content_hash', unless a file
+    # still has those contents.
+    def remove_workbook(self, content_hash):
+        if self.conn.execute('SELECT 1 FROM files WHERE content_hash = ? LIMIT 1', (content_hash,)).fetchone() != None:
+            return
+        # end_if
+        for table in DATA_TABLES:
+            self.conn.execute('DELETE FROM ' + table + ' WHERE content_hash = ?', (content_hash,))
+        # end_for
+    # end_def remove_workbook()
+
+    # Remove the data for workbooks that are no longer referenced by any file.
+    def remove_unreferenced(self):
+        for table in DATA_TABLES:
+            self.conn.execute('DELETE FROM ' + table + ' WHERE content_hash NOT IN (SELECT content_hash FROM files)')
+        # end_for
+    # end_def remove_unreferenced()
+
+    # Remove the files that no longer exist from the index, along with their data.
+    # Return the number of files removed.
+    def prune(self):
+        missing = [row[0] for row in self.conn.execute('SELECT path FROM files') if not os.path.exists(row[0])]
+        self.conn.executemany('DELETE FROM files WHERE path = ?', [(path,) for path in missing])
+        self.remove_unreferenced()
+        self.conn.commit()
+        return len(missing)
+    # end_def prune()
+
+    # Run the SQL query 'sql', with parameters 'params'. Return a tuple (column_names, rows).
+    def query(self, sql, params=()):
+        cursor = self.conn.execute(sql, params)
+        column_names = [d[0] for d in cursor.description] if cursor.description != None else []
+        return (column_names, cursor.fetchall())
+    # end_def query()
+
+    def close(self):
+        self.conn.close()
+    # end_def close()
+# end_class portfolioIndex
+
+# Main driver routine for the portfolio index.
+def main(argv):
+    parser = argparse.ArgumentParser(description='Build and query an index of the data in many workscope exhibit workbooks.')
+    subparsers = parser.add_subparsers(dest='command')
+    ingest = subparsers.add_parser('ingest', help='add new and changed workbooks to the index')
+    ingest.add_argument('--db', required=True, help='SQLite database file containing the index')
+    ingest.add_argument('--prune', action='store_true', help='also remove workbooks that no longer exist from the index')
+    ingest.add_argument('paths', nargs='+', help='.xlsx file, or folder containing .xlsx files')
+    query = subparsers.add_parser('query', help='run an SQL query against the index')
+    query.add_argument('--db', required=True, help='SQLite database file containing the index')
+    query.add_argument('sql', help='the query, e.g., "SELECT * FROM current_sheets"')
+    args = parser.parse_args(argv)
+
+    index = portfolioIndex(args.db)
+    try:
+        if args.command == 'ingest':
+            # N.B. Imported here, as the batch module is only needed for this.
+            from workscope_exhibit_batch import find_xlsx_files
+            start = time.time()
+            counts = {'unchanged': 0, 'copy': 0, 'ingested': 0, 'failed': 0}
+            for fullpath in find_xlsx_files(args.paths):
+                (outcome, errors) = index.ingest(fullpath)
+                counts[outcome] += 1
+                if errors != '':
+                    print 'Errors found when reading ' + fullpath + ':'
+                    print errors
+                # end_if
+            # end_for
+            num_pruned = index.prune() if args.prune else 0
+            print '%d ingested, %d copies, %d unchanged, %d failed, %d removed in %.3f s' % \
+                  (counts['ingested'], counts['copy'], counts['unchanged'], counts['failed'], num_pruned, time.time() - start)
+            return 1 if counts['failed'] > 0 else 0
+        else:
+            start = time.time()
+            (column_names, rows) = index.query(args.sql)
+            elapsed = time.time() - start
+            print '\t'.join(column_names)
+            for row in rows:
+                print '\t'.join([unicode(v) if v != None else '' for v in row]).encode('UTF-8')
+            # end_for
+            print '(%d rows in %.1f ms)' % (len(rows), elapsed * 1000.0)
+            return 0
+        # end_if
+    finally:
+        index.close()
+    # end_try
+# end_def main()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
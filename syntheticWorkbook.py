@@ -0,0 +1,302 @@
+# Synthetic workscope workbooks, for stress tests and benchmarks
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies upon OpenPyXl, which is imported only when a workbook is written
+#      (see the note on startup time in 'excelFileManager.py').
+#
+# A synthetic workbook is a valid workscope workbook: it contains a 'workscope_exhibits'
+# worksheet with all the defined names listed in REQUIRED_DEFINED_NAMES (see
+# 'workbookValidator.py'), and totals that add up. Its shape is given by a 'layout'
+# (a dictionary: see DEFAULT_LAYOUT), and the placement of the schedule bars and milestones
+# within it is chosen at random, from the layout's 'seed'; so the same layout always
+# produces the same workbook. Besides writing the workbook, generate_workbook returns what
+# the tool should find in it, which check_exhibit_data compares with the data the tool
+# actually extracted.
+#
+# The worksheet is laid out as follows (rows and columns 1-based):
+#   B2 - project name
+#   row 4 - the name of the MAJOR schedule unit, in the first schedule column
+#   row 5 - the salary grade abbreviations, and the overhead rate (e.g., '@ 95.39%')
+#   row 6 - task_list_top
+#   rows 7 ... - one row per task: number (column B), name (C), person-weeks per salary grade
+#                (D to L), total (M), direct salary (N), overhead (O), and total cost (P);
+#                the schedule starts in column R
+#   then - the total line, the other direct costs, the totals, the funding sources, and the
+#          milestones list
+#
+# Internals of this Module
+# ========================
+#
+# get_layout - returns a layout: DEFAULT_LAYOUT, with the given entries replaced
+#
+# generate_workbook - writes a synthetic workbook with a given layout, and returns what
+#                     the tool should find in it
+#
+# get_runs - returns the runs of consecutive filled cells in a row of the schedule
+#
+# check_exhibit_data - compares the data extracted from a synthetic workbook with what
+#                      generate_workbook said it should contain
+#
+###############################################################################
+
+import random
+import string
+
+from workbookValidator import WORKSCOPE_SHEET_NAME
+
+# The default layout. Entries:
+#   seed - seed of the random choices made in laying out the schedule
+#   num_tasks - number of tasks (at least 1)
+#   num_units - number of MAJOR schedule units
+#   sched_major_units - 'Quarter', 'Month', or 'Week'
+#   bars_per_task - number of schedule bars per task (at most one per two schedule columns)
+#   max_bar_length - maximum length of a schedule bar, in MINOR schedule units
+#   milestones_per_task - number of milestones per task, each in a schedule column of its own
+#                         (at most one per schedule column)
+#   milestone_list_length - number of entries in the milestones list
+#   num_funding_sources - number of funding sources
+DEFAULT_LAYOUT = {'seed': 0,
+                  'num_tasks': 8,
+                  'num_units': 24,
+                  'sched_major_units': 'Month',
+                  'bars_per_task': 2,
+                  'max_bar_length': 3,
+                  'milestones_per_task': 1,
+                  'milestone_list_length': 4,
+                  'num_funding_sources': 2}
+
+# Number of MINOR schedule units per MAJOR schedule unit (see init_workscope_sheet in 'excelFileManager.py')
+NUM_SUBDIVISIONS = {'Quarter': 3, 'Month': 4, 'Week': 5}
+
+# The salary grades: abbreviation, and the defined name of the column
+SALARY_GRADES = [('M-1', 'm1_column'), ('P-5', 'p5_column'), ('P-4', 'p4_column'), ('P-3', 'p3_column'),
+                 ('P-2', 'p2_column'), ('P-1', 'p1_column'), ('SP-3', 'sp3_column'), ('SP-1', 'sp1_column'),
+                 ('Temp', 'temp_column')]
+
+# The defined names of the lines of other direct costs, in the order in which they appear
+ODC_LINES = ['odc_travel_line', 'odc_office_equipment_line', 'odc_dp_equipment_line', 'odc_consultants_line',
+             'odc_printing_line', 'odc_other_line']
+
+# The overhead rate, and the direct salary per person-week
+OVERHEAD_RATE = 0.9539
+SALARY_PER_PERSON_WEEK = 1234.5
+
+# Columns (1-based) of the task number, the task name, the first salary grade, and the first schedule column
+TASK_NUMBER_COL = 2
+TASK_NAME_COL = 3
+FIRST_GRADE_COL = 4
+FIRST_SCHEDULE_COL = 18
+
+# Return a layout: a copy of DEFAULT_LAYOUT, with the entries in 'changes' replaced.
+def get_layout(**changes):
+    retval = dict(DEFAULT_LAYOUT)
+    retval.update(changes)
+    return retval
+# end_def get_layout()
+
+# Return the runs of consecutive True values in the list 'filled', as a list of pairs
+# (index of first, index of last).
+def get_runs(filled):
+    retval = []
+    start = None
+    for (ix, value) in enumerate(filled + [False]):
+        if value and start == None:
+            start = ix
+        elif not value and start != None:
+            retval.append((start, ix - 1))
+            start = None
+        # end_if
+    # end_for
+    return retval
+# end_def get_runs()
+
+# Write a synthetic workbook with the layout 'layout' (see DEFAULT_LAYOUT) to 'dest': the name of
+# an .xlsx file, or a file-like object (e.g., an io.BytesIO). The last schedule column is always
+# used (by the last task), so that the schedule has exactly the layout's number of MAJOR units.
+# Return a dictionary describing what the tool should find in the workbook:
+#   num_sched_col_header_cells - number of MAJOR schedule units
+#   sched_items - list with one entry per task: the list of its schedule items, as would be
+#                 returned by get_sched_items in 'excelFileManager.py'
+#   num_bars - total number of schedule bars
+#   num_milestones - number of entries in the milestones list
+#   num_funding_sources - number of funding sources
+def generate_workbook(layout, dest):
+    import openpyxl
+    from openpyxl.styles import PatternFill
+    from openpyxl.workbook.defined_name import DefinedName
+    from openpyxl.utils import get_column_letter
+
+    rng = random.Random(layout['seed'])
+    num_tasks = max(layout['num_tasks'], 1)
+    num_cols = layout['num_units'] * NUM_SUBDIVISIONS[layout['sched_major_units']]
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = WORKSCOPE_SHEET_NAME
+    names = {}
+    def put(row, col, value, name=None):
+        ws.cell(row=row, column=col).value = value
+        if name != None:
+            names[name] = (row, col)
+        # end_if
+    # end_def put()
+
+    put(2, 2, 'Synthetic workscope %d' % layout['seed'], 'project_name_cell')
+    put(4, FIRST_SCHEDULE_COL, layout['sched_major_units'], 'sched_major_units_cell')
+    for (ix, (grade, name)) in enumerate(SALARY_GRADES):
+        put(5, FIRST_GRADE_COL + ix, grade, name)
+    # end_for
+    total_col = FIRST_GRADE_COL + len(SALARY_GRADES)
+    put(5, total_col, 'Total', 'total_column')
+    put(5, total_col + 1, 'Salary', 'direct_salary_column')
+    put(5, total_col + 2, '@ %.2f%%' % (OVERHEAD_RATE * 100.0), 'overhead_column')
+    names['overhead_cell'] = (5, total_col + 2)
+    put(5, total_col + 3, 'Cost', 'total_cost_column')
+    names['task_number_column'] = (6, TASK_NUMBER_COL)
+    names['task_name_column'] = (6, TASK_NAME_COL)
+    names['task_list_top'] = (6, 1)
+    names['first_schedule_column'] = (6, FIRST_SCHEDULE_COL)
+    # N.B. The last schedule column is the one after the last one used (see get_last_used_sched_column).
+    names['last_schedule_column'] = (6, FIRST_SCHEDULE_COL + num_cols)
+
+    # The tasks: the salary cost table, and the schedule
+    magic_fill = PatternFill(patternType='gray125')
+    totals = [0.0] * (len(SALARY_GRADES) + 4)
+    sched_items = []
+    num_bars = 0
+    for task_ix in range(num_tasks):
+        row = 7 + task_ix
+        put(row, TASK_NUMBER_COL, str(task_ix + 1))
+        put(row, TASK_NAME_COL, 'Task %d' % (task_ix + 1))
+        person_weeks = [rng.randint(0, 20) * 0.5 for grade in SALARY_GRADES]
+        salary = round(sum(person_weeks) * SALARY_PER_PERSON_WEEK, 2)
+        overhead = round(salary * OVERHEAD_RATE, 2)
+        values = person_weeks + [sum(person_weeks), salary, overhead, salary + overhead]
+        for (ix, value) in enumerate(values):
+            put(row, FIRST_GRADE_COL + ix, value)
+            totals[ix] += value
+        # end_for
+
+        # Schedule bars: in randomly chosen 'slots' of two columns, so that there is a gap between bars
+        filled = [False] * num_cols
+        num_slots = (num_cols + 1) / 2
+        slots = sorted(rng.sample(range(num_slots), min(layout['bars_per_task'], num_slots)))
+        for (ix, slot) in enumerate(slots):
+            start = slot * 2
+            next_start = slots[ix + 1] * 2 if ix + 1 < len(slots) else num_cols + 1
+            length = rng.randint(1, max(min(layout['max_bar_length'], next_start - start - 1), 1))
+            for col in range(start, start + length):
+                filled[col] = True
+            # end_for
+        # end_for
+        if task_ix == num_tasks - 1 and num_cols > 0:
+            filled[num_cols - 1] = True
+        # end_if
+        for col in range(num_cols):
+            if filled[col]:
+                ws.cell(row=row, column=FIRST_SCHEDULE_COL + col).fill = magic_fill
+            # end_if
+        # end_for
+        items = [{'type': 'bar', 'start': FIRST_SCHEDULE_COL + start, 'end': FIRST_SCHEDULE_COL + end, 'milestone': ''}
+                 for (start, end) in get_runs(filled)]
+        num_bars += len(items)
+
+        # Milestones: each in a randomly chosen column
+        for col in rng.sample(range(num_cols), min(layout['milestones_per_task'], num_cols)):
+            letter = rng.choice(string.ascii_uppercase)
+            put(row, FIRST_SCHEDULE_COL + col, letter)
+            items.append({'type': 'milestone', 'start': FIRST_SCHEDULE_COL + col, 'end': FIRST_SCHEDULE_COL + col,
+                          'milestone': letter})
+        # end_for
+        sched_items.append(sorted(items, key=lambda x: (x['start'], x['type'])))
+    # end_for
+
+    # The total line
+    row = 7 + num_tasks
+    names['task_list_bottom'] = (row, 1)
+    names['total_line'] = (row, 1)
+    for (ix, value) in enumerate(totals):
+        put(row, FIRST_GRADE_COL + ix, value)
+    # end_for
+    cost_col = total_col + 3
+
+    # Other direct costs, and the totals
+    row += 2
+    odc_total = 0.0
+    for (ix, name) in enumerate(ODC_LINES):
+        cost = float(rng.randint(0, 100) * 50)
+        names[name] = (row + ix, 1)
+        put(row + ix, cost_col, cost)
+        odc_total += cost
+    # end_for
+    put(row + len(ODC_LINES) - 1, TASK_NAME_COL, 'Other')
+    row += len(ODC_LINES)
+    put(row, cost_col, odc_total, 'odc_cell')
+    put(row + 1, cost_col, totals[-1] + odc_total, 'total_cost_cell')
+    put(row + 2, cost_col, totals[-1], 'direct_salary_cell')
+
+    # Funding sources
+    row += 4
+    names['funding_list_top'] = (row, 1)
+    for ix in range(layout['num_funding_sources']):
+        put(row + 1 + ix, TASK_NAME_COL, 'Funding source %d' % (ix + 1))
+    # end_for
+    row += layout['num_funding_sources'] + 1
+    names['funding_list_bottom'] = (row, 1)
+
+    # The milestones list
+    row += 2
+    names['milestones_list_first_row'] = (row, 1)
+    names['milestone_label_column'] = (row, 2)
+    names['milestone_name_column'] = (row, 3)
+    for ix in range(layout['milestone_list_length']):
+        label = string.ascii_uppercase[ix % 26] * (ix / 26 + 1)
+        put(row + ix, 2, label + ':')
+        put(row + ix, 3, 'Deliverable %d' % (ix + 1))
+    # end_for
+
+    for (name, (name_row, name_col)) in sorted(names.items()):
+        wb.defined_names.append(DefinedName(name, attr_text='%s!$%s$%d' % (WORKSCOPE_SHEET_NAME,
+                                                                           get_column_letter(name_col), name_row)))
+    # end_for
+    wb.save(dest)
+
+    retval = {}
+    retval['num_sched_col_header_cells'] = layout['num_units']
+    retval['sched_items'] = sched_items
+    retval['num_bars'] = num_bars
+    retval['num_milestones'] = layout['milestone_list_length']
+    retval['num_funding_sources'] = layout['num_funding_sources']
+    return retval
+# end_def generate_workbook()
+
+# Compare 'exData', the data extracted from a synthetic workbook (see extract_exhibit_data in
+# 'excelFileManager.py'), with 'expected', as returned by generate_workbook for it.
+# Return a string with the text of error message(s) for any difference(s) found, or '' if none.
+def check_exhibit_data(exData, expected):
+    errors = ''
+    if exData['num_sched_col_header_cells'] != expected['num_sched_col_header_cells']:
+        errors += 'Expected %d MAJOR schedule units, found %d.\n' % (expected['num_sched_col_header_cells'],
+                                                                     exData['num_sched_col_header_cells'])
+    # end_if
+    if len(exData['tasks']) != len(expected['sched_items']):
+        errors += 'Expected %d tasks, found %d.\n' % (len(expected['sched_items']), len(exData['tasks']))
+    # end_if
+    for (ix, (task, items)) in enumerate(zip(exData['tasks'], expected['sched_items'])):
+        if task['sched_items'] != items:
+            errors += 'Task %d: expected schedule items %r, found %r.\n' % (ix + 1, items, task['sched_items'])
+        # end_if
+    # end_for
+    if len(exData['milestones']) != expected['num_milestones']:
+        errors += 'Expected %d milestones, found %d.\n' % (expected['num_milestones'], len(exData['milestones']))
+    # end_if
+    if len(exData['funding_sources']) != expected['num_funding_sources']:
+        errors += 'Expected %d funding sources, found %d.\n' % (expected['num_funding_sources'],
+                                                               len(exData['funding_sources']))
+    # end_if
+    if exData['warnings'] != '':
+        errors += 'Expected no warnings, found:\n' + exData['warnings']
+    # end_if
+    return errors
+# end_def check_exhibit_data()
@@ -0,0 +1,101 @@
+# Tests for the workscope exhibit generator tool
+#
+# NOTES:
+#   1. These tests were written to run under Python 2.7.x, with the 'unittest' module of the
+#      Python standard library, and need the libraries used by the tool (OpenPyXl and
+#      Beautiful Soup).
+#
+# The workbooks the tests read are synthetic (see 'syntheticWorkbook.py'), written afresh
+# into a temporary folder by each test; each test then compares what the tool extracted from
+# a workbook with what generate_workbook said it should contain (see check_exhibit_data).
+#
+# Usage (from the folder containing the tool):
+#   <Python_installation_folder>/python.exe -m unittest discover -s tests -t .
+#
+# Internals of this Module
+# ========================
+#
+# workbookTestCase - base class of test cases which write synthetic workbooks
+#
+# read_exhibit_data - returns the data extracted from each workscope worksheet of a workbook
+#
+# read_synthetic_exhibit_data - writes a synthetic workbook in memory, and returns the data
+#                               extracted from it
+#
+# run_batch_quietly - runs a batch, capturing the report it prints
+#
+###############################################################################
+
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from syntheticWorkbook import get_layout, generate_workbook, check_exhibit_data
+
+# Base class of test cases which write synthetic workbooks into a temporary folder of their own,
+# which is removed after each test.
+class workbookTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='workscope_exhibit_test_')
+        self.addCleanup(shutil.rmtree, self.tmpdir, True)
+    # end_def setUp()
+
+    # Write a synthetic workbook named 'name' in the temporary folder, with the default layout
+    # with the entries in 'changes' replaced (see get_layout in 'syntheticWorkbook.py').
+    # Return a tuple (fullpath, expected), where 'expected' is as returned by generate_workbook.
+    def write_workbook(self, name, **changes):
+        fullpath = os.path.join(self.tmpdir, name)
+        out_dir = os.path.dirname(fullpath)
+        if not os.path.isdir(out_dir):
+            os.makedirs(out_dir)
+        # end_if
+        expected = generate_workbook(get_layout(**changes), fullpath)
+        return (fullpath, expected)
+    # end_def write_workbook()
+# end_class workbookTestCase
+
+# Return the data extracted from each workscope worksheet of the workbook 'source' (a filename or
+# a file-like object), as a list (see workbookSession in 'excelFileManager.py').
+def read_exhibit_data(source):
+    from excelFileManager import workbookSession
+    with workbookSession(source) as session:
+        if session.errors != '':
+            raise AssertionError('Errors found in workbook:\n' + session.errors)
+        # end_if
+        return session.extract()
+    # end_with
+# end_def read_exhibit_data()
+
+# Write a synthetic workbook in memory, with the default layout with the entries in 'changes'
+# replaced, and check the data extracted from it (see check_exhibit_data in 'syntheticWorkbook.py').
+# Return a tuple (exData, expected), where 'expected' is as returned by generate_workbook.
+def read_synthetic_exhibit_data(**changes):
+    source = io.BytesIO()
+    expected = generate_workbook(get_layout(**changes), source)
+    source.seek(0)
+    exData = read_exhibit_data(source)[0]
+    errors = check_exhibit_data(exData, expected)
+    if errors != '':
+        raise AssertionError('Unexpected data extracted from synthetic workbook:\n' + errors)
+    # end_if
+    return (exData, expected)
+# end_def read_synthetic_exhibit_data()
+
+
+# Run run_batch with the arguments given, with stdout (to which it prints its report) captured.
+# Return a tuple (results, text of the report).
+def run_batch_quietly(*args, **kwargs):
+    old_stdout = sys.stdout
+    sys.stdout = io.BytesIO()
+    try:
+        from workscope_exhibit_batch import run_batch
+        results = run_batch(*args, **kwargs)
+        report = sys.stdout.getvalue()
+    finally:
+        sys.stdout = old_stdout
+    # end_try
+    return (results, report)
+# end_def run_batch_quietly()
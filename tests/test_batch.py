@@ -0,0 +1,73 @@
+# Tests of the pipeline of the batch driver ('workscope_exhibit_batch.py').
+
+import os
+import re
+import time
+
+import workscope_exhibit_batch
+from workscope_exhibit_batch import find_inputs
+from workscope_exhibit_tool import get_output_filenames
+from syntheticWorkbook import check_exhibit_data
+from tests import workbookTestCase, run_batch_quietly
+
+# Return the maximum depth of the queue feeding 'stage', from a report printed by run_batch.
+def get_max_queued(report, stage):
+    return int(re.search(stage + r'\s+queue depth: \d+ \(max (\d+)\)', report).group(1))
+# end_def get_max_queued()
+
+class pipelineTest(workbookTestCase):
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        self.real_render_workbook = workscope_exhibit_batch.render_workbook
+        self.addCleanup(setattr, workscope_exhibit_batch, 'render_workbook', self.real_render_workbook)
+    # end_def setUp()
+
+    # Each workbook reaches the 'render' stage with the data extracted from it, in the order given
+    # (with one worker per stage), and its exhibits are written beside it.
+    def test_order_and_extracted_data(self):
+        expected = {}
+        for ix in range(4):
+            (fullpath, expected[fullpath]) = self.write_workbook('wb%d.xlsx' % ix, seed=ix, num_tasks=3 + ix)
+        # end_for
+        rendered = []
+        def render_workbook(result, *args):
+            rendered.append(result['fullpath'])
+            self.assertEqual(check_exhibit_data(result['exDatas'][0], expected[result['fullpath']]), '')
+            self.real_render_workbook(result, *args)
+        # end_def render_workbook()
+        workscope_exhibit_batch.render_workbook = render_workbook
+
+        (results, report) = run_batch_quietly(find_inputs([self.tmpdir]), 1, 1, 2)
+        self.assertEqual(rendered, sorted(expected.keys()))
+        self.assertEqual([result['fullpath'] for result in results], sorted(expected.keys()))
+        for result in results:
+            self.assertEqual(result['errors'], '')
+            for out_fn in get_output_filenames(result['fullpath']):
+                self.assertTrue(os.path.exists(out_fn))
+            # end_for
+        # end_for
+    # end_def test_order_and_extracted_data()
+
+    # When the 'render' stage falls behind, the bounded queue throttles the 'parse' stage: no more
+    # workbooks wait for (or are in) the 'render' stage than the queue, the render workers, and the
+    # parse worker blocked putting one in the queue can hold.
+    def test_back_pressure(self):
+        num_workbooks = 6
+        for ix in range(num_workbooks):
+            self.write_workbook('wb%d.xlsx' % ix, seed=ix, num_tasks=2, num_units=4)
+        # end_for
+        def render_workbook(result, *args):
+            time.sleep(0.5)
+            self.real_render_workbook(result, *args)
+        # end_def render_workbook()
+        workscope_exhibit_batch.render_workbook = render_workbook
+
+        queue_size = 1
+        (results, report) = run_batch_quietly(find_inputs([self.tmpdir]), 1, 1, queue_size)
+        self.assertEqual(len(results), num_workbooks)
+        self.assertEqual([result['errors'] for result in results], [''] * num_workbooks)
+        self.assertTrue(get_max_queued(report, 'render') <= queue_size + 1 + 1, report)
+        self.assertTrue(get_max_queued(report, 'parse') <= queue_size + 1 + 1, report)
+        self.assertTrue('render   queue depth: 0 (max' in report, report)
+    # end_def test_back_pressure()
+# end_class pipelineTest
@@ -0,0 +1,106 @@
+# Tests of the time and memory limits on the 'parse' worker processes of the batch driver
+# (supervisedWorker in 'workscope_exhibit_batch.py').
+
+import os
+import re
+import time
+import unittest
+
+import workscope_exhibit_batch
+from workscope_exhibit_batch import supervisedWorker
+from syntheticWorkbook import check_exhibit_data
+from tests import workbookTestCase
+
+# Stand-ins for workbookSession in the 'parse' worker processes, for the limits on them.
+class slowLoadSession:
+    def __init__(self, fullpath):
+        self.errors = ''
+    # end_def __init__()
+
+    def __enter__(self):
+        time.sleep(60)
+        return self
+    # end_def __enter__()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+    # end_def __exit__()
+# end_class slowLoadSession
+
+class slowExtractSession(slowLoadSession):
+    def __enter__(self):
+        return self
+    # end_def __enter__()
+
+    def extract(self):
+        time.sleep(60)
+        return []
+    # end_def extract()
+# end_class slowExtractSession
+
+class hugeLoadSession(slowLoadSession):
+    def __enter__(self):
+        self.data = 'x' * (512 * 1024 * 1024)
+        return self
+    # end_def __enter__()
+# end_class hugeLoadSession
+
+class supervisedWorkerTest(workbookTestCase):
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        # N.B. The worker process is started (forked) by the first call of extract, after the
+        #      stand-in for workbookSession is in place.
+        self.real_session = workscope_exhibit_batch.workbookSession
+        self.addCleanup(setattr, workscope_exhibit_batch, 'workbookSession', self.real_session)
+    # end_def setUp()
+
+    # A workbook that takes too long to load is killed, and recorded as failed in the 'load' stage;
+    # the next workbook is read by a fresh worker process.
+    def test_timeout_in_load(self):
+        (fullpath, expected) = self.write_workbook('wb.xlsx')
+        worker = supervisedWorker(1, 0)
+        self.addCleanup(worker.stop)
+        workscope_exhibit_batch.workbookSession = slowLoadSession
+        start = time.time()
+        result = worker.extract(fullpath, 'hash')
+        self.assertTrue(time.time() - start < 30)
+        self.assertEqual(result['errors'], 'Timed out after 1 s when reading input .xlsx file (stage: load).\n')
+        self.assertEqual(result['stage'], 'load')
+        self.assertEqual(result['content_hash'], 'hash')
+        self.assertEqual(worker.process, None)
+
+        workscope_exhibit_batch.workbookSession = self.real_session
+        result = worker.extract(fullpath, 'hash')
+        self.assertEqual(result['errors'], '')
+        self.assertEqual(check_exhibit_data(result['exDatas'][0], expected), '')
+    # end_def test_timeout_in_load()
+
+    # The stage reported for a workbook that times out is the one it had reached.
+    def test_timeout_in_extract(self):
+        (fullpath, expected) = self.write_workbook('wb.xlsx')
+        worker = supervisedWorker(1, 0)
+        self.addCleanup(worker.stop)
+        workscope_exhibit_batch.workbookSession = slowExtractSession
+        result = worker.extract(fullpath, None)
+        self.assertEqual(result['stage'], 'extract')
+        self.assertTrue('(stage: extract)' in result['errors'])
+    # end_def test_timeout_in_extract()
+
+    # A workbook that exceeds the memory limit fails, and its worker process is replaced.
+    @unittest.skipUnless(workscope_exhibit_batch.resource != None and os.path.exists('/proc/self/status'),
+                         'memory limits are not supported on this platform')
+    def test_memory_limit(self):
+        (fullpath, expected) = self.write_workbook('wb.xlsx')
+        # Allow the worker (a copy of this process) its current address space, plus a little
+        f = open('/proc/self/status')
+        vm_size_kb = int(re.search(r'VmSize:\s+(\d+)', f.read()).group(1))
+        f.close()
+        worker = supervisedWorker(30, vm_size_kb / 1024 + 128)
+        self.addCleanup(worker.stop)
+        workscope_exhibit_batch.workbookSession = hugeLoadSession
+        result = worker.extract(fullpath, None)
+        self.assertEqual(result['errors'], 'Memory limit exceeded when reading input .xlsx file (stage: load).\n')
+        self.assertTrue(result['recycle'])
+        self.assertEqual(worker.process, None)
+    # end_def test_memory_limit()
+# end_class supervisedWorkerTest
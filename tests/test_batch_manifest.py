@@ -0,0 +1,69 @@
+# Tests of resuming a batch run from its manifest ('batchManifest.py').
+
+import os
+
+from workscope_exhibit_batch import find_inputs
+from workscope_exhibit_tool import get_output_filenames
+from batchManifest import batchManifest
+from tests import workbookTestCase, run_batch_quietly
+
+class manifestResumeTest(workbookTestCase):
+    OPTIONS = {'compress_level': 0, 'export_data': False, 'ex1_page_units': 0, 'inline_css': False,
+               'strict_totals': False}
+
+    # Run a batch over the paths 'paths' (by default, the temporary folder), recording the outcomes
+    # in the manifest, with the options 'options'. Return the list of the paths of the workbooks processed.
+    def run_with_manifest(self, options, paths=None):
+        manifest = batchManifest(os.path.join(self.tmpdir, 'manifest.jsonl'), options)
+        try:
+            (results, report) = run_batch_quietly(find_inputs(paths or [self.tmpdir]), 1, 1, 2, manifest=manifest)
+        finally:
+            manifest.close()
+        # end_try
+        return sorted([result['fullpath'] for result in results])
+    # end_def run_with_manifest()
+
+    # A re-started run skips the workbooks processed successfully, retries those that failed,
+    # and processes those that have changed, or whose outputs have, or when the options differ.
+    def test_resume(self):
+        paths = [self.write_workbook('wb%d.xlsx' % ix, seed=ix, num_tasks=2)[0] for ix in range(3)]
+        bad_path = os.path.join(self.tmpdir, 'bad.xlsx')
+        f = open(bad_path, 'wb')
+        f.write('not a workbook')
+        f.close()
+
+        self.assertEqual(self.run_with_manifest(self.OPTIONS), sorted(paths + [bad_path]))
+        self.assertEqual(self.run_with_manifest(self.OPTIONS), [bad_path])
+
+        self.write_workbook('wb1.xlsx', seed=10, num_tasks=2)
+        os.remove(get_output_filenames(paths[2])[1])
+        self.assertEqual(self.run_with_manifest(self.OPTIONS), [bad_path, paths[1], paths[2]])
+
+        options = dict(self.OPTIONS)
+        options['inline_css'] = True
+        self.assertEqual(self.run_with_manifest(options), sorted(paths + [bad_path]))
+    # end_def test_resume()
+
+    # Workbooks that could not be read at all, so have no hash, are recorded as failed all the same,
+    # and retried by a re-started run.
+    def test_unreadable_inputs(self):
+        missing_path = os.path.join(self.tmpdir, 'missing.xlsx')
+        bundle_path = os.path.join(self.tmpdir, 'broken.zip')
+        f = open(bundle_path, 'wb')
+        f.write('not a bundle')
+        f.close()
+        paths = sorted([missing_path, bundle_path])
+
+        self.assertEqual(self.run_with_manifest(self.OPTIONS, paths), paths)
+        manifest = batchManifest(os.path.join(self.tmpdir, 'manifest.jsonl'), self.OPTIONS)
+        try:
+            for path in paths:
+                entry = manifest.lookup(path)
+                self.assertEqual((entry['status'], entry['content_hash'], entry['stage']), ('failed', '', 'load'))
+            # end_for
+        finally:
+            manifest.close()
+        # end_try
+        self.assertEqual(self.run_with_manifest(self.OPTIONS, paths), paths)
+    # end_def test_unreadable_inputs()
+# end_class manifestResumeTest
@@ -0,0 +1,76 @@
+# Tests of the pruning and minifying of the stylesheet inlined in the exhibits ('cssInliner.py').
+
+import os
+
+import cssInliner
+from cssInliner import parse_css, get_used_names, selector_matches, get_selector_names, get_pruned_css
+from tests import workbookTestCase
+
+STYLESHEET = '''@charset "UTF-8";
+/* Exhibit 1 */
+#ex1Tbl td.schedColCell , .scheduleBar { border : 1px solid black; }
+.deliverableCodeDiv:hover { color: red }
+/* Exhibit 2 */
+table#ex2Tbl > tr td[headers] { padding: 2px; }
+@media print {
+    .scheduleBar { background: black; }
+    .otherExpDiv { display: block; }
+}
+body { margin: 0; }
+'''
+
+class cssInlinerTest(workbookTestCase):
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        self.filename = os.path.join(self.tmpdir, 'style.css')
+        f = open(self.filename, 'wb')
+        f.write(STYLESHEET)
+        f.close()
+    # end_def setUp()
+
+    def test_get_used_names(self):
+        used = get_used_names('<TABLE id=ex2Tbl><tr class="a  b"><td class=\'c\' id="row1">x</td></tr></TABLE>')
+        self.assertEqual(used, (frozenset(['table', 'tr', 'td']), frozenset(['ex2Tbl', 'row1']), frozenset(['a', 'b', 'c'])))
+    # end_def test_get_used_names()
+
+    # A selector matches only if every element type, id, and class it names is used; pseudo-classes
+    # and attribute selectors are ignored.
+    def test_selector_matches(self):
+        used = (frozenset(['table', 'tr', 'td']), frozenset(['ex2Tbl']), frozenset(['deliverableCodeDiv']))
+        self.assertTrue(selector_matches('table#ex2Tbl>tr td[headers]', used))
+        self.assertTrue(selector_matches('.deliverableCodeDiv:hover', used))
+        self.assertTrue(selector_matches('*', used))
+        self.assertFalse(selector_matches('#ex1Tbl td.schedColCell', used))
+        self.assertFalse(selector_matches('div.deliverableCodeDiv', used))
+    # end_def test_selector_matches()
+
+    def test_get_selector_names(self):
+        names = get_selector_names(parse_css(STYLESHEET))
+        self.assertEqual(names, (frozenset(['td', 'table', 'tr', 'body']), frozenset(['ex1Tbl', 'ex2Tbl']),
+                                 frozenset(['schedColCell', 'scheduleBar', 'deliverableCodeDiv', 'otherExpDiv'])))
+    # end_def test_get_selector_names()
+
+    # The rules (and the selectors in a list) that cannot apply are dropped, as are an at-rule left
+    # empty, and @charset; the rest are minified.
+    def test_pruned_css(self):
+        used = get_used_names('<body><table id="ex2Tbl"><tr><td headers="x"><div class="scheduleBar">' +
+                              '</div></td></tr></table></body>')
+        self.assertEqual(get_pruned_css(self.filename, used),
+                         '.scheduleBar{border:1px solid black}' +
+                         'table#ex2Tbl>tr td[headers]{padding:2px}' +
+                         '@media print{.scheduleBar{background:black}}' +
+                         'body{margin:0}')
+        used = get_used_names('<p class="otherExpDiv"></p>')
+        self.assertEqual(get_pruned_css(self.filename, used), '@media print{.otherExpDiv{display:block}}')
+    # end_def test_pruned_css()
+
+    # Documents which differ only in names that no selector mentions share a cache entry.
+    def test_cache_key(self):
+        for ix in range(5):
+            get_pruned_css(self.filename, get_used_names('<body><div id="row%d" class="scheduleBar task%d"></div></body>' % (ix, ix)))
+        # end_for
+        keys = [key for key in cssInliner.pruned_stylesheets.keys() if key[0] == self.filename]
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(keys[0][1], (frozenset(['body']), frozenset(), frozenset(['scheduleBar'])))
+    # end_def test_cache_key()
+# end_class cssInlinerTest
@@ -0,0 +1,146 @@
+# Tests of the daemon and its client ('workscope_exhibit_daemon.py' and 'workscope_exhibit_client.py').
+
+import io
+import os
+import socket
+import subprocess
+import sys
+import unittest
+
+import workscope_exhibit_client
+import workscope_exhibit_tool
+from workscope_exhibit_daemon import send_request, daemonNotRunning, SOCKET_PATH_VARIABLE
+from workscope_exhibit_tool import render_exhibit, get_output_filenames
+from tests import workbookTestCase, read_exhibit_data
+
+# Folder containing the tool, from which the daemon is run
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class clientTestCase(workbookTestCase):
+    # Point the client at a socket in the temporary folder, on which nothing is listening yet.
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        self.socket_path = os.path.join(self.tmpdir, 'daemon.sock')
+        self.addCleanup(os.environ.__setitem__, SOCKET_PATH_VARIABLE, os.environ.get(SOCKET_PATH_VARIABLE, ''))
+        os.environ[SOCKET_PATH_VARIABLE] = self.socket_path
+        (self.fullpath, self.expected) = self.write_workbook('wb.xlsx', num_tasks=3)
+        f = open(self.fullpath, 'rb')
+        self.data = f.read()
+        f.close()
+    # end_def setUp()
+
+    # Run the client with the arguments 'argv', with 'stdin_data' on stdin, and with stdout and stderr
+    # captured. Return a tuple (exit status, text written to stdout, text written to stderr).
+    def run_client(self, argv, stdin_data=''):
+        saved = (sys.stdin, sys.stdout, sys.stderr)
+        (sys.stdin, sys.stdout, sys.stderr) = (io.BytesIO(stdin_data), io.BytesIO(), io.BytesIO())
+        try:
+            status = workscope_exhibit_client.main(argv)
+            return (status, sys.stdout.getvalue(), sys.stderr.getvalue())
+        finally:
+            (sys.stdin, sys.stdout, sys.stderr) = saved
+        # end_try
+    # end_def run_client()
+
+    # The same requests have the same effect whether or not the daemon is running.
+    def check_requests(self):
+        exhibit_2 = render_exhibit(read_exhibit_data(self.fullpath)[0], 2)
+        self.assertEqual(self.run_client(['--stdout', '--exhibit', '2', self.fullpath]), (0, exhibit_2, ''))
+        self.assertEqual(self.run_client(['--exhibit', '2', '-'], self.data), (0, exhibit_2, ''))
+
+        (status, out, err) = self.run_client(['-'], 'not a workbook')
+        self.assertEqual((status, out), (1, ''))
+        self.assertTrue(err.startswith('HTML generation aborted.\nErrors found when reading stdin:\n'), err)
+
+        # Relative paths are relative to the client's current folder.
+        old_cwd = os.getcwd()
+        os.chdir(self.tmpdir)
+        try:
+            (status, out, err) = self.run_client(['wb.xlsx'])
+        finally:
+            os.chdir(old_cwd)
+        # end_try
+        self.assertEqual(status, 0, err)
+        for out_fn in get_output_filenames(self.fullpath):
+            self.assertTrue(os.path.exists(out_fn))
+        # end_for
+    # end_def check_requests()
+# end_class clientTestCase
+
+class fallbackTest(clientTestCase):
+    # With no daemon listening, the client runs the tool itself.
+    def test_no_daemon(self):
+        self.assertRaises(daemonNotRunning, send_request, self.socket_path, {'command': 'status'})
+        self.check_requests()
+    # end_def test_no_daemon()
+# end_class fallbackTest
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'the daemon needs Unix-domain sockets')
+class daemonTest(clientTestCase):
+    # Start the daemon, listening on the socket, and stop it after the test.
+    def setUp(self):
+        clientTestCase.setUp(self)
+        self.daemon_err = open(os.path.join(self.tmpdir, 'daemon.err'), 'w+')
+        self.addCleanup(self.daemon_err.close)
+        self.daemon = subprocess.Popen([sys.executable, 'workscope_exhibit_daemon.py', 'serve', '--socket', self.socket_path],
+                                       cwd=TOOL_DIR, stdout=subprocess.PIPE, stderr=self.daemon_err)
+        self.addCleanup(self.stop_daemon)
+        line = self.daemon.stdout.readline()
+        self.assertTrue(line.startswith('Daemon (process %d) listening on ' % self.daemon.pid), line)
+    # end_def setUp()
+
+    def stop_daemon(self):
+        if self.daemon.poll() == None:
+            try:
+                send_request(self.socket_path, {'command': 'stop'}, out=io.BytesIO(), err=io.BytesIO())
+            except daemonNotRunning:
+                self.daemon.kill()
+            # end_try
+        # end_if
+        self.daemon.wait()
+        self.daemon.stdout.close()
+    # end_def stop_daemon()
+
+    # Requests are forwarded to the daemon, and its output and exit status returned to the client,
+    # which does not run the tool itself.
+    def test_round_trip(self):
+        def cli_main(argv):
+            raise AssertionError('The tool was run by the client.')
+        # end_def cli_main()
+        self.addCleanup(setattr, workscope_exhibit_tool, 'cli_main', workscope_exhibit_tool.cli_main)
+        workscope_exhibit_tool.cli_main = cli_main
+        out = io.BytesIO()
+        self.assertEqual(send_request(self.socket_path, {'command': 'status'}, out=out), 0)
+        self.assertEqual(out.getvalue(), 'Daemon running (process %d), listening on %s\n' % (self.daemon.pid, self.socket_path))
+        self.check_requests()
+
+        # The tool's command line is checked by the daemon
+        (status, out, err) = self.run_client(['--compress', '6', '--stdout', self.fullpath])
+        self.assertEqual((status, out), (2, ''))
+        self.assertTrue('--compress may not be given with --stdout' in err, err)
+    # end_def test_round_trip()
+
+    # Once the daemon has stopped, the client runs the tool itself again.
+    def test_stop(self):
+        self.stop_daemon()
+        self.assertEqual(self.daemon.returncode, 0)
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.daemon_err.seek(0)
+        self.assertEqual(self.daemon_err.read(), '')
+        self.check_requests()
+    # end_def test_stop()
+
+    # The client refuses to send requests to a socket belonging to another user, and runs the
+    # tool itself instead.
+    @unittest.skipUnless(hasattr(os, 'getuid') and os.getuid() == 0, 'only root can give the socket to another user')
+    def test_socket_of_another_user(self):
+        os.chown(self.socket_path, 65534, -1)
+        try:
+            (status, out, err) = self.run_client(['--stdout', '--exhibit', '2', self.fullpath])
+        finally:
+            os.chown(self.socket_path, 0, -1)
+        # end_try
+        self.assertEqual((status, out), (0, render_exhibit(read_exhibit_data(self.fullpath)[0], 2)))
+        self.assertEqual(err, 'Refused to connect to ' + self.socket_path + ': it belongs to another user.\n')
+    # end_def test_socket_of_another_user()
+# end_class daemonTest
@@ -0,0 +1,103 @@
+# Tests of the structural diff of two versions of a workbook ('workscope_exhibit_diff.py').
+
+import io
+import os
+import sys
+import copy
+
+from workscope_exhibit_tool import gen_exhibit_data
+from workscope_exhibit_diff import diff_workbook_data, count_differences, gen_diff_text, main
+from tests import workbookTestCase, read_synthetic_exhibit_data
+
+class diffWorkbookDataTest(workbookTestCase):
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        (exData, expected) = read_synthetic_exhibit_data(num_tasks=3, num_units=4)
+        self.old = gen_exhibit_data(exData)
+        self.new = copy.deepcopy(self.old)
+    # end_def setUp()
+
+    def test_unchanged(self):
+        diffs = diff_workbook_data([self.old], [self.new])
+        self.assertEqual(diffs, [('workscope_exhibits', 'unchanged', [])])
+        self.assertEqual(count_differences(diffs), 0)
+    # end_def test_unchanged()
+
+    # Each change is reported once, in its section, and the sections are in order.
+    def test_changes(self):
+        new = self.new
+        new['tasks'][0]['name'] = u'Data collection'
+        del new['tasks'][2]
+        odc = new['other_direct_costs'][0]
+        odc['cost'] += 100
+        new['other_direct_costs_total'] += 100
+        new['total_cost'] += 100
+        bar = [item for item in new['tasks'][1]['schedule'] if item['type'] == 'bar'][0]
+        (bar['start'], bar['end'], bar['start_label'], bar['end_label']) = (100, 101, u'Month 9, Week 1', u'Month 9, Week 2')
+        del new['milestones'][-1]
+        old_bar = [item for item in self.old['tasks'][1]['schedule'] if item['type'] == 'bar'][0]
+        old_task_3 = self.old['tasks'][2]
+
+        diffs = diff_workbook_data([self.old], [new])
+        self.assertEqual(diffs[0][:2], ('workscope_exhibits', 'changed'))
+        self.assertEqual(diffs[0][2],
+                         [('Tasks', 'Task 3 removed: Task 3 (%.1f person-weeks, $%s)' %
+                                    (old_task_3['total_person_weeks'], '{0:,.0f}'.format(old_task_3['total_cost']))),
+                          ('Tasks', 'Task 1 renamed: Task 1 -> Data collection'),
+                          ('Costs', 'Other direct costs, %s: $%s -> $%s (+$100)' %
+                                    (odc['name'], '{0:,.0f}'.format(odc['cost'] - 100), '{0:,.0f}'.format(odc['cost']))),
+                          ('Costs', 'Total other direct costs: $%s -> $%s (+$100)' %
+                                    ('{0:,.0f}'.format(new['other_direct_costs_total'] - 100),
+                                     '{0:,.0f}'.format(new['other_direct_costs_total']))),
+                          ('Costs', 'Total cost: $%s -> $%s (+$100)' %
+                                    ('{0:,.0f}'.format(new['total_cost'] - 100), '{0:,.0f}'.format(new['total_cost']))),
+                          ('Schedule', 'Task 2: bar moved from %s - %s to Month 9, Week 1 - Month 9, Week 2' %
+                                       (old_bar['start_label'], old_bar['end_label'])),
+                          ('Milestones', 'Milestone D removed: Deliverable 4')])
+        self.assertEqual(count_differences(diffs), 7)
+        self.assertTrue(gen_diff_text('old.xlsx', 'new.xlsx', diffs).endswith('\n7 difference(s) found.\n'))
+    # end_def test_changes()
+
+    # Workbooks containing several workscopes are compared worksheet by worksheet, by name.
+    def test_worksheets_matched_by_name(self):
+        other = copy.deepcopy(self.old)
+        other['sheet_name'] = 'Phase 2'
+        diffs = diff_workbook_data([self.old, other], [self.new])
+        self.assertEqual(diffs, [('workscope_exhibits', 'unchanged', []), ('Phase 2', 'removed', [])])
+        self.assertEqual(count_differences(diffs), 1)
+    # end_def test_worksheets_matched_by_name()
+# end_class diffWorkbookDataTest
+
+class diffMainTest(workbookTestCase):
+    # As for the 'diff' utility, the exit code is 0 if no differences were found, 1 if some were,
+    # and 2 if a workbook could not be read; the portfolio index, if given, is used as a cache.
+    def test_exit_codes(self):
+        (old_path, expected) = self.write_workbook('old.xlsx', seed=1, num_tasks=3)
+        (new_path, expected) = self.write_workbook('new.xlsx', seed=1, num_tasks=4)
+        bad_path = os.path.join(self.tmpdir, 'bad.xlsx')
+        f = open(bad_path, 'wb')
+        f.write('not a workbook')
+        f.close()
+        report_path = os.path.join(self.tmpdir, 'report.txt')
+        db_path = os.path.join(self.tmpdir, 'index.db')
+
+        self.assertEqual(main([old_path, old_path, '--output', report_path]), 0)
+        self.assertEqual(main([old_path, new_path, '--output', report_path, '--db', db_path]), 1)
+        f = open(report_path, 'rb')
+        report = f.read()
+        f.close()
+        self.assertTrue('    Task 4 added: Task 4 (' in report, report)
+        self.assertEqual(main([old_path, new_path, '--output', report_path, '--db', db_path]), 1)
+        f = open(report_path, 'rb')
+        self.assertEqual(f.read(), report)
+        f.close()
+        old_stderr = sys.stderr
+        sys.stderr = io.BytesIO()
+        try:
+            self.assertEqual(main([old_path, bad_path, '--output', report_path]), 2)
+            self.assertTrue(sys.stderr.getvalue().startswith('Errors found when reading ' + bad_path + ':\n'))
+        finally:
+            sys.stderr = old_stderr
+        # end_try
+    # end_def test_exit_codes()
+# end_class diffMainTest
@@ -0,0 +1,86 @@
+# Tests of the export of the data shown in the exhibits as JSON and JSON lines (gen_exhibit_data
+# in 'workscope_exhibit_tool.py', and the '--json' and '--jsonl' options of the batch driver).
+
+import json
+import os
+
+from workscope_exhibit_tool import gen_exhibit_data, format_json, get_data_filename
+from workscope_exhibit_batch import find_inputs, jsonLinesWriter
+from tests import workbookTestCase, read_synthetic_exhibit_data, run_batch_quietly
+
+class genExhibitDataTest(workbookTestCase):
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        (self.exData, self.expected) = read_synthetic_exhibit_data(num_tasks=3, num_units=4)
+    # end_def setUp()
+
+    def test_contents(self):
+        data = gen_exhibit_data(self.exData, 'wb.xlsx')
+        self.assertEqual((data['source'], data['sheet_name']), ('wb.xlsx', self.exData['sheet_name']))
+        self.assertEqual([task['name'] for task in data['tasks']], [task['name'] for task in self.exData['tasks']])
+        self.assertEqual(sorted(data['totals']['person_weeks'].keys()), sorted(data['grades']))
+        self.assertAlmostEqual(data['totals']['total_person_weeks'],
+                               sum([task['total_person_weeks'] for task in data['tasks']]))
+        self.assertEqual(len(data['milestones']), self.expected['num_milestones'])
+        self.assertEqual(len(data['funding_sources']), self.expected['num_funding_sources'])
+
+        # The schedule items are indices of minor schedule units, counted from the first
+        first = self.exData['first_schedule_col_ix']
+        for (task, items) in zip(data['tasks'], self.expected['sched_items']):
+            self.assertEqual([(item['type'], item['start'], item['end'], item['milestone']) for item in task['schedule']],
+                             [(item['type'], item['start'] - first, item['end'] - first, item['milestone']) for item in items])
+        # end_for
+    # end_def test_contents()
+
+    # Empty cells, which are read as ' ', are exported as None.
+    def test_empty_cells(self):
+        self.exData['project_name'] = ' '
+        self.exData['cost_block'][0][0] = None
+        data = gen_exhibit_data(self.exData)
+        self.assertEqual(data['project_name'], None)
+        self.assertEqual(data['tasks'][0]['person_weeks'][data['grades'][0]], None)
+    # end_def test_empty_cells()
+
+    # The JSON is indented, or on a single line for a 'JSON lines' file; either way, it reads back
+    # as the data exported.
+    def test_format_json(self):
+        data = gen_exhibit_data(self.exData, u'r\xe9vision.xlsx')
+        for one_line in [False, True]:
+            text = format_json(data, one_line)
+            self.assertTrue(isinstance(text, str))
+            self.assertEqual(json.loads(text.decode('UTF-8')), data)
+        # end_for
+        self.assertEqual(format_json(data, True).count('\n'), 1)
+        self.assertTrue(format_json(data).count('\n') > 1)
+    # end_def test_format_json()
+# end_class genExhibitDataTest
+
+class batchExportTest(workbookTestCase):
+    # A JSON file is written beside the exhibits of each workbook, and one line per worksheet to
+    # the 'JSON lines' file.
+    def test_json_and_json_lines(self):
+        paths = [self.write_workbook('wb%d.xlsx' % ix, seed=ix, num_tasks=2 + ix)[0] for ix in range(3)]
+        jsonl_path = os.path.join(self.tmpdir, 'all.jsonl')
+        jsonl = jsonLinesWriter(jsonl_path)
+        try:
+            (results, report) = run_batch_quietly(find_inputs([self.tmpdir]), 1, 2, 2, export_data=True, jsonl=jsonl)
+        finally:
+            jsonl.close()
+        # end_try
+        self.assertEqual([result['errors'] for result in results], [''] * len(paths))
+
+        for (ix, path) in enumerate(paths):
+            data_fn = get_data_filename(path)
+            self.assertTrue(data_fn in [result['outputs'] for result in results if result['fullpath'] == path][0])
+            f = open(data_fn, 'rb')
+            data = json.loads(f.read())
+            f.close()
+            self.assertEqual((data['source'], len(data['tasks'])), (path, 2 + ix))
+        # end_for
+
+        f = open(jsonl_path, 'rb')
+        lines = f.read().splitlines()
+        f.close()
+        self.assertEqual(sorted([json.loads(line)['source'] for line in lines]), paths)
+    # end_def test_json_and_json_lines()
+# end_class batchExportTest
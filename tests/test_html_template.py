@@ -0,0 +1,55 @@
+# Tests of the compiled element templates ('htmlTemplate.py'), and of the escaping of the text
+# taken from workbooks in the generated exhibits.
+
+import unittest
+
+from htmlTemplate import compile_template, escape_html
+from workscope_exhibit_tool import render_exhibit
+from tests import read_synthetic_exhibit_data
+
+class compileTemplateTest(unittest.TestCase):
+    def test_escape_html(self):
+        self.assertEqual(escape_html('R&D <draft> "final"'), 'R&amp;D &lt;draft&gt; &quot;final&quot;')
+        self.assertEqual(escape_html(12.5), '12.5')
+        self.assertEqual(escape_html(u'caf\xe9 & co'), u'caf\xe9 &amp; co')
+    # end_def test_escape_html()
+
+    def test_fields(self):
+        render = compile_template('<div id="task{num}" style="width:100%">{name}{extra:raw}</div>')
+        self.assertEqual(render(num=3, name='A & <B>', extra='<br>'),
+                         '<div id="task3" style="width:100%">A &amp; &lt;B&gt;<br></div>')
+    # end_def test_fields()
+
+    def test_field_both_escaped_and_raw(self):
+        self.assertRaises(ValueError, compile_template, '{name} {name:raw}')
+    # end_def test_field_both_escaped_and_raw()
+# end_class compileTemplateTest
+
+class exhibitEscapingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        (cls.exData, expected) = read_synthetic_exhibit_data(num_tasks=2, num_units=6)
+        cls.exData['project_name'] = u'Route 1 & <Main St>'
+        cls.exData['tasks'][0]['name'] = u'R&D <draft>'
+        cls.exData['milestones'][0]['name'] = u'Memo "A" & <B>'
+        cls.exData['funding_sources'][0] = u'MPO <3C>'
+        cls.exData['odcs'][-1]['name'] = u'Other & <misc>'
+    # end_def setUpClass()
+
+    # Text containing '&' or '<' appears as such, rather than as broken markup.
+    def test_exhibit_1(self):
+        html = render_exhibit(self.exData, 1)
+        self.assertTrue('Route 1 &amp; &lt;Main St&gt;' in html)
+        self.assertTrue('R&amp;D &lt;draft&gt;' in html)
+        self.assertTrue('Memo "A" &amp; &lt;B&gt;' in html)
+        self.assertFalse('<draft>' in html or '<main' in html.lower() or '<b>' in html.lower())
+    # end_def test_exhibit_1()
+
+    def test_exhibit_2(self):
+        html = render_exhibit(self.exData, 2)
+        self.assertTrue('R&amp;D &lt;draft&gt;' in html)
+        self.assertTrue('MPO &lt;3C&gt;' in html)
+        self.assertTrue('Other &amp; &lt;misc&gt;' in html)
+        self.assertFalse('<draft>' in html or '<3c>' in html.lower() or '<misc>' in html)
+    # end_def test_exhibit_2()
+# end_class exhibitEscapingTest
@@ -0,0 +1,56 @@
+# Tests of the classification of the cells with the 'magic' fill by their style ids
+# (get_magic_fill_style_ids and sheetGrid in 'excelFileManager.py').
+
+from excelFileManager import get_magic_fill_style_ids, sheetGrid, open_workbook, MAGIC_FILL_STYLE
+from workbookValidator import WORKSCOPE_SHEET_NAME
+from tests import workbookTestCase
+
+class magicFillTest(workbookTestCase):
+    # Write a synthetic workbook, with cells added below the exhibits with the 'magic' fill in
+    # a style of its own (bold), and with other fills.
+    def setUp(self):
+        import openpyxl
+        from openpyxl.styles import PatternFill, Font
+        workbookTestCase.setUp(self)
+        (self.fullpath, expected) = self.write_workbook('wb.xlsx', num_tasks=4)
+        wb = openpyxl.load_workbook(self.fullpath)
+        ws = wb[WORKSCOPE_SHEET_NAME]
+        row_ix = ws.max_row + 2
+        ws.cell(row=row_ix, column=1).fill = PatternFill(patternType=MAGIC_FILL_STYLE)
+        ws.cell(row=row_ix, column=1).font = Font(bold=True)
+        ws.cell(row=row_ix, column=2).fill = PatternFill(patternType='solid', fgColor='FFFF00')
+        ws.cell(row=row_ix, column=3).fill = PatternFill(patternType='lightGray')
+        ws.cell(row=row_ix, column=4, value='not filled')
+        wb.save(self.fullpath)
+        self.row_ix = row_ix
+    # end_def setUp()
+
+    # Reading the worksheet with the style ids, and with the fill of each cell looked up, gives the
+    # same grid.
+    def test_same_as_cell_fill(self):
+        wb = open_workbook(self.fullpath)
+        try:
+            magic_style_ids = get_magic_fill_style_ids(wb)
+            # Both the synthetic workbook's style with the 'magic' fill, and the bold one
+            self.assertTrue(magic_style_ids != None and len(magic_style_ids) >= 2, magic_style_ids)
+            ws = wb[WORKSCOPE_SHEET_NAME]
+            by_style_id = sheetGrid()
+            by_style_id.read(ws, 1, self.row_ix, 1, 60, magic_style_ids)
+            by_fill = sheetGrid()
+            by_fill.read(ws, 1, self.row_ix, 1, 60)
+        finally:
+            wb.close()
+        # end_try
+        self.assertEqual(by_style_id.values, by_fill.values)
+        self.assertEqual(by_style_id.filled, by_fill.filled)
+        self.assertTrue(len(by_fill.filled) > 1)
+        self.assertEqual(sorted([col_ix for (row_ix, col_ix) in by_fill.filled if row_ix == self.row_ix]), [1])
+    # end_def test_same_as_cell_fill()
+
+    # Outside read-only mode, the fill of each cell is looked up instead.
+    def test_not_read_only(self):
+        import openpyxl
+        wb = openpyxl.load_workbook(self.fullpath)
+        self.assertEqual(get_magic_fill_style_ids(wb), None)
+    # end_def test_not_read_only()
+# end_class magicFillTest
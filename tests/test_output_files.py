@@ -0,0 +1,107 @@
+# Tests of the writing of output files and their compressed copies (write_output_file in
+# 'workscope_exhibit_tool.py').
+
+import gzip
+import io
+import os
+
+import workscope_exhibit_tool
+from workscope_exhibit_tool import write_output_file, compress_bytes, get_output_filenames
+from batchManifest import hash_bytes, hash_file
+from tests import workbookTestCase
+
+# Return the contents of the file 'filename'.
+def read_file(filename):
+    f = open(filename, 'rb')
+    retval = f.read()
+    f.close()
+    return retval
+# end_def read_file()
+
+# Write 'data' to the file 'filename', and set its modification time to 'mtime'.
+def write_file(filename, data, mtime):
+    f = open(filename, 'wb')
+    f.write(data)
+    f.close()
+    os.utime(filename, (mtime, mtime))
+# end_def write_file()
+
+class writeOutputFileTest(workbookTestCase):
+    DATA = '<html>' + 'exhibit ' * 1000 + '</html>\n'
+
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        self.filename = os.path.join(self.tmpdir, 'wb_Exhibit_1.html')
+    # end_def setUp()
+
+    # The .gz copy decompresses to the output file, and the same data always compresses to the
+    # same bytes.
+    def test_gzip_copy(self):
+        written = write_output_file(self.DATA, self.filename, 6)
+        self.assertEqual(read_file(self.filename), self.DATA)
+        gz = gzip.GzipFile(fileobj=io.BytesIO(read_file(self.filename + '.gz')))
+        self.assertEqual(gz.read(), self.DATA)
+        self.assertEqual(read_file(self.filename + '.gz'), compress_bytes(self.DATA, '.gz', 6))
+        self.assertTrue(len(read_file(self.filename + '.gz')) < len(self.DATA))
+        for (out_fn, out_hash) in written.items():
+            self.assertEqual(hash_file(out_fn), out_hash)
+        # end_for
+        self.assertEqual(write_output_file(self.DATA, self.filename), {self.filename: hash_bytes(self.DATA)})
+    # end_def test_gzip_copy()
+
+    # With a record of the hashes (e.g., a batch manifest), an unchanged output file is not re-written,
+    # nor are its compressed copies re-compressed, unless they were compressed at another level.
+    def test_recorded_hashes(self):
+        recorded = write_output_file(self.DATA, self.filename, 6)
+        write_file(self.filename, self.DATA, 1000000000)
+        write_file(self.filename + '.gz', 'stale', 1000000000)
+        recorded[self.filename + '.gz'] = hash_bytes('stale')
+
+        write_output_file(self.DATA, self.filename, 6, recorded.get, recorded_compress_level=6)
+        self.assertEqual(os.path.getmtime(self.filename), 1000000000)
+        self.assertEqual(read_file(self.filename + '.gz'), 'stale')
+
+        write_output_file(self.DATA, self.filename, 9, recorded.get, recorded_compress_level=6)
+        self.assertEqual(os.path.getmtime(self.filename), 1000000000)
+        self.assertEqual(read_file(self.filename + '.gz'), compress_bytes(self.DATA, '.gz', 9))
+
+        write_output_file(self.DATA + 'changed', self.filename, 9, recorded.get, recorded_compress_level=9)
+        self.assertEqual(read_file(self.filename), self.DATA + 'changed')
+    # end_def test_recorded_hashes()
+
+    # Outside batch mode, the files on disk are the record: an output file already containing the data
+    # is not re-written, and its compressed copies are kept if they are newer than it.
+    def test_record_on_disk(self):
+        write_file(self.filename, self.DATA, 1000000000)
+        write_file(self.filename + '.gz', 'newer', 1000000100)
+        written = write_output_file(self.DATA, self.filename, 6, record_on_disk=True)
+        self.assertEqual(os.path.getmtime(self.filename), 1000000000)
+        self.assertEqual(read_file(self.filename + '.gz'), 'newer')
+        self.assertEqual(written[self.filename + '.gz'], hash_bytes('newer'))
+
+        os.utime(self.filename + '.gz', (999999900, 999999900))
+        write_output_file(self.DATA, self.filename, 6, record_on_disk=True)
+        self.assertEqual(os.path.getmtime(self.filename), 1000000000)
+        self.assertEqual(read_file(self.filename + '.gz'), compress_bytes(self.DATA, '.gz', 6))
+
+        write_output_file(self.DATA + 'changed', self.filename, 6, record_on_disk=True)
+        self.assertEqual(read_file(self.filename), self.DATA + 'changed')
+        self.assertEqual(read_file(self.filename + '.gz'), compress_bytes(self.DATA + 'changed', '.gz', 6))
+    # end_def test_record_on_disk()
+
+    # Generating the exhibits of a workbook again leaves the unchanged output files alone.
+    def test_main_skips_unchanged_outputs(self):
+        (fullpath, expected) = self.write_workbook('wb.xlsx')
+        self.assertEqual(workscope_exhibit_tool.main(fullpath, compress_level=6), 0)
+        out_fns = get_output_filenames(fullpath)
+        for out_fn in out_fns:
+            os.utime(out_fn, (1000000000, 1000000000))
+            os.utime(out_fn + '.gz', (1000000100, 1000000100))
+        # end_for
+        self.assertEqual(workscope_exhibit_tool.main(fullpath, compress_level=6), 0)
+        for out_fn in out_fns:
+            self.assertEqual(os.path.getmtime(out_fn), 1000000000)
+            self.assertEqual(os.path.getmtime(out_fn + '.gz'), 1000000100)
+        # end_for
+    # end_def test_main_skips_unchanged_outputs()
+# end_class writeOutputFileTest
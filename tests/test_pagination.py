@@ -0,0 +1,76 @@
+# Tests of the splitting of the schedule of Exhibit 1 into pages ('workscope_exhibit_tool.py').
+
+import re
+import unittest
+
+from workscope_exhibit_tool import get_ex1_pages, render_ex1_page, render_exhibit, \
+                                   SCHED_HEADER_CELL_WITDH_IN_PX_12PX_BORDER
+from tests import read_synthetic_exhibit_data
+
+class ex1PaginationTest(unittest.TestCase):
+    # Six months, in weeks: with four months per page, the second page has two
+    @classmethod
+    def setUpClass(cls):
+        (cls.exData, expected) = read_synthetic_exhibit_data(num_tasks=2, num_units=6, sched_major_units='Month')
+    # end_def setUpClass()
+
+    def test_pages(self):
+        first = self.exData['first_schedule_col_ix']
+        pages = get_ex1_pages(self.exData, 4)
+        self.assertEqual([(page['page_num'], page['num_pages'], page['first_unit'], page['num_units']) for page in pages],
+                         [(1, 2, 1, 4), (2, 2, 5, 2)])
+        self.assertEqual([(page['first_col_ix'], page['last_col_ix']) for page in pages],
+                         [(first, first + 15), (first + 16, first + 23)])
+        self.assertEqual([page['id_suffix'] for page in pages], ['_p1', '_p2'])
+    # end_def test_pages()
+
+    # A schedule no longer than a page is not split, and is generated as it is without pages.
+    def test_single_page(self):
+        for page_units in [0, 6, 12]:
+            pages = get_ex1_pages(self.exData, page_units)
+            self.assertEqual(len(pages), 1)
+            self.assertEqual((pages[0]['num_units'], pages[0]['id_suffix']), (6, ''))
+        # end_for
+        self.assertEqual(render_exhibit(self.exData, 1, ex1_page_units=6), render_exhibit(self.exData, 1))
+    # end_def test_single_page()
+
+    # A bar crossing the boundary between pages is clipped at the edges of each page, and a
+    # milestone appears only on the page on which it falls.
+    def test_bar_crossing_pages(self):
+        first = self.exData['first_schedule_col_ix']
+        exData = dict(self.exData)
+        task = dict(exData['tasks'][0])
+        # Month 4, week 3, to month 5, week 2; and a milestone in month 5, week 3
+        task['sched_items'] = [{'type': 'bar', 'start': first + 14, 'end': first + 17, 'milestone': ''},
+                               {'type': 'milestone', 'start': first + 18, 'end': first + 18, 'milestone': 'Q'}]
+        exData['tasks'] = [task] + exData['tasks'][1:]
+        minor_cell_width = SCHED_HEADER_CELL_WITDH_IN_PX_12PX_BORDER / 4.0
+        (page_1, page_2) = [render_ex1_page(exData, page) for page in get_ex1_pages(exData, 4)]
+        task_row_1 = page_1[page_1.index('id="row1_p1"'):page_1.index('id="row2_p1"')]
+        task_row_2 = page_2[page_2.index('id="row1_p2"'):page_2.index('id="row2_p2"')]
+
+        self.assertEqual(re.findall(r'left:([^p]*)px;width:([^p]*)px', task_row_1),
+                         [(str(14 * minor_cell_width), str(2 * minor_cell_width))])
+        self.assertTrue('From Month 4, Week 3 to Month 4, Week 4, part of the period from Month 4, Week 3 to ' +
+                        'Month 5, Week 2.' in task_row_1)
+        self.assertFalse('deliverableCodeDiv' in task_row_1)
+
+        self.assertEqual(re.findall(r'left:([^p]*)px;width:([^p]*)px', task_row_2),
+                         [(str(0.0), str(2 * minor_cell_width))])
+        self.assertTrue('From Month 5, Week 1 to Month 5, Week 2, part of the period from Month 4, Week 3 to ' +
+                        'Month 5, Week 2.' in task_row_2)
+        self.assertEqual(re.findall(r'class="deliverableCodeDiv" style="left:([^p]*)px;"', task_row_2),
+                         [str(2 * minor_cell_width)])
+        self.assertTrue('Delivered by Month 5, Week 3.' in task_row_2)
+    # end_def test_bar_crossing_pages()
+
+    # Each page has a heading of its own; the list of milestones follows the last page only.
+    def test_paged_exhibit(self):
+        html = render_exhibit(self.exData, 1, ex1_page_units=4)
+        self.assertEqual(html.count('ex1PageDiv'), 2)
+        self.assertTrue('Page 1 of 2: Month 1 to Month 4' in html)
+        self.assertTrue('Page 2 of 2: Month 5 to Month 6' in html)
+        self.assertTrue(html.index('Page 2 of 2') < html.index('Deliverable 1'))
+        self.assertEqual(len(re.findall(r'Deliverable 1\s', html)), 1)
+    # end_def test_paged_exhibit()
+# end_class ex1PaginationTest
@@ -0,0 +1,66 @@
+# Tests of the portfolio index ('portfolioIndex.py').
+
+import os
+import shutil
+
+from portfolioIndex import portfolioIndex
+from tests import workbookTestCase
+
+class portfolioIndexTest(workbookTestCase):
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        self.index = portfolioIndex(os.path.join(self.tmpdir, 'index.db'))
+        self.addCleanup(self.index.close)
+    # end_def setUp()
+
+    # Return the number of distinct workbook contents whose data is in the index.
+    def count_workbooks(self):
+        (names, rows) = self.index.query('SELECT COUNT(DISTINCT content_hash) FROM sheets')
+        return rows[0][0]
+    # end_def count_workbooks()
+
+    def test_ingest(self):
+        (path_a, expected) = self.write_workbook('a.xlsx', num_tasks=3)
+        self.assertEqual(self.index.ingest(path_a), ('ingested', ''))
+        self.assertEqual(self.index.ingest(path_a), ('unchanged', ''))
+        shutil.copy(path_a, os.path.join(self.tmpdir, 'b.xlsx'))
+        self.assertEqual(self.index.ingest(os.path.join(self.tmpdir, 'b.xlsx')), ('copy', ''))
+        self.assertEqual(self.count_workbooks(), 1)
+        (names, rows) = self.index.query('SELECT COUNT(*) FROM tasks')
+        self.assertEqual(rows[0][0], 3)
+    # end_def test_ingest()
+
+    # The data for a workbook is removed when the last file with its contents changes.
+    def test_replaced_contents(self):
+        (path_a, expected) = self.write_workbook('a.xlsx', seed=1)
+        path_b = os.path.join(self.tmpdir, 'b.xlsx')
+        shutil.copy(path_a, path_b)
+        self.index.ingest(path_a)
+        self.index.ingest(path_b)
+
+        self.write_workbook('a.xlsx', seed=2)
+        self.assertEqual(self.index.ingest(path_a)[0], 'ingested')
+        self.assertEqual(self.count_workbooks(), 2)
+
+        (path_b, expected) = self.write_workbook('b.xlsx', seed=3)
+        self.assertEqual(self.index.ingest(path_b)[0], 'ingested')
+        self.assertEqual(self.count_workbooks(), 2)
+        (names, rows) = self.index.query('SELECT COUNT(*) FROM tasks WHERE content_hash NOT IN (SELECT content_hash FROM files)')
+        self.assertEqual(rows[0][0], 0)
+
+        (errors, exported) = self.index.get_workbook_data(path_b)
+        self.assertEqual(errors, '')
+        self.assertEqual(len(exported[0]['tasks']), len(expected['sched_items']))
+    # end_def test_replaced_contents()
+
+    # Files that no longer exist are removed by prune, along with their data.
+    def test_prune(self):
+        (path_a, expected) = self.write_workbook('a.xlsx', seed=1)
+        (path_b, expected) = self.write_workbook('b.xlsx', seed=2)
+        self.index.ingest(path_a)
+        self.index.ingest(path_b)
+        os.remove(path_a)
+        self.assertEqual(self.index.prune(), 1)
+        self.assertEqual(self.count_workbooks(), 1)
+    # end_def test_prune()
+# end_class portfolioIndexTest
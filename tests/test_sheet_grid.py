@@ -0,0 +1,78 @@
+# Tests of the reading of the cells of interest of a workscope worksheet (read_sheet_grid in
+# 'excelFileManager.py').
+
+import excelFileManager
+from excelFileManager import MILESTONE_CRAWL_MARGIN
+from workbookValidator import WORKSCOPE_SHEET_NAME
+from syntheticWorkbook import check_exhibit_data
+from tests import workbookTestCase, read_exhibit_data
+
+# Stand-in for an OpenPyXl worksheet, which records each call of iter_rows.
+class countingWorksheet:
+    def __init__(self, ws):
+        self.ws = ws
+        self.calls = []
+    # end_def __init__()
+
+    def iter_rows(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.ws.iter_rows(**kwargs)
+    # end_def iter_rows()
+# end_class countingWorksheet
+
+class readSheetGridTest(workbookTestCase):
+    # Record the worksheet passed to read_sheet_grid, and the sheetGrid it returns.
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        self.real_read_sheet_grid = excelFileManager.read_sheet_grid
+        self.addCleanup(setattr, excelFileManager, 'read_sheet_grid', self.real_read_sheet_grid)
+        self.reads = []
+        def read_sheet_grid(ws, xlsInfo, magic_style_ids=None):
+            ws = countingWorksheet(ws)
+            grid = self.real_read_sheet_grid(ws, xlsInfo, magic_style_ids)
+            self.reads.append((ws, grid))
+            return grid
+        # end_def read_sheet_grid()
+        excelFileManager.read_sheet_grid = read_sheet_grid
+    # end_def setUp()
+
+    # A milestones list several times longer than MILESTONE_CRAWL_MARGIN is read in full, in a
+    # single pass beyond the rectangle, which stops at the first row with an empty label: the
+    # cells further down the milestone columns are not read.
+    def test_long_milestone_list(self):
+        import openpyxl
+        (fullpath, expected) = self.write_workbook('wb.xlsx', milestone_list_length=6 * MILESTONE_CRAWL_MARGIN)
+        wb = openpyxl.load_workbook(fullpath)
+        ws = wb[WORKSCOPE_SHEET_NAME]
+        last_row = ws.max_row
+        ws.cell(row=last_row + 10, column=2, value='Z:')
+        wb.save(fullpath)
+
+        exData = read_exhibit_data(fullpath)[0]
+        self.assertEqual(check_exhibit_data(exData, expected), '')
+        self.assertEqual(len(exData['milestones']), 6 * MILESTONE_CRAWL_MARGIN)
+        (ws, grid) = self.reads[0]
+        self.assertEqual(len(ws.calls), 2)
+        self.assertEqual(ws.calls[1].get('max_row'), None)
+        self.assertEqual(grid.max_row, last_row + 1)
+        self.assertFalse((last_row + 10, 2) in grid.values)
+    # end_def test_long_milestone_list()
+
+    # A workbook whose used range has been inflated, by a cell in the last row and column of the
+    # worksheet, is read as before: none of the rows below the rectangle are read.
+    def test_inflated_used_range(self):
+        import openpyxl
+        (fullpath, expected) = self.write_workbook('wb.xlsx')
+        wb = openpyxl.load_workbook(fullpath)
+        ws = wb[WORKSCOPE_SHEET_NAME]
+        ws.cell(row=1048576, column=16384, value='stray')
+        wb.save(fullpath)
+
+        exData = read_exhibit_data(fullpath)[0]
+        self.assertEqual(check_exhibit_data(exData, expected), '')
+        (ws, grid) = self.reads[0]
+        self.assertEqual(len(ws.calls), 1)
+        self.assertTrue(grid.max_row < 1000)
+        self.assertFalse((1048576, 16384) in grid.values)
+    # end_def test_inflated_used_range()
+# end_class readSheetGridTest
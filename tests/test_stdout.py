@@ -0,0 +1,86 @@
+# Tests of writing the exhibits to stdout (the '--stdout' option of 'workscope_exhibit_tool.py').
+
+import io
+import os
+import sys
+import tarfile
+import zipfile
+
+from workscope_exhibit_tool import cli_main, get_output_filenames, get_data_filename, render_exhibit
+from tests import workbookTestCase, read_exhibit_data
+
+class stdoutTest(workbookTestCase):
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        (self.fullpath, self.expected) = self.write_workbook('wb.xlsx', num_tasks=3)
+        f = open(self.fullpath, 'rb')
+        self.data = f.read()
+        f.close()
+    # end_def setUp()
+
+    # Run cli_main with the arguments 'argv', with 'stdin_data' on stdin, and with stdout and stderr
+    # captured. Return a tuple (exit status, text written to stdout, text written to stderr).
+    def run_cli(self, argv, stdin_data=''):
+        saved = (sys.stdin, sys.stdout, sys.stderr)
+        (sys.stdin, sys.stdout, sys.stderr) = (io.BytesIO(stdin_data), io.BytesIO(), io.BytesIO())
+        try:
+            try:
+                status = cli_main(argv)
+            except SystemExit as e:
+                status = e.code
+            # end_try
+            return (status, sys.stdout.getvalue(), sys.stderr.getvalue())
+        finally:
+            (sys.stdin, sys.stdout, sys.stderr) = saved
+        # end_try
+    # end_def run_cli()
+
+    def test_tar_archive(self):
+        (status, out, err) = self.run_cli(['--stdout', self.fullpath])
+        self.assertEqual((status, err), (0, ''))
+        tf = tarfile.open(fileobj=io.BytesIO(out))
+        self.assertEqual(sorted(tf.getnames()), sorted([os.path.basename(out_fn) for out_fn in get_output_filenames(self.fullpath)]))
+        self.assertTrue('</html>' in tf.extractfile(tf.getmembers()[0]).read())
+        tf.close()
+    # end_def test_tar_archive()
+
+    # The name given with --name is used for the members of the archive.
+    def test_zip_archive_with_data(self):
+        (status, out, err) = self.run_cli(['--archive', 'zip', '--json', '--name', 'proj.xlsx', '-'], self.data)
+        self.assertEqual((status, err), (0, ''))
+        zf = zipfile.ZipFile(io.BytesIO(out))
+        self.assertEqual(sorted(zf.namelist()), sorted(list(get_output_filenames('proj.xlsx')) + [get_data_filename('proj.xlsx')]))
+        zf.close()
+    # end_def test_zip_archive_with_data()
+
+    def test_single_exhibit(self):
+        exData = read_exhibit_data(self.fullpath)[0]
+        (status, out, err) = self.run_cli(['--exhibit', '2', '-'], self.data)
+        self.assertEqual((status, err), (0, ''))
+        self.assertEqual(out, render_exhibit(exData, 2))
+    # end_def test_single_exhibit()
+
+    # Errors are reported on stderr, with exit status 1, and nothing is written to stdout.
+    def test_errors(self):
+        (status, out, err) = self.run_cli(['-'], 'not a workbook')
+        self.assertEqual((status, out), (1, ''))
+        self.assertTrue(err.startswith('HTML generation aborted.\nErrors found when reading stdin:\n'), err)
+
+        (status, out, err) = self.run_cli(['--stdout', os.path.join(self.tmpdir, 'missing.xlsx')])
+        self.assertEqual((status, out), (1, ''))
+        self.assertTrue(err.startswith('Failed to open input .xlsx file: '), err)
+    # end_def test_errors()
+
+    # The options for writing output files are refused with --stdout.
+    def test_refused_options(self):
+        for options in [['--compress', '6'], ['--processes', '2'], ['--report-memory']]:
+            (status, out, err) = self.run_cli(options + ['--stdout', self.fullpath])
+            self.assertEqual((status, out), (2, ''))
+            self.assertTrue(options[0] + ' may not be given with --stdout' in err, err)
+
+            (status, out, err) = self.run_cli(options + ['-'], self.data)
+            self.assertEqual(status, 2)
+        # end_for
+        self.assertEqual(os.listdir(self.tmpdir), ['wb.xlsx'])
+    # end_def test_refused_options()
+# end_class stdoutTest
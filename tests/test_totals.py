@@ -0,0 +1,100 @@
+# Tests of the cross-check of the totals of the cost tables (check_exhibit_totals in
+# 'excelFileManager.py'), and of how a batch run reports totals that do not add up.
+
+import copy
+import os
+
+from excelFileManager import check_exhibit_totals, get_exhibit_warnings
+from workscope_exhibit_batch import find_inputs
+from tests import workbookTestCase, read_synthetic_exhibit_data, run_batch_quietly
+
+class checkExhibitTotalsTest(workbookTestCase):
+    def setUp(self):
+        workbookTestCase.setUp(self)
+        (self.exData, expected) = read_synthetic_exhibit_data(num_tasks=3, num_units=4)
+    # end_def setUp()
+
+    def test_totals_add_up(self):
+        self.assertEqual(check_exhibit_totals(self.exData), '')
+    # end_def test_totals_add_up()
+
+    # A stale total line: the column no longer sums to it
+    def test_column_sum(self):
+        self.exData['cost_totals'][0] += 1.0
+        self.assertEqual(check_exhibit_totals(self.exData),
+                         'Total line, M-1 column: the tasks sum to %.1f, but the total line contains %.1f.\n' %
+                         (self.exData['cost_totals'][0] - 1.0, self.exData['cost_totals'][0]) +
+                         'Total line: the salary grades sum to %.1f person-weeks, but the Total column contains %.1f.\n' %
+                         (sum(self.exData['cost_totals'][:9]), self.exData['cost_totals'][9]))
+    # end_def test_column_sum()
+
+    # A task whose overhead is not its direct salary at the overhead rate (nor, then, is that of the
+    # total line), although the columns and rows add up
+    def test_overhead(self):
+        self.exData['cost_block'][1][11] += 100.0
+        self.exData['cost_block'][1][12] += 100.0
+        self.exData['cost_totals'][11] += 100.0
+        self.exData['cost_totals'][12] += 100.0
+        self.exData['direct_salary_total'] += 100.0
+        self.exData['total_cost'] += 100.0
+        warnings = check_exhibit_totals(self.exData)
+        lines = warnings.splitlines()
+        self.assertEqual(len(lines), 2, warnings)
+        self.assertTrue(lines[0].startswith('Task 2: Direct Salary at the overhead rate of 95.39% is '), warnings)
+        self.assertTrue(lines[1].startswith('Total line: Direct Salary at the overhead rate of 95.39% is '), warnings)
+    # end_def test_overhead()
+
+    # The totals outside the salary cost table
+    def test_total_cost(self):
+        self.exData['total_cost'] += 10.0
+        self.assertEqual(check_exhibit_totals(self.exData),
+                         'Direct Salary and Overhead plus Other Direct Costs is ${0:,.2f}, but TOTAL COST is ${1:,.2f}.\n'.format(
+                             self.exData['direct_salary_total'] + self.exData['odc_total'], self.exData['total_cost']))
+    # end_def test_total_cost()
+
+    # Empty cells count as 0, and cells containing text are skipped.
+    def test_empty_and_text_cells(self):
+        self.exData['cost_block'][0][0] = None
+        self.exData['cost_block'][0][1] = u'n/a'
+        warnings = check_exhibit_totals(self.exData)
+        self.assertTrue(warnings.startswith('Total line, M-1 column: the tasks sum to '), warnings)
+        self.assertFalse('P-5 column' in warnings)
+    # end_def test_empty_and_text_cells()
+
+    def test_warnings_of_several_worksheets(self):
+        other = copy.deepcopy(self.exData)
+        other['sheet_name'] = 'Phase 2'
+        other['warnings'] = 'Total line is wrong.\n'
+        self.assertEqual(get_exhibit_warnings([self.exData]), '')
+        self.assertEqual(get_exhibit_warnings([other]), 'Total line is wrong.\n')
+        self.assertEqual(get_exhibit_warnings([self.exData, other]), 'Worksheet Phase 2:\nTotal line is wrong.\n')
+    # end_def test_warnings_of_several_worksheets()
+# end_class checkExhibitTotalsTest
+
+class batchTotalsTest(workbookTestCase):
+    # Write a synthetic workbook whose TOTAL COST cell is off by $10.
+    def setUp(self):
+        import openpyxl
+        workbookTestCase.setUp(self)
+        (self.fullpath, expected) = self.write_workbook('wb.xlsx', num_tasks=2, num_units=4)
+        wb = openpyxl.load_workbook(self.fullpath)
+        dest = list(wb.defined_names['total_cost_cell'].destinations)[0]
+        wb[dest[0]][dest[1].replace('$', '')].value += 10.0
+        wb.save(self.fullpath)
+    # end_def setUp()
+
+    # The workbook is generated, with a warning...
+    def test_warning(self):
+        (results, report) = run_batch_quietly(find_inputs([self.fullpath]), 1, 1, 2)
+        self.assertEqual(results[0]['errors'], '')
+        self.assertTrue(results[0]['warnings'].startswith('Direct Salary and Overhead plus Other Direct Costs is '))
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, 'wb_Exhibit_1.html')))
+    # end_def test_warning()
+
+    # ...unless the totals must add up.
+    def test_strict_totals(self):
+        (results, report) = run_batch_quietly(find_inputs([self.fullpath]), 1, 1, 2, strict_totals=True)
+        self.assertEqual(results[0]['errors'], 'Totals that do not add up found:\n' + results[0]['warnings'])
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'wb_Exhibit_1.html')))
+    # end_def test_strict_totals()
+# end_class batchTotalsTest
@@ -0,0 +1,53 @@
+# Tests of the validation of workbooks ('workbookValidator.py').
+
+import io
+import re
+import zipfile
+
+from workbookValidator import validate_workbook
+from tests import workbookTestCase
+
+# Return a copy of the .xlsx file 'fullpath', as an io.BytesIO, with the (single) match of the
+# regular expression 'pattern' in 'xl/workbook.xml' replaced by 'replacement'.
+def rewrite_workbook_xml(fullpath, pattern, replacement):
+    src = zipfile.ZipFile(fullpath)
+    retval = io.BytesIO()
+    dest = zipfile.ZipFile(retval, 'w')
+    for info in src.infolist():
+        data = src.read(info)
+        if info.filename == 'xl/workbook.xml':
+            (data, count) = re.subn(pattern, replacement, data)
+            assert count == 1
+        # end_if
+        dest.writestr(info, data)
+    # end_for
+    dest.close()
+    src.close()
+    retval.seek(0)
+    return retval
+# end_def rewrite_workbook_xml()
+
+class validateWorkbookTest(workbookTestCase):
+    def test_valid_workbook(self):
+        (fullpath, expected) = self.write_workbook('wb.xlsx')
+        self.assertEqual(validate_workbook(fullpath), '')
+    # end_def test_valid_workbook()
+
+    def test_missing_defined_name(self):
+        (fullpath, expected) = self.write_workbook('wb.xlsx')
+        source = rewrite_workbook_xml(fullpath, r'<definedName name="milestone_label_column"[^>]*>[^<]*</definedName>', '')
+        self.assertEqual(validate_workbook(source), 'Failed to find defined name: milestone_label_column.\n')
+    # end_def test_missing_defined_name()
+
+    def test_misplaced_defined_name(self):
+        (fullpath, expected) = self.write_workbook('wb.xlsx')
+        source = rewrite_workbook_xml(fullpath, r'(<definedName name="funding_list_bottom"[^>]*>[^<]*)\$\d+<',
+                                      r'\g<1>$1<')
+        self.assertEqual(validate_workbook(source), 'Defined name funding_list_top must refer to a row above that ' +
+                                                    'referred to by defined name funding_list_bottom.\n')
+    # end_def test_misplaced_defined_name()
+
+    def test_not_a_workbook(self):
+        self.assertEqual(validate_workbook(io.BytesIO('not a workbook')), 'Failed to open and/or read input .xlsx file.\n')
+    # end_def test_not_a_workbook()
+# end_class validateWorkbookTest
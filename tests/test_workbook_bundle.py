@@ -0,0 +1,57 @@
+# Tests of reading workbooks from bundles in batch runs ('workbookBundle.py').
+
+import io
+import os
+import tarfile
+
+from workscope_exhibit_batch import find_inputs
+from workscope_exhibit_tool import get_output_filenames
+from workbookBundle import get_member_path
+from tests import workbookTestCase, run_batch_quietly
+
+class bundleTest(workbookTestCase):
+    def test_get_member_path(self):
+        self.assertEqual(get_member_path('Project_A/./scope.xlsx'), 'Project_A/scope.xlsx')
+        self.assertEqual(get_member_path('Project_A\\..\\scope.xlsx'), 'scope.xlsx')
+        for name in ['/etc/x.xlsx', '../../x.xlsx', 'a/../../x.xlsx', '..\\x.xlsx', 'C:/x.xlsx', 'C:x.xlsx']:
+            self.assertEqual(get_member_path(name), None, name)
+        # end_for
+    # end_def test_get_member_path()
+
+    # The workbooks in a tar bundle are read from it, and their exhibits written under the output
+    # folder; members whose names are absolute or lead outside the bundle are reported as failed,
+    # and nothing is written for them.
+    def test_unsafe_member_names(self):
+        (fullpath, expected) = self.write_workbook('src/wb.xlsx')
+        bundle_path = os.path.join(self.tmpdir, 'bundle.tar')
+        f = open(fullpath, 'rb')
+        data = f.read()
+        f.close()
+        tf = tarfile.open(bundle_path, 'w')
+        # N.B. TarFile.add would strip the leading '/' from an absolute name
+        for name in ['good/wb.xlsx', '../x.xlsx', 'good/../../y.xlsx', '/tmp/z.xlsx']:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+        # end_for
+        tf.close()
+        output_dir = os.path.join(self.tmpdir, 'out')
+
+        (results, report) = run_batch_quietly(find_inputs([bundle_path]), 1, 1, 2, output_dir=output_dir)
+        results = dict([(result['fullpath'], result) for result in results])
+        self.assertEqual(sorted(results.keys()), sorted([os.path.join(bundle_path, 'good', 'wb.xlsx'),
+                                                         bundle_path + '/../x.xlsx', bundle_path + '/good/../../y.xlsx',
+                                                         bundle_path + '//tmp/z.xlsx']))
+        self.assertEqual(results.pop(os.path.join(bundle_path, 'good', 'wb.xlsx'))['errors'], '')
+        for result in results.values():
+            self.assertTrue(result['errors'].startswith('Refused to read .xlsx file from bundle'))
+            self.assertEqual(result['stage'], 'load')
+        # end_for
+        for out_fn in get_output_filenames(os.path.join(output_dir, 'bundle', 'good', 'wb.xlsx')):
+            self.assertTrue(os.path.exists(out_fn))
+        # end_for
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['bundle.tar', 'out', 'src'])
+        self.assertEqual(os.listdir(output_dir), ['bundle'])
+        self.assertEqual(os.listdir(os.path.join(output_dir, 'bundle')), ['good'])
+    # end_def test_unsafe_member_names()
+# end_class bundleTest
@@ -0,0 +1,76 @@
+# Tests of the hash of the content of a workbook (hash_workbook in 'batchManifest.py').
+
+import os
+import zipfile
+
+from batchManifest import hash_workbook
+from workbookValidator import WORKSCOPE_SHEET_NAME
+from tests import workbookTestCase
+
+# Copy the .xlsx file 'src' to 'dest', a member at a time, in the order of the names of the
+# members, reversed; with the contents of each member whose name is a key of 'replacements'
+# replaced by the value, and compressed with 'compress_type'.
+def rewrite_xlsx(src, dest, replacements={}, compress_type=zipfile.ZIP_DEFLATED):
+    zin = zipfile.ZipFile(src)
+    zout = zipfile.ZipFile(dest, 'w', compress_type)
+    for info in sorted(zin.infolist(), key=lambda info: info.filename, reverse=True):
+        zout.writestr(info.filename, replacements.get(info.filename, zin.read(info)))
+    # end_for
+    zout.close()
+    zin.close()
+# end_def rewrite_xlsx()
+
+class hashWorkbookTest(workbookTestCase):
+    # Write a synthetic workbook with another worksheet, not containing workscope exhibits.
+    def setUp(self):
+        import openpyxl
+        workbookTestCase.setUp(self)
+        (self.fullpath, expected) = self.write_workbook('wb.xlsx')
+        wb = openpyxl.load_workbook(self.fullpath)
+        wb.create_sheet('Notes')['A1'] = 1
+        wb.save(self.fullpath)
+        self.hash = hash_workbook(self.fullpath)
+    # end_def setUp()
+
+    # Set the value of the cell 'cell' in the worksheet 'sheet_name' to 'value'.
+    def set_cell(self, sheet_name, cell, value):
+        import openpyxl
+        wb = openpyxl.load_workbook(self.fullpath)
+        wb[sheet_name][cell] = value
+        wb.save(self.fullpath)
+    # end_def set_cell()
+
+    # Neither the document properties (e.g., the time of the last save), nor the order or the
+    # compression of the parts of the .xlsx file, affect the hash.
+    def test_resaved(self):
+        copy_path = os.path.join(self.tmpdir, 'copy.xlsx')
+        rewrite_xlsx(self.fullpath, copy_path, {'docProps/core.xml': '<coreProperties/>'}, zipfile.ZIP_STORED)
+        zf = zipfile.ZipFile(copy_path)
+        self.assertEqual(zf.infolist()[-1].filename, '[Content_Types].xml')
+        zf.close()
+        self.assertEqual(hash_workbook(copy_path), self.hash)
+        f = open(copy_path, 'rb')
+        self.assertEqual(hash_workbook('unused.xlsx', f.read()), self.hash)
+        f.close()
+    # end_def test_resaved()
+
+    # Only the worksheets containing workscope exhibits are hashed.
+    def test_changed_worksheets(self):
+        self.set_cell('Notes', 'A1', 2)
+        self.assertEqual(hash_workbook(self.fullpath), self.hash)
+        self.set_cell(WORKSCOPE_SHEET_NAME, 'A1', 2)
+        self.assertNotEqual(hash_workbook(self.fullpath), self.hash)
+    # end_def test_changed_worksheets()
+
+    # If the worksheets containing workscope exhibits cannot be found, all the worksheets are hashed.
+    def test_no_relationships(self):
+        copy_path = os.path.join(self.tmpdir, 'copy.xlsx')
+        rewrite_xlsx(self.fullpath, copy_path, {'xl/_rels/workbook.xml.rels': '<Relationships/>'})
+        zf = zipfile.ZipFile(copy_path)
+        sheet2 = zf.read('xl/worksheets/sheet2.xml')
+        zf.close()
+        other_path = os.path.join(self.tmpdir, 'other.xlsx')
+        rewrite_xlsx(copy_path, other_path, {'xl/worksheets/sheet2.xml': sheet2 + ' '})
+        self.assertNotEqual(hash_workbook(other_path), hash_workbook(copy_path))
+    # end_def test_no_relationships()
+# end_class hashWorkbookTest
@@ -0,0 +1,171 @@
+# Reading workbooks from, and writing output files to, bundles (archives) of files
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies only upon the Python standard library.
+#
+# Revisions of workscopes are frequently sent as 'bundles': .zip or .tar archives (the latter
+# optionally gzip-compressed: .tar.gz or .tgz) containing many .xlsx files. Rather than the
+# bundle being extracted to disk, and each .xlsx file then being read back from disk,
+# iter_bundle_workbooks reads each .xlsx file in a bundle into memory in turn, in a single pass
+# through the bundle; the workbook can then be loaded from memory (see open_workbook in
+# 'excelFileManager.py'). Nothing is written to disk, and a .tar bundle is read as a stream,
+# without seeking. Likewise, bundleWriter writes output files into an archive, rather than
+# to disk (see write_output_file in 'workscope_exhibit_tool.py').
+#
+# Bundles are recognized by the suffix of their name (see BUNDLE_SUFFIXES). Within a bundle,
+# .xlsx files are named by their path in the bundle, with '/' separating folders, e.g.,
+# 'Project_A/scope_rev3.xlsx'. Excel's lock files ('~$...'), and the metadata added to .zip
+# archives by macOS ('__MACOSX/...'), are skipped.
+# N.B. The names of the files in a bundle are used to name the output files generated from them,
+#      so a name that is absolute, has a drive prefix, or climbs out of the bundle ('..') must not
+#      be used as is: see get_member_path.
+#
+# Internals of this Module
+# ========================
+#
+# is_bundle - returns True if a path names a bundle
+#
+# get_bundle_suffix - returns the suffix of the name of a bundle
+#
+# get_bundle_stem - returns the name of a bundle without its suffix
+#
+# is_workbook_member - returns True if a file in a bundle is an .xlsx file to be read
+#
+# get_member_path - returns the normalized path of a file in a bundle, or None if it is unsafe
+#
+# iter_bundle_workbooks - generates the name and contents of each .xlsx file in a bundle
+#
+# bundleWriter - class for writing files to an archive; thread-safe
+#
+###############################################################################
+
+import io
+import os
+import time
+import posixpath
+import tarfile
+import zipfile
+import threading
+
+# Suffixes of the names of bundles; the longest suffix matching a name is the one used.
+BUNDLE_SUFFIXES = ['.tar.gz', '.tgz', '.tar', '.zip']
+
+# Return the suffix in BUNDLE_SUFFIXES of 'path', or None if it has none.
+def get_bundle_suffix(path):
+    for suffix in BUNDLE_SUFFIXES:
+        if path.lower().endswith(suffix):
+            return suffix
+        # end_if
+    # end_for
+    return None
+# end_def get_bundle_suffix()
+
+# Return True if 'path' names a bundle of .xlsx files (by its suffix).
+def is_bundle(path):
+    return get_bundle_suffix(path) != None
+# end_def is_bundle()
+
+# Return 'path' (the name of a bundle) without its suffix, e.g., 'submissions/rev3' for 'submissions/rev3.tar.gz'.
+def get_bundle_stem(path):
+    return path[:len(path) - len(get_bundle_suffix(path))]
+# end_def get_bundle_stem()
+
+# Return True if 'name' (the name of a member of a bundle) is that of an .xlsx file to be read.
+def is_workbook_member(name):
+    basename = name.split('/')[-1]
+    return basename.lower().endswith('.xlsx') and not basename.startswith('~$') and \
+           not name.startswith('__MACOSX/')
+# end_def is_workbook_member()
+
+# Return 'name' (the name of a member of a bundle) normalized to a relative path, with '/' separating
+# folders (e.g., 'Project_A/scope.xlsx' for './Project_A//scope.xlsx'), or None if it is not safe to
+# use in naming an output file: if it is absolute, has a drive prefix (e.g., 'C:'), or climbs out
+# of the bundle ('..').
+def get_member_path(name):
+    path = posixpath.normpath(name.replace('\\', '/'))
+    if path.startswith('/') or path == '..' or path.startswith('../') or path == '.' or \
+       ':' in path.split('/')[0]:
+        return None
+    # end_if
+    return path
+# end_def get_member_path()
+
+# Generate a pair (name, data) for each .xlsx file in the bundle 'path', in the order in which they
+# appear in it: 'name' is the path of the .xlsx file in the bundle, and 'data' its contents, as a
+# string of bytes. Raises an exception (e.g., IOError, zipfile.BadZipfile, or tarfile.TarError) if
+# the bundle cannot be read; the .xlsx files already generated are unaffected.
+def iter_bundle_workbooks(path):
+    if get_bundle_suffix(path) == '.zip':
+        zf = zipfile.ZipFile(path)
+        try:
+            for info in zf.infolist():
+                name = info.filename
+                if isinstance(name, unicode):
+                    name = name.encode('UTF-8')
+                # end_if
+                if is_workbook_member(name):
+                    yield (name, zf.read(info))
+                # end_if
+            # end_for
+        finally:
+            zf.close()
+        # end_try
+    else:
+        # N.B. The 'r|*' mode reads the archive as a stream, in one pass, decompressing it if need be.
+        tf = tarfile.open(path, 'r|*')
+        try:
+            for info in tf:
+                if info.isfile() and is_workbook_member(info.name):
+                    yield (info.name, tf.extractfile(info).read())
+                # end_if
+            # end_for
+        finally:
+            tf.close()
+        # end_try
+    # end_if
+# end_def iter_bundle_workbooks()
+
+# Writes files into a .zip or .tar (optionally gzip-compressed) archive, 'path', chosen by its suffix
+# (see BUNDLE_SUFFIXES), from any number of threads.
+class bundleWriter:
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.zf = None
+        self.tf = None
+        suffix = get_bundle_suffix(path)
+        if suffix == '.zip':
+            self.zf = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+        else:
+            self.tf = tarfile.open(path, 'w:gz' if suffix in ['.tar.gz', '.tgz'] else 'w')
+        # end_if
+    # end_def __init__()
+
+    # Write the string of bytes 'data' into the archive, as the file 'name'
+    # (a relative path; any os.sep in it is written as '/').
+    def write(self, name, data):
+        name = name.replace(os.sep, '/')
+        self.lock.acquire()
+        try:
+            if self.zf != None:
+                self.zf.writestr(name, data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = time.time()
+                info.mode = 0644
+                self.tf.addfile(info, io.BytesIO(data))
+            # end_if
+        finally:
+            self.lock.release()
+        # end_try
+    # end_def write()
+
+    def close(self):
+        if self.zf != None:
+            self.zf.close()
+        else:
+            self.tf.close()
+        # end_if
+    # end_def close()
+# end_class bundleWriter
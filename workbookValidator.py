@@ -0,0 +1,309 @@
+# Fast validation of workscope exhibit template .xlsx files
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies only upon the Python standard library. In particular, it does
+#      NOT use OpenPyXl: it reads the small part of the .xlsx file it needs directly.
+#
+# An .xlsx file is a zip archive of XML documents. The list of worksheets in a workbook
+# and the 'defined names' in it are both found in a single small document in the archive,
+# 'xl/workbook.xml'. Checking that a workbook satisfies the requirements on the
+# worksheet name and defined names documented in 'excelFileManager.py' therefore requires
+# reading only that document, rather than loading the whole workbook. This takes
+# milliseconds per file, so a whole share full of workbooks can be checked before
+# committing to an expensive batch run.
+#
+# The checks performed are:
+#   1. The file is an .xlsx file (i.e., a zip archive containing 'xl/workbook.xml')
+#   2. The workbook contains at least one worksheet containing workscope exhibits:
+#      see find_workscope_sheets
+#   3. For each such worksheet, each of the defined names listed in REQUIRED_DEFINED_NAMES
+#      is present, and refers to a single cell in that worksheet
+#   4. The cells referred to by the defined names are sensibly placed relative to each
+#      other: see COORDINATE_CHECKS
+# The values of cells are NOT checked.
+#
+# A workbook may contain the exhibits for several workscopes (e.g., the sub-studies of a
+# program), each in its own worksheet. Each such worksheet has its own copy of the defined
+# names, 'scoped' to that worksheet. A defined name scoped to a worksheet takes precedence
+# over a workbook-scoped name of the same name, as in Excel itself.
+#
+# Internals of this Module
+# ========================
+#
+# validate_workbook - validates an .xlsx file; returns a string containing the
+#                     text of error message(s) for any error(s) found, or '' if none
+#
+# validate_sheet_names - validates the defined names for one workscope worksheet
+#
+# find_workscope_sheets - returns the names of the worksheets containing workscope exhibits
+#
+# get_sheet_defined_names - returns the defined names in effect for a given worksheet
+#
+# read_workbook_xml - returns the list of worksheet names and the defined names in
+#                     an .xlsx file
+#
+# read_sheet_parts - returns the name of the part of an .xlsx file containing each worksheet
+#
+# parse_cell_reference - parses the value of a defined name that refers to a single cell
+#
+# main - validates the .xlsx files named on the command line, and reports the results
+#
+###############################################################################
+
+import sys
+import re
+import posixpath
+import time
+import zipfile
+import xml.etree.cElementTree as ET
+
+# Name of the worksheet containing the workscope exhibits
+WORKSCOPE_SHEET_NAME = 'workscope_exhibits'
+
+# The defined names which MUST be present in the workbook: see 'excelFileManager.py'.
+REQUIRED_DEFINED_NAMES = ['direct_salary_cell', 'direct_salary_column', 'first_schedule_column',
+                          'funding_list_bottom', 'funding_list_top', 'last_schedule_column',
+                          'm1_column', 'milestone_label_column', 'milestone_name_column',
+                          'milestones_list_first_row', 'odc_cell', 'odc_consultants_line',
+                          'odc_dp_equipment_line', 'odc_office_equipment_line', 'odc_other_line',
+                          'odc_printing_line', 'odc_travel_line', 'overhead_cell', 'overhead_column',
+                          'p1_column', 'p2_column', 'p3_column', 'p4_column', 'p5_column',
+                          'project_name_cell', 'sched_major_units_cell', 'sp1_column', 'sp3_column',
+                          'task_list_bottom', 'task_list_top', 'task_name_column', 'task_number_column',
+                          'temp_column', 'total_column', 'total_cost_cell', 'total_cost_column', 'total_line']
+
+# Checks on the relative placement of the cells referred to by pairs of defined names.
+# Each entry is: (first name, second name, 'row' or 'col'); the row (or column) index of
+# the cell referred to by the first name must be less than that of the second.
+COORDINATE_CHECKS = [('task_list_top', 'task_list_bottom', 'row'),
+                     ('funding_list_top', 'funding_list_bottom', 'row'),
+                     ('first_schedule_column', 'last_schedule_column', 'col')]
+
+# Matches the value of a defined name referring to a single cell, e.g., workscope_exhibits!$B$2
+# or 'workscope exhibits'!$B$2
+CELL_REFERENCE_RE = re.compile(r"^(?:'((?:[^']|'')+)'|([^'!]+))!\$?([A-Za-z]{1,3})\$?([0-9]+)$")
+
+# Return the local part of an XML tag, i.e., without its namespace.
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+# end_def local_name()
+
+# Parse the value of a defined name referring to a single cell.
+# Return a tuple (sheet_name, row_ix, col_ix), or None if the value is not of this form.
+def parse_cell_reference(value):
+    m = CELL_REFERENCE_RE.match(value.strip())
+    if m == None:
+        return None
+    # end_if
+    if m.group(1) != None:
+        sheet_name = m.group(1).replace("''", "'")
+    else:
+        sheet_name = m.group(2)
+    # end_if
+    col_ix = 0
+    for c in m.group(3).upper():
+        col_ix = col_ix * 26 + (ord(c) - ord('A') + 1)
+    # end_for
+    return (sheet_name, int(m.group(4)), col_ix)
+# end_def parse_cell_reference()
+
+# Read 'xl/workbook.xml' in the .xlsx file 'source' (a filename, a file-like object, or a
+# zipfile.ZipFile already open on it, which is left open).
+# Return a tuple (sheet_names, defined_names) where:
+#   sheet_names - list of the names of the worksheets, in order
+#   defined_names - list of tuples (name, local_sheet_ix, value), one per defined name;
+#                   local_sheet_ix is the (0-based) index in sheet_names of the worksheet
+#                   to which the name is local, or None for a workbook-scoped name
+# Raises zipfile.BadZipfile, KeyError, or SyntaxError (from the XML parser) if the file is
+# not a well-formed .xlsx file.
+def read_workbook_xml(source):
+    if isinstance(source, zipfile.ZipFile):
+        root = ET.fromstring(source.read('xl/workbook.xml'))
+    else:
+        zf = zipfile.ZipFile(source)
+        try:
+            root = ET.fromstring(zf.read('xl/workbook.xml'))
+        finally:
+            zf.close()
+        # end_try
+    # end_if
+    sheet_names = []
+    defined_names = []
+    for elem in root.iter():
+        tag = local_name(elem.tag)
+        if tag == 'sheet':
+            sheet_names.append(elem.get('name'))
+        elif tag == 'definedName':
+            local_sheet_ix = elem.get('localSheetId')
+            if local_sheet_ix != None:
+                local_sheet_ix = int(local_sheet_ix)
+            # end_if
+            defined_names.append((elem.get('name'), local_sheet_ix, elem.text or ''))
+        # end_if
+    # end_for
+    return (sheet_names, defined_names)
+# end_def read_workbook_xml()
+
+# Return a dictionary: name of each worksheet -> name of the part (i.e., the member of the zip
+# archive) containing it, for the .xlsx file open as the zipfile.ZipFile 'zf'. Each worksheet is
+# listed in 'xl/workbook.xml' with the id of a relationship, which 'xl/_rels/workbook.xml.rels'
+# maps to the part; the target of a relationship is relative to 'xl/', unless it is absolute.
+# Raises KeyError or SyntaxError (from the XML parser) if the file is not a well-formed .xlsx file.
+def read_sheet_parts(zf):
+    targets = {}
+    for elem in ET.fromstring(zf.read('xl/_rels/workbook.xml.rels')).iter():
+        if local_name(elem.tag) == 'Relationship':
+            target = elem.get('Target', '')
+            if target.startswith('/'):
+                targets[elem.get('Id')] = target[1:]
+            else:
+                targets[elem.get('Id')] = posixpath.normpath('xl/' + target)
+            # end_if
+        # end_if
+    # end_for
+    retval = {}
+    for elem in ET.fromstring(zf.read('xl/workbook.xml')).iter():
+        if local_name(elem.tag) == 'sheet':
+            # N.B. The id is the 'r:id' attribute, in the namespace of relationships
+            rel_ids = [value for (attr, value) in elem.items() if local_name(attr) == 'id']
+            if len(rel_ids) != 1:
+                raise KeyError(elem.get('name'))
+            # end_if
+            retval[elem.get('name')] = targets[rel_ids[0]]
+        # end_if
+    # end_for
+    return retval
+# end_def read_sheet_parts()
+
+# Return the list of the names of the worksheets in a workbook that contain workscope exhibits,
+# in the order in which they appear in the workbook; 'sheet_names' and 'defined_names' are as
+# returned by read_workbook_xml. A worksheet contains workscope exhibits if any of the defined
+# names in REQUIRED_DEFINED_NAMES is scoped to it, or if it is named WORKSCOPE_SHEET_NAME (in
+# which case it may rely on workbook-scoped names, as templates have always done).
+def find_workscope_sheets(sheet_names, defined_names):
+    scoped_sheet_ixs = set()
+    for (name, local_sheet_ix, value) in defined_names:
+        if local_sheet_ix != None and name in REQUIRED_DEFINED_NAMES:
+            scoped_sheet_ixs.add(local_sheet_ix)
+        # end_if
+    # end_for
+    retval = []
+    for (sheet_ix, sheet_name) in enumerate(sheet_names):
+        if sheet_ix in scoped_sheet_ixs or sheet_name == WORKSCOPE_SHEET_NAME:
+            retval.append(sheet_name)
+        # end_if
+    # end_for
+    return retval
+# end_def find_workscope_sheets()
+
+# Return a dictionary: name -> value of the defined names in effect in the worksheet with
+# (0-based) index 'sheet_ix', i.e., those scoped to it and those scoped to the workbook, the
+# former taking precedence; 'defined_names' is as returned by read_workbook_xml.
+# If 'sheet_ix' is None, only the workbook-scoped names are returned.
+def get_sheet_defined_names(defined_names, sheet_ix):
+    retval = {}
+    for (name, local_sheet_ix, value) in defined_names:
+        if local_sheet_ix == None and name not in retval:
+            retval[name] = value
+        elif local_sheet_ix != None and local_sheet_ix == sheet_ix:
+            retval[name] = value
+        # end_if
+    # end_for
+    return retval
+# end_def get_sheet_defined_names()
+
+# Validate the defined names in effect for the worksheet 'sheet_name', given as a dictionary
+# 'values': name -> value (see get_sheet_defined_names).
+# Return a string with text of error message(s) for any error(s) found, or '' if none.
+def validate_sheet_names(values, sheet_name):
+    errors = ''
+    cells = {}
+    for (name, value) in values.items():
+        cells[name] = parse_cell_reference(value)
+    # end_for
+    for name in REQUIRED_DEFINED_NAMES:
+        if name not in cells:
+            errors += 'Failed to find defined name: ' + name + '.\n'
+        elif cells[name] == None:
+            errors += 'Defined name ' + name + ' does not refer to a single cell.\n'
+        elif cells[name][0] != sheet_name:
+            errors += 'Defined name ' + name + ' does not refer to a cell in the ' + sheet_name + ' worksheet.\n'
+        # end_if
+    # end_for
+
+    for (name1, name2, axis) in COORDINATE_CHECKS:
+        cell1 = cells.get(name1)
+        cell2 = cells.get(name2)
+        if cell1 == None or cell2 == None:
+            # Already reported
+            continue
+        # end_if
+        ix = 1 if axis == 'row' else 2
+        if not cell1[ix] < cell2[ix]:
+            errors += 'Defined name ' + name1 + ' must refer to a ' + ('row above' if axis == 'row' else 'column to the left of') + \
+                      ' that referred to by defined name ' + name2 + '.\n'
+        # end_if
+    # end_for
+    return errors
+# end_def validate_sheet_names()
+
+# Validate the .xlsx file 'source' (a filename or a file-like object).
+# Return a string with text of error message(s) for any error(s) found;
+# if the string returned is '', no errors were found.
+def validate_workbook(source):
+    errors = ''
+    try:
+        (sheet_names, defined_names) = read_workbook_xml(source)
+    except:
+        return 'Failed to open and/or read input .xlsx file.\n'
+    # end_try
+    sheets = find_workscope_sheets(sheet_names, defined_names)
+    if len(sheets) == 0:
+        errors += 'Failed to find ' + WORKSCOPE_SHEET_NAME + ' worksheet.\n'
+        # Check the workbook-scoped names nonetheless
+        errors += validate_sheet_names(get_sheet_defined_names(defined_names, None), WORKSCOPE_SHEET_NAME)
+    # end_if
+    for sheet_name in sheets:
+        sheet_errors = validate_sheet_names(get_sheet_defined_names(defined_names, sheet_names.index(sheet_name)), sheet_name)
+        if sheet_errors != '' and len(sheets) > 1:
+            sheet_errors = 'Worksheet ' + sheet_name + ':\n' + sheet_errors
+        # end_if
+        errors += sheet_errors
+    # end_for
+    return errors
+# end_def validate_workbook()
+
+# Validate each of the .xlsx files in the list 'fullpaths', and print the results. Instead of the path
+# of an .xlsx file, an item may be a pair (fullpath, source), where 'source' is a file-like object from
+# which it is read (e.g., for an .xlsx file in a bundle: see 'workbookBundle.py'), or a triple
+# (fullpath, None, errors), for a file that could not be read, with the text of the error message(s);
+# and 'fullpaths' may be any iterable.
+# Return the number of files in which errors were found.
+def main(fullpaths):
+    num_failed = 0
+    num_validated = 0
+    start = time.time()
+    for item in fullpaths:
+        if isinstance(item, tuple) and len(item) == 3:
+            (fullpath, source, errors) = item
+        else:
+            (fullpath, source) = item if isinstance(item, tuple) else (item, item)
+            errors = validate_workbook(source)
+        # end_if
+        num_validated += 1
+        if errors == '':
+            print 'OK: ' + fullpath
+        else:
+            num_failed += 1
+            print 'Errors found when validating ' + fullpath + ':'
+            print errors
+        # end_if
+    # end_for
+    elapsed = time.time() - start
+    print str(num_validated) + ' workbook(s) validated in ' + ('%.3f' % elapsed) + ' s; ' + str(num_failed) + ' failed.'
+    return num_failed
+# end_def main()
+
+if __name__ == "__main__":
+    sys.exit(1 if main(sys.argv[1:]) > 0 else 0)
@@ -0,0 +1,956 @@
+# Python module to generate workscope exhibits for a batch of .xlsx workbooks
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies upon the 'workscope_exhibit_tool.py' and 'excelFileManager.py'
+#      modules, and thus upon the OpenPyXl and Beautiful Soup (version 4) libraries.
+#
+# Generating the exhibits for a workbook consists of three stages, the first of which is optional:
+#   1. 'prefetch' - reading the input .xlsx file into memory, in one sequential read, ahead of
+#                   the 'parse' stage (see read_workbook_bytes in 'excelFileManager.py'). This
+#                   stage is I/O-bound, and runs in a pool of worker THREADS in the driver.
+#                   On a network share, loading a workbook directly from the .xlsx file takes
+#                   many small reads, each a round trip to the server; with this stage, the next
+#                   workbooks are read (in bulk) while the current ones are being parsed, and the
+#                   'parse' stage loads each from the copy in memory. Without it ('--prefetch 0'),
+#                   each 'parse' worker reads the .xlsx file itself (in one read, likewise).
+#   2. 'parse' - reading the input .xlsx file with OpenPyXl, and extracting the data
+#                for the exhibits from each of its worksheets containing workscope
+#                exhibits (initExcelWorkbook and extract_exhibit_data).
+#                This stage is CPU-bound, and runs in a pool of worker PROCESSES.
+#                Its output, an 'exData' per worksheet, contains only plain Python data, and so
+#                can be passed (pickled) from a worker process back to the driver.
+#                Each worker process is supervised by a thread in the driver, which
+#                kills it if it takes too long over a workbook; and each worker process
+#                may be given a memory limit. Some workbooks (e.g., those with inflated
+#                'used ranges' or corrupt styles) can take minutes and gigabytes to load;
+#                these limits keep one such workbook from stalling the whole batch.
+#                The workbook is recorded as failed, along with the stage it was in.
+#   3. 'render' - generating the HTML for both exhibits from each 'exData', and writing
+#                 it to disk. This stage is lighter, and partly I/O-bound; it runs in
+#                 a pool of worker THREADS in the driver process.
+# The stages are fed by bounded queues; so if rendering falls behind, parsing is
+# throttled (back-pressure), and memory use does not grow with the size of the batch.
+# N.B. At most ('--queue-size' + '--prefetch') workbooks read into memory by the 'prefetch'
+#      stage are held waiting for the 'parse' stage.
+#
+# Optionally, the outcome of processing each workbook is recorded in a 'manifest' file
+# (see 'batchManifest.py'). When a run is re-started with the same manifest, workbooks that
+# were processed successfully (with the same options) and have not changed since are skipped,
+# and only those that failed (or were not reached) are processed. Likewise, an output file is not re-written
+# if its contents would be the same as those recorded for it in the manifest.
+#
+# Optionally ('--compress'), gzip (and brotli) compressed copies of the output files are
+# written beside them, for serving from a static web site; an unchanged output file is
+# not re-compressed.
+#
+# Optionally, the data shown in the exhibits is also exported as JSON, by the 'render' stage
+# from the same 'exData' (so the workbook is read only once): to a file beside the HTML for
+# each worksheet (see gen_exhibit_data in 'workscope_exhibit_tool.py'), and/or as one line per
+# worksheet of a single 'JSON lines' file for the whole batch run. N.B. Workbooks skipped
+# because they are up to date in the manifest are not exported to the JSON lines file.
+#
+# Periodically, and at the end of the run, the driver reports the depth of the queue
+# feeding each stage and the throughput of each stage. These are the figures to watch
+# when sizing the pools on a particular machine: a 'render' queue that is usually
+# empty indicates that more 'parse' workers are needed, and vice versa; likewise, a
+# 'parse' queue that is usually empty, while the 'prefetch' workers are busy, indicates
+# that more 'prefetch' workers are needed (e.g., on a slow network share).
+#
+# Usage:
+#   <Python_installation_folder>/python.exe workscope_exhibit_batch.py [options] path [path ...]
+# where each 'path' is either an .xlsx file, a folder, all of whose .xlsx files
+# (including those in sub-folders) are processed, or a 'bundle': a .zip, .tar, or .tar.gz
+# archive, all of whose .xlsx files are processed. Run with '--help' for the options.
+#
+# The .xlsx files in a bundle are read into memory from the bundle, in one pass through it, by
+# the driver (see 'workbookBundle.py'), and passed straight to the 'parse' stage; the bundle is
+# never extracted to disk. Such a workbook is named by the path of the bundle joined with its
+# path in the bundle, e.g., 'rev3.zip/Project_A/scope.xlsx'.
+# By default, the output files for a workbook are written beside it; this cannot be done for
+# a workbook in a bundle. With the '--output-dir' option, they are instead written under the
+# folder given, in sub-folders mirroring those in which the workbooks were found: e.g., the
+# output files for 'rev3.zip/Project_A/scope.xlsx' are written in 'Project_A' in 'rev3' in it.
+# With the '--output-archive' option, they are written (with the same relative paths) into a
+# single .zip, .tar, or .tar.gz archive, again without being written to disk first.
+# With the '--validate' option, the .xlsx files are only checked for the presence of the
+# required worksheet and defined names (see 'workbookValidator.py'); no HTML is generated.
+# Workbooks whose totals do not add up (see check_exhibit_totals in 'excelFileManager.py')
+# are reported with warnings in the summary at the end of the run; with the '--strict-totals'
+# option, they fail instead.
+#
+# Internals of this Module: Top-level Functions
+# =============================================
+#
+# run_batch - driver routine for generating the exhibits for a list of .xlsx files
+#
+# prefetch_workbook - the 'prefetch' stage for one .xlsx file; runs in a worker thread
+#
+# extract_workbook - the 'parse' stage for one .xlsx file; runs in a worker process
+#
+# parse_worker_main - body of a 'parse' worker process
+#
+# render_workbook - the 'render' stage for one .xlsx file; runs in a worker thread
+#
+# Internals of this Module: Utility Functions and Classes
+# =======================================================
+#
+# find_xlsx_files - expands a list of files and folders into a list of .xlsx files
+#
+# find_inputs - expands a list of files, bundles, and folders into a list of .xlsx files and bundles
+#
+# iter_workbooks - generates the workbooks to be processed, reading those in bundles into memory
+#
+# get_failed_result - returns a dictionary like that returned by extract_workbook, for a failure
+#
+# pipelineStats - collects queue depths and per-stage timings; thread-safe
+#
+# supervisedWorker - runs a 'parse' worker process, enforcing a time limit per workbook
+#
+# jsonLinesWriter - writes lines to a 'JSON lines' file; thread-safe
+#
+###############################################################################
+
+import io
+import os
+import sys
+import time
+import threading
+import traceback
+import argparse
+import multiprocessing
+import Queue
+try:
+    import resource
+except ImportError:
+    # Not available under Windows
+    resource = None
+from excelFileManager import workbookSession, get_exhibit_warnings, read_workbook_bytes
+from workscope_exhibit_tool import render_exhibit, write_output_file, get_output_filenames, \
+                                   gen_exhibit_data, format_json, get_data_filename
+from batchManifest import batchManifest, hash_workbook
+from workbookBundle import is_bundle, get_bundle_stem, get_member_path, iter_bundle_workbooks, bundleWriter
+import workbookValidator
+
+# The stages of the pipeline, in order
+STAGES = ['prefetch', 'parse', 'render']
+
+# Collects the depth of the queue feeding each stage, and the number of workbooks
+# processed by and the time spent in each stage. Methods may be called from any thread.
+class pipelineStats:
+    def __init__(self, num_workers):
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        # num_workers - dictionary: stage name -> number of workers in stage;
+        #               stages with no workers (i.e., 'prefetch', if disabled) are not reported
+        self.num_workers = num_workers
+        self.stages = {}
+        for stage in STAGES:
+            if num_workers.get(stage, 0) == 0:
+                continue
+            # end_if
+            temp = {}
+            temp['queued'] = 0
+            temp['max_queued'] = 0
+            temp['done'] = 0
+            temp['failed'] = 0
+            temp['busy_secs'] = 0.0
+            self.stages[stage] = temp
+        # end_for
+        # Number of workbooks skipped because they were up to date
+        self.num_skipped = 0
+    # end_def __init__()
+
+    # Record that a workbook has been skipped because it was up to date.
+    def skipped(self):
+        self.lock.acquire()
+        self.num_skipped += 1
+        self.lock.release()
+    # end_def skipped()
+
+    # Record that a workbook has been queued for a stage.
+    def queued(self, stage):
+        self.lock.acquire()
+        temp = self.stages[stage]
+        temp['queued'] += 1
+        temp['max_queued'] = max(temp['max_queued'], temp['queued'])
+        self.lock.release()
+    # end_def queued()
+
+    # Record that a stage has finished with a workbook, and how long it took.
+    def done(self, stage, secs, failed):
+        self.lock.acquire()
+        temp = self.stages[stage]
+        temp['queued'] -= 1
+        temp['done'] += 1
+        temp['busy_secs'] += secs
+        if failed:
+            temp['failed'] += 1
+        # end_if
+        self.lock.release()
+    # end_def done()
+
+    # Return a (multi-line) string reporting the current queue depths and the throughput of each stage.
+    # 'utilization' is the fraction of the elapsed time the workers in a stage have been busy.
+    def report(self):
+        self.lock.acquire()
+        elapsed = max(time.time() - self.start_time, 0.001)
+        lines = ['Elapsed: %.1f s; skipped (up to date): %d' % (elapsed, self.num_skipped)]
+        for stage in STAGES:
+            if stage not in self.stages:
+                continue
+            # end_if
+            temp = self.stages[stage]
+            utilization = temp['busy_secs'] / (elapsed * self.num_workers[stage])
+            s = '  %-8s queue depth: %d (max %d); done: %d (%d failed); ' % \
+                (stage, temp['queued'], temp['max_queued'], temp['done'], temp['failed'])
+            s += '%.2f files/s; utilization of %d workers: %.0f%%' % \
+                 (temp['done'] / elapsed, self.num_workers[stage], utilization * 100.0)
+            lines.append(s)
+        # end_for
+        self.lock.release()
+        return '\n'.join(lines)
+    # end_def report()
+# end_class pipelineStats
+
+# Expand a list of .xlsx files and folders into a list of .xlsx files.
+# Folders are searched recursively. Excel's lock files ('~$...') are skipped.
+def find_xlsx_files(paths):
+    retval = []
+    for path in paths:
+        if os.path.isdir(path):
+            for (dirpath, dirnames, filenames) in os.walk(path):
+                dirnames.sort()
+                for fn in sorted(filenames):
+                    if fn.lower().endswith('.xlsx') and not fn.startswith('~$'):
+                        retval.append(os.path.join(dirpath, fn))
+                    # end_if
+                # end_for
+            # end_for
+        else:
+            retval.append(path)
+        # end_if
+    # end_for
+    return retval
+# end_def find_xlsx_files()
+
+# Expand a list of .xlsx files, bundles (see 'workbookBundle.py'), and folders into a list of pairs
+# (path, relpath), one per .xlsx file or bundle: 'relpath' is its path relative to the folder in which
+# it was found (see find_xlsx_files), or its name, if it was given itself. N.B. Folders are searched
+# for .xlsx files, not for bundles.
+def find_inputs(paths):
+    retval = []
+    for path in paths:
+        if os.path.isdir(path):
+            for fullpath in find_xlsx_files([path]):
+                retval.append((fullpath, os.path.relpath(fullpath, path)))
+            # end_for
+        else:
+            retval.append((path, os.path.basename(path)))
+        # end_if
+    # end_for
+    return retval
+# end_def find_inputs()
+
+# Generate a tuple (fullpath, relpath, data, errors) for each workbook to be processed, given the list
+# of pairs (path, relpath) returned by find_inputs:
+#   for an .xlsx file - (path, relpath, None, ''); the file is read by the 'prefetch' or 'parse' stage
+#   for each .xlsx file in a bundle - ('path/name', 'stem/name', contents, ''), where 'name' is its
+#                                     path in the bundle, and 'stem' is 'relpath' without its suffix;
+#                                     the .xlsx files are read here, in turn (see iter_bundle_workbooks)
+#   for a bundle that cannot be read - (path, relpath, None, text of error message), after any
+#                                      .xlsx files that were read from it before the error
+#   for an .xlsx file in a bundle whose name is unsafe (see get_member_path in 'workbookBundle.py')
+#       - ('path/name', None, None, text of error message); it is not processed
+def iter_workbooks(inputs):
+    for (path, relpath) in inputs:
+        if not is_bundle(path):
+            yield (path, relpath, None, '')
+            continue
+        # end_if
+        try:
+            for (name, data) in iter_bundle_workbooks(path):
+                member_path = get_member_path(name)
+                if member_path == None:
+                    yield (path + '/' + name, None, None,
+                           'Refused to read .xlsx file from bundle: its name, ' + name + ', is absolute or ' +
+                           'outside the bundle.\n')
+                    continue
+                # end_if
+                member_path = member_path.replace('/', os.sep)
+                yield (os.path.join(path, member_path), os.path.join(get_bundle_stem(relpath), member_path), data, '')
+            # end_for
+        except Exception as e:
+            yield (path, relpath, None, 'Failed to read .xlsx files from bundle: ' + str(e) + '\n')
+        # end_try
+    # end_for
+# end_def iter_workbooks()
+
+# Return a dictionary like that returned by extract_workbook for the workbook 'fullpath' (whose
+# hash is 'content_hash'), which failed in 'stage' after 'secs' seconds, with the error message(s)
+# 'errors'; e.g., when its worker process was killed.
+def get_failed_result(fullpath, content_hash, errors, stage, secs):
+    retval = {}
+    retval['fullpath'] = fullpath
+    retval['content_hash'] = content_hash
+    retval['errors'] = errors
+    retval['stage'] = stage
+    retval['exDatas'] = None
+    retval['outputs'] = {}
+    retval['rss_kb'] = None
+    retval['parse_secs'] = secs
+    return retval
+# end_def get_failed_result()
+
+# The 'prefetch' stage: read the .xlsx file 'fullpath' into memory, for the 'parse' stage.
+# Return the contents of the file as a string of bytes, or None if it cannot be read
+# (in which case the 'parse' stage tries again, and reports the error), and the time taken.
+def prefetch_workbook(fullpath):
+    start = time.time()
+    try:
+        data = read_workbook_bytes(fullpath)
+    except (IOError, OSError):
+        data = None
+    # end_try
+    return (data, time.time() - start)
+# end_def prefetch_workbook()
+
+# The 'parse' stage: read the .xlsx file 'fullpath' and extract the data for its exhibits.
+# If 'data' is not None, it is the contents of the file, as read by the 'prefetch' stage, and
+# the workbook is loaded from it rather than from the file.
+# This runs in a worker process, so it must not raise; any error is reported in the
+# 'errors' entry of the dictionary returned:
+#   fullpath
+#   content_hash - hash of the content of the .xlsx file (see hash_workbook in 'batchManifest.py'),
+#                  as passed in (or None)
+#   errors - as for get_workbook_errors: '' if no errors were found in the workbook or any of
+#            its worksheets
+#   stage - the stage of processing reached: 'load', 'extract', or 'render' (see report_stage);
+#           if errors were found, this is the stage in which they were found
+#   exDatas - list of the data extracted by extract_exhibit_data, one per worksheet containing
+#             workscope exhibits, or None if errors were found
+#   outputs - dictionary: output file name -> hash of its contents; filled in by render_workbook
+#   parse_secs - time taken
+#   rss_kb - resident set size of the process after releasing the workbook (see workbookSession
+#            in 'excelFileManager.py'), or None if unknown
+#   recycle - True if the worker process should be replaced (e.g., after running out of memory)
+# If 'report_stage' is not None, it is called with the name of each stage as it is entered:
+#   'load' - opening the workbook and locating the cells of interest (initExcelWorkbook)
+#   'extract' - reading the data for the exhibits (extract_exhibit_data)
+def extract_workbook(fullpath, content_hash=None, report_stage=None, data=None):
+    start = time.time()
+    retval = {}
+    retval['fullpath'] = fullpath
+    retval['content_hash'] = content_hash
+    retval['errors'] = ''
+    retval['exDatas'] = None
+    retval['outputs'] = {}
+    retval['rss_kb'] = None
+    retval['recycle'] = False
+
+    def enter_stage(stage):
+        retval['stage'] = stage
+        if report_stage != None:
+            report_stage(stage)
+        # end_if
+    # end_def enter_stage()
+
+    try:
+        enter_stage('load')
+        with workbookSession(fullpath if data == None else io.BytesIO(data)) as session:
+            if session.errors == '':
+                enter_stage('extract')
+                retval['exDatas'] = session.extract()
+            else:
+                retval['errors'] = session.errors
+            # end_if
+        # end_with
+        retval['rss_kb'] = session.rss_after_kb
+    except MemoryError:
+        retval['errors'] += 'Memory limit exceeded when reading input .xlsx file (stage: ' + retval['stage'] + ').\n'
+        retval['recycle'] = True
+    except:
+        retval['errors'] += 'Unexpected error when reading input .xlsx file:\n' + traceback.format_exc()
+    # end_try
+    retval['parse_secs'] = time.time() - start
+    return retval
+# end_def extract_workbook()
+
+# Body of a 'parse' worker process. Receives (fullpath, content_hash, data) tuples over the
+# connection 'conn' and runs extract_workbook on each, sending back ('stage', name) messages
+# as it proceeds and finally a ('result', dictionary) message. Exits on receiving None, or after
+# a result for which a fresh process is wanted.
+# If 'memory_limit_mb' is non-zero, the address space of the process is limited to that
+# many megabytes; this is only supported where the 'resource' module is available (i.e., not
+# under Windows).
+def parse_worker_main(conn, memory_limit_mb):
+    if memory_limit_mb > 0 and resource != None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    # end_if
+    def report_stage(stage):
+        conn.send(('stage', stage))
+    # end_def report_stage()
+    while True:
+        args = conn.recv()
+        if args == None:
+            break
+        # end_if
+        result = extract_workbook(args[0], args[1], report_stage, args[2])
+        args = None
+        conn.send(('result', result))
+        if result['recycle']:
+            break
+        # end_if
+    # end_while
+    conn.close()
+# end_def parse_worker_main()
+
+# Supervises one 'parse' worker process, and enforces a wall-clock time limit on each workbook
+# it is given: a worker that exceeds the limit is killed, and the workbook is recorded as
+# failed in the stage it had reached. A worker that dies (or exits after running out of
+# memory) is replaced by a new one for the next workbook.
+class supervisedWorker:
+    def __init__(self, timeout_secs, memory_limit_mb):
+        self.timeout_secs = timeout_secs
+        self.memory_limit_mb = memory_limit_mb
+        self.process = None
+        self.conn = None
+    # end_def __init__()
+
+    def start(self):
+        (self.conn, child_conn) = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=parse_worker_main, args=(child_conn, self.memory_limit_mb))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+    # end_def start()
+
+    # Kill the worker process (if it is still running), and forget about it.
+    def kill(self):
+        if self.process != None:
+            if self.process.is_alive():
+                self.process.terminate()
+            # end_if
+            self.process.join()
+            self.conn.close()
+        # end_if
+        self.process = None
+        self.conn = None
+    # end_def kill()
+
+    # Run extract_workbook(fullpath, content_hash, data) in the worker process, subject to the time limit.
+    # Return the dictionary returned by extract_workbook, or one reporting the failure.
+    def extract(self, fullpath, content_hash, data=None):
+        if self.process == None or not self.process.is_alive():
+            self.kill()
+            self.start()
+        # end_if
+        start = time.time()
+        deadline = start + self.timeout_secs if self.timeout_secs > 0 else None
+        stage = 'load'
+        failure = ''
+        retval = None
+        try:
+            self.conn.send((fullpath, content_hash, data))
+            while retval == None and failure == '':
+                wait_secs = None if deadline == None else max(deadline - time.time(), 0.0)
+                if not self.conn.poll(wait_secs):
+                    failure = 'Timed out after ' + str(self.timeout_secs) + ' s when reading input .xlsx file (stage: ' + stage + ').\n'
+                    break
+                # end_if
+                (kind, value) = self.conn.recv()
+                if kind == 'stage':
+                    stage = value
+                else:
+                    retval = value
+                # end_if
+            # end_while
+        except (EOFError, IOError, OSError):
+            failure = 'Worker process died when reading input .xlsx file (stage: ' + stage + ').\n'
+        # end_try
+        if retval == None:
+            self.kill()
+            retval = get_failed_result(fullpath, content_hash, failure, stage, time.time() - start)
+        elif retval['recycle']:
+            self.kill()
+        # end_if
+        return retval
+    # end_def extract()
+
+    def stop(self):
+        if self.process != None and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (IOError, OSError):
+                pass
+            # end_try
+            self.process.join(5)
+        # end_if
+        self.kill()
+    # end_def stop()
+# end_class supervisedWorker
+
+# Writes lines to a 'JSON lines' file (or to stdout, if the filename is '-'), each as a whole, 
+# from any number of threads.
+class jsonLinesWriter:
+    def __init__(self, filename):
+        self.lock = threading.Lock()
+        if filename == '-':
+            self.f = sys.stdout
+        else:
+            self.f = open(filename, 'wb')
+        # end_if
+    # end_def __init__()
+
+    # Write 'line' (a string of bytes, ending with a newline).
+    def write(self, line):
+        self.lock.acquire()
+        try:
+            self.f.write(line)
+            self.f.flush()
+        finally:
+            self.lock.release()
+        # end_try
+    # end_def write()
+
+    def close(self):
+        if self.f != sys.stdout:
+            self.f.close()
+        # end_if
+    # end_def close()
+# end_class jsonLinesWriter
+
+# The 'render' stage: generate the HTML for both exhibits for each worksheet from the output of
+# the 'parse' stage, and write it to disk (see render_exhibit in 'workscope_exhibit_tool.py', which
+# gives each exhibit its own stringAccumulator, as this runs in one of several worker threads).
+# Errors are added to the 'errors' entry of 'result', the hash of each output file is recorded in
+# its 'outputs' entry, and the time taken is recorded in its 'render_secs' entry. If 'manifest' is
+# not None, an output file whose contents are unchanged from those recorded in the manifest is not
+# re-written.
+# If 'export_data' is True, the data shown in the exhibits is also exported to a JSON file (which
+# is treated like the HTML files); if 'jsonl' is not None, it is also written to that jsonLinesWriter.
+# If 'compress_level' is non-zero, compressed copies of the output files are also written (see
+# write_output_file in 'workscope_exhibit_tool.py'); they are recorded in the manifest like the output
+# files themselves, and are not re-compressed if the output file they were made from is unchanged
+# (and they were compressed at the same level).
+# If 'inline_css' is True, the stylesheet is inlined in each exhibit (see inline_stylesheet in
+# 'workscope_exhibit_tool.py'). If 'ex1_page_units' is non-zero, the schedule in Exhibit 1 is split
+# into pages of (at most) that many MAJOR schedule units (see get_ex1_pages in 'workscope_exhibit_tool.py').
+# The output files are named after the 'output_path' entry of 'result' (see get_output_filenames
+# in 'workscope_exhibit_tool.py'), rather than the input .xlsx file; if 'archive' is not None, they
+# are written into that bundleWriter (see 'workbookBundle.py'), rather than to disk.
+def render_workbook(result, manifest=None, export_data=False, jsonl=None, compress_level=0, inline_css=False,
+                    archive=None, ex1_page_units=0):
+    start = time.time()
+    result['stage'] = 'render'
+    get_recorded_hash = None
+    recorded_compress_level = None
+    if manifest != None:
+        get_recorded_hash = lambda out_fn: manifest.get_output_hash(result['fullpath'], out_fn)
+        recorded_options = manifest.get_options(result['fullpath'])
+        if recorded_options != None:
+            recorded_compress_level = recorded_options.get('compress_level')
+        # end_if
+    # end_if
+    output_path = result['output_path']
+    try:
+        out_dir = os.path.dirname(output_path)
+        if archive == None and out_dir != '' and not os.path.isdir(out_dir):
+            try:
+                os.makedirs(out_dir)
+            except OSError:
+                # Another thread may have just created it
+                if not os.path.isdir(out_dir):
+                    raise
+                # end_if
+            # end_try
+        # end_if
+        for exData in result['exDatas']:
+            (ex_1_out_html_fn, ex_2_out_html_fn) = get_output_filenames(output_path, exData['sheet_name'])
+            # The contents of each output file, and its name
+            outputs = [(render_exhibit(exData, 1, inline_css, ex1_page_units), ex_1_out_html_fn),
+                       (render_exhibit(exData, 2, inline_css), ex_2_out_html_fn)]
+            if export_data or jsonl != None:
+                exported = gen_exhibit_data(exData, result['fullpath'])
+                if export_data:
+                    outputs.append((format_json(exported), get_data_filename(output_path, exData['sheet_name'])))
+                # end_if
+                if jsonl != None:
+                    jsonl.write(format_json(exported, True))
+                # end_if
+            # end_if
+            for (data, out_fn) in outputs:
+                result['outputs'].update(write_output_file(data, out_fn, compress_level, get_recorded_hash, archive,
+                                                             recorded_compress_level))
+            # end_for
+        # end_for
+    except:
+        result['errors'] += 'Unexpected error when generating HTML:\n' + traceback.format_exc()
+    # end_try
+    result['render_secs'] = time.time() - start
+# end_def render_workbook()
+
+# Driver routine: generate the exhibits for each of the .xlsx files and bundles in 'inputs', a list
+# of pairs (path, relpath) as returned by find_inputs.
+# Parameters:
+#   parse_workers - number of worker processes in the 'parse' stage
+#   prefetch_workers - number of worker threads in the 'prefetch' stage; 0 for none, in which
+#                      case each 'parse' worker reads the .xlsx file itself
+#   output_dir - folder under which the output files are written, at the relative path of each
+#                workbook (see iter_workbooks), or None to write them beside the .xlsx files
+#   archive - bundleWriter into which the output files are written, at the relative path of each
+#             workbook, or None to write them to disk
+#   render_workers - number of worker threads in the 'render' stage
+#   queue_size - bound on the number of workbooks waiting for each stage
+#   progress_interval - number of seconds between progress reports; 0 for none
+#   manifest - batchManifest in which the outcome for each workbook is recorded, or None
+#   timeout_secs - wall-clock time limit for reading each workbook; 0 for none
+#   memory_limit_mb - memory limit for each 'parse' worker process, in megabytes; 0 for none
+#   export_data - if True, also export the data shown in the exhibits to a JSON file per worksheet
+#   jsonl - jsonLinesWriter to which the data shown in the exhibits is exported, or None
+#   compress_level - if non-zero, also write compressed copies of the output files, at this level
+#   inline_css - if True, inline the stylesheet in each exhibit, rather than linking to it
+#   ex1_page_units - if non-zero, split the schedule in Exhibit 1 into pages of (at most) that many
+#                    MAJOR schedule units
+#   strict_totals - if True, a workbook whose totals do not add up (see check_exhibit_totals in
+#                   'excelFileManager.py') fails, rather than being generated with warnings
+# Return a list containing, for each input file that was processed, the dictionary returned by
+# extract_workbook and updated by render_workbook; the 'exDatas' entries are dropped, and a
+# 'warnings' entry is added, containing the text of any warnings for the workbook ('' if none).
+# A bundle that cannot be read is included as a workbook that failed (see iter_workbooks).
+# Input files found to be up to date in the manifest are not processed; they are counted
+# in the 'skipped' entry of the pipelineStats.
+def run_batch(inputs, parse_workers, render_workers, queue_size, progress_interval=0, manifest=None,
+              timeout_secs=0, memory_limit_mb=0, export_data=False, jsonl=None, strict_totals=False,
+              compress_level=0, inline_css=False, prefetch_workers=0, output_dir=None, archive=None,
+              ex1_page_units=0):
+    num_workers = {}
+    num_workers['prefetch'] = prefetch_workers
+    num_workers['parse'] = parse_workers
+    num_workers['render'] = render_workers
+    stats = pipelineStats(num_workers)
+    results = []
+
+    # N.B. All the queues are bounded: putting a workbook in a full queue blocks until
+    #      the following stage has caught up.
+    prefetch_queue = Queue.Queue(queue_size)
+    parse_queue = Queue.Queue(queue_size)
+    render_queue = Queue.Queue(queue_size)
+
+    # Record the outcome for a workbook in the manifest, if any. A workbook that could not
+    # even be read to hash it is recorded (as failed) with an empty hash, so that a resumed
+    # run sees it and tries it again.
+    def checkpoint(result):
+        if manifest == None:
+            return
+        # end_if
+        entry = {}
+        for key in ['fullpath', 'content_hash', 'errors', 'warnings', 'outputs', 'parse_secs', 'rss_kb', 'stage']:
+            entry[key] = result[key]
+        # end_for
+        if entry['content_hash'] == None:
+            entry['content_hash'] = ''
+        # end_if
+        entry['render_secs'] = result.get('render_secs', 0.0)
+        entry['status'] = 'ok' if result['errors'] == '' else 'failed'
+        entry['finished'] = time.time()
+        manifest.record(entry)
+    # end_def checkpoint()
+
+    def prefetch_worker():
+        while True:
+            args = prefetch_queue.get()
+            if args == None:
+                break
+            # end_if
+            (data, secs) = prefetch_workbook(args[0])
+            stats.done('prefetch', secs, data == None)
+            stats.queued('parse')
+            # N.B. This blocks while the 'parse' queue is full; so at most one workbook
+            #      per 'prefetch' worker is read ahead of those in the queue.
+            parse_queue.put((args[0], args[1], data, args[2]))
+            data = None
+        # end_while
+    # end_def prefetch_worker()
+
+    # Each 'parse' worker thread supervises one worker process, which does the real work.
+    def parse_worker():
+        worker = supervisedWorker(timeout_secs, memory_limit_mb)
+        try:
+            while True:
+                args = parse_queue.get()
+                if args == None:
+                    break
+                # end_if
+                result = worker.extract(args[0], args[1], args[2])
+                result['output_path'] = args[3]
+                args = None
+                result['warnings'] = get_exhibit_warnings(result['exDatas']) if result['exDatas'] != None else ''
+                if strict_totals and result['warnings'] != '':
+                    result['errors'] = 'Totals that do not add up found:\n' + result['warnings']
+                # end_if
+                failed = result['errors'] != ''
+                stats.done('parse', result['parse_secs'], failed)
+                results.append(result)
+                if failed:
+                    checkpoint(result)
+                else:
+                    stats.queued('render')
+                    render_queue.put(result)
+                # end_if
+            # end_while
+        finally:
+            worker.stop()
+        # end_try
+    # end_def parse_worker()
+
+    def render_worker():
+        while True:
+            result = render_queue.get()
+            if result == None:
+                break
+            # end_if
+            render_workbook(result, manifest, export_data, jsonl, compress_level, inline_css, archive, ex1_page_units)
+            stats.done('render', result['render_secs'], result['errors'] != '')
+            result['exDatas'] = None
+            checkpoint(result)
+        # end_while
+    # end_def render_worker()
+
+    finished = threading.Event()
+    def progress_reporter():
+        while not finished.wait(progress_interval):
+            print stats.report()
+        # end_while
+    # end_def progress_reporter()
+
+    prefetch_threads = []
+    for i in range(prefetch_workers):
+        t = threading.Thread(target=prefetch_worker)
+        t.daemon = True
+        t.start()
+        prefetch_threads.append(t)
+    # end_for
+    parse_threads = []
+    for i in range(parse_workers):
+        t = threading.Thread(target=parse_worker)
+        t.daemon = True
+        t.start()
+        parse_threads.append(t)
+    # end_for
+    render_threads = []
+    for i in range(render_workers):
+        t = threading.Thread(target=render_worker)
+        t.daemon = True
+        t.start()
+        render_threads.append(t)
+    # end_for
+    reporter = None
+    if progress_interval > 0:
+        reporter = threading.Thread(target=progress_reporter)
+        reporter.daemon = True
+        reporter.start()
+    # end_if
+
+    try:
+        for (fullpath, relpath, data, errors) in iter_workbooks(inputs):
+            if errors != '':
+                result = get_failed_result(fullpath, None, errors, 'load', 0.0)
+                result['warnings'] = ''
+                results.append(result)
+                checkpoint(result)
+                continue
+            # end_if
+            if archive != None:
+                output_path = relpath
+            elif output_dir != None:
+                output_path = os.path.join(output_dir, relpath)
+            else:
+                output_path = fullpath
+            # end_if
+            content_hash = None
+            if manifest != None:
+                try:
+                    content_hash = hash_workbook(fullpath, data)
+                except (IOError, OSError):
+                    # Let the 'parse' stage report the error
+                    pass
+                # end_try
+                if content_hash != None and manifest.is_up_to_date(fullpath, content_hash):
+                    stats.skipped()
+                    continue
+                # end_if
+            # end_if
+            # N.B. This blocks while the queue is full. A workbook read from a bundle
+            #      has already been read into memory.
+            if prefetch_workers > 0 and data == None:
+                stats.queued('prefetch')
+                prefetch_queue.put((fullpath, content_hash, output_path))
+            else:
+                stats.queued('parse')
+                parse_queue.put((fullpath, content_hash, data, output_path))
+            # end_if
+            data = None
+        # end_for
+    finally:
+        for t in prefetch_threads:
+            prefetch_queue.put(None)
+        # end_for
+        for t in prefetch_threads:
+            t.join()
+        # end_for
+        for t in parse_threads:
+            parse_queue.put(None)
+        # end_for
+        for t in parse_threads:
+            t.join()
+        # end_for
+        for t in render_threads:
+            render_queue.put(None)
+        # end_for
+        for t in render_threads:
+            t.join()
+        # end_for
+        finished.set()
+        if reporter != None:
+            reporter.join()
+        # end_if
+    # end_try
+    print stats.report()
+    return results
+# end_def run_batch()
+
+# Main driver routine for batch runs.
+def main(argv):
+    parser = argparse.ArgumentParser(description='Generate the HTML for the workscope exhibits of a batch of .xlsx files.')
+    parser.add_argument('paths', nargs='+',
+                        help='.xlsx file, folder containing .xlsx files, or .zip, .tar, or .tar.gz archive of .xlsx files')
+    parser.add_argument('--validate', action='store_true',
+                        help='only check that the .xlsx files contain the required worksheet and defined names')
+    parser.add_argument('--prefetch', type=int, default=2, metavar='N',
+                        help='number of worker threads reading .xlsx files into memory ahead of the worker processes '
+                             'reading them, e.g., from a network share; 0 for none (default: 2)')
+    parser.add_argument('--parse-workers', type=int, default=multiprocessing.cpu_count(),
+                        help='number of worker processes reading .xlsx files (default: number of CPUs)')
+    parser.add_argument('--render-workers', type=int, default=2,
+                        help='number of worker threads generating and writing HTML (default: 2)')
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help='maximum number of workbooks waiting for or in each stage (default: 8)')
+    parser.add_argument('--progress-interval', type=float, default=10.0,
+                        help='seconds between progress reports; 0 for none (default: 10)')
+    parser.add_argument('--timeout', type=float, default=600.0,
+                        help='seconds allowed for reading each .xlsx file; 0 for no limit (default: 600)')
+    parser.add_argument('--memory-limit', type=int, default=4096,
+                        help='megabytes of memory allowed to each worker process reading .xlsx files; '
+                             '0 for no limit; not supported under Windows (default: 4096)')
+    parser.add_argument('--manifest', default=None,
+                        help='manifest file in which the outcome for each workbook is recorded; when re-run with '
+                             'the same manifest, workbooks that are up to date are skipped')
+    parser.add_argument('--json', action='store_true',
+                        help='also export the data shown in the exhibits as JSON, to a file beside the HTML')
+    parser.add_argument('--jsonl', default=None,
+                        help="also export the data shown in the exhibits to this 'JSON lines' file, one line per "
+                             "worksheet; '-' for stdout")
+    parser.add_argument('--strict-totals', action='store_true',
+                        help='treat totals that do not add up as errors, rather than warnings: no HTML is '
+                             'generated for such workbooks')
+    parser.add_argument('--compress', type=int, default=0, metavar='LEVEL',
+                        help='also write gzip (.gz) and, if the brotli module is installed, brotli (.br) copies of '
+                             'the output files, compressed at this level (1-9; up to 11 for brotli); '
+                             '0 for none (default: 0)')
+    parser.add_argument('--inline-css', action='store_true',
+                        help='embed a minified copy of the stylesheet in each exhibit, pruned to the rules it uses, '
+                             'rather than linking to it; the stylesheet is parsed once per run')
+    parser.add_argument('--ex1-page-units', type=int, default=0, metavar='N',
+                        help='split the schedule in Exhibit 1 into pages of N major schedule units (e.g., months), '
+                             'each repeating the task column, for schedules too long to show legibly in one table; '
+                             '0 for a single table (default: 0)')
+    parser.add_argument('--output-dir', default=None,
+                        help='write the output files under this folder, in sub-folders mirroring those of the '
+                             '.xlsx files (and archives) given, rather than beside the .xlsx files')
+    parser.add_argument('--output-archive', default=None,
+                        help='write the output files into this .zip, .tar, or .tar.gz archive, rather than to '
+                             'disk; cannot be used with --manifest')
+    args = parser.parse_args(argv)
+
+    inputs = find_inputs(args.paths)
+    if args.validate:
+        # Validate the .xlsx files in bundles from memory, as they are read
+        workbooks = (((fullpath, None, errors) if errors != '' else
+                      fullpath if data == None else (fullpath, io.BytesIO(data)))
+                     for (fullpath, relpath, data, errors) in iter_workbooks(inputs))
+        return 1 if workbookValidator.main(workbooks) > 0 else 0
+    # end_if
+    if args.ex1_page_units < 0:
+        parser.error('--ex1-page-units must not be negative')
+    # end_if
+    if args.output_dir != None and args.output_archive != None:
+        parser.error('only one of --output-dir and --output-archive may be given')
+    # end_if
+    if args.output_archive != None and not is_bundle(args.output_archive):
+        parser.error('the name of the output archive must end with .zip, .tar, .tar.gz, or .tgz')
+    # end_if
+    if args.output_archive != None and args.manifest != None:
+        parser.error('--manifest cannot be used with --output-archive, which is written afresh by each run')
+    # end_if
+    if args.output_dir == None and args.output_archive == None and \
+       len([path for (path, relpath) in inputs if is_bundle(path)]) > 0:
+        parser.error('--output-dir or --output-archive must be given for .xlsx files in archives')
+    # end_if
+    archive = None
+    if args.output_archive != None:
+        archive = bundleWriter(args.output_archive)
+    # end_if
+    manifest = None
+    if args.manifest != None:
+        # The options that affect the output files: a workbook processed with others is processed again
+        options = {'compress_level': args.compress, 'export_data': args.json, 'ex1_page_units': args.ex1_page_units,
+                   'inline_css': args.inline_css, 'strict_totals': args.strict_totals}
+        manifest = batchManifest(args.manifest, options)
+    # end_if
+    jsonl = None
+    if args.jsonl != None:
+        jsonl = jsonLinesWriter(args.jsonl)
+        if args.jsonl == '-':
+            # stdout is reserved for the JSON lines: send the progress reports, etc., to stderr.
+            sys.stdout = sys.stderr
+        # end_if
+    # end_if
+    try:
+        results = run_batch(inputs, args.parse_workers, args.render_workers, args.queue_size, 
+                            args.progress_interval, manifest, args.timeout, args.memory_limit,
+                            args.json, jsonl, args.strict_totals, args.compress, args.inline_css, args.prefetch,
+                            args.output_dir, archive, args.ex1_page_units)
+    finally:
+        if archive != None:
+            archive.close()
+        # end_if
+        if manifest != None:
+            manifest.close()
+        # end_if
+        if jsonl != None:
+            jsonl.close()
+        # end_if
+    # end_try
+    num_failed = 0
+    num_warned = 0
+    for result in results:
+        if result['errors'] != '':
+            num_failed += 1
+            print 'HTML generation aborted.\nErrors found when processing ' + result['fullpath'] + \
+                  ' (stage: ' + result['stage'] + '):\n'
+            print result['errors']
+        elif result['warnings'] != '':
+            num_warned += 1
+            print 'Warning: totals that do not add up found in ' + result['fullpath'] + ' (the exhibits show them as found):\n'
+            print result['warnings']
+        # end_if
+    # end_for
+    print str(len(results)) + ' workbook(s) processed; ' + str(num_failed) + ' failed; ' + \
+          str(num_warned) + ' with warnings.'
+    return 1 if num_failed > 0 else 0
+# end_def main()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,468 @@
+# Benchmarks for the workscope exhibit generator tool
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies only upon the Python standard library; the modules it measures
+#      rely upon OpenPyXl and Beautiful Soup (version 4), as usual.
+#
+# Usage:
+#   <Python_installation_folder>/python.exe workscope_exhibit_benchmark.py startup [options]
+#   <Python_installation_folder>/python.exe workscope_exhibit_benchmark.py stress [options]
+# Run with '--help' for the options.
+#
+# The 'startup' benchmark
+# =======================
+#
+# Each of the STARTUP_SCENARIOS is run in a fresh Python interpreter, as it would be when
+# the tool is started, and the time taken by its code (typically, importing one of the modules
+# of the tool) is measured. Two things are checked for each scenario:
+#   1. That none of the scenario's 'forbidden' modules were loaded. The libraries used to read
+#      workbooks and to format HTML (OpenPyXl and Beautiful Soup) take a noticeable fraction
+#      of a second to import; so they are imported only by the code that uses them, and code
+#      paths that never read a workbook or write HTML (e.g., '--help', '--validate', or
+#      starting the GUI) must not load them. This check does not depend on the speed of the
+#      machine, and is the one to rely upon.
+#   2. That the time taken is within the scenario's budget (the median of several runs is used).
+# With the '--profile' option, the time spent importing each top-level package (excluding
+# the time spent importing other packages it imports) is also reported, largest first.
+#
+# N.B. The GUI module ('workscope_exhibit_tool_gui.py') launches the GUI when it is imported,
+#      and so is not measured directly: apart from wxPython itself, it imports nothing at
+#      startup, and the modules it imports when generating the exhibits are those measured by
+#      the 'import_tool' scenario.
+#
+# The 'stress' benchmark
+# ======================
+#
+# The time taken to generate the exhibits should grow (no faster than) linearly with the size
+# of the workbook, whatever its shape; but the slowest real workbooks have odd shapes: very many
+# short schedule bars, milestones in every schedule column, or long milestones lists. For each of
+# the STRESS_DIMENSIONS, synthetic workbooks (see 'syntheticWorkbook.py') of growing size along
+# that dimension, with schedules laid out at random, are generated in memory, and the time taken
+# by each of the STRESS_PHASES is measured (the median of several runs is used). The exponent
+# of the growth of each phase (and of their total) with the size is fitted over the larger
+# sizes, where fixed costs (e.g., loading the stylesheet) matter least, and any exponent
+# greater than the threshold (by default, 1.2, to allow for noise) is flagged. The smallest
+# workbook showing the growth (that whose time grew faster than linearly from that of the
+# next smaller one) is saved, e.g., to attach to a bug report.
+# Each workbook is also checked: the tool must read it without errors or warnings, and find
+# exactly the schedule items, milestones, and funding sources it was generated with (see
+# check_exhibit_data in 'syntheticWorkbook.py'); Exhibit 1 must show every schedule bar. The
+# first (and so the smallest) workbook failing these checks is saved, and its dimension is
+# grown no further.
+#
+# Internals of this Module
+# ========================
+#
+# run_startup_scenario - runs one startup scenario in a fresh interpreter, and returns
+#                        the measurements
+#
+# run_startup_benchmark - runs all the startup scenarios, and reports the results
+#
+# get_stress_sizes - returns the sizes of the workbooks generated along a stress dimension
+#
+# time_stress_phases - reads a workbook and generates its exhibits, timing each phase
+#
+# fit_exponent - fits the exponent of the growth of a time with a size
+#
+# run_stress_dimension - measures the times taken for workbooks of growing size along one
+#                        stress dimension, and reports the results
+#
+# run_stress_benchmark - runs the stress benchmark along each of the stress dimensions
+#
+# main - parses the command line, and runs the benchmark requested
+#
+###############################################################################
+
+import os
+import io
+import sys
+import math
+import time
+import json
+import argparse
+import subprocess
+
+# Folder containing the modules of the tool
+TOOL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The startup scenarios. Each is a dictionary:
+#   name
+#   description
+#   code - Python statement(s) run in a fresh interpreter; FULLPATH is bound to the name of
+#          the workbook given on the command line (or None)
+#   needs_workbook - True if the scenario is only run if a workbook is given on the command line
+#   forbidden - list of (top-level) modules that must not be loaded by the code
+#   budget_secs - time allowed for the code
+STARTUP_SCENARIOS = [
+    {'name': 'import_tool',
+     'description': 'import workscope_exhibit_tool, as when the tool (or the GUI) starts',
+     'code': 'import workscope_exhibit_tool',
+     'needs_workbook': False,
+     'forbidden': ['openpyxl', 'bs4'],
+     'budget_secs': 0.5},
+    {'name': 'import_batch',
+     'description': 'import workscope_exhibit_batch, as for --help',
+     'code': 'import workscope_exhibit_batch',
+     'needs_workbook': False,
+     'forbidden': ['openpyxl', 'bs4'],
+     'budget_secs': 0.5},
+    {'name': 'import_client',
+     'description': 'import workscope_exhibit_client, as when a request is forwarded to the daemon',
+     'code': 'import workscope_exhibit_client',
+     'needs_workbook': False,
+     'forbidden': ['openpyxl', 'bs4', 'workscope_exhibit_tool'],
+     'budget_secs': 0.1},
+    {'name': 'validate',
+     'description': 'workscope_exhibit_tool.py --validate FULLPATH',
+     'code': 'import workscope_exhibit_tool, workbookValidator\nworkbookValidator.validate_workbook(FULLPATH)',
+     'needs_workbook': True,
+     'forbidden': ['openpyxl', 'bs4'],
+     'budget_secs': 0.5},
+    {'name': 'load_workbook',
+     'description': 'read FULLPATH, for comparison: this loads OpenPyXl',
+     'code': 'import excelFileManager\nexcelFileManager.initExcelWorkbook(FULLPATH)',
+     'needs_workbook': True,
+     'forbidden': ['bs4'],
+     'budget_secs': 5.0}
+]
+
+# Program run in a fresh interpreter for each scenario. It times every import made while
+# the scenario's code runs, and prints a JSON object containing the results.
+STARTUP_CHILD_PROGRAM = """
+import sys, time, json, __builtin__
+sys.path.insert(0, %(tool_dir)r)
+FULLPATH = %(fullpath)r
+# Time spent importing each top-level package, excluding that spent in nested imports
+import_secs = {}
+stack = []
+real_import = __builtin__.__import__
+def timed_import(name, *args, **kwargs):
+    stack.append(0.0)
+    start = time.time()
+    module = None
+    try:
+        module = real_import(name, *args, **kwargs)
+        return module
+    finally:
+        elapsed = time.time() - start
+        nested_secs = stack.pop()
+        # N.B. The name of the module returned is used, since 'name' may be relative.
+        top = getattr(module, '__name__', name).split('.')[0]
+        import_secs[top] = import_secs.get(top, 0.0) + elapsed - nested_secs
+        if len(stack) > 0:
+            stack[-1] += elapsed
+__builtin__.__import__ = timed_import
+start = time.time()
+%(code)s
+secs = time.time() - start
+__builtin__.__import__ = real_import
+result = {}
+result['secs'] = secs
+result['modules'] = sorted(set(name.split('.')[0] for (name, module) in sys.modules.items() if module != None))
+result['import_secs'] = import_secs
+sys.stdout.write(json.dumps(result))
+"""
+
+# Run the startup scenario 'scenario' in a fresh interpreter.
+# Return a dictionary containing:
+#   secs - time taken by the scenario's code
+#   process_secs - time taken by the interpreter as a whole, including its own startup
+#   modules - list of the (top-level) modules loaded
+#   import_secs - dictionary: top-level package -> time spent importing it (see above)
+def run_startup_scenario(scenario, fullpath):
+    program = STARTUP_CHILD_PROGRAM % {'tool_dir': TOOL_DIR, 'fullpath': fullpath, 'code': scenario['code']}
+    start = time.time()
+    child = subprocess.Popen([sys.executable, '-c', program], cwd=TOOL_DIR,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    (out, err) = child.communicate()
+    process_secs = time.time() - start
+    if child.returncode != 0:
+        raise RuntimeError('Scenario ' + scenario['name'] + ' failed:\n' + err)
+    # end_if
+    retval = json.loads(out)
+    retval['process_secs'] = process_secs
+    return retval
+# end_def run_startup_scenario()
+
+# Run each of the STARTUP_SCENARIOS 'repeat' times, and print the results.
+# If 'profile' is True, also print the time spent importing each package.
+# Return the number of scenarios that loaded a forbidden module or exceeded their budget.
+def run_startup_benchmark(fullpath, repeat, profile):
+    num_failed = 0
+    for scenario in STARTUP_SCENARIOS:
+        if scenario['needs_workbook'] and fullpath == None:
+            print scenario['name'] + ': skipped (no workbook given)'
+            continue
+        # end_if
+        runs = [run_startup_scenario(scenario, fullpath) for i in range(repeat)]
+        secs = sorted([run['secs'] for run in runs])[len(runs) / 2]
+        process_secs = sorted([run['process_secs'] for run in runs])[len(runs) / 2]
+        forbidden = [m for m in scenario['forbidden'] if m in runs[0]['modules']]
+        failures = []
+        if len(forbidden) > 0:
+            failures.append('loaded ' + ', '.join(forbidden))
+        # end_if
+        if secs > scenario['budget_secs']:
+            failures.append('over budget of %.3f s' % scenario['budget_secs'])
+        # end_if
+        print '%s: %.3f s (interpreter: %.3f s); %d modules loaded; %s' % \
+              (scenario['name'], secs, process_secs, len(runs[0]['modules']),
+               'FAILED: ' + '; '.join(failures) if len(failures) > 0 else 'OK')
+        print '    ' + scenario['description']
+        if profile:
+            import_secs = runs[0]['import_secs'].items()
+            import_secs.sort(key=lambda x: x[1], reverse=True)
+            for (name, t) in import_secs[:15]:
+                print '    %8.4f s  %s' % (t, name)
+            # end_for
+        # end_if
+        if len(failures) > 0:
+            num_failed += 1
+        # end_if
+    # end_for
+    return num_failed
+# end_def run_startup_benchmark()
+
+# The dimensions along which the 'stress' benchmark grows synthetic workbooks. Each is a dictionary:
+#   name
+#   description
+#   key - the entry of the layout (see DEFAULT_LAYOUT in 'syntheticWorkbook.py') that is grown; the
+#         other entries are those of DEFAULT_LAYOUT
+#   start - its value for the smallest workbook; it is doubled for each larger one
+#   limit - its largest value, or None for no limit
+# N.B. The limits of 'bars' and 'milestones' are those allowed by the 96 schedule columns of
+#      DEFAULT_LAYOUT (24 months of 4 weeks): one bar per two columns, one milestone per column.
+STRESS_DIMENSIONS = [
+    {'name': 'tasks',
+     'description': 'number of tasks',
+     'key': 'num_tasks',
+     'start': 8,
+     'limit': None},
+    {'name': 'schedule_units',
+     'description': 'number of months in the schedule',
+     'key': 'num_units',
+     'start': 12,
+     'limit': None},
+    {'name': 'bars',
+     'description': 'number of short schedule bars per task',
+     'key': 'bars_per_task',
+     'start': 3,
+     'limit': 48},
+    {'name': 'milestones',
+     'description': 'number of milestones per task, up to one in every schedule column',
+     'key': 'milestones_per_task',
+     'start': 6,
+     'limit': 96},
+    {'name': 'milestone_list',
+     'description': 'number of entries in the milestones list, which is crawled down to find its end',
+     'key': 'milestone_list_length',
+     'start': 25,
+     'limit': None}
+]
+
+# The phases timed by the 'stress' benchmark:
+#   read - initExcelFile: loading the workbook, and reading the cells of interest
+#   extract - extract_exhibit_data
+#   exhibit_1, exhibit_2 - render_exhibit, for each exhibit
+STRESS_PHASES = ['read', 'extract', 'exhibit_1', 'exhibit_2']
+
+# Number of the largest sizes along a dimension over which the exponents are fitted (see fit_exponent)
+STRESS_FIT_SIZES = 3
+
+# Phases whose time for the largest workbook is less than this are not flagged, however fast
+# it grew: at that scale, the noise in the measurements swamps the growth.
+STRESS_MIN_FLAGGED_SECS = 0.01
+
+# Return the list of sizes (values of its 'key') of the workbooks generated along the stress
+# dimension 'dimension': 'steps' sizes, starting at its 'start', each double the previous one,
+# up to its 'limit'.
+def get_stress_sizes(dimension, steps):
+    retval = []
+    size = dimension['start']
+    for i in range(steps):
+        if dimension['limit'] != None and size > dimension['limit']:
+            if len(retval) == 0 or retval[-1] < dimension['limit']:
+                retval.append(dimension['limit'])
+            # end_if
+            break
+        # end_if
+        retval.append(size)
+        size *= 2
+    # end_for
+    return retval
+# end_def get_stress_sizes()
+
+# Read the workbook whose contents are the string of bytes 'data', and generate both its exhibits.
+# Return a tuple: (dictionary: phase (see STRESS_PHASES) -> time taken, exData, HTML of Exhibit 1);
+# exData is None if the workbook could not be read, in which case only the 'read' phase is timed,
+# and the error message(s) are returned in place of the HTML.
+def time_stress_phases(data):
+    from excelFileManager import initExcelFile, extract_exhibit_data
+    from workscope_exhibit_tool import render_exhibit
+    secs = {}
+    start = time.time()
+    xlsInfo = initExcelFile(io.BytesIO(data))
+    secs['read'] = time.time() - start
+    if xlsInfo['errors'] != '':
+        return (secs, None, xlsInfo['errors'])
+    # end_if
+    start = time.time()
+    exData = extract_exhibit_data(xlsInfo)
+    secs['extract'] = time.time() - start
+    start = time.time()
+    html = render_exhibit(exData, 1)
+    secs['exhibit_1'] = time.time() - start
+    start = time.time()
+    render_exhibit(exData, 2)
+    secs['exhibit_2'] = time.time() - start
+    return (secs, exData, html)
+# end_def time_stress_phases()
+
+# Return the exponent k of the power law secs = c * size**k best fitting (by least squares, in
+# log-log space) the lists of sizes 'sizes' and times 'secs', or None if there are too few points.
+def fit_exponent(sizes, secs):
+    points = [(math.log(size), math.log(max(t, 1e-6))) for (size, t) in zip(sizes, secs)]
+    if len(points) < 2:
+        return None
+    # end_if
+    mean_x = sum([x for (x, y) in points]) / len(points)
+    mean_y = sum([y for (x, y) in points]) / len(points)
+    var_x = sum([(x - mean_x) ** 2 for (x, y) in points])
+    if var_x == 0:
+        return None
+    # end_if
+    return sum([(x - mean_x) * (y - mean_y) for (x, y) in points]) / var_x
+# end_def fit_exponent()
+
+# Run the stress benchmark along the stress dimension 'dimension' (see STRESS_DIMENSIONS), with
+# 'steps' sizes, each timed 'repeat' times, with schedules laid out from the seed 'seed'; print the
+# results. Exponents greater than 'threshold' are flagged, and the smallest workbook showing them
+# (or failing the checks: see above) is saved in the folder 'save_dir'.
+# Return True if the dimension was flagged or a workbook failed the checks, False otherwise.
+def run_stress_dimension(dimension, steps, repeat, seed, threshold, save_dir):
+    import syntheticWorkbook
+    print dimension['name'] + ': ' + dimension['description']
+    print '    %8s' % 'size' + ''.join(['%10s' % phase for phase in STRESS_PHASES + ['total']])
+    sizes = []
+    datas = []
+    times = dict([(phase, []) for phase in STRESS_PHASES + ['total']])
+    for size in get_stress_sizes(dimension, steps):
+        layout = syntheticWorkbook.get_layout(**{'seed': seed, dimension['key']: size})
+        buf = io.BytesIO()
+        expected = syntheticWorkbook.generate_workbook(layout, buf)
+        data = buf.getvalue()
+        runs = [time_stress_phases(data) for i in range(repeat)]
+        (secs, exData, html) = runs[0]
+        if exData == None:
+            errors = html
+        else:
+            errors = syntheticWorkbook.check_exhibit_data(exData, expected)
+            num_bars = html.count('class="scheduleBar"')
+            if num_bars != expected['num_bars']:
+                errors += 'Expected Exhibit 1 to show %d schedule bars, found %d.\n' % (expected['num_bars'], num_bars)
+            # end_if
+        # end_if
+        if errors != '':
+            fullpath = os.path.join(save_dir, 'stress_%s_%d.xlsx' % (dimension['name'], size))
+            with open(fullpath, 'wb') as f:
+                f.write(data)
+            # end_with
+            print '    %8d  FAILED: the workbook (saved to %s) was not read as generated:' % (size, fullpath)
+            print '        ' + errors.rstrip('\n').replace('\n', '\n        ')
+            return True
+        # end_if
+        sizes.append(size)
+        datas.append(data)
+        for phase in STRESS_PHASES:
+            times[phase].append(sorted([run[0][phase] for run in runs])[len(runs) / 2])
+        # end_for
+        times['total'].append(sum([times[phase][-1] for phase in STRESS_PHASES]))
+        print '    %8d' % size + ''.join(['%10.4f' % times[phase][-1] for phase in STRESS_PHASES + ['total']])
+    # end_for
+
+    exponents = dict([(phase, fit_exponent(sizes[-STRESS_FIT_SIZES:], times[phase][-STRESS_FIT_SIZES:]))
+                      for phase in STRESS_PHASES + ['total']])
+    print '    %8s' % 'exponent' + ''.join([('%10.2f' % exponents[phase]) if exponents[phase] != None else '%10s' % '-'
+                                           for phase in STRESS_PHASES + ['total']])
+    flagged = [phase for phase in STRESS_PHASES + ['total'] if exponents[phase] != None and
+               exponents[phase] > threshold and times[phase][-1] >= STRESS_MIN_FLAGGED_SECS]
+    if len(flagged) == 0:
+        print '    OK'
+        return False
+    # end_if
+    # The smallest workbook whose time (for a flagged phase) grew faster than linearly from that of the
+    # next smaller one; failing that, the largest.
+    ix = len(sizes) - 1
+    for i in range(1, len(sizes)):
+        growth = [math.log(max(times[phase][i], 1e-6) / max(times[phase][i - 1], 1e-6)) / math.log(float(sizes[i]) / sizes[i - 1])
+                  for phase in flagged if times[phase][i] >= STRESS_MIN_FLAGGED_SECS]
+        if len(growth) > 0 and max(growth) > threshold:
+            ix = i
+            break
+        # end_if
+    # end_for
+    fullpath = os.path.join(save_dir, 'stress_%s_%d.xlsx' % (dimension['name'], sizes[ix]))
+    with open(fullpath, 'wb') as f:
+        f.write(datas[ix])
+    # end_with
+    print '    SUPERLINEAR: ' + ', '.join(['%s (exponent %.2f)' % (phase, exponents[phase]) for phase in flagged])
+    print '    Smallest workbook showing it (%s = %d; seed %d) saved to %s' % (dimension['key'], sizes[ix], seed, fullpath)
+    return True
+# end_def run_stress_dimension()
+
+# Run the stress benchmark along each of the STRESS_DIMENSIONS named in 'names' (see run_stress_dimension).
+# Return the number of dimensions flagged, or along which a workbook failed the checks.
+def run_stress_benchmark(names, steps, repeat, seed, threshold, save_dir):
+    sys.path.insert(0, TOOL_DIR)
+    num_failed = 0
+    for dimension in STRESS_DIMENSIONS:
+        if dimension['name'] in names:
+            if run_stress_dimension(dimension, steps, repeat, seed, threshold, save_dir):
+                num_failed += 1
+            # end_if
+        # end_if
+    # end_for
+    return num_failed
+# end_def run_stress_benchmark()
+
+# Main driver routine for benchmarks.
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmarks for the workscope exhibit generator tool.')
+    subparsers = parser.add_subparsers(dest='benchmark')
+    startup = subparsers.add_parser('startup', help='measure the time taken, and modules loaded, at startup')
+    startup.add_argument('--workbook', default=None,
+                         help='.xlsx file used by the scenarios that read a workbook; they are skipped if none is given')
+    startup.add_argument('--repeat', type=int, default=5,
+                         help='number of times each scenario is run; the median time is reported (default: 5)')
+    startup.add_argument('--profile', action='store_true',
+                         help='report the time spent importing each package')
+    stress = subparsers.add_parser('stress', help='time synthetic workbooks of growing size along each of several '
+                                                  'dimensions, and flag times that grow faster than linearly')
+    stress.add_argument('--dimension', action='append', choices=[dimension['name'] for dimension in STRESS_DIMENSIONS],
+                        help='dimension along which to grow the workbooks; may be repeated (default: all)')
+    stress.add_argument('--steps', type=int, default=5,
+                        help='number of sizes along each dimension, each double the previous one (default: 5)')
+    stress.add_argument('--repeat', type=int, default=3,
+                        help='number of times each workbook is timed; the median time is used (default: 3)')
+    stress.add_argument('--seed', type=int, default=0,
+                        help='seed for laying out the schedules of the workbooks at random (default: 0)')
+    stress.add_argument('--threshold', type=float, default=1.2,
+                        help='flag times growing with an exponent greater than this (default: 1.2)')
+    stress.add_argument('--save-dir', default='.',
+                        help='folder in which to save the workbooks showing superlinear growth, or failing '
+                             'the checks (default: the current folder)')
+    args = parser.parse_args(argv)
+
+    if args.benchmark == 'startup':
+        num_failed = run_startup_benchmark(args.workbook, max(args.repeat, 1), args.profile)
+    elif args.benchmark == 'stress':
+        names = args.dimension if args.dimension != None else [dimension['name'] for dimension in STRESS_DIMENSIONS]
+        num_failed = run_stress_benchmark(names, max(args.steps, 2), max(args.repeat, 1), args.seed, args.threshold,
+                                          args.save_dir)
+    # end_if
+    return 1 if num_failed > 0 else 0
+# end_def main()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
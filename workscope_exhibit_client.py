@@ -0,0 +1,58 @@
+# Client for the workscope exhibit generator daemon
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies only upon the Python standard library, unless the daemon is not
+#      running, in which case it runs 'workscope_exhibit_tool.py' itself.
+#
+# This script takes the same command line as 'workscope_exhibit_tool.py', and has the same
+# effect, but, if the daemon is running (see 'workscope_exhibit_daemon.py'), has the daemon
+# do the work: it neither imports the tool nor OpenPyXl and Beautiful Soup, so it starts
+# quickly; this makes a difference when the tool is run once per workbook from a script, e.g.:
+#     python workscope_exhibit_daemon.py serve &
+#     for f in *.xlsx; do python workscope_exhibit_client.py --json "$f"; done
+#     python workscope_exhibit_daemon.py stop
+# The output of the tool (written by the daemon) is copied to stdout and stderr as it arrives,
+# and the exit status is that of the tool. If the daemon is not running, or cannot run on
+# this platform, the client runs the tool in-process, as 'workscope_exhibit_tool.py' would.
+#
+# Internals of this Module
+# ========================
+#
+# main - forwards the command line to the daemon, or runs the tool in-process
+#
+###############################################################################
+
+import os
+import sys
+from workscope_exhibit_daemon import get_socket_path, send_request, daemonNotRunning
+
+# Main driver routine for the client; 'argv' is the command line for the tool (without the
+# program name). Return the exit status of the tool.
+def main(argv):
+    stdin_data = None
+    # N.B. Under Windows, the daemon cannot run (and stdin would have to be switched to binary
+    #      mode before being read: see binary_mode in 'workscope_exhibit_tool.py').
+    if sys.platform != 'win32':
+        request = {'command': 'run', 'argv': argv, 'cwd': os.getcwd()}
+        # The workbook is read from stdin if the path given is '-'; the daemon cannot read the
+        # client's stdin, so it is sent along with the request.
+        if '-' in argv:
+            stdin_data = sys.stdin.read()
+        # end_if
+        try:
+            return send_request(get_socket_path(), request, stdin_data)
+        except daemonNotRunning:
+            pass
+        # end_try
+    # end_if
+    import io
+    import workscope_exhibit_tool
+    if stdin_data != None:
+        sys.stdin = io.BytesIO(stdin_data)
+    # end_if
+    return workscope_exhibit_tool.cli_main(argv)
+# end_def main()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
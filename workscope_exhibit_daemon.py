@@ -0,0 +1,490 @@
+# Daemon for the workscope exhibit generator tool
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies only upon the Python standard library at startup; the daemon
+#      preloads 'workscope_exhibit_tool.py' (and hence OpenPyXl and Beautiful Soup).
+#   3. The daemon listens on a Unix-domain socket, and so is available only where these
+#      are (i.e., not under Windows); elsewhere, the client always runs the tool itself.
+#
+# Scripts that run the tool once per workbook pay, for each workbook, for starting the
+# Python interpreter and for importing OpenPyXl and Beautiful Soup: for a small workbook,
+# this takes longer than generating its exhibits. The daemon pays for these once: it
+# imports the tool and the libraries it uses, and then waits for requests on a Unix-domain
+# socket. The client ('workscope_exhibit_client.py') takes the same command line as
+# 'workscope_exhibit_tool.py', and forwards it to the daemon; the daemon forks a child
+# process, which runs the tool's command-line driver (cli_main) in the client's current
+# folder, sending what it writes to stdout and stderr back to the client as it goes,
+# followed by its exit status. If the command line reads a workbook from stdin ('-'),
+# the client sends its stdin along with the command line.
+#
+# A child process is forked for each request, so that requests are run in parallel, and
+# each runs in a fresh copy of the daemon: a request cannot leave anything behind (e.g.,
+# memory, or a changed current folder) to affect the next. Note that the daemon runs the
+# tool's code as it was when the daemon was started: restart it after updating the tool.
+#
+# The socket is, by default, 'workscope_exhibit.sock' in a folder private to the user:
+# $XDG_RUNTIME_DIR if set, else 'workscope_exhibit_<user id>' in the temporary folder, which
+# the daemon creates accessible only to the user (and refuses to use if it is a symbolic
+# link, belongs to another user, or is accessible to other users, as anyone can create a
+# file of that name in the shared temporary folder first). The socket can be overridden by
+# the WORKSCOPE_EXHIBIT_SOCKET environment variable (for both the daemon and the client),
+# or the '--socket' option of the daemon. The socket is created accessible only to the user
+# running the daemon, and the client refuses to connect to a socket belonging to another
+# user (and runs the tool itself instead).
+#
+# Usage:
+#   <Python_installation_folder>/python.exe workscope_exhibit_daemon.py serve [--socket PATH]
+#   <Python_installation_folder>/python.exe workscope_exhibit_daemon.py status|stop [--socket PATH]
+#   <Python_installation_folder>/python.exe workscope_exhibit_client.py <workscope_exhibit_tool.py options and paths>
+# The daemon runs in the foreground until stopped (or interrupted): start it in the
+# background, e.g., with '&', from a build script.
+#
+# Protocol
+# ========
+#
+# Messages in both directions are frames: a 1-character kind, the length of the payload
+# (4 bytes, big-endian), and the payload. The client sends:
+#   'r' - the request, as JSON: a dictionary containing:
+#           command - 'run', 'status', or 'stop'
+#           argv - for 'run', the command-line arguments for the tool
+#           cwd - for 'run', the current folder of the client
+#           stdin - for 'run', True if an 'i' frame follows
+#   'i' - the contents of the client's stdin
+# The daemon replies with any number of:
+#   '1' - output written to stdout
+#   '2' - output written to stderr
+# followed by:
+#   'x' - the exit status, as a decimal integer
+#
+# Internals of this Module
+# ========================
+#
+# get_socket_path - returns the path of the daemon's socket
+#
+# get_socket_dir - returns the folder of the daemon's socket by default
+#
+# make_socket_dir - creates the folder of the daemon's socket, or checks that it is private
+#
+# send_frame, recv_frame - send and receive frames
+#
+# frameWriter - file-like object which sends what is written to it as frames
+#
+# run_request - runs one request, in a child process of the daemon
+#
+# serve - preloads the tool, and serves requests until stopped
+#
+# send_request - sends a request to the daemon, copies its output to stdout and stderr,
+#                and returns its exit status
+#
+# main - parses the command line, and starts, stops, or checks the status of the daemon
+#
+###############################################################################
+
+import os
+import sys
+import io
+import json
+import errno
+import socket
+import struct
+import signal
+import stat
+import argparse
+import tempfile
+import traceback
+
+# Environment variable which, if set, gives the path of the daemon's socket
+SOCKET_PATH_VARIABLE = 'WORKSCOPE_EXHIBIT_SOCKET'
+
+# Header of a frame: kind and length of the payload
+FRAME_HEADER = struct.Struct('>cI')
+
+# How often (in seconds) the daemon stops waiting for requests to collect finished child processes
+REAP_INTERVAL_SECS = 1.0
+
+# Raised by send_request if the daemon is not running (i.e., nothing is listening on the socket),
+# or if the socket belongs to another user
+class daemonNotRunning(Exception):
+    pass
+# end_class daemonNotRunning
+
+# Return the path of the daemon's socket: 'socket_path' if given, else that given by the
+# environment, else the default (see the top of this module).
+def get_socket_path(socket_path=None):
+    if socket_path != None:
+        return socket_path
+    # end_if
+    if os.environ.get(SOCKET_PATH_VARIABLE, '') != '':
+        return os.environ[SOCKET_PATH_VARIABLE]
+    # end_if
+    return os.path.join(get_socket_dir(), 'workscope_exhibit.sock')
+# end_def get_socket_path()
+
+# Return the folder of the daemon's socket by default: $XDG_RUNTIME_DIR if set, else a folder
+# private to the user in the temporary folder (see the top of this module). The folder is not
+# created: see make_socket_dir.
+def get_socket_dir():
+    if os.environ.get('XDG_RUNTIME_DIR', '') != '':
+        return os.environ['XDG_RUNTIME_DIR']
+    # end_if
+    # N.B. os.getuid is not available under Windows, where the daemon cannot run anyway
+    user = str(os.getuid()) if hasattr(os, 'getuid') else ''
+    return os.path.join(tempfile.gettempdir(), 'workscope_exhibit_' + user)
+# end_def get_socket_dir()
+
+# Create the folder 'dirname', accessible only to the user, if it does not exist. Return an
+# error message if it (still) is not a folder belonging to the user and accessible only to
+# them, else None.
+def make_socket_dir(dirname):
+    try:
+        os.mkdir(dirname, 0700)
+    except OSError, e:
+        if e.errno != errno.EEXIST:
+            return 'Unable to create the folder ' + dirname + ' for the socket: ' + e.strerror + '.\n'
+        # end_if
+    # end_try
+    # N.B. lstat, so that a symbolic link planted in place of the folder is not followed
+    st = os.lstat(dirname)
+    if not stat.S_ISDIR(st.st_mode):
+        return 'Refused to use ' + dirname + ' for the socket: it is not a folder.\n'
+    elif st.st_uid != os.getuid():
+        return 'Refused to use ' + dirname + ' for the socket: it belongs to another user.\n'
+    elif st.st_mode & 0077 != 0:
+        return 'Refused to use ' + dirname + ' for the socket: it is accessible to other users.\n'
+    # end_if
+    return None
+# end_def make_socket_dir()
+
+# Send a frame of kind 'kind' with payload 'payload' (a string of bytes) on the socket 'sock'.
+def send_frame(sock, kind, payload):
+    sock.sendall(FRAME_HEADER.pack(kind, len(payload)) + payload)
+# end_def send_frame()
+
+# Helper for recv_frame: return the next 'n' bytes from the socket 'sock', or None if it is closed first.
+def recv_bytes(sock, n):
+    chunks = []
+    while n > 0:
+        chunk = sock.recv(min(n, 65536))
+        if chunk == '':
+            return None
+        # end_if
+        chunks.append(chunk)
+        n -= len(chunk)
+    # end_while
+    return ''.join(chunks)
+# end_def recv_bytes()
+
+# Receive a frame from the socket 'sock'. Return a tuple (kind, payload), or (None, None)
+# if the socket is closed before a whole frame is received.
+def recv_frame(sock):
+    header = recv_bytes(sock, FRAME_HEADER.size)
+    if header == None:
+        return (None, None)
+    # end_if
+    (kind, length) = FRAME_HEADER.unpack(header)
+    payload = recv_bytes(sock, length)
+    if payload == None:
+        return (None, None)
+    # end_if
+    return (kind, payload)
+# end_def recv_frame()
+
+# File-like object standing in for stdout or stderr in a child process of the daemon: what is
+# written to it is sent to the client as frames of kind 'kind' ('1' or '2').
+class frameWriter(object):
+    def __init__(self, sock, kind):
+        self.sock = sock
+        self.kind = kind
+        # Used by the 'print' statement
+        self.softspace = 0
+    # end_def __init__()
+
+    def write(self, s):
+        if isinstance(s, unicode):
+            s = s.encode('UTF-8')
+        # end_if
+        if s != '':
+            send_frame(self.sock, self.kind, s)
+        # end_if
+    # end_def write()
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+        # end_for
+    # end_def writelines()
+
+    def flush(self):
+        pass
+    # end_def flush()
+
+    def isatty(self):
+        return False
+    # end_def isatty()
+# end_class frameWriter
+
+# Run the request 'request' (see the top of this module) received on the socket 'conn', in a
+# child process of the daemon: run the tool's command-line driver with stdin, stdout, and
+# stderr redirected to the client. Return the exit status.
+def run_request(conn, request, stdin_data):
+    import workscope_exhibit_tool
+    # N.B. argparse names the program in messages after sys.argv[0]
+    sys.argv = ['workscope_exhibit_client.py'] + request['argv']
+    sys.stdin = io.BytesIO(stdin_data)
+    sys.stdout = frameWriter(conn, '1')
+    sys.stderr = frameWriter(conn, '2')
+    try:
+        os.chdir(request['cwd'])
+        status = workscope_exhibit_tool.cli_main(request['argv'])
+    except SystemExit, e:
+        # E.g., argparse, for '--help' or a bad command line
+        if e.code == None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            sys.stderr.write(str(e.code) + '\n')
+            status = 1
+        # end_if
+    except:
+        sys.stderr.write(traceback.format_exc())
+        status = 1
+    # end_try
+    return status
+# end_def run_request()
+
+# Helper for serve: handle the connection 'conn' from a client. Return False if the daemon was
+# asked to stop, True otherwise. Requests to run the tool are run in a child process (forked
+# after reading the request, so that the daemon is not held up by a slow client).
+def handle_connection(conn, listener, socket_path):
+    (kind, payload) = recv_frame(conn)
+    if kind != 'r':
+        return True
+    # end_if
+    request = json.loads(payload)
+    command = request.get('command')
+    if command == 'status':
+        send_frame(conn, '1', 'Daemon running (process %d), listening on %s\n' % (os.getpid(), socket_path))
+        send_frame(conn, 'x', '0')
+        return True
+    elif command == 'stop':
+        send_frame(conn, '1', 'Daemon (process %d) stopped.\n' % os.getpid())
+        send_frame(conn, 'x', '0')
+        return False
+    elif command != 'run':
+        send_frame(conn, '2', 'Unknown request: ' + str(command) + '\n')
+        send_frame(conn, 'x', '1')
+        return True
+    # end_if
+    stdin_data = ''
+    if request.get('stdin'):
+        (kind, stdin_data) = recv_frame(conn)
+        if kind != 'i':
+            return True
+        # end_if
+    # end_if
+    pid = os.fork()
+    if pid == 0:
+        # Child process: never returns
+        status = 1
+        try:
+            listener.close()
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            status = run_request(conn, request, stdin_data)
+            send_frame(conn, 'x', str(status))
+            conn.close()
+        except:
+            # E.g., the client went away
+            pass
+        # end_try
+        os._exit(status)
+    # end_if
+    return True
+# end_def handle_connection()
+
+# Helper for serve: collect the exit status of finished child processes.
+def reap_children():
+    while True:
+        try:
+            (pid, status) = os.waitpid(-1, os.WNOHANG)
+        except OSError:
+            # No child processes
+            return
+        # end_try
+        if pid == 0:
+            return
+        # end_if
+    # end_while
+# end_def reap_children()
+
+# Helper for serve: raise SystemExit on SIGTERM, so that the socket is removed.
+def handle_sigterm(signum, frame):
+    sys.exit(0)
+# end_def handle_sigterm()
+
+# Preload the tool, and serve requests on the Unix-domain socket 'socket_path' until asked to
+# stop (see the top of this module). Return 0 when stopped, 1 if the daemon could not be started.
+def serve(socket_path):
+    if not hasattr(socket, 'AF_UNIX'):
+        sys.stderr.write('The daemon needs Unix-domain sockets, which are not available on this platform.\n')
+        return 1
+    # end_if
+    try:
+        send_request(socket_path, {'command': 'status'}, out=io.BytesIO(), err=io.BytesIO())
+        sys.stderr.write('A daemon is already listening on ' + socket_path + '.\n')
+        return 1
+    except daemonNotRunning:
+        pass
+    # end_try
+
+    # Preload the tool, and the libraries it imports only when first used, so that the child
+    # process forked for each request finds them already loaded. Also read and parse the
+    # stylesheet, which is cached for --inline-css.
+    import workscope_exhibit_tool
+    import cssInliner
+    import openpyxl
+    workscope_exhibit_tool.format_html('<html><body></body></html>')
+    try:
+        cssInliner.get_stylesheet(workscope_exhibit_tool.STYLESHEET_PATH)
+    except IOError:
+        pass
+    # end_try
+
+    if os.path.dirname(socket_path) == get_socket_dir():
+        error = make_socket_dir(get_socket_dir())
+        if error != None:
+            sys.stderr.write(error)
+            return 1
+        # end_if
+    # end_if
+
+    # Remove a socket left behind by a daemon which did not exit cleanly
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    # end_if
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0077)
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    # end_try
+    listener.listen(16)
+    listener.settimeout(REAP_INTERVAL_SECS)
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    print 'Daemon (process %d) listening on %s' % (os.getpid(), socket_path)
+    sys.stdout.flush()
+    try:
+        running = True
+        while running:
+            reap_children()
+            try:
+                (conn, address) = listener.accept()
+            except socket.timeout:
+                continue
+            except socket.error, e:
+                if e.errno == errno.EINTR:
+                    continue
+                # end_if
+                raise
+            # end_try
+            conn.settimeout(None)
+            try:
+                running = handle_connection(conn, listener, socket_path)
+            except socket.error:
+                # The client went away
+                pass
+            finally:
+                conn.close()
+            # end_try
+        # end_while
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        os.unlink(socket_path)
+    # end_try
+    print 'Daemon (process %d) stopped.' % os.getpid()
+    return 0
+# end_def serve()
+
+# Send the request 'request' (see the top of this module) to the daemon listening on 'socket_path',
+# and if 'stdin_data' is given, send it as the request's stdin. Copy the output of the request to
+# 'out' and 'err' (by default, stdout and stderr) as it arrives, and return its exit status.
+# Raises daemonNotRunning if no daemon is listening on the socket, or if the socket belongs to
+# another user (who would be sent the request, and could reply with anything).
+def send_request(socket_path, request, stdin_data=None, out=None, err=None):
+    out = out if out != None else sys.stdout
+    err = err if err != None else sys.stderr
+    if not hasattr(socket, 'AF_UNIX'):
+        raise daemonNotRunning()
+    # end_if
+    try:
+        owner = os.stat(socket_path).st_uid
+    except OSError:
+        raise daemonNotRunning()
+    # end_try
+    if owner != os.getuid():
+        err.write('Refused to connect to ' + socket_path + ': it belongs to another user.\n')
+        raise daemonNotRunning()
+    # end_if
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+        except socket.error:
+            raise daemonNotRunning()
+        # end_try
+        request = dict(request)
+        request['stdin'] = stdin_data != None
+        send_frame(sock, 'r', json.dumps(request))
+        if stdin_data != None:
+            send_frame(sock, 'i', stdin_data)
+        # end_if
+        while True:
+            (kind, payload) = recv_frame(sock)
+            if kind == '1':
+                out.write(payload)
+                out.flush()
+            elif kind == '2':
+                err.write(payload)
+                err.flush()
+            elif kind == 'x':
+                return int(payload)
+            else:
+                err.write('The daemon on ' + socket_path + ' ended the request without an exit status.\n')
+                return 1
+            # end_if
+        # end_while
+    finally:
+        sock.close()
+    # end_try
+# end_def send_request()
+
+# Main driver routine for the daemon.
+def main(argv):
+    parser = argparse.ArgumentParser(description='Daemon for the workscope exhibit generator tool: see also '
+                                                 'workscope_exhibit_client.py.')
+    parser.add_argument('command', choices=['serve', 'status', 'stop'],
+                        help='serve: preload the tool and serve requests until stopped; '
+                             'status: report whether the daemon is running; stop: stop the daemon')
+    parser.add_argument('--socket', default=None,
+                        help='path of the Unix-domain socket (default: $' + SOCKET_PATH_VARIABLE + ', or ' +
+                             get_socket_path() + ')')
+    args = parser.parse_args(argv)
+
+    socket_path = get_socket_path(args.socket)
+    if args.command == 'serve':
+        return serve(socket_path)
+    # end_if
+    try:
+        return send_request(socket_path, {'command': args.command})
+    except daemonNotRunning:
+        print 'No daemon is listening on ' + socket_path + '.'
+        return 1
+    # end_try
+# end_def main()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
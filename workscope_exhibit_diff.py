@@ -0,0 +1,459 @@
+# Structural diff of two versions of a workscope exhibit workbook
+#
+# NOTES:
+#   1. This module was written to run under Python 2.7.x
+#   2. This module relies upon the 'excelFileManager.py' and 'workscope_exhibit_tool.py'
+#      modules (and hence upon OpenPyXl) to read workbooks.
+#
+# This tool reports the differences between the workscope exhibits of two workbooks,
+# typically two revisions of the same scope of work:
+#   - changes to the project name, overhead rate, or units of the schedule
+#   - tasks added, removed, or renamed
+#   - changes to the person-weeks of each salary grade, for each task and in total
+#   - changes to the costs of each task, the other direct costs, and the totals (with the deltas)
+#   - schedule bars moved or resized, and milestones moved, in Exhibit 1
+#   - milestones added, removed, or renamed, and funding sources added or removed
+# It compares the data extracted from the workbooks (see gen_exhibit_data in
+# 'workscope_exhibit_tool.py'), rather than the text of the generated HTML, so that each
+# change is reported once, in terms of the tasks, grades, and schedule units concerned.
+#
+# Tasks are matched by their task number; worksheets (for workbooks containing several
+# workscopes) by their name, or, if each workbook contains a single workscope, to each other.
+#
+# If a portfolio index (see 'portfolioIndex.py') is given with the '--db' option, it is used
+# as a cache: a workbook whose contents are already in the index is not read again, and one
+# that is not is added to it. Otherwise, both workbooks are read.
+#
+# Usage:
+#   <Python_installation_folder>/python.exe workscope_exhibit_diff.py old.xlsx new.xlsx [options]
+# Run with '--help' for the options. As for the 'diff' utility, the exit code is 0 if no
+# differences were found, 1 if some were, and 2 if either workbook could not be read.
+#
+# Internals of this Module
+# ========================
+#
+# load_workbook_data - returns the data extracted from each workscope worksheet of a workbook
+#
+# diff_sheet_data - compares the data for two versions of a workscope worksheet
+#
+# diff_workbook_data - compares the data for two versions of a workbook, worksheet by worksheet
+#
+# gen_diff_text, gen_diff_html - format the differences as plain text or as HTML
+#
+# main - parses the command line, and reports the differences
+#
+###############################################################################
+
+import sys
+import cgi
+import argparse
+from excelFileManager import workbookSession
+from workscope_exhibit_tool import gen_exhibit_data, format_person_weeks, format_dollars, write_bytes_to_file
+from stringAccumulator import stringAccumulator
+
+# Sections of the report, in order
+DIFF_SECTIONS = ['Project', 'Tasks', 'Person-weeks', 'Costs', 'Schedule', 'Milestones', 'Funding sources']
+
+# Cost items of each task (and of the 'Total' row of Exhibit 2) that are compared, with their descriptions
+TASK_COST_ITEMS = [('direct_salary', 'direct salary'), ('overhead', 'overhead'), ('total_cost', 'total cost')]
+
+# Cost items of a worksheet as a whole that are compared, with their descriptions
+SHEET_COST_ITEMS = [('direct_salary_total', 'Total direct salary'),
+                    ('other_direct_costs_total', 'Total other direct costs'),
+                    ('total_cost', 'Total cost')]
+
+# Return the data extracted from each workscope worksheet of the workbook 'fullpath', using the
+# portfolio index 'index' as a cache if it is not None. Return a tuple (errors, exported), as for
+# portfolioIndex.get_workbook_data.
+def load_workbook_data(fullpath, index=None):
+    if index != None:
+        return index.get_workbook_data(fullpath)
+    # end_if
+    with workbookSession(fullpath) as session:
+        if session.errors != '':
+            return (session.errors, [])
+        # end_if
+        exDatas = session.extract()
+    # end_with
+    return ('', [gen_exhibit_data(exData, fullpath) for exData in exDatas])
+# end_def load_workbook_data()
+
+# Return a value from the extracted data as text, for use in the report.
+def show(value):
+    if value == None:
+        return '(blank)'
+    elif isinstance(value, float) and value == int(value):
+        return unicode(int(value))
+    # end_if
+    return unicode(value)
+# end_def show()
+
+# Return True if 'value' is a number (as opposed to text, or None for an empty cell).
+def is_number(value):
+    return isinstance(value, (int, long, float)) and not isinstance(value, bool)
+# end_def is_number()
+
+# Describe the change of a quantity from 'old' to 'new', formatted by the function 'fmt';
+# empty cells count as 0. Return None if there is no change.
+def describe_change(old, new, fmt):
+    old = 0 if old == None else old
+    new = 0 if new == None else new
+    if is_number(old) and is_number(new):
+        if abs(new - old) < 1e-9:
+            return None
+        # end_if
+        delta = new - old
+        return fmt(old) + ' -> ' + fmt(new) + ' (' + ('+' if delta > 0 else '-') + fmt(abs(delta)) + ')'
+    # end_if
+    if old == new:
+        return None
+    # end_if
+    return fmt_value(old, fmt) + ' -> ' + fmt_value(new, fmt)
+# end_def describe_change()
+
+def fmt_dollars(dollars):
+    return '$' + format_dollars(dollars)
+# end_def fmt_dollars()
+
+# Return 'value' formatted by the function 'fmt' if it is a number (0 if it is None), else as text.
+def fmt_value(value, fmt):
+    if value == None:
+        value = 0
+    # end_if
+    return fmt(value) if is_number(value) else show(value)
+# end_def fmt_value()
+
+# Return the label of a task, e.g., 'Task 3'.
+def task_label(task):
+    return 'Task ' + show(task['number'])
+# end_def task_label()
+
+# Return a dictionary: key -> task, for the list of tasks 'tasks', and the list of keys in order.
+# Tasks are keyed by task number, or by position if they have none (or it is repeated).
+def key_tasks(tasks):
+    retval = {}
+    keys = []
+    for (task_ix, task) in enumerate(tasks):
+        key = show(task['number']) if task['number'] != None else '#' + str(task_ix)
+        if key in retval:
+            key = '#' + str(task_ix)
+        # end_if
+        retval[key] = task
+        keys.append(key)
+    # end_for
+    return (retval, keys)
+# end_def key_tasks()
+
+# Describe the span of a schedule item, e.g., 'Quarter 1, Month 2 - Quarter 2, Month 1'.
+def show_span(item):
+    if item['start'] == item['end']:
+        return item['start_label']
+    # end_if
+    return item['start_label'] + ' - ' + item['end_label']
+# end_def show_span()
+
+# Compare the schedules of two versions of the same task, appending the changes found to 'changes'.
+def diff_task_schedule(label, old_task, new_task, changes):
+    old_bars = [item for item in old_task['schedule'] if item['type'] == 'bar']
+    new_bars = [item for item in new_task['schedule'] if item['type'] == 'bar']
+    if len(old_bars) == len(new_bars):
+        # Pair the bars in chronological order
+        for (old, new) in zip(old_bars, new_bars):
+            if (old['start'], old['end']) == (new['start'], new['end']):
+                continue
+            # end_if
+            if old['end'] - old['start'] == new['end'] - new['start']:
+                what = 'moved'
+            elif old['start'] == new['start'] or old['end'] == new['end']:
+                what = 'resized'
+            else:
+                what = 'moved and resized'
+            # end_if
+            changes.append(('Schedule', label + ': bar ' + what + ' from ' + show_span(old) + ' to ' + show_span(new)))
+        # end_for
+    else:
+        old_spans = [(item['start'], item['end']) for item in old_bars]
+        new_spans = [(item['start'], item['end']) for item in new_bars]
+        for item in old_bars:
+            if (item['start'], item['end']) not in new_spans:
+                changes.append(('Schedule', label + ': bar removed from ' + show_span(item)))
+            # end_if
+        # end_for
+        for item in new_bars:
+            if (item['start'], item['end']) not in old_spans:
+                changes.append(('Schedule', label + ': bar added at ' + show_span(item)))
+            # end_if
+        # end_for
+    # end_if
+
+    old_milestones = dict([(item['milestone'], item) for item in old_task['schedule'] if item['type'] == 'milestone'])
+    new_milestones = dict([(item['milestone'], item) for item in new_task['schedule'] if item['type'] == 'milestone'])
+    for (milestone, item) in sorted(old_milestones.items()):
+        if milestone not in new_milestones:
+            changes.append(('Schedule', label + ': milestone ' + show(milestone) + ' removed from ' + show_span(item)))
+        elif item['start'] != new_milestones[milestone]['start']:
+            changes.append(('Schedule', label + ': milestone ' + show(milestone) + ' moved from ' + show_span(item) +
+                            ' to ' + show_span(new_milestones[milestone])))
+        # end_if
+    # end_for
+    for (milestone, item) in sorted(new_milestones.items()):
+        if milestone not in old_milestones:
+            changes.append(('Schedule', label + ': milestone ' + show(milestone) + ' added at ' + show_span(item)))
+        # end_if
+    # end_for
+# end_def diff_task_schedule()
+
+# Compare the person-weeks by grade and the costs of two versions of a task (or of the 'Total' row),
+# appending the changes found to 'changes'.
+def diff_task_costs(label, old_task, new_task, changes):
+    grades = sorted(set(old_task['person_weeks'].keys()) | set(new_task['person_weeks'].keys()))
+    for grade in grades:
+        change = describe_change(old_task['person_weeks'].get(grade), new_task['person_weeks'].get(grade), format_person_weeks)
+        if change != None:
+            changes.append(('Person-weeks', label + ', ' + grade + ': ' + change))
+        # end_if
+    # end_for
+    change = describe_change(old_task['total_person_weeks'], new_task['total_person_weeks'], format_person_weeks)
+    if change != None:
+        changes.append(('Person-weeks', label + ', total: ' + change))
+    # end_if
+    for (item, description) in TASK_COST_ITEMS:
+        change = describe_change(old_task[item], new_task[item], fmt_dollars)
+        if change != None:
+            changes.append(('Costs', label + ' ' + description + ': ' + change))
+        # end_if
+    # end_for
+# end_def diff_task_costs()
+
+# Compare the data 'old' and 'new' for two versions of a workscope worksheet (as returned by
+# gen_exhibit_data). Return a list of tuples (section, description), one per change found,
+# where 'section' is one of DIFF_SECTIONS; the list is empty if there are no differences.
+def diff_sheet_data(old, new):
+    changes = []
+    for (item, description) in [('project_name', 'Project name'), ('overhead_rate', 'Overhead rate'),
+                                ('sched_major_units', 'Major schedule units'), ('sched_minor_units', 'Minor schedule units')]:
+        if old[item] != new[item]:
+            changes.append(('Project', description + ': ' + show(old[item]) + ' -> ' + show(new[item])))
+        # end_if
+    # end_for
+
+    (old_tasks, old_keys) = key_tasks(old['tasks'])
+    (new_tasks, new_keys) = key_tasks(new['tasks'])
+    for key in old_keys:
+        task = old_tasks[key]
+        if key not in new_tasks:
+            changes.append(('Tasks', task_label(task) + ' removed: ' + show(task['name']) + ' (' +
+                            fmt_value(task['total_person_weeks'], format_person_weeks) + ' person-weeks, ' +
+                            fmt_value(task['total_cost'], fmt_dollars) + ')'))
+        # end_if
+    # end_for
+    for key in new_keys:
+        task = new_tasks[key]
+        if key not in old_tasks:
+            changes.append(('Tasks', task_label(task) + ' added: ' + show(task['name']) + ' (' +
+                            fmt_value(task['total_person_weeks'], format_person_weeks) + ' person-weeks, ' +
+                            fmt_value(task['total_cost'], fmt_dollars) + ')'))
+            continue
+        # end_if
+        old_task = old_tasks[key]
+        label = task_label(task)
+        if old_task['name'] != task['name']:
+            changes.append(('Tasks', label + ' renamed: ' + show(old_task['name']) + ' -> ' + show(task['name'])))
+        # end_if
+        diff_task_costs(label, old_task, task, changes)
+        diff_task_schedule(label, old_task, task, changes)
+    # end_for
+    diff_task_costs('Total', old['totals'], new['totals'], changes)
+
+    old_odcs = dict([(show(odc['name']), odc['cost']) for odc in old['other_direct_costs']])
+    new_odcs = dict([(show(odc['name']), odc['cost']) for odc in new['other_direct_costs']])
+    for name in [show(odc['name']) for odc in old['other_direct_costs']]:
+        if name not in new_odcs:
+            changes.append(('Costs', 'Other direct costs, ' + name + ': removed (' + fmt_value(old_odcs[name], fmt_dollars) + ')'))
+        # end_if
+    # end_for
+    for name in [show(odc['name']) for odc in new['other_direct_costs']]:
+        change = describe_change(old_odcs.get(name), new_odcs[name], fmt_dollars)
+        if name not in old_odcs:
+            changes.append(('Costs', 'Other direct costs, ' + name + ': added (' + fmt_value(new_odcs[name], fmt_dollars) + ')'))
+        elif change != None:
+            changes.append(('Costs', 'Other direct costs, ' + name + ': ' + change))
+        # end_if
+    # end_for
+    for (item, description) in SHEET_COST_ITEMS:
+        change = describe_change(old[item], new[item], fmt_dollars)
+        if change != None:
+            changes.append(('Costs', description + ': ' + change))
+        # end_if
+    # end_for
+
+    # N.B. Milestone labels are typically of the form 'A:'
+    old_milestones = dict([(show(m['label']).rstrip(':'), m['name']) for m in old['milestones']])
+    new_milestones = dict([(show(m['label']).rstrip(':'), m['name']) for m in new['milestones']])
+    for m in old['milestones']:
+        label = show(m['label']).rstrip(':')
+        if label not in new_milestones:
+            changes.append(('Milestones', 'Milestone ' + label + ' removed: ' + show(m['name'])))
+        # end_if
+    # end_for
+    for m in new['milestones']:
+        label = show(m['label']).rstrip(':')
+        if label not in old_milestones:
+            changes.append(('Milestones', 'Milestone ' + label + ' added: ' + show(m['name'])))
+        elif old_milestones[label] != m['name']:
+            changes.append(('Milestones', 'Milestone ' + label + ' renamed: ' + show(old_milestones[label]) +
+                            ' -> ' + show(m['name'])))
+        # end_if
+    # end_for
+
+    for name in old['funding_sources']:
+        if name not in new['funding_sources']:
+            changes.append(('Funding sources', 'Removed: ' + show(name)))
+        # end_if
+    # end_for
+    for name in new['funding_sources']:
+        if name not in old['funding_sources']:
+            changes.append(('Funding sources', 'Added: ' + show(name)))
+        # end_if
+    # end_for
+
+    # Group the changes by section, keeping their order within each section
+    changes.sort(key=lambda change: DIFF_SECTIONS.index(change[0]))
+    return changes
+# end_def diff_sheet_data()
+
+# Compare the data for two versions of a workbook, 'old_exported' and 'new_exported' (each a list
+# of the data for its workscope worksheets, as returned by load_workbook_data).
+# Return a list of tuples (sheet_name, status, changes), one per worksheet, where:
+#   sheet_name - the name of the worksheet (or 'old name -> new name', if they differ)
+#   status - 'changed', 'unchanged', 'added', or 'removed'
+#   changes - list of the changes found, as returned by diff_sheet_data
+def diff_workbook_data(old_exported, new_exported):
+    retval = []
+    if len(old_exported) == 1 and len(new_exported) == 1:
+        pairs = [(old_exported[0], new_exported[0])]
+    else:
+        new_by_name = dict([(data['sheet_name'], data) for data in new_exported])
+        old_names = [data['sheet_name'] for data in old_exported]
+        pairs = [(data, new_by_name.get(data['sheet_name'])) for data in old_exported]
+        pairs += [(None, data) for data in new_exported if data['sheet_name'] not in old_names]
+    # end_if
+    for (old, new) in pairs:
+        if new == None:
+            retval.append((old['sheet_name'], 'removed', []))
+        elif old == None:
+            retval.append((new['sheet_name'], 'added', []))
+        else:
+            sheet_name = old['sheet_name']
+            if new['sheet_name'] != old['sheet_name']:
+                sheet_name += ' -> ' + new['sheet_name']
+            # end_if
+            changes = diff_sheet_data(old, new)
+            retval.append((sheet_name, 'changed' if len(changes) > 0 else 'unchanged', changes))
+        # end_if
+    # end_for
+    return retval
+# end_def diff_workbook_data()
+
+# Return the number of differences in 'diffs' (as returned by diff_workbook_data).
+def count_differences(diffs):
+    return sum([len(changes) if status in ['changed', 'unchanged'] else 1 for (sheet_name, status, changes) in diffs])
+# end_def count_differences()
+
+# Format the differences 'diffs' between the workbooks 'old_fullpath' and 'new_fullpath' as plain text.
+def gen_diff_text(old_fullpath, new_fullpath, diffs):
+    textAcc = stringAccumulator()
+    textAcc.append('Comparing ' + old_fullpath + ' and ' + new_fullpath + '\n')
+    for (sheet_name, status, changes) in diffs:
+        textAcc.append('Worksheet ' + sheet_name + ': ' + status + '\n')
+        section = None
+        for (change_section, description) in changes:
+            if change_section != section:
+                section = change_section
+                textAcc.append('  ' + section + ':\n')
+            # end_if
+            textAcc.append('    ' + description + '\n')
+        # end_for
+    # end_for
+    textAcc.append(str(count_differences(diffs)) + ' difference(s) found.\n')
+    return textAcc.get()
+# end_def gen_diff_text()
+
+# Format the differences 'diffs' between the workbooks 'old_fullpath' and 'new_fullpath' as an HTML page.
+def gen_diff_html(old_fullpath, new_fullpath, diffs):
+    htmlAcc = stringAccumulator()
+    htmlAcc.append('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n')
+    htmlAcc.append('<title>Workscope differences</title>\n')
+    htmlAcc.append('<link rel="stylesheet" type="text/css" href="ctps_work_scope.css">\n</head>\n<body>\n')
+    htmlAcc.append('<h1>Comparing ' + cgi.escape(old_fullpath) + ' and ' + cgi.escape(new_fullpath) + '</h1>\n')
+    for (sheet_name, status, changes) in diffs:
+        htmlAcc.append('<h2>Worksheet ' + cgi.escape(sheet_name) + ': ' + status + '</h2>\n')
+        section = None
+        for (change_section, description) in changes:
+            if change_section != section:
+                if section != None:
+                    htmlAcc.append('</ul>\n')
+                # end_if
+                section = change_section
+                htmlAcc.append('<h3>' + section + '</h3>\n<ul>\n')
+            # end_if
+            htmlAcc.append('<li>' + cgi.escape(description) + '</li>\n')
+        # end_for
+        if section != None:
+            htmlAcc.append('</ul>\n')
+        # end_if
+    # end_for
+    htmlAcc.append('<p>' + str(count_differences(diffs)) + ' difference(s) found.</p>\n</body>\n</html>\n')
+    return htmlAcc.get()
+# end_def gen_diff_html()
+
+# Main driver routine for the diff tool.
+def main(argv):
+    parser = argparse.ArgumentParser(description='Report the differences between the workscope exhibits of two workbooks.')
+    parser.add_argument('old', help='.xlsx file containing the old version')
+    parser.add_argument('new', help='.xlsx file containing the new version')
+    parser.add_argument('--format', choices=['text', 'html'], default='text', help='format of the report (default: text)')
+    parser.add_argument('--output', default=None, help='file to which the report is written (default: standard output)')
+    parser.add_argument('--db', default=None,
+                        help='portfolio index (SQLite database file) used as a cache of the data extracted from workbooks')
+    args = parser.parse_args(argv)
+
+    index = None
+    if args.db != None:
+        # N.B. Imported here, as the index is only needed with this option.
+        from portfolioIndex import portfolioIndex
+        index = portfolioIndex(args.db)
+    # end_if
+    try:
+        exported = []
+        for fullpath in [args.old, args.new]:
+            (errors, data) = load_workbook_data(fullpath, index)
+            if errors != '':
+                sys.stderr.write('Errors found when reading ' + fullpath + ':\n' + errors)
+                return 2
+            # end_if
+            exported.append(data)
+        # end_for
+    finally:
+        if index != None:
+            index.close()
+        # end_if
+    # end_try
+
+    diffs = diff_workbook_data(exported[0], exported[1])
+    if args.format == 'html':
+        report = gen_diff_html(args.old, args.new, diffs)
+    else:
+        report = gen_diff_text(args.old, args.new, diffs)
+    # end_if
+    report = report.encode('UTF-8')
+    if args.output != None:
+        write_bytes_to_file(report, args.output)
+    else:
+        sys.stdout.write(report)
+    # end_if
+    return 1 if count_differences(diffs) > 0 else 0
+# end_def main()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
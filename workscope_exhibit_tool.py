@@ -28,7 +28,16 @@
 # Internals of this Module: Top-level Functions
 # =============================================
 #
-# main - main driver routine for this program
+# main - main driver routine for this program; reads the input .xlsx file using
+#        initExcelFile and extract_exhibit_data (see excelFileManager.py), and passes
+#        the data extracted ('exData') to gen_exhibit_1 and gen_exhibit_2
+#
+# stream_exhibits - alternative to main for use in a pipeline: reads the input .xlsx file
+#                   from a file-like object (e.g., stdin), and writes the HTML for one
+#                   exhibit, or a tar or zip archive of the HTML for both, to another
+#                   (e.g., stdout)
+#
+# cli_main - parses the command line, and calls main, stream_exhibits, or the validator
 #
 # gen_exhibit_1 - driver routine for generating Exhibit 1;
 #                 calls gen_exhibit_1_initial_boilerplate,
@@ -40,7 +49,15 @@
 # gen_exhibit_1_final_boilerplate - generates boilerplate HTML at end of Exhibit 1
 #
 # gen_exhibit_1_body - driver routine for producing HTML for the body of Exhibit 1;
-#                      calls gen_ex1_schedule_table and  gen_ex1_milestone_div
+#                      calls gen_ex1_schedule_table and  gen_ex1_milestone_div,
+#                      or, if the schedule is split into pages, gen_exhibit_1_paged_body
+#
+# gen_exhibit_1_paged_body - driver routine for producing HTML for the body of Exhibit 1
+#                            when the schedule is split into pages; calls render_ex1_page
+#
+# render_ex1_page - generates the HTML for one page of Exhibit 1, and returns it
+#
+# get_ex1_pages - returns the pages into which the schedule in Exhibit 1 is split
 #
 # gen_ex1_schedule_table - driver routine for generating HTML for the schedule
 #                          <table> in Exhibit 1
@@ -63,6 +80,9 @@
 #                 calls gen_exhibit_2_initial_boilerplate,
 #                 gen_exhibit_2_body, and gen_exhibit_2_final_boilerplate
 #
+# gen_exhibit_data - returns the data shown in Exhibits 1 and 2 in a form suitable for
+#                    export as JSON (see format_json)
+#
 # gen_exhibit_2_initial_boilerplate - generates boilerplate HTML at beginning of
 #                                     Exhibit 2
 #
@@ -98,6 +118,42 @@
 #                  string with zero decimal places of precision (i.e., an integer),
 #                  using the ',' symbol as the thousands delimeter
 #
+# format_cost_rows - formats the rows of the salary cost table, column by column
+#
+# format_html - pretty-formats generated HTML and encodes it as UTF-8
+#
+# write_bytes_to_file - writes a string of bytes to a file, replacing it atomically
+#
+# write_output_file - writes an output file and, optionally, compressed copies of it
+#                     for static serving; files already up to date are not re-written
+#
+# get_hash_on_disk - returns the hash of an existing output file, as the record of
+#                    what was last written to it outside batch mode
+#
+# compress_bytes - compresses a string of bytes with gzip or brotli
+#
+# get_output_filenames - returns the names of the output HTML files for a given input
+#                        .xlsx file and worksheet
+#
+# get_data_filename - returns the name of the output JSON file for a given input .xlsx
+#                     file and worksheet
+#
+# format_json - formats data exported by gen_exhibit_data as JSON, encoded as UTF-8
+#
+# inline_stylesheet - replaces the link to the stylesheet in an exhibit by a pruned,
+#                     minified copy of it
+#
+# render_exhibit - generates the HTML for Exhibit 1 or 2 for one worksheet, and returns it
+#
+# render_exhibits_to_bytes - generates the HTML for Exhibits 1 and 2 for one worksheet,
+#                            and returns it
+#
+# render_output - generates the HTML for Exhibit 1 or 2, or the JSON data, for one
+#                 worksheet, and writes it to disk
+#
+# render_outputs_in_threads - calls render_output for several outputs concurrently, on
+#                             threads of their own
+#
 # col_ix_to_temporal_string - maps a column index in the schedule portion of the input 
 #                             .xlsx file to a text string that expresses the point in 
 #                             time indicated by the input column index in terms of the 
@@ -110,16 +166,40 @@ import os
 import sys
 import math
 import re
-import openpyxl
-from bs4 import BeautifulSoup
-from excelFileManager import initExcelFile, get_column_index, get_row_index, get_cell_contents, \
+import multiprocessing
+import threading
+import argparse
+import tarfile
+import zipfile
+import time
+import io
+import json
+import gzip
+# The brotli module is optional: if it is not installed, only .gz copies of the output files
+# are written (see write_output_file).
+try:
+    import brotli
+except ImportError:
+    brotli = None
+# N.B. Beautiful Soup is imported by format_html, and OpenPyXl by excelFileManager.open_workbook,
+#      rather than here: see the note on startup time in 'excelFileManager.py'.
+from excelFileManager import initExcelFile, initExcelWorkbook, get_workbook_errors, workbookSession, WORKSCOPE_SHEET_NAME, get_column_index, get_row_index, get_cell_contents, \
                              get_last_used_sched_column, MAGIC_FILL_STYLE, \
-                             dump_xlsInfo
+                             dump_xlsInfo, extract_exhibit_data, get_exhibit_warnings, SALARY_GRADE_COLUMNS, COST_TABLE_COLUMNS
 from stringAccumulator import stringAccumulator
+from htmlTemplate import compile_template
+from batchManifest import hash_bytes, hash_file
+from cssInliner import get_pruned_css, get_used_names
 
 debug_flags = {}
 debug_flags['dump_sched_elements'] = False
 
+# The stylesheet linked to by the exhibits, found in the same folder as this module, and the
+# <link> element for it; see inline_stylesheet.
+STYLESHEET_FILENAME = 'ctps_work_scope_print.css'
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), STYLESHEET_FILENAME)
+STYLESHEET_LINK = '<link rel="stylesheet" type="text/css" href="./' + STYLESHEET_FILENAME + '">'
+
 # Global pseudo-constants:
 # Width of table HEADER cells in the schedule table
 SCHED_HEADER_CELL_WITDH_IN_PTS_12PX_BORDER = 33.9375
@@ -142,20 +222,50 @@ def format_dollars(dollars):
     return retval
 # end_def format_dollars()
 
+# Columns of the salary cost table, other than those for the salary grades, that appear in 
+# every row of Exhibit 2, in order; and the function used to format each of them.
+COST_TABLE_SUMMARY_COLUMNS = [('total_col_ix', format_person_weeks),
+                              ('direct_salary_col_ix', lambda x: '$' + format_dollars(x)),
+                              ('overhead_col_ix', lambda x: '$' + format_dollars(x)),
+                              ('total_cost_col_ix', lambda x: '$' + format_dollars(x))]
+
+# Format the rows of the salary cost table 'cost_rows' (e.g., exData['cost_block']), each a 
+# list of values in the order of COST_TABLE_COLUMNS, for output in Exhibit 2.
+# Return a list of rows, one per input row, each a list of strings: the person-weeks for each
+# of the salary grades in 'real_cols_info' (see gen_ex2_salary_cost_table_div), followed by
+# the columns in COST_TABLE_SUMMARY_COLUMNS.
+# N.B. The rows are transposed, and each column is formatted in one go, before being 
+#      transposed back; i.e., the formatting function for each column is looked up once 
+#      per table rather than once per cell.
+def format_cost_rows(cost_rows, real_cols_info):
+    if len(cost_rows) == 0:
+        return []
+    # end_if
+    columns = zip(*cost_rows)
+    formatted = []
+    for col_info in real_cols_info:
+        formatted.append(map(format_person_weeks, columns[col_info['cost_ix']]))
+    # end_for
+    for (col, format_fn) in COST_TABLE_SUMMARY_COLUMNS:
+        formatted.append(map(format_fn, columns[COST_TABLE_COLUMNS.index(col)]))
+    # end_for
+    return zip(*formatted)
+# end_def format_cost_rows()
+
 # Map a column index in the schedule portion of the input .xlsx file to
 # a text string that expresses the point in time indicated by the 
 # input column index in terms of the major- and minor-units of the schedule.
 # Example: Map column index X to "Month 3, Week 1"
-def col_ix_to_temporal_string(col_ix, xlsInfo):
+def col_ix_to_temporal_string(col_ix, exData):
     retval = ''
-    maj_unit = xlsInfo['sched_major_units']
-    min_unit = xlsInfo['sched_minor_units']
-    num_subdivisions = xlsInfo['num_sched_subdivisions']
+    maj_unit = exData['sched_major_units']
+    min_unit = exData['sched_minor_units']
+    num_subdivisions = exData['num_sched_subdivisions']
     
     # The trick  here is to remember that after 'unbiasing' the input column index
     # by the index of the first column in the schedule, the result will be 0-based,
     # whereas human beings think of the first <time unit> of a schedule as <time unit> 1.    
-    start_abs = (col_ix - xlsInfo['first_schedule_col_ix']) + num_subdivisions
+    start_abs = (col_ix - exData['first_schedule_col_ix']) + num_subdivisions
     maj_abs = start_abs / num_subdivisions
     # The same principle applies to the minor schedule units
     min_abs = (start_abs % num_subdivisions) + 1
@@ -166,92 +276,114 @@ def col_ix_to_temporal_string(col_ix, xlsInfo):
     return retval
 # end_def_col_ix_to_temporal_string()
 
-def gen_ex1_task_tr_2nd_td(htmlAcc, task_num, task_row_ix, xlsInfo):
+# Templates for the elements of the schedule table in Exhibit 1: see htmlTemplate.py.
+# Each is compiled once, when this module is loaded. The values of all fields are HTML-escaped.
+#
+# N.B. The ids of the elements of the schedule table end with the 'id_suffix' of the page of the
+#      schedule they are on (see get_ex1_pages): '' unless the schedule is split into pages.
+#
+# Opening tag of the schedule table of a page of a schedule split into pages (the table of a
+# schedule that is not split keeps its original opening tag: see gen_ex1_schedule_table)
+EX1_PAGED_TABLE_START = compile_template('<table id="ex1Tbl{id_suffix}" class="ex1PagedTbl" summary="Breakdown of schedule ' +
+                                         'by tasks in column one and calendar time ranges and deliverable dates in column two.">')
+# Header cell for the 'Task' column
+EX1_TASK_HEADER_CELL = compile_template('<th id="ex1taskTblHdr{id_suffix}" class="colTblHdr" rowspan="2"><br>Task</th>')
+# Header cell for the name of the MAJOR schedule unit, e.g., 'Month'
+EX1_MAJOR_UNITS_HEADER_CELL = compile_template('<th id="ex1weekTblHeader{id_suffix}" class="colTblHdr" colspan="{colspan}">{units}</th>')
+# Header cell for a MAJOR schedule unit
+EX1_SCHED_HEADER_CELL = compile_template('<th id="timeUnit{num}" class="{cell_class}" abbr="Schedule range">{num}</th>')
+# First <td> in the row for a task: task number and task name
+EX1_TASK_TD = compile_template('<td id="row{task_num}{id_suffix}" headers="ex1taskTblHdr{id_suffix}" class="{cell_class}">' +
+                               '<div class="taskNumDiv">{task_num}.</div>' +
+                               '<div class="taskNameDiv">{name}</div>' +
+                               '</td>')
+# Opening tag of the second <td> in the row for a task
+# *** TBD: 'timeUnit1' (or, on a page of a schedule split into pages, the first unit on the page)
+#          seems to ALWAYS be incuded as a header. Is this right?
+EX1_SCHED_TD_START = compile_template('<td colspan="{colspan}" headers="row{task_num}{id_suffix} timeUnit{first_unit}" class="{cell_class}">')
+# A schedule 'bar', with text for screen readers
+EX1_SCHED_BAR = compile_template('<div class="schedElemDiv">' +
+                                 '<div class="scheduleBar" style="left:{left}px;width:{width}px">' +
+                                 '<div class="overflowHiddenTextDiv">From {start} to {end}.</div>' +
+                                 '</div></div>')
+# The part of a schedule 'bar' on one page of a schedule split into pages, when the bar runs onto
+# other pages; the text for screen readers gives both the part shown and the whole bar
+EX1_SCHED_BAR_PART = compile_template('<div class="schedElemDiv">' +
+                                      '<div class="scheduleBar" style="left:{left}px;width:{width}px">' +
+                                      '<div class="overflowHiddenTextDiv">From {start} to {end}, ' +
+                                      'part of the period from {bar_start} to {bar_end}.</div>' +
+                                      '</div></div>')
+# A milestone/deliverable, with text for screen readers
+EX1_SCHED_MILESTONE = compile_template('<div class="schedElemDiv">' +
+                                       '<div class="deliverableCodeDiv" style="left:{left}px;">' +
+                                       '<div class="overflowHiddenTextDiv">Deliverable</div>' +
+                                       '{milestone}' +
+                                       '<div class="overflowHiddenTextDiv">Delivered by {start}.</div>' +
+                                       '</div></div>')
+# One entry in the list of milestones/deliverables
+EX1_MILESTONE_ENTRY = compile_template('<span class="label">{label}</span>{name}<br>')
+# The line of the <h1> of a page of Exhibit 1, when the schedule is split into pages
+EX1_PAGE_LINE = compile_template('Page {page_num} of {num_pages}: {units} {first_unit} to {units} {last_unit}<br>')
+EX1_PAGE_LINE_1_UNIT = compile_template('Page {page_num} of {num_pages}: {units} {unit}<br>')
+
+# Return the list of the 'pages' into which the schedule table of Exhibit 1 is split, each showing
+# (at most) 'page_units' of the MAJOR schedule units, so that a long schedule (e.g., two years, in
+# weeks) is not generated as a single table too wide to be laid out or printed legibly. If
+# 'page_units' is 0, or the schedule has no more than that many units, there is a single page,
+# showing the whole schedule in a single table, as Exhibit 1 always has. Each page is a dictionary:
+#   page_num - number of the page (1-based)
+#   num_pages - number of pages
+#   first_unit - number of the first MAJOR schedule unit on the page (1-based)
+#   num_units - number of MAJOR schedule units on the page
+#   first_col_ix - index of the first column of the schedule in the input .xlsx file on the page
+#   last_col_ix - index of the last column of the schedule in the input .xlsx file on the page
+#   id_suffix - suffix of the ids of the elements of the page's schedule table, which must be unique
+#               in the exhibit: '' if there is a single page; otherwise, e.g., '_p2' for page 2
+def get_ex1_pages(exData, page_units=0):
+    total_units = exData['num_sched_col_header_cells']
+    num_subdivisions = exData['num_sched_subdivisions']
+    if page_units <= 0 or total_units <= page_units:
+        page_units = max(total_units, 1)
+    # end_if
+    num_pages = max((total_units + page_units - 1) / page_units, 1)
+    retval = []
+    for page_ix in range(num_pages):
+        page = {}
+        page['page_num'] = page_ix + 1
+        page['num_pages'] = num_pages
+        page['first_unit'] = page_ix * page_units + 1
+        page['num_units'] = min(page_units, total_units - page_ix * page_units)
+        page['first_col_ix'] = exData['first_schedule_col_ix'] + page_ix * page_units * num_subdivisions
+        page['last_col_ix'] = page['first_col_ix'] + page['num_units'] * num_subdivisions - 1
+        page['id_suffix'] = '' if num_pages == 1 else '_p' + str(page_ix + 1)
+        retval.append(page)
+    # end_for
+    return retval
+# end_def get_ex1_pages()
+
+# Generate the second <td> in the <tr> for a task in the schedule table of 'page' (see get_ex1_pages)
+# of Exhibit 1. Only the parts of the schedule items that fall on the page are shown: a 'bar' that
+# runs onto other pages is clipped at the edges of the page, and a milestone appears only on the
+# page on which it falls.
+def gen_ex1_task_tr_2nd_td(htmlAcc, task_num, task, exData, page):
     global SCHED_HEADER_CELL_WITDH_IN_PX_12PX_BORDER, SCHED_HEADER_CELL_WIDTH_IN_PX_24PX_BORDER
     global debug_flags
 
-    t1 = '<td colspan="' + str(xlsInfo['num_sched_col_header_cells']) + '" '
-    # *** TBD: 'timeUnit1' seems to ALWAYS be incuded as a header. Is this right?
-    t2 = 'headers ="row' + str(task_num) + ' timeUnit1" '
     if task_num == 1:
-        t3 = 'class="firstSchedColCell">'
+        cell_class = 'firstSchedColCell'
     else:
-        t3 = 'class="schedColCell">'
+        cell_class = 'schedColCell'
     # end_if
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
+    htmlAcc.append(EX1_SCHED_TD_START(colspan=page['num_units'], task_num=task_num, id_suffix=page['id_suffix'],
+                                      first_unit=page['first_unit'], cell_class=cell_class))
     
     # The guts of 2nd <td> in schedule row.
     # This may contain an arbitrary number of chart 'bars' and an arbitrary number
     # of 'milestones'. Each of these is placed in a <div> of its own,  generated in 
-    # ascending chronological order.
-    #
-    # In order to this, we build (1) a list of 'bars' and (2) a list of 'milestones,'
-    # both in ascending chronological (i.e., column) order. We use a common dictionary 
-    # data structure for the elements of these two lists:
-    #     'type'      : 'bar' or 'milestone'
-    #     'start'     : start column index
-    #     'end'       : end column index   ('start' == 'end' for milestones)
-    #     'milestone' : if item is a milestone, the milestone letter, otherwise ''
-    # We then merge the two lists, maintaining ascending chronological order.  
-    # Having done this, we will then be in a position to generate the relevant HTML.
-    
-    # Build the list of 'bars'
-    # Prep work: Generate a string of 0's and 1's indicating the cells in the schedule
-    # bar chart that have been 'filled in' with the magic fill pattern 'gray125'.
-    # Logically, we're creating a bit vector; it's implemented, however as a vector
-    # of '0' and '1' characters in a string.
-    my_pseudo_bv = ''
-    ws = xlsInfo['ws']
-    for col in range(xlsInfo['first_schedule_col_ix'],xlsInfo['last_used_schedule_col_ix']+1):
-        cell = ws.cell(task_row_ix, col)
-        fill = cell.fill
-        patternType = fill.patternType
-        my_pseudo_bv += '1' if patternType == MAGIC_FILL_STYLE else '0'
-    # end_for
-    # The list of 'bars'
-    bars = []
-    my_re = re.compile('1+')
-    my_iter = my_re.finditer(my_pseudo_bv)
-    for match in my_iter:
-        my_span = match.span()
-        # To get the actual column indices of the first and last cell, bias the indices
-        # in the (logical) bitvector by the index of the first column in the schedule table
-        start = my_span[0] + xlsInfo['first_schedule_col_ix']
-        end = my_span[1] + xlsInfo['first_schedule_col_ix'] - 1
-        # Debug:
-        # print "task #" + str(task_num) + " start: " + str(start) + " end: " + str(end)
-        temp = {}
-        temp['type'] = 'bar'
-        temp['start'] = start
-        temp['end'] = end
-        temp['milestone'] = ''
-        bars.append(temp)
-    # end_for
-    
-    # Build the list of 'milestones'
-    milestones = []
-    for col in range(xlsInfo['first_schedule_col_ix'],xlsInfo['last_used_schedule_col_ix']+1):
-        val = get_cell_contents(xlsInfo['ws'], task_row_ix, col)
-        if str(val).isupper():
-            # Debug:
-            # print "milestone : " + str(val) + " start: " + str(col)
-            temp = {}
-            temp['type'] = 'milestone'
-            temp['start'] = col
-            temp['end'] = col
-            temp['milestone'] = val
-            milestones.append(temp)
-        # end_if
-    # end_for
-    
-    # Combine 'bars' and 'milestones' into a single list, and sort the result 
-    # on (1) the 'start' value and (2) the 'type'.
-    # N.B. 'bar' appears before 'milestone' in the sort order for 'type', 
-    #      and so thereby ensures that the HTML for task bars are generated before
-    #      the HTML for any milesones occuring within them.
-    big_list = bars + milestones
-    big_list_sorted = sorted(big_list, key=lambda x: (x['start'], x['type']))
+    # ascending chronological order. The merged, sorted list of 'bars' and 'milestones'
+    # was built when the data was extracted from the input .xlsx file: see get_sched_items
+    # in excelFileManager.py.
+    big_list_sorted = task['sched_items']
 
     if debug_flags['dump_sched_elements']:
         for thing in big_list_sorted:
@@ -265,68 +397,60 @@ def gen_ex1_task_tr_2nd_td(htmlAcc, task_num, task_row_ix, xlsInfo):
     #     2. the number of cells for the relevant schedule item in the INPUT .xlsx file
     #     3. the width (in pixels) of the schedule table HEADER cells in the output HTML
     #     4. the number of minor schedule units per major schedule unit in the input .xlsx file
+    # The left offsets are relative to the first column on the page.
     
-    if xlsInfo['num_sched_col_header_cells'] <= 12:
+    if page['num_units'] <= 12:
         hdr_cell_width = SCHED_HEADER_CELL_WITDH_IN_PX_12PX_BORDER
     else:
-        hdr_cell_width = SCHED_HEADER_CELL_WITDH_IN_PX_24PX_BORDER
+        hdr_cell_width = SCHED_HEADER_CELL_WIDTH_IN_PX_24PX_BORDER
     # end_if
 
     # Width of 'virtual' cell for one subdivision of the major schedule unit
-    minor_cell_width  = hdr_cell_width / float(xlsInfo['num_sched_subdivisions'])
+    minor_cell_width  = hdr_cell_width / float(exData['num_sched_subdivisions'])
     
     # Debug
     # print 'Header cell width = ' + str(hdr_cell_width)
     # print 'Minor cell width = ' + str(minor_cell_width)
     
     # Generation of the <divs> for the schedule bars and milestones
+    first_col_ix = page['first_col_ix']
+    last_col_ix = page['last_col_ix']
     for item in big_list_sorted:
-        left = float(item['start'] - xlsInfo['first_schedule_col_ix']) *  minor_cell_width
         if item['type'] == 'bar':
-            num_subdivisions = item['end'] - item['start'] + 1
+            # The part of the bar on the page, if any
+            start = max(item['start'], first_col_ix)
+            end = min(item['end'], last_col_ix)
+            if start > end:
+                continue
+            # end_if
+            left = float(start - first_col_ix) *  minor_cell_width
+            num_subdivisions = end - start + 1
             width = num_subdivisions * minor_cell_width
             
             # Debug
             # print '*** Task #' + str(task_num) +  ' start: ' + str(item['start']) + ' end: ' + str(item['end']) + ' ' + ' left = ' + str(left) + ' width = ' + str(width)
             
-            t1 = '<div class="schedElemDiv">'
-            t2 = '<div class="scheduleBar" style="'
-            t2 += 'left:' + str(left) + 'px;'
-            t2 += 'width:' + str(width) + 'px'
-            t2 += '">'
-            # Stuff for screen reader
-            t3 = '<div class="overflowHiddenTextDiv">'
-            t4 = 'From ' + col_ix_to_temporal_string(item['start'], xlsInfo)
-            t5 = ' to ' + col_ix_to_temporal_string(item['end'], xlsInfo) + '.'
-            t6 = '</div>'
-            # End of stuff for screen reader
-            # Close <div> with class=schedBar 
-            t7 = '</div>'
-            # Close <div> with class=schedElemDiv
-            t8 = '</div>'
-            s = t1 + t2 + t3 + t4 + t5 + t6 + t7 + t8
-            htmlAcc.append(s)
+            if start == item['start'] and end == item['end']:
+                htmlAcc.append(EX1_SCHED_BAR(left=left, width=width,
+                                             start=col_ix_to_temporal_string(start, exData),
+                                             end=col_ix_to_temporal_string(end, exData)))
+            else:
+                htmlAcc.append(EX1_SCHED_BAR_PART(left=left, width=width,
+                                                  start=col_ix_to_temporal_string(start, exData),
+                                                  end=col_ix_to_temporal_string(end, exData),
+                                                  bar_start=col_ix_to_temporal_string(item['start'], exData),
+                                                  bar_end=col_ix_to_temporal_string(item['end'], exData)))
+            # end_if
         else:
             # Must be a 'milestone'
+            if item['start'] < first_col_ix or item['start'] > last_col_ix:
+                continue
+            # end_if
+            left = float(item['start'] - first_col_ix) *  minor_cell_width
             # Debug
             # print '*** Milestone: ' + item['milestone'] + ' start: ' + str(item['start']) +  ' ' + ' left = ' + str(left)
-            t1 = '<div class="schedElemDiv">'
-            t2 = '<div class="deliverableCodeDiv" style="'
-            t2 += 'left:' + str(left) + 'px;">'
-            # Firt bunch of stuff for screen reader
-            t3 = '<div class="overflowHiddenTextDiv">Deliverable</div>'
-            # The name of the milestone/deliverable
-            t4 = item['milestone']
-            
-            # Second bunch of stuff for screen reader - text of when the milestone/deliverable will arrive
-            t5 = '<div class="overflowHiddenTextDiv">'
-            t6 = 'Delivered by ' + col_ix_to_temporal_string(item['start'], xlsInfo) + '.'
-            t7 = '</div>'
-            
-            # Close the remaining two <div>s
-            t8 = '</div></div>'
-            s = t1 + t2 + t3 + t4 + t5 + t6 + t7 + t8
-            htmlAcc.append(s)
+            htmlAcc.append(EX1_SCHED_MILESTONE(left=left, milestone=item['milestone'],
+                                               start=col_ix_to_temporal_string(item['start'], exData)))
         # end_if
     #end_for
     
@@ -335,54 +459,37 @@ def gen_ex1_task_tr_2nd_td(htmlAcc, task_num, task_row_ix, xlsInfo):
     htmlAcc.append(s)
 # end_def gen_ex1_task_tr_2nd_td()
 
-def gen_ex1_task_tr(htmlAcc, task_num, task_row_ix, xlsInfo):
+def gen_ex1_task_tr(htmlAcc, task_num, task, exData, page):
     s = '<tr>'
     htmlAcc.append(s)
       
     # First <td> in row: task number and task name
-    t1 = '<td id="row' + str(task_num) + '" headers="ex1taskTblHdr" '
     if task_num == 1:
-        t2 = 'class="firstTaskTblCell">'
+        cell_class = 'firstTaskTblCell'
     else:
-        t2 = 'class="taskTblCell">'
+        cell_class = 'taskTblCell'
     # end_if
-    s = t1 + t2
-    htmlAcc.append(s)
-    
-    t1 = '<div class="taskNumDiv">'
     # *** TBD: Fetch task number from cell in Excel file rather than using task_num
-    t2 = str(task_num) + '.'
-    t3 = '</div>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    
-    t1 = '<div class="taskNameDiv">'
     #  *** TBD: This currently gets the task name from its cell in the cost table
-    t2 = get_cell_contents(xlsInfo['ws'], task_row_ix, xlsInfo['task_name_col_ix'])
-    t3 = '</div>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    # Close first <td> in row
-    s = '</td>'
-    htmlAcc.append(s)
+    htmlAcc.append(EX1_TASK_TD(task_num=task_num, id_suffix=page['id_suffix'], cell_class=cell_class, name=task['name']))
     
     # Second <td> in row: schedule bar(s) and deliverable(s), (if any)
-    gen_ex1_task_tr_2nd_td(htmlAcc, task_num, task_row_ix, xlsInfo)
+    gen_ex1_task_tr_2nd_td(htmlAcc, task_num, task, exData, page)
     
     # Close <tr>
     s = '</tr>'
     htmlAcc.append(s)
 # end_def gen_ex1_task_tr()
 
-def gen_ex1_schedule_table_body(htmlAcc, xlsInfo):
+def gen_ex1_schedule_table_body(htmlAcc, exData, page):
     # Open <tbody>
     s = '<tbody>'
     htmlAcc.append(s)
     # Write the <tr>s in the table body
     i = 0
-    for task_row_ix in range(xlsInfo['task_list_top_row_ix']+1,xlsInfo['task_list_bottom_row_ix']):
+    for task in exData['tasks']:
         i = i + 1
-        gen_ex1_task_tr(htmlAcc, i, task_row_ix, xlsInfo)
+        gen_ex1_task_tr(htmlAcc, i, task, exData, page)
     # end_for
     # Close <tbody>
     s = '</tbody>'
@@ -392,29 +499,33 @@ def gen_ex1_schedule_table_body(htmlAcc, xlsInfo):
     htmlAcc.append(s)
 # end_def gen_ex1_schedule_table_body()
 
-def gen_ex1_schedule_table(htmlAcc, xlsInfo):
-    s = '<table id="ex1Tbl"'
-    s += 'summary="Breakdown of schedule by tasks in column one and calendar time ranges and deliverable dates in column two.">'
-    htmlAcc.append(s)
+# Generate the schedule <table> of Exhibit 1 for 'page' (see get_ex1_pages), or, if it is None,
+# for the whole schedule. The task column is repeated in the table of each page.
+def gen_ex1_schedule_table(htmlAcc, exData, page=None):
+    if page == None:
+        page = get_ex1_pages(exData)[0]
+    # end_if
+    if page['num_pages'] == 1:
+        s = '<table id="ex1Tbl"'
+        s += 'summary="Breakdown of schedule by tasks in column one and calendar time ranges and deliverable dates in column two.">'
+        htmlAcc.append(s)
+    else:
+        htmlAcc.append(EX1_PAGED_TABLE_START(id_suffix=page['id_suffix']))
+    # end_if
     
     s = '<thead>'
     # First row of column header, first column: 'Task'
     htmlAcc.append(s)
     s = '<tr>'
     htmlAcc.append(s)
-    s = '<th id="ex1taskTblHdr" class="colTblHdr" rowspan="2"><br>Task</th>'
-    htmlAcc.append(s)
+    htmlAcc.append(EX1_TASK_HEADER_CELL(id_suffix=page['id_suffix']))
     
     # First row of table header, second column: name of MAJOR time unit used in table,
     # i.e., either 'Quarter', 'Month' or 'Week'
     #
 
-    t1 = '<th id="ex1weekTblHeader" class="colTblHdr"'
-    t2 = 'colspan="' + str(xlsInfo['num_sched_col_header_cells']) + '">' 
-    t3 = xlsInfo['sched_major_units']
-    t4 = '</th>'
-    s = t1 + t2 +t3 + t4
-    htmlAcc.append(s)
+    htmlAcc.append(EX1_MAJOR_UNITS_HEADER_CELL(id_suffix=page['id_suffix'], colspan=page['num_units'],
+                                               units=exData['sched_major_units']))
     s = '</tr>'
     htmlAcc.append(s)
     
@@ -422,21 +533,16 @@ def gen_ex1_schedule_table(htmlAcc, xlsInfo):
     s = '<tr>'
     htmlAcc.append(s)
     # The <th>s for the second row of headers,
-    # the numbers of the MAJOR schedule units actually used in the schedule
+    # the numbers of the MAJOR schedule units actually used in the schedule (on the page)
     
-    if xlsInfo['num_sched_col_header_cells'] <= 12:
-        sched_header_cell_class_string = ' class="scheduleColHdr12PixBorder" '
+    if page['num_units'] <= 12:
+        sched_header_cell_class = 'scheduleColHdr12PixBorder'
     else:
-        sched_header_cell_class_string = ' class="scheduleColHdr24PixBorder" '
+        sched_header_cell_class = 'scheduleColHdr24PixBorder'
     # end_if
     
-    for i in range(1,xlsInfo['num_sched_col_header_cells']+1):
-        t1 = '<th id='
-        t2 = '"timeUnit' + str(i) + '"'
-        t3 = sched_header_cell_class_string + ' abbr="Schedule range">'
-        t4 = str(i) + '</th>'
-        s = t1 + t2 + t3 + t4
-        htmlAcc.append(s)
+    for i in range(page['first_unit'], page['first_unit'] + page['num_units']):
+        htmlAcc.append(EX1_SCHED_HEADER_CELL(num=i, cell_class=sched_header_cell_class))
     # end_for
     
     # Close the 2nd row of column headers
@@ -448,11 +554,11 @@ def gen_ex1_schedule_table(htmlAcc, xlsInfo):
     htmlAcc.append(s)
   
     # Call subordinate routine to do the heavy lifting: generate the <table> body for Exhibit 1
-    gen_ex1_schedule_table_body(htmlAcc, xlsInfo)
+    gen_ex1_schedule_table_body(htmlAcc, exData, page)
 # end_def gen_ex1_schedule_table()
 
 
-def gen_ex1_milestone_div(htmlAcc, xlsInfo):
+def gen_ex1_milestone_div(htmlAcc, exData):
     s = '<div id="milestoneDiv">'
     htmlAcc.append(s)
     s = '<div id="milestoneHdrDiv">'
@@ -468,27 +574,10 @@ def gen_ex1_milestone_div(htmlAcc, xlsInfo):
     # Example:
     #   <span class="label"> A: </span> Memo to MPO with initial findings <br>
     
-    # Dumb little predicate to return True if string is empty or only contains blanks, False otherwise.
-    def is_empty(s):
-        return s.strip() == ''
-    # end_def is_empty()
-    
-    first_milestone_ix = xlsInfo['milestones_list_first_row_ix']
-    # Find the last row of the milestones list: crawl down milestone_label_column
-    # until the first row containing an 'empty' cell is found. 
-    last_milestone_ix = first_milestone_ix + 1
-    while is_empty(get_cell_contents(xlsInfo['ws'], last_milestone_ix, xlsInfo['milestone_label_col_ix'])) == False:
-        last_milestone_ix += 1
-    # end_while
-    
-    for milestone_ix in range(first_milestone_ix, last_milestone_ix):
-        t1 = '<span class="label">'
-        t2 = get_cell_contents(xlsInfo['ws'], milestone_ix, xlsInfo['milestone_label_col_ix'])
-        t3 = '</span>'
-        t4 = get_cell_contents(xlsInfo['ws'], milestone_ix, xlsInfo['milestone_name_col_ix'])
-        t5 = '<br>'
-        s = t1 + t2 + t3 + t4 + t5
-        htmlAcc.append(s)
+    # N.B. The last row of the milestones list was found when the data was extracted
+    #      from the input .xlsx file, by crawling down milestone_label_column.
+    for milestone in exData['milestones']:
+        htmlAcc.append(EX1_MILESTONE_ENTRY(label=milestone['label'], name=milestone['name']))
     # end_for
     
     s = '</div>'
@@ -498,8 +587,17 @@ def gen_ex1_milestone_div(htmlAcc, xlsInfo):
 # end_def gen_ex1_milestone_div()
 
 
-def gen_exhibit_1_body(htmlAcc, xlsInfo):
-    pass
+# The line of the <h1> of Exhibits 1 and 2 containing the project name
+PROJECT_NAME_LINE = compile_template('{project_name}<br>')
+
+# If 'page_units' is non-zero, and the schedule has more than that many MAJOR schedule units,
+# it is split into pages: see gen_exhibit_1_paged_body.
+def gen_exhibit_1_body(htmlAcc, exData, page_units=0):
+    pages = get_ex1_pages(exData, page_units)
+    if len(pages) > 1:
+        gen_exhibit_1_paged_body(htmlAcc, exData, pages)
+        return
+    # end_if
     s = '<body style="text-align:center;padding:0pt;margin:0pt;">'
     htmlAcc.append(s)
     s = '<div id="exhibit1">'
@@ -513,16 +611,62 @@ def gen_exhibit_1_body(htmlAcc, xlsInfo):
     s = 'ESTIMATED SCHEDULE<br>'
     htmlAcc.append(s)
     # Project name
-    s = str(get_cell_contents(xlsInfo['ws'], xlsInfo['project_name_cell_row_ix'], xlsInfo['project_name_cell_col_ix']))
-    s = s + '<br>'
-    htmlAcc.append(s)
+    htmlAcc.append(PROJECT_NAME_LINE(project_name=exData['project_name']))
     s = '</h1>'
     htmlAcc.append(s)
     #
-    gen_ex1_schedule_table(htmlAcc, xlsInfo)
-    gen_ex1_milestone_div(htmlAcc, xlsInfo)
+    gen_ex1_schedule_table(htmlAcc, exData)
+    gen_ex1_milestone_div(htmlAcc, exData)
 # end_def 
 
+# Generate the body of Exhibit 1, with the schedule split into 'pages' (see get_ex1_pages). Each page
+# is laid out as a (printed) page of its own, with the heading of the exhibit, and a schedule table
+# showing only the MAJOR schedule units on the page; the list of milestones follows the table on the
+# last page. Each page is generated independently (see render_ex1_page).
+def gen_exhibit_1_paged_body(htmlAcc, exData, pages):
+    s = '<body style="text-align:center;padding:0pt;margin:0pt;">'
+    htmlAcc.append(s)
+    s = '<div id="exhibit1">'
+    htmlAcc.append(s)
+    for page in pages:
+        htmlAcc.append(render_ex1_page(exData, page))
+    # end_for
+    s = '</div>'
+    htmlAcc.append(s)
+# end_def gen_exhibit_1_paged_body()
+
+# Return the HTML for 'page' (see get_ex1_pages) of Exhibit 1, when the schedule is split into pages.
+# N.B. The HTML for a page depends only upon 'exData' and 'page', and is accumulated in a
+#      stringAccumulator of its own; so pages can be generated concurrently, or cached.
+def render_ex1_page(exData, page):
+    htmlAcc = stringAccumulator()
+    s = '<div class="exhibitPageLayoutDiv1 ex1PageDiv"><div class="exhibitPageLayoutDiv2">'
+    htmlAcc.append(s)
+    s = '<h1>'
+    htmlAcc.append(s)
+    s = 'Exhibit 1<br>'
+    htmlAcc.append(s)
+    s = 'ESTIMATED SCHEDULE<br>'
+    htmlAcc.append(s)
+    htmlAcc.append(PROJECT_NAME_LINE(project_name=exData['project_name']))
+    if page['num_units'] == 1:
+        htmlAcc.append(EX1_PAGE_LINE_1_UNIT(page_num=page['page_num'], num_pages=page['num_pages'],
+                                            units=exData['sched_major_units'], unit=page['first_unit']))
+    else:
+        htmlAcc.append(EX1_PAGE_LINE(page_num=page['page_num'], num_pages=page['num_pages'], units=exData['sched_major_units'],
+                                     first_unit=page['first_unit'], last_unit=page['first_unit'] + page['num_units'] - 1))
+    # end_if
+    s = '</h1>'
+    htmlAcc.append(s)
+    gen_ex1_schedule_table(htmlAcc, exData, page)
+    if page['page_num'] == page['num_pages']:
+        gen_ex1_milestone_div(htmlAcc, exData)
+    # end_if
+    s = '</div></div>'
+    htmlAcc.append(s)
+    return htmlAcc.get()
+# end_def render_ex1_page()
+
 # TBD: Combine this and gen_exhibit_2_body into a single, parameterized,  routine.
 def gen_exhibit_1_initial_boilerplate(htmlAcc):
     s = '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">'
@@ -531,7 +675,7 @@ def gen_exhibit_1_initial_boilerplate(htmlAcc):
     htmlAcc.append(s)
     s = '<title>CTPS Work Scope Exhibit 1</title>'
     htmlAcc.append(s)
-    s = '<link rel="stylesheet" type="text/css" href="./ctps_work_scope_print.css">'
+    s = STYLESHEET_LINK
     htmlAcc.append(s)
     s = '</head>'
     htmlAcc.append(s)
@@ -548,9 +692,11 @@ def gen_exhibit_1_final_boilerplate(htmlAcc):
 # end_def gen_exhibit_1_final_boilerplate()
 
 
-def gen_exhibit_1(htmlAcc, xlsInfo):
+# If 'page_units' is non-zero, the schedule is split into pages of (at most) that many MAJOR
+# schedule units: see get_ex1_pages.
+def gen_exhibit_1(htmlAcc, exData, page_units=0):
     gen_exhibit_1_initial_boilerplate(htmlAcc)
-    gen_exhibit_1_body(htmlAcc, xlsInfo)
+    gen_exhibit_1_body(htmlAcc, exData, page_units)
     gen_exhibit_1_final_boilerplate(htmlAcc)
 # end_def gen_exhibit_1()
 
@@ -563,7 +709,7 @@ def gen_exhibit_2_initial_boilerplate(htmlAcc):
     htmlAcc.append(s)
     s = '<title>CTPS Work Scope Exhibit 2</title>'
     htmlAcc.append(s)
-    s = '<link rel="stylesheet" type="text/css" href="./ctps_work_scope_print.css">'
+    s = STYLESHEET_LINK
     htmlAcc.append(s)
     s = '</head>'
     htmlAcc.append(s)
@@ -577,16 +723,63 @@ def gen_exhibit_2_final_boilerplate(htmlAcc):
     htmlAcc.append(s)
 # end_def gen_exhibit_2_final_boilerplate()
 
-def gen_ex2_direct_salary_div(htmlAcc, xlsInfo):
+# Templates for the elements of Exhibit 2: see htmlTemplate.py.
+# Each is compiled once, when this module is loaded. The values of all fields are HTML-escaped.
+#
+# The amount on a "one-line div", e.g., for the total direct salary and overhead
+EX2_H2_AMOUNT = compile_template('<div class="h2AmtDiv">${amount}</div>')
+# Header cell for the overhead column, showing the overhead rate
+EX2_OVERHEAD_HEADER_CELL = compile_template('<th id="overheadTblHdr" class="colTblHdr" rowspan="2" scope="col" abbr="Overhead">' +
+                                            'Overhead<br>{rate}</th>')
+# Header cell for a salary grade
+EX2_GRADE_HEADER_CELL = compile_template('<th id="{grade_id}" class="personWKTblHdr" scope="col" abbr="{grade_wo_dash}">' +
+                                         '{grade}</th>')
+# Start of the <tr> for a task in the salary cost table: the <tr> tag, and the <td> for the task
+# number and task name
+EX2_TASK_TR_START = compile_template('<tr id="taskHeader{task_num}">' +
+                                     '<td headers="taskTblHdr" scope="row" class="{cell_class}">' +
+                                     '<div class="taskTblCellDiv">' +
+                                     '<div class="taskNumDiv">{number}</div>' +
+                                     '<div class="taskNameDiv">{name}</div>' +
+                                     '</div></td>')
+# Cell for a salary grade in the <tr> for a task
+EX2_TASK_GRADE_CELL = compile_template('<td headers="taskHeader{task_num} personWeekTblHdr {grade_id}" class="rightPaddedTblCell">' +
+                                       '{value}</td>')
+# End of the <tr> for a task: the cells for 'Total [person weeks]', 'Direct Salary', 'Overhead',
+# and 'Total Cost', and the </tr> tag
+EX2_TASK_TR_END = compile_template('<td headers="taskHeader{task_num} personWeekTblHdr personWeekTotalTblHdr" class="rightPaddedTblCell">' +
+                                   '{total_pw}</td>' +
+                                   '<td headers="taskHeader{task_num} salaryTblHdr" class="rightPaddedTblCell">{direct_salary}</td>' +
+                                   '<td headers="taskHeader{task_num} overheadTblHdr" class="rightPaddedTblCell">{overhead}</td>' +
+                                   '<td headers="taskHeader{task_num} totalTblHdr" class="rightPaddedTblCell">{total_cost}</td>' +
+                                   '</tr>')
+# Cell for a salary grade in the 'Total' row
+EX2_TOTAL_GRADE_CELL = compile_template('<td headers="totalRowTblHdr personWeekTblHdr {grade_id}" class="totalRowTblCell">{value}</td>')
+# End of the 'Total' row: as for EX2_TASK_TR_END
+EX2_TOTAL_TR_END = compile_template('<td id="personWeeksTotalRowTblCell" headers="totalRowTblHdr personWeekTblHdr personWeekTotalTblHdr" ' +
+                                    'class="totalRowTblCell">{total_pw}</td>' +
+                                    '<td id="directSalaryTotalRowTblCell" headers="totalRowTblHdr salaryTblHdr" ' +
+                                    'class="totalRowTblCell">{direct_salary}</td>' +
+                                    '<td id="overheadTotalRowTblCell" headers="totalRowTblHdr overheadTblHdr" ' +
+                                    'class="totalRowTblCell">{overhead}</td>' +
+                                    '<td id="totalTotalRowTblCell" headers="totalRowTblHdr totalTblHdr" ' +
+                                    'class="totalRowTblCell">{total_cost}</td>' +
+                                    '</tr>')
+# One kind of 'other direct cost'
+EX2_ODC = compile_template('<div class="otherExpDiv">' +
+                           '<div class="otherExpDescDiv">{name}</div>' +
+                           '<div class="otherExpAmtDiv">${cost}</div>' +
+                           '</div>')
+# A funding source; each one after the first is preceded by a <br>
+EX2_FUNDING_SOURCE = compile_template('{name}')
+EX2_NEXT_FUNDING_SOURCE = compile_template('<br>{name}')
+
+def gen_ex2_direct_salary_div(htmlAcc, exData):
     s = '<div id="directSalaryDiv" class="barH2">'
     htmlAcc.append(s)
     s = '<h2>Direct Salary and Overhead</h2>'
     htmlAcc.append(s)
-    t1 = '<div class="h2AmtDiv">'
-    t2 = '$' + format_dollars(get_cell_contents(xlsInfo['ws'], xlsInfo['direct_salary_cell_row_ix'], xlsInfo['direct_salary_cell_col_ix']))
-    t3 = '</div>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
+    htmlAcc.append(EX2_H2_AMOUNT(amount=format_dollars(exData['direct_salary_total'])))
     s = '</div>'
     htmlAcc.append(s)
 # end_def gen_ex2_direct_salary_div()
@@ -596,94 +789,34 @@ def gen_ex2_direct_salary_div(htmlAcc, xlsInfo):
 # This function is called only from gen_ex2_salary_cost_table_div, which it is LOGICALLY nested within.
 # In order to expedite development/prototyping, however, it is currently defined here at scope-0.
 # When the tool has become stable, move it within the def of salary_cost_table_div.
+# 'task_cells' is the task's row of the cost table, as formatted by format_cost_rows.
 #
-def gen_task_tr(htmlAcc, task_num, task_row_ix, xlsInfo, real_cols_info):
-    # Open <tr> element
-    t1 = '<tr id='
-    tr_id = 'taskHeader' + str(task_num)
-    t2 = tr_id + '>'
-    s = t1 + t2
-    htmlAcc.append(s)
-    
-    # <td> for task number and task name
-    # Note: This contains 3 divs organized thus: <div> <div></div> <div></div> </div>
-    t1 = '<td headers="taskTblHdr" scope="row" '
+def gen_task_tr(htmlAcc, task_num, task, task_cells, real_cols_info):
+    # <tr> tag, and <td> for task number and task name
+    # Note: The <td> contains 3 divs organized thus: <div> <div></div> <div></div> </div>
     if task_num == 1:
-        t2  = 'class="firstTaskTblCell">'
+        cell_class = 'firstTaskTblCell'
     else:
-        t2 = 'class="taskTblCell">'
+        cell_class = 'taskTblCell'
     # end_if
-    s = t1 + t2 
-    htmlAcc.append(s)
-    # Open outer div
-    s = '<div class="taskTblCellDiv">'
-    htmlAcc.append(s)
-    # First inner div
-    t1 = '<div class="taskNumDiv">'
-    t2 = get_cell_contents(xlsInfo['ws'], task_row_ix, xlsInfo['task_number_col_ix'])
-    t3 = '</div>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    # Second inner div
-    t1 = '<div class="taskNameDiv">'
-    t2 = get_cell_contents(xlsInfo['ws'], task_row_ix, xlsInfo['task_name_col_ix'])
-    t3 = '</div>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    # Close outer div, and close <td>
-    s = '</div>'
-    htmlAcc.append(s)
-    s = '</td>'
-    htmlAcc.append(s)
+    htmlAcc.append(EX2_TASK_TR_START(task_num=task_num, cell_class=cell_class, number=task['number'], name=task['name']))
     
     # Generate the <td>s for all the salary grades used in this work scope exhibit
-    for col_info in real_cols_info:
-        t1 = '<td headers="' + tr_id + ' personWeekTblHdr ' + col_info['col_header_id'] + '"'
-        t2 = ' class="rightPaddedTblCell">'
-        t3 = format_person_weeks(get_cell_contents(xlsInfo['ws'], task_row_ix, xlsInfo[col_info['col_ix']]))
-        t4 = '</td>'
-        s = t1 + t2 + t3 + t4
-        htmlAcc.append(s)
+    for (col_info, cell) in zip(real_cols_info, task_cells):
+        htmlAcc.append(EX2_TASK_GRADE_CELL(task_num=task_num, grade_id=col_info['col_header_id'], value=cell))
     # end_for
     
-    # Generate the <td>s for 'Total [person weeks]', 'Direct Salary', 'Overhead', and 'Total Cost'.
-    #
-    # Total [person weeks]
-    t1 = '<td headers="' + tr_id + ' personWeekTblHdr personWeekTotalTblHdr" class="rightPaddedTblCell">'
-    t2 = format_person_weeks(get_cell_contents(xlsInfo['ws'], task_row_ix, xlsInfo['total_col_ix']))
-    t3 = '</td>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    #
-    # Direct Salary
-    t1 = '<td headers="' + tr_id + ' salaryTblHdr" class="rightPaddedTblCell">'
-    t2 = '$' + format_dollars(get_cell_contents(xlsInfo['ws'], task_row_ix, xlsInfo['direct_salary_col_ix']))
-    t3 = '</td>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    #
-    # Overhead
-    t1 = '<td headers="' + tr_id + ' overheadTblHdr" class="rightPaddedTblCell">'
-    t2 = '$' +  format_dollars(get_cell_contents(xlsInfo['ws'], task_row_ix, xlsInfo['overhead_col_ix']))
-    t3 = '</td>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)       
-    #
-    # Total Cost
-    t1 = '<td headers="' + tr_id + ' totalTblHdr" class="rightPaddedTblCell">'
-    t2 = '$' + format_dollars(get_cell_contents(xlsInfo['ws'], task_row_ix, xlsInfo['total_cost_col_ix']))
-    t3 = '</td>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)       
-    
-    s = '</tr>'
-    htmlAcc.append(s)
+    # Generate the <td>s for 'Total [person weeks]', 'Direct Salary', 'Overhead', and 'Total Cost',
+    # and close the <tr>
+    (total_pw, direct_salary, overhead, total_cost) = task_cells[len(real_cols_info):]
+    htmlAcc.append(EX2_TASK_TR_END(task_num=task_num, total_pw=total_pw, direct_salary=direct_salary,
+                                   overhead=overhead, total_cost=total_cost))
 # end_def gen_task_tr()
 
 ############################################################################
 # Top-level routine for generating HTML for Exhibit 2 salary cost table div.
 # Calls end_def gen_ex2_task_tr as a helper function.
-def gen_ex2_salary_cost_table_div(htmlAcc, xlsInfo):
+def gen_ex2_salary_cost_table_div(htmlAcc, exData):
     s = '<div class="costTblDiv">'
     htmlAcc.append(s)
     s = '<table id="ex2Tbl" summary="Breakdown of staff time by task in column one, expressed in person weeks for each implicated pay grade in the middle columns,'
@@ -710,10 +843,9 @@ def gen_ex2_salary_cost_table_div(htmlAcc, xlsInfo):
     # Accumulate the result in real_col_ixs, and then use real_col_ixs to create real_cols_info, 
     # which is re-used when generating <tr>s for individual tasks.
     #
-    all_cols = ['m1_col_ix', 'p5_col_ix', 'p4_col_ix', 'p3_col_ix', 'p2_col_ix', 'p1_col_ix', 'sp3_col_ix', 'sp1_col_ix', 'temp_col_ix']
     real_col_ixs = []
-    for col in all_cols:
-        val = get_cell_contents(xlsInfo['ws'], xlsInfo['total_line_row_ix'], xlsInfo[col])
+    for col in SALARY_GRADE_COLUMNS:
+        val = exData['cost_totals'][COST_TABLE_COLUMNS.index(col)]
         if val != 0:
             real_col_ixs.append(col)
         # end_if
@@ -729,9 +861,9 @@ def gen_ex2_salary_cost_table_div(htmlAcc, xlsInfo):
     for col_ix in real_col_ixs:
         info = {}
         info['col_ix'] = col_ix
-        # *** Next line is a temp hack!
-        # *** TBD: Need 'named range' for row containing job classification abbreviations.
-        t1 = get_cell_contents(xlsInfo['ws'], xlsInfo['task_list_top_row_ix']-1, xlsInfo[col_ix])
+        # Index of this column in each row of exData['cost_block']
+        info['cost_ix'] = COST_TABLE_COLUMNS.index(col_ix)
+        t1 = exData['cost_col_headers'][SALARY_GRADE_COLUMNS.index(col_ix)]
         info['col_header_with_dash'] = t1
         t2 = t1.replace('-',' ')
         info['col_header_wo_dash'] = t2
@@ -746,12 +878,7 @@ def gen_ex2_salary_cost_table_div(htmlAcc, xlsInfo):
     htmlAcc.append(s)
     s = '<th id="salaryTblHdr" class="colTblHdr" rowspan="2" scope="col" abbr="Direct Salary">Direct<br>Salary</th>'
     htmlAcc.append(s)
-    t1 = '<th id="overheadTblHdr" class="colTblHdr" rowspan="2" scope="col" abbr="Overhead">Overhead<br>'
-    t2 = get_cell_contents(xlsInfo['ws'], xlsInfo['overhead_cell_row_ix'], xlsInfo['overhead_cell_col_ix'])
-    t2 = t2.replace('@ ', '')
-    t3 = '</th>'
-    s = t1 + t2 + t3 
-    htmlAcc.append(s)
+    htmlAcc.append(EX2_OVERHEAD_HEADER_CELL(rate=exData['overhead_rate'].replace('@ ', '')))
     s = '<th id="totalTblHdr" class="colTblHdr" rowspan="2" scope="col" abbr="Total Cost">Total<br>Cost</th>'
     htmlAcc.append(s)
     s = '</tr>'
@@ -764,15 +891,8 @@ def gen_ex2_salary_cost_table_div(htmlAcc, xlsInfo):
     # Column headers for all columns for job classifications used in this work scope
     #
     for col_info in real_cols_info:
-        t1 = '<th id="'
-        t2 = col_info['col_header_id']
-        t3 = '" class="personWKTblHdr" scope="col" abbr="'
-        t4 = col_info['col_header_wo_dash']
-        t5 = '">'
-        t6 = col_info['col_header_with_dash']
-        t7 = '</th>'
-        s = t1 + t2 + t3 + t4 + t5 + t6 + t7
-        htmlAcc.append(s)
+        htmlAcc.append(EX2_GRADE_HEADER_CELL(grade_id=col_info['col_header_id'], grade_wo_dash=col_info['col_header_wo_dash'],
+                                             grade=col_info['col_header_with_dash']))
     # end_for
     # Second: column header for Total column
     s = '<th id="personWeekTotalTblHdr" scope="col">Total</th>'
@@ -791,12 +911,17 @@ def gen_ex2_salary_cost_table_div(htmlAcc, xlsInfo):
     
     # <tbody> contents.
     #
+    # Format the whole cost table, including the 'Total' row, in one go.
+    formatted_rows = format_cost_rows(exData['cost_block'] + [exData['cost_totals']], real_cols_info)
+    
     # Write <tr>s for each task in the task list.
     i = 0
-    for task_row_ix in range(xlsInfo['task_list_top_row_ix']+1,xlsInfo['task_list_bottom_row_ix']):
+    for (task, task_cells) in zip(exData['tasks'], formatted_rows):
         i = i + 1
-        gen_task_tr(htmlAcc, i, task_row_ix, xlsInfo, real_cols_info)
+        gen_task_tr(htmlAcc, i, task, task_cells, real_cols_info)
     # end_for
+    total_cells = formatted_rows[-1]
+    (total_pw, direct_salary, overhead, total_cost) = total_cells[len(real_cols_info):]
     
     # The 'Total' row
     #
@@ -818,41 +943,12 @@ def gen_ex2_salary_cost_table_div(htmlAcc, xlsInfo):
     htmlAcc.append(s)
     
     # Total row: columns for salary grades used in this workscope
-    for col_info in real_cols_info:
-        t1 = '<td headers="totalRowTblHdr personWeekTblHdr ' + col_info['col_header_id'] + '" class="totalRowTblCell">'
-        t2 = format_person_weeks(get_cell_contents(xlsInfo['ws'], xlsInfo['total_line_row_ix'], xlsInfo[col_info['col_ix']]))
-        t3 = '</td>'
-        s = t1 + t2 + t3
-        htmlAcc.append(s)
+    for (col_info, cell) in zip(real_cols_info, total_cells):
+        htmlAcc.append(EX2_TOTAL_GRADE_CELL(grade_id=col_info['col_header_id'], value=cell))
     # end_for
     
-    # Total row: Total [person weeks] column
-    t1 = '<td id="personWeeksTotalRowTblCell" headers="totalRowTblHdr personWeekTblHdr personWeekTotalTblHdr" class="totalRowTblCell">'
-    t2 = format_person_weeks(get_cell_contents(xlsInfo['ws'], xlsInfo['total_line_row_ix'], xlsInfo['total_col_ix']))
-    t3 = '</td>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    # Total row, direct salary column
-    t1 = '<td id="directSalaryTotalRowTblCell" headers="totalRowTblHdr salaryTblHdr" class="totalRowTblCell">'
-    t2 = '$' + format_dollars(get_cell_contents(xlsInfo['ws'], xlsInfo['total_line_row_ix'], xlsInfo['direct_salary_col_ix']))
-    t3 = '</td>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    # Total row, overhead column
-    t1 = '<td id="overheadTotalRowTblCell" headers="totalRowTblHdr overheadTblHdr" class="totalRowTblCell">'
-    t2 = '$' + format_dollars(get_cell_contents(xlsInfo['ws'], xlsInfo['total_line_row_ix'], xlsInfo['overhead_col_ix']))
-    t3 = '</td>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    # Total row, total cost column
-    t1 = '<td id="totalTotalRowTblCell" headers="totalRowTblHdr totalTblHdr" class="totalRowTblCell">'
-    t2 = '$' + format_dollars(get_cell_contents(xlsInfo['ws'], xlsInfo['total_line_row_ix'], xlsInfo['total_cost_col_ix']))
-    t3 = '</td>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
-    # Close <tr> for Total row
-    s = '</tr>'
-    htmlAcc.append(s)
+    # Total row: Total [person weeks], direct salary, overhead, and total cost columns; and close <tr>
+    htmlAcc.append(EX2_TOTAL_TR_END(total_pw=total_pw, direct_salary=direct_salary, overhead=overhead, total_cost=total_cost))
     
     # Close <tbody>, <table>, and <div>
     s = '</tbody>'
@@ -863,17 +959,12 @@ def gen_ex2_salary_cost_table_div(htmlAcc, xlsInfo):
     htmlAcc.append(s)
 # end_def gen_ex2_salary_cost_table_div()
 
-def gen_ex2_other_direct_costs_div(htmlAcc, xlsInfo):
+def gen_ex2_other_direct_costs_div(htmlAcc, exData):
     s = '<div id="otherDirectDiv" class="barH2">'
     htmlAcc.append(s)
     s = '<h2>Other Direct Costs</h2>'
     htmlAcc.append(s)
-    t1 = '<div class="h2AmtDiv">'
-    odc_total = get_cell_contents(xlsInfo['ws'], xlsInfo['odc_cell_row_ix'], xlsInfo['odc_cell_col_ix'])
-    t2 = '$' + format_dollars(odc_total)
-    t3 = '</div>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
+    htmlAcc.append(EX2_H2_AMOUNT(amount=format_dollars(exData['odc_total'])))
     s = '</div>'
     htmlAcc.append(s)
     # Write the divs for the specific other direct costs and a wrapper div around all of them (even if there are none.)
@@ -882,69 +973,29 @@ def gen_ex2_other_direct_costs_div(htmlAcc, xlsInfo):
     s = '<div class="costTblDiv">'
     htmlAcc.append(s)
     
-    # Utiltiy function to write HTML for one kind of 'other direct cost.'
-    def gen_odc(htmlAcc, name, cost):
-        s = '<div class="otherExpDiv">'
-        htmlAcc.append(s)
-        s = '<div class="otherExpDescDiv">' + name + '</div>'
-        htmlAcc.append(s)
-        s = '<div class="otherExpAmtDiv">' + '$' + format_dollars(cost) + '</div>'
-        htmlAcc.append(s)
-        s = '</div>'
-        htmlAcc.append(s)
-    # end_def gen_odc()
-    
-    # Travel
-    travel = get_cell_contents(xlsInfo['ws'], xlsInfo['odc_travel_line_ix'], xlsInfo['total_cost_col_ix'])
-    if travel != 0:
-        gen_odc(htmlAcc, 'Travel', travel)
-    
-    # General office equipment
-    general_office_equipment = get_cell_contents(xlsInfo['ws'], xlsInfo['odc_office_equipment_line_ix'], xlsInfo['total_cost_col_ix'])
-    if general_office_equipment != 0:
-        gen_odc(htmlAcc, 'General Office Equipment', general_office_equipment)
-    
-    # Data processing equipment
-    dp_equipment = get_cell_contents(xlsInfo['ws'], xlsInfo['odc_dp_equipment_line_ix'], xlsInfo['total_cost_col_ix'])
-    if dp_equipment != 0:
-        gen_odc(htmlAcc, 'Data Processing Equipent', dp_equipment)
-    
-    # Consultant(s)
-    consultants = get_cell_contents(xlsInfo['ws'], xlsInfo['odc_consultants_line_ix'], xlsInfo['total_cost_col_ix'])
-    if consultants != 0:
-        gen_odc(htmlAcc, 'Consultants', consultants)
-    
-    # Printing
-    printing = get_cell_contents(xlsInfo['ws'], xlsInfo['odc_printing_line_ix'], xlsInfo['total_cost_col_ix'])
-    if printing != 0:
-        gen_odc(htmlAcc, 'Printing', printing)
-    
-    # Other 
-    other = get_cell_contents(xlsInfo['ws'], xlsInfo['odc_other_line_ix'], xlsInfo['total_cost_col_ix'])
-    if other != 0:
-        desc = get_cell_contents(xlsInfo['ws'], xlsInfo['odc_other_line_ix'], xlsInfo['task_name_col_ix'])
-        gen_odc(htmlAcc, desc, other)
+    # Travel, general office equipment, data processing equipment, consultant(s), printing, and other
+    for odc in exData['odcs']:
+        if odc['cost'] != 0:
+            htmlAcc.append(EX2_ODC(name=odc['name'], cost=format_dollars(odc['cost'])))
+        # end_if
+    # end_for
     
     # </div> for wrapper
     s = '</div>'
     htmlAcc.append(s)
 # end_def gen_ex2_other_direct_costs_div()
 
-def gen_ex2_total_direct_costs_div(htmlAcc, xlsInfo):
+def gen_ex2_total_direct_costs_div(htmlAcc, exData):
     s = '<div id="totalDirectDiv" class="barH2">'
     htmlAcc.append(s)
     s = '<h2>TOTAL COST</h2>'
     htmlAcc.append(s)
-    t1 = '<div class="h2AmtDiv">'
-    t2 = '$' + format_dollars(get_cell_contents(xlsInfo['ws'], xlsInfo['total_cost_cell_row_ix'], xlsInfo['total_cost_cell_col_ix']))
-    t3 = '</div>'
-    s = t1 + t2 + t3
-    htmlAcc.append(s)
+    htmlAcc.append(EX2_H2_AMOUNT(amount=format_dollars(exData['total_cost'])))
     s = '</div>'
     htmlAcc.append(s)
 # end_def gen_ex2_total_direct_costs_div()
 
-def gen_ex2_funding_div(htmlAcc, xlsInfo):
+def gen_ex2_funding_div(htmlAcc, exData):
     s = '<div id="fundingDiv">'
     htmlAcc.append(s)
     s = '<div id="fundingHdrDiv">'
@@ -957,15 +1008,14 @@ def gen_ex2_funding_div(htmlAcc, xlsInfo):
     htmlAcc.append(s)
     #
     kount = 0
-    for fs_row in range(xlsInfo['funding_list_top_row_ix']+1,xlsInfo['funding_list_bottom_row_ix']):
+    for funding_source in exData['funding_sources']:
         kount = kount + 1
         # Emit <br> before funding source name except for first funding source.
-        s = ''
         if kount != 1:
-            s = s + '<br>'
+            htmlAcc.append(EX2_NEXT_FUNDING_SOURCE(name=funding_source))
+        else:
+            htmlAcc.append(EX2_FUNDING_SOURCE(name=funding_source))
         # end_if
-        s = s + get_cell_contents(xlsInfo['ws'], fs_row, xlsInfo['task_name_col_ix'])
-        htmlAcc.append(s)
     # end_for       
     s = '</div>'
     htmlAcc.append(s)
@@ -980,7 +1030,7 @@ def gen_ex2_funding_div(htmlAcc, xlsInfo):
 #   the div for the salary cost table
 #   the div forthe "Other Direct Costs" line
 #   the div for funding source(s)
-def gen_exhibit_2_body(htmlAcc, xlsInfo):
+def gen_exhibit_2_body(htmlAcc, exData):
     s = '<body style="text-align:center;margin:0pt;padding:0pt;">'
     htmlAcc.append(s)
     s = '<div id="exhibit2">'
@@ -994,65 +1044,661 @@ def gen_exhibit_2_body(htmlAcc, xlsInfo):
     s = 'ESTIMATED COST<br>'
     htmlAcc.append(s)
     # Project name
-    s = str(get_cell_contents(xlsInfo['ws'], xlsInfo['project_name_cell_row_ix'], xlsInfo['project_name_cell_col_ix']))
-    s = s + '<br>'
-    htmlAcc.append(s)
+    htmlAcc.append(PROJECT_NAME_LINE(project_name=exData['project_name']))
     s = '</h1>'
     htmlAcc.append(s)
     #
-    gen_ex2_direct_salary_div(htmlAcc, xlsInfo)
-    gen_ex2_salary_cost_table_div(htmlAcc, xlsInfo)
-    gen_ex2_other_direct_costs_div(htmlAcc, xlsInfo)
-    gen_ex2_total_direct_costs_div(htmlAcc, xlsInfo)
-    gen_ex2_funding_div(htmlAcc, xlsInfo)
+    gen_ex2_direct_salary_div(htmlAcc, exData)
+    gen_ex2_salary_cost_table_div(htmlAcc, exData)
+    gen_ex2_other_direct_costs_div(htmlAcc, exData)
+    gen_ex2_total_direct_costs_div(htmlAcc, exData)
+    gen_ex2_funding_div(htmlAcc, exData)
 # end_def gen_exhibit_2_body()
 
-def gen_exhibit_2(htmlAcc, xlsInfo):
+def gen_exhibit_2(htmlAcc, exData):
     gen_exhibit_2_initial_boilerplate(htmlAcc)
-    gen_exhibit_2_body(htmlAcc, xlsInfo)
+    gen_exhibit_2_body(htmlAcc, exData)
     gen_exhibit_2_final_boilerplate(htmlAcc)
 # end_def gen_exhibit_2()
 
-# Pretty-formats HTML and saves it to specified filename.
-def write_html_to_file(html, filename):
+# Return the data shown in Exhibits 1 and 2, taken from 'exData', as a dictionary containing 
+# only strings, numbers, None, lists and dictionaries, i.e., in a form suitable for export as
+# JSON. Empty cells are exported as None. 'source' (e.g., the name of the input .xlsx file) is
+# included in the dictionary, to identify where the data came from. The dictionary contains:
+#   source
+#   sheet_name
+#   project_name
+#   grades - list of the salary grade abbreviations, e.g., 'P-5', in the order in Exhibit 2
+#   tasks - list of dictionaries, one per task:
+#       number, name
+#       person_weeks - dictionary: salary grade abbreviation -> person-weeks
+#       total_person_weeks, direct_salary, overhead, total_cost
+#       schedule - list of dictionaries, one per bar or milestone in the task's row of
+#                  Exhibit 1, in chronological order:
+#           type - 'bar' or 'milestone'
+#           milestone - the milestone's letter, or '' for a bar
+#           start, end - 0-based index of the first and last minor schedule unit (e.g., Month)
+#                        spanned; the same, for a milestone
+#           start_label, end_label - the same, expressed as e.g. 'Quarter 1, Month 2'
+#   totals - dictionary: person_weeks, total_person_weeks, direct_salary, overhead, total_cost;
+#            as for each task, for the 'Total' row of Exhibit 2
+#   overhead_rate - as shown in Exhibit 2, e.g., '95.39%'
+#   direct_salary_total, other_direct_costs_total, total_cost
+#   other_direct_costs - list of dictionaries, one per line of other direct costs (including
+#                        any whose cost is 0): name, cost
+#   funding_sources - list of the names of the funding source(s)
+#   milestones - list of dictionaries, one per milestone: label, name
+#   sched_major_units, sched_minor_units - e.g., 'Quarter' and 'Month'
+def gen_exhibit_data(exData, source=None):
+    # Empty cells are read as ' ': see get_cell_contents
+    def value(v):
+        if v == None or (isinstance(v, basestring) and v.strip() == ''):
+            return None
+        # end_if
+        return v
+    # end_def value()
+    
+    grades = [value(header) for header in exData['cost_col_headers']]
+    # Return the dictionary of the items in one row of the cost table
+    def cost_row(costs):
+        retval = {}
+        retval['person_weeks'] = {}
+        for (grade, col) in zip(grades, SALARY_GRADE_COLUMNS):
+            retval['person_weeks'][grade if grade != None else col] = value(costs[COST_TABLE_COLUMNS.index(col)])
+        # end_for
+        retval['total_person_weeks'] = value(costs[COST_TABLE_COLUMNS.index('total_col_ix')])
+        retval['direct_salary'] = value(costs[COST_TABLE_COLUMNS.index('direct_salary_col_ix')])
+        retval['overhead'] = value(costs[COST_TABLE_COLUMNS.index('overhead_col_ix')])
+        retval['total_cost'] = value(costs[COST_TABLE_COLUMNS.index('total_cost_col_ix')])
+        return retval
+    # end_def cost_row()
+    
+    retval = {}
+    retval['source'] = source
+    retval['sheet_name'] = exData['sheet_name']
+    retval['project_name'] = value(exData['project_name'])
+    retval['grades'] = grades
+    tasks = []
+    for (task, costs) in zip(exData['tasks'], exData['cost_block']):
+        temp = cost_row(costs)
+        temp['number'] = value(task['number'])
+        temp['name'] = value(task['name'])
+        schedule = []
+        for item in task['sched_items']:
+            sched_item = {}
+            sched_item['type'] = item['type']
+            sched_item['milestone'] = item['milestone']
+            sched_item['start'] = item['start'] - exData['first_schedule_col_ix']
+            sched_item['end'] = item['end'] - exData['first_schedule_col_ix']
+            sched_item['start_label'] = col_ix_to_temporal_string(item['start'], exData)
+            sched_item['end_label'] = col_ix_to_temporal_string(item['end'], exData)
+            schedule.append(sched_item)
+        # end_for
+        temp['schedule'] = schedule
+        tasks.append(temp)
+    # end_for
+    retval['tasks'] = tasks
+    retval['totals'] = cost_row(exData['cost_totals'])
+    overhead_rate = value(exData['overhead_rate'])
+    retval['overhead_rate'] = overhead_rate.replace('@ ', '') if isinstance(overhead_rate, basestring) else overhead_rate
+    retval['direct_salary_total'] = value(exData['direct_salary_total'])
+    retval['other_direct_costs_total'] = value(exData['odc_total'])
+    retval['total_cost'] = value(exData['total_cost'])
+    retval['other_direct_costs'] = [{'name': value(odc['name']), 'cost': value(odc['cost'])} for odc in exData['odcs']]
+    retval['funding_sources'] = [value(fs) for fs in exData['funding_sources']]
+    retval['milestones'] = [{'label': value(m['label']), 'name': value(m['name'])} for m in exData['milestones']]
+    retval['sched_major_units'] = exData['sched_major_units']
+    retval['sched_minor_units'] = exData['sched_minor_units']
+    return retval
+# end_def gen_exhibit_data()
+
+# Pretty-formats HTML, and returns it encoded as UTF-8.
+def format_html(html):
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html, 'html.parser')
     pretty_html = soup.prettify() + '\n'
-    o = open(filename, 'w')
     # NOTE: We need to encode the output as UTF-8 because it may contain non-ASCII characters,
     # e.g., the "section" symbol used to identify funding sources such as <section>5303 ...
-    o.write(pretty_html.encode("UTF-8"))
+    return pretty_html.encode("UTF-8")
+# end_def format_html()
+
+# Replace the link to the stylesheet in the (unformatted) HTML for an exhibit by a <style> element
+# containing a minified copy of it, pruned to the rules that can apply to that exhibit; so that the
+# exhibit does not depend on the stylesheet being published beside it. See 'cssInliner.py'.
+def inline_stylesheet(html):
+    css = get_pruned_css(STYLESHEET_PATH, get_used_names(html))
+    return html.replace(STYLESHEET_LINK, '<style type="text/css">' + css + '</style>', 1)
+# end_def inline_stylesheet()
+
+# Format the data returned by gen_exhibit_data as JSON, and return it encoded as UTF-8.
+# If 'one_line' is True, the JSON is written on a single line, as required for a 'JSON lines' 
+# file; otherwise, it is indented for legibility.
+def format_json(data, one_line=False):
+    if one_line:
+        retval = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    else:
+        retval = json.dumps(data, sort_keys=True, indent=2, separators=(',', ': '), ensure_ascii=False)
+    # end_if
+    if isinstance(retval, unicode):
+        retval = retval.encode('UTF-8')
+    # end_if
+    return retval + '\n'
+# end_def format_json()
+
+# Saves a string of bytes to the specified filename.
+# The output is first written to a temporary file alongside the target, which then replaces
+# the target; so a reader of the target (e.g., a web server) never sees a partially-written file.
+def write_bytes_to_file(data, filename):
+    temp_filename = filename + '.tmp'
+    o = open(temp_filename, 'wb')
+    o.write(data)
     o.close()
+    # N.B. Under Windows, os.rename fails if the target file exists.
+    if os.name == 'nt' and os.path.exists(filename):
+        os.remove(filename)
+    # end_if
+    os.rename(temp_filename, filename)
+# end_def write_bytes_to_file()
+
+# Return the suffixes of the compressed copies of each output file written by write_output_file:
+# '.gz', and '.br' if the brotli module is installed.
+def get_compressed_suffixes():
+    return ['.gz', '.br'] if brotli != None else ['.gz']
+# end_def get_compressed_suffixes()
+
+# Return the string of bytes 'data' compressed in the format indicated by 'suffix' ('.gz' or '.br'),
+# at compression level 'level' (1-9 for gzip; 1-11 for brotli, levels above 9 being used as 9 for gzip).
+# N.B. The time stamp and file name in the gzip header are left empty, so that the same data always
+#      compresses to the same bytes, and unchanged output files are recognized as such by their hash.
+def compress_bytes(data, suffix, level):
+    if suffix == '.br':
+        return brotli.compress(data, quality=min(level, 11))
+    # end_if
+    buf = io.BytesIO()
+    gz = gzip.GzipFile(filename='', mode='wb', compresslevel=min(level, 9), fileobj=buf, mtime=0)
+    gz.write(data)
+    gz.close()
+    return buf.getvalue()
+# end_def compress_bytes()
+
+# Write the string of bytes 'data' to the output file 'filename' (see write_bytes_to_file).
+# If 'compress_level' is non-zero, compressed copies of it are also written beside it, for a web
+# server to send to browsers that accept them: 'filename' + each of get_compressed_suffixes(),
+# compressed at that level (see compress_bytes).
+# If 'get_recorded_hash' is not None, it is a function returning the hash recorded for an output
+# file when it was last written (e.g., in a batch manifest), or None. A file whose recorded hash is
+# that of the data to be written, and which still exists, is not re-written; and the compressed
+# copies of such a file are neither re-compressed nor re-written, if they too still exist and
+# 'recorded_compress_level', the level at which they were compressed when recorded, is 'compress_level'.
+# If 'record_on_disk' is True (e.g., outside batch mode, where there is no manifest), the files on disk
+# are the record instead, and 'get_recorded_hash' is ignored: a file whose contents are already the data
+# to be written is not re-written, and a compressed copy of such a file is kept if it is newer than the
+# file (as the level at which it was compressed is unknown).
+# If 'archive' is not None, the files are written into it (see bundleWriter in 'workbookBundle.py'),
+# under the name 'filename', rather than to disk; and none is found up to date.
+# Return a dictionary: name of each file written (or found up to date) -> hash of its contents.
+def write_output_file(data, filename, compress_level=0, get_recorded_hash=None, archive=None,
+                      recorded_compress_level=None, record_on_disk=False):
+    retval = {}
+    if archive != None:
+        write = lambda data, filename: archive.write(filename, data)
+        get_recorded_hash = None
+        record_on_disk = False
+    else:
+        write = write_bytes_to_file
+    # end_if
+    if record_on_disk:
+        get_recorded_hash = get_hash_on_disk
+    # end_if
+    data_hash = hash_bytes(data)
+    up_to_date = get_recorded_hash != None and get_recorded_hash(filename) == data_hash and os.path.exists(filename)
+    if not up_to_date:
+        write(data, filename)
+    # end_if
+    retval[filename] = data_hash
+    if compress_level > 0:
+        for suffix in get_compressed_suffixes():
+            compressed_filename = filename + suffix
+            if up_to_date:
+                compressed_hash = get_recorded_hash(compressed_filename)
+                if record_on_disk:
+                    compressed_up_to_date = compressed_hash != None and \
+                                            os.path.getmtime(compressed_filename) >= os.path.getmtime(filename)
+                else:
+                    compressed_up_to_date = compressed_hash != None and recorded_compress_level == compress_level and \
+                                            os.path.exists(compressed_filename)
+                # end_if
+                if compressed_up_to_date:
+                    retval[compressed_filename] = compressed_hash
+                    continue
+                # end_if
+            # end_if
+            compressed = compress_bytes(data, suffix, compress_level)
+            write(compressed, compressed_filename)
+            retval[compressed_filename] = hash_bytes(compressed)
+        # end_for
+    # end_if
+    return retval
+# end_def write_output_file()
+
+# Return the hash of the contents of the file 'filename', or None if it does not exist (or cannot be
+# read); for write_output_file, when the output files on disk are the record of what was last written.
+def get_hash_on_disk(filename):
+    try:
+        return hash_file(filename)
+    except (IOError, OSError):
+        return None
+    # end_try
+# end_def get_hash_on_disk()
+
+# Pretty-formats HTML and saves it to specified filename, unless the file already contains it;
+# if 'compress_level' is non-zero, compressed copies are also written (see write_output_file).
+def write_html_to_file(html, filename, compress_level=0):
+    write_output_file(format_html(html), filename, compress_level, record_on_disk=True)
 # end_def write_html_to_file()
 
-# Main driver routine - this function does NOT launch a GUI.
-def main(fullpath):
-    htmlAcc = stringAccumulator()
+# Return the names of the files to which the HTML for Exhibits 1 and 2 generated 
+# from the worksheet 'sheet_name' of the input .xlsx file 'fullpath' are written: these are
+# placed in the same folder as the input file. Unless the worksheet is the 'workscope_exhibits'
+# worksheet (or 'sheet_name' is None), the names include that of the worksheet, with any
+# characters other than letters, digits, '-' and '_' replaced by '_'.
+def get_output_filenames(fullpath, sheet_name=None):
+    prefix = get_output_prefix(fullpath, sheet_name)
+    ex_1_out_html_fn = prefix + '_Exhibit_1.html'
+    ex_2_out_html_fn = prefix + '_Exhibit_2.html'
+    return (ex_1_out_html_fn, ex_2_out_html_fn)
+# end_def get_output_filenames()
+
+# Return the name of the file to which the data exported by gen_exhibit_data for the worksheet
+# 'sheet_name' of the input .xlsx file 'fullpath' is written; see get_output_filenames.
+def get_data_filename(fullpath, sheet_name=None):
+    return get_output_prefix(fullpath, sheet_name) + '_Exhibit_Data.json'
+# end_def get_data_filename()
+
+# Return the common prefix (including the folder) of the names of the output files
+# for the worksheet 'sheet_name' of the input .xlsx file 'fullpath'; see get_output_filenames.
+def get_output_prefix(fullpath, sheet_name):
     t1 = os.path.split(fullpath)
     in_dir = t1[0]
     in_fn = t1[1]
     in_fn_wo_suffix = os.path.splitext(in_fn)[0]
-    ex_1_out_html_fn = in_dir + '\\' + in_fn_wo_suffix + '_Exhibit_1.html'
-    ex_2_out_html_fn = in_dir + '\\' + in_fn_wo_suffix + '_Exhibit_2.html'
-    
-    # Collect 'navigation' information from input .xlsx file
-    xlsInfo = initExcelFile(fullpath)
-    if xlsInfo['errors'] == '':
-        # Generate Exhibit 1 HTML, and save it to disk
-        gen_exhibit_1(htmlAcc, xlsInfo)
-        write_html_to_file(htmlAcc.get(), ex_1_out_html_fn)
-        # Generate Exhibit 2 HTML, and save it to disk
-        htmlAcc.re_init()
-        gen_exhibit_2(htmlAcc, xlsInfo)
-        write_html_to_file(htmlAcc.get(), ex_2_out_html_fn)
+    if sheet_name != None and sheet_name != WORKSCOPE_SHEET_NAME:
+        in_fn_wo_suffix += '_' + re.sub(r'[^A-Za-z0-9_-]+', '_', sheet_name)
+    # end_if
+    return os.path.join(in_dir, in_fn_wo_suffix)
+# end_def get_output_prefix()
+
+# Generate the HTML for Exhibit 'exhibit' (1 or 2) from the data 'exData' read from one worksheet
+# of an input .xlsx file. Return the pretty-formatted HTML, as UTF-8 encoded bytes (see format_html).
+# If 'inline_css' is True, the stylesheet is inlined in the exhibit (see inline_stylesheet).
+# If 'ex1_page_units' is non-zero, the schedule in Exhibit 1 is split into pages of (at most)
+# that many MAJOR schedule units (see get_ex1_pages).
+# N.B. The HTML is accumulated in a stringAccumulator of its own, and 'exData' is only read, so
+#      both exhibits can be generated at the same time, on different threads.
+def render_exhibit(exData, exhibit, inline_css=False, ex1_page_units=0):
+    htmlAcc = stringAccumulator()
+    if exhibit == 1:
+        gen_exhibit_1(htmlAcc, exData, ex1_page_units)
+    else:
+        gen_exhibit_2(htmlAcc, exData)
+    # end_if
+    html = htmlAcc.get()
+    if inline_css:
+        html = inline_stylesheet(html)
+    # end_if
+    return format_html(html)
+# end_def render_exhibit()
+
+# Generate the HTML for Exhibits 1 and 2 from the data 'exData' read from one worksheet 
+# of an input .xlsx file. Return a tuple of the pretty-formatted HTML for each, as UTF-8 
+# encoded bytes (see render_exhibit).
+def render_exhibits_to_bytes(exData, inline_css=False, ex1_page_units=0):
+    return (render_exhibit(exData, 1, inline_css, ex1_page_units), render_exhibit(exData, 2, inline_css))
+# end_def render_exhibits_to_bytes()
+
+# Return the list of the outputs generated for each worksheet by main: 1 and 2 for the HTML
+# for Exhibits 1 and 2, and, if 'export_data' is True, 'data' for the data shown in them as JSON.
+def get_outputs(export_data):
+    return [1, 2] + (['data'] if export_data else [])
+# end_def get_outputs()
+
+# Generate one output (see get_outputs) from the data 'exData' read from one worksheet of the
+# input .xlsx file 'fullpath', and save it to disk (see get_output_filenames and get_data_filename),
+# unless the output file already contains it. If 'compress_level' is non-zero, compressed copies of
+# the output file are also written, unless those already there are newer (see write_output_file). If 'inline_css' is True, the stylesheet is inlined in an exhibit (see
+# inline_stylesheet). If 'ex1_page_units' is non-zero, the schedule in Exhibit 1 is split into
+# pages (see get_ex1_pages).
+def render_output(fullpath, exData, output, compress_level=0, inline_css=False, ex1_page_units=0):
+    if output == 'data':
+        data = format_json(gen_exhibit_data(exData, os.path.basename(fullpath)))
+        out_fn = get_data_filename(fullpath, exData['sheet_name'])
+    else:
+        data = render_exhibit(exData, output, inline_css, ex1_page_units)
+        out_fn = get_output_filenames(fullpath, exData['sheet_name'])[output - 1]
+    # end_if
+    write_output_file(data, out_fn, compress_level, record_on_disk=True)
+# end_def render_output()
+
+# Helper for calling render_output in a worker process or thread: 'args' is the tuple
+# (fullpath, exData, output, compress_level, inline_css, ex1_page_units).
+def render_output_worker(args):
+    render_output(args[0], args[1], args[2], args[3], args[4], args[5])
+# end_def render_output_worker()
+
+# Call render_output_worker for each of the list of tuples 'work', each on a thread of its own,
+# and wait for them all to finish. If any of them raised an exception, the first is re-raised.
+def render_outputs_in_threads(work):
+    exc_infos = []
+    def run(args):
+        try:
+            render_output_worker(args)
+        except:
+            exc_infos.append(sys.exc_info())
+        # end_try
+    # end_def run()
+    threads = [threading.Thread(target=run, args=(args,)) for args in work]
+    for thread in threads:
+        thread.start()
+    # end_for
+    for thread in threads:
+        thread.join()
+    # end_for
+    if len(exc_infos) > 0:
+        raise exc_infos[0][0], exc_infos[0][1], exc_infos[0][2]
+    # end_if
+# end_def render_outputs_in_threads()
+
+# Main driver routine - this function does NOT launch a GUI.
+# The exhibits for each worksheet in the input .xlsx file containing workscope exhibits
+# are generated. Once the data has been read, the outputs for each worksheet (Exhibits 1 and 2,
+# and the JSON data: see get_outputs) are independent of each other, and are generated and
+# written concurrently. If 'num_processes' is greater than 1, they are generated, for all the
+# worksheets, in a pool of (up to) that many worker processes. Otherwise, they are generated
+# one worksheet at a time, with the outputs for each worksheet on threads of their own; as
+# Python runs only one thread at a time, this overlaps only the writing (and compression) of
+# one output with the generation of another.
+# N.B. Under Windows, worker processes import the module that called this function; so it
+#      should only be greater than 1 when that module has an 'if __name__ == "__main__"' guard.
+# N.B. Starting a pool, and pickling the data for each output to it, costs more than generating
+#      the outputs for a workbook of ordinary size; so processes are worthwhile only for very
+#      large workbooks, or many of them sharing one pool.
+# If 'pool' is not None, it is a multiprocessing.Pool (e.g., shared by all the .xlsx files of a run:
+# see cli_main) in which the outputs are generated, and 'num_processes' is ignored.
+# If 'export_data' is True, the data shown in the exhibits is also exported as JSON.
+# If 'compress_level' is non-zero, compressed copies of the output files are also written.
+# If 'inline_css' is True, the stylesheet is inlined in each exhibit, rather than linked to.
+# If 'ex1_page_units' is non-zero, the schedule in Exhibit 1 is split into pages of (at most)
+# that many MAJOR schedule units (see get_ex1_pages).
+# If 'report_memory' is True, the memory used by the process before reading the workbook, and after
+# releasing it, is reported (see workbookSession in 'excelFileManager.py').
+# Return 0 if the exhibits were generated, 1 if errors were found.
+def main(fullpath, num_processes=1, export_data=False, compress_level=0, inline_css=False, report_memory=False,
+         ex1_page_units=0, pool=None):
+    # Collect 'navigation' information from input .xlsx file, and read the data for both exhibits
+    # from each worksheet containing workscope exhibits; the workbook is loaded once, however many
+    # such worksheets it contains, and is released as soon as the data has been read.
+    with workbookSession(fullpath) as session:
+        errors = session.errors
+        if errors == '':
+            exDatas = session.extract()
+        # end_if
+    # end_with
+    if report_memory:
+        print session.get_memory_report()
+    # end_if
+    if errors == '':
+        warnings = get_exhibit_warnings(exDatas)
+        if warnings != '':
+            print 'Warning: totals that do not add up found in ' + fullpath + ' (the exhibits show them as found):\n'
+            print warnings
+        # end_if
+        # The outputs to generate, for each worksheet: the arguments for render_output_worker
+        work = [[(fullpath, exData, output, compress_level, inline_css, ex1_page_units) for output in get_outputs(export_data)]
+                for exData in exDatas]
+        if pool != None:
+            pool.map(render_output_worker, [args for sheet_work in work for args in sheet_work])
+        elif num_processes > 1:
+            pool = multiprocessing.Pool(min(num_processes, sum([len(sheet_work) for sheet_work in work])))
+            try:
+                pool.map(render_output_worker, [args for sheet_work in work for args in sheet_work])
+            finally:
+                pool.close()
+                pool.join()
+            # end_try
+        else:
+            for sheet_work in work:
+                render_outputs_in_threads(sheet_work)
+            # end_for
+        # end_if
     else:
         print 'HTML generation aborted.\nErrors found when reading ' + fullpath + ':\n'
-        print xlsInfo['errors']        
+        print errors
+        return 1
     # end_if
+    return 0
 # end_def main()
 
+# Return the file object 'f' (sys.stdin or sys.stdout), having made sure that it is in
+# binary mode: under Windows, they are in text mode by default, which would corrupt
+# an .xlsx file or an archive.
+def binary_mode(f):
+    if sys.platform == 'win32':
+        import msvcrt
+        msvcrt.setmode(f.fileno(), os.O_BINARY)
+    # end_if
+    return f
+# end_def binary_mode()
+
+# Pipeline driver routine: read an .xlsx file from the file-like object 'source' (e.g., stdin), 
+# and write the HTML for its exhibits to the file-like object 'out' (e.g., stdout); nothing
+# is written to disk. Parameters:
+#   name - name of the input .xlsx file (without folder), used to name the exhibits in an archive,
+#          as get_output_filenames would name the output files
+#   exhibit - '1' or '2' to write the HTML for that exhibit alone; 'data' to write the data shown
+#             in the exhibits as JSON (see gen_exhibit_data); 'both' to write an archive containing
+#             the HTML for both exhibits of every worksheet containing workscope exhibits
+#   archive_format - 'tar' or 'zip': the format of the archive written if 'exhibit' is 'both'
+#   sheet_name - name of the worksheet whose exhibits are written, or None for all of them;
+#                when writing a single exhibit, the workbook must contain exactly one
+#                worksheet containing workscope exhibits, or this must be given
+#   export_data - if True, the archive also contains the data shown in the exhibits as JSON
+#   inline_css - if True, the stylesheet is inlined in each exhibit (see inline_stylesheet)
+#   ex1_page_units - if non-zero, the schedule in Exhibit 1 is split into pages of (at most) that
+#                    many MAJOR schedule units (see get_ex1_pages)
+# Return a string with the text of error message(s) for any error(s) found, or '' if none;
+# if there are errors, nothing is written to 'out'.
+def stream_exhibits(source, name, exhibit, archive_format, sheet_name, out, export_data=False, inline_css=False,
+                    ex1_page_units=0):
+    # N.B. OpenPyXl needs to seek in the .xlsx file, which cannot be done in a pipe.
+    data = io.BytesIO(source.read())
+    with workbookSession(data) as session:
+        if session.errors != '':
+            return session.errors
+        # end_if
+        sheets = session.wbInfo['sheets']
+        if sheet_name != None:
+            sheets = [xlsInfo for xlsInfo in sheets if xlsInfo['sheet_name'] == sheet_name]
+            if len(sheets) == 0:
+                return 'Failed to find ' + sheet_name + ' worksheet.\n'
+            # end_if
+        # end_if
+        if exhibit != 'both' and len(sheets) > 1:
+            return 'The workbook contains more than one worksheet containing workscope exhibits; select one (--sheet).\n'
+        # end_if
+        exDatas = session.extract(sheets)
+    # end_with
+    data = None
+    # N.B. As 'out' may be stdout, warnings are written to stderr.
+    warnings = get_exhibit_warnings(exDatas)
+    if warnings != '':
+        sys.stderr.write('Warning: totals that do not add up found in ' + name + ' (the exhibits show them as found):\n' + warnings)
+    # end_if
+    
+    if exhibit == 'data':
+        out.write(format_json(gen_exhibit_data(exDatas[0], name)))
+        return ''
+    elif exhibit != 'both':
+        html = render_exhibit(exDatas[0], int(exhibit), inline_css, ex1_page_units)
+        out.write(html)
+        return ''
+    # end_if
+    
+    # Collect the members of the archive: (name, contents)
+    members = []
+    for exData in exDatas:
+        out_fns = get_output_filenames(name, exData['sheet_name'])
+        for (out_fn, html) in zip(out_fns, render_exhibits_to_bytes(exData, inline_css, ex1_page_units)):
+            members.append((os.path.basename(out_fn), html))
+        # end_for
+        if export_data:
+            data_fn = get_data_filename(name, exData['sheet_name'])
+            members.append((os.path.basename(data_fn), format_json(gen_exhibit_data(exData, name))))
+        # end_if
+    # end_for
+    if archive_format == 'zip':
+        # N.B. zipfile needs to seek in the archive it writes, so it is built in memory.
+        buf = io.BytesIO()
+        zf = zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED)
+        for (member_name, html) in members:
+            zf.writestr(member_name, html)
+        # end_for
+        zf.close()
+        out.write(buf.getvalue())
+    else:
+        # N.B. The 'w|' mode writes the archive as a stream, without seeking.
+        tf = tarfile.open(fileobj=out, mode='w|')
+        for (member_name, html) in members:
+            info = tarfile.TarInfo(member_name)
+            info.size = len(html)
+            info.mtime = time.time()
+            info.mode = 0644
+            tf.addfile(info, io.BytesIO(html))
+        # end_for
+        tf.close()
+    # end_if
+    out.flush()
+    return ''
+# end_def stream_exhibits()
+
+# Command-line driver routine; 'argv' is the list of command-line arguments (without the
+# program name). Return the exit status: 0 for success, 1 if errors were found.
+def cli_main(argv):
+    parser = argparse.ArgumentParser(description='Generate the HTML for the workscope exhibits of an .xlsx file.')
+    parser.add_argument('paths', nargs='+', metavar='path',
+                        help=".xlsx file; '-' to read it from stdin (implies --stdout)")
+    parser.add_argument('--validate', action='store_true',
+                        help='only check that the .xlsx file(s) contain the required worksheet and defined names')
+    parser.add_argument('--stdout', action='store_true',
+                        help='write the HTML to stdout rather than to files beside the .xlsx file')
+    parser.add_argument('--exhibit', choices=['1', '2', 'data', 'both'], default='both',
+                        help='with --stdout: the exhibit to write, or data for the data shown in the exhibits as JSON; '
+                             'for both, an archive of both is written (default: both)')
+    parser.add_argument('--json', action='store_true',
+                        help='also export the data shown in the exhibits as JSON, to a file beside the HTML '
+                             '(or, with --stdout, in the archive)')
+    parser.add_argument('--archive', choices=['tar', 'zip'], default='tar',
+                        help='with --stdout: the format of the archive written for both exhibits (default: tar)')
+    parser.add_argument('--sheet', default=None,
+                        help='with --stdout: the worksheet whose exhibits are written (default: all)')
+    parser.add_argument('--name', default=None,
+                        help='with --stdout: the name of the .xlsx file, used to name the exhibits in an archive '
+                             '(default: that of the .xlsx file, or workscope.xlsx for stdin)')
+    parser.add_argument('--compress', type=int, default=0, metavar='LEVEL',
+                        help='also write gzip (.gz) and, if the brotli module is installed, brotli (.br) copies of '
+                             'the output files, compressed at this level (1-9; up to 11 for brotli); '
+                             '0 for none (default: 0)')
+    parser.add_argument('--inline-css', action='store_true',
+                        help='embed a minified copy of the stylesheet, pruned to the rules each exhibit uses, '
+                             'rather than linking to ' + STYLESHEET_FILENAME)
+    parser.add_argument('--report-memory', action='store_true',
+                        help='report the memory used by the process before reading each .xlsx file, and after '
+                             'releasing it (e.g., to check that it stays steady over many files)')
+    parser.add_argument('--processes', type=int, default=1, metavar='N',
+                        help='generate the outputs in a pool of N worker processes, shared by all the .xlsx files; '
+                             'worthwhile only for very large workbooks, or many of them; 1 to generate them on '
+                             'threads of this process (default: 1)')
+    parser.add_argument('--ex1-page-units', type=int, default=0, metavar='N',
+                        help='split the schedule in Exhibit 1 into pages of N major schedule units (e.g., months), '
+                             'each repeating the task column, for schedules too long to show legibly in one table; '
+                             '0 for a single table (default: 0)')
+    args = parser.parse_args(argv)
+    if args.ex1_page_units < 0:
+        parser.error('--ex1-page-units must not be negative')
+    # end_if
+
+    if args.validate:
+        import workbookValidator
+        return 1 if workbookValidator.main(args.paths) > 0 else 0
+    # end_if
+    if args.stdout or args.paths == ['-']:
+        if len(args.paths) != 1:
+            parser.error('only one .xlsx file may be given with --stdout')
+        # end_if
+        if args.compress != 0:
+            parser.error('--compress may not be given with --stdout')
+        # end_if
+        if args.processes != 1:
+            parser.error('--processes may not be given with --stdout')
+        # end_if
+        if args.report_memory:
+            parser.error('--report-memory may not be given with --stdout')
+        # end_if
+        fullpath = args.paths[0]
+        if fullpath == '-':
+            source = binary_mode(sys.stdin)
+            name = args.name if args.name != None else 'workscope.xlsx'
+        else:
+            try:
+                source = open(fullpath, 'rb')
+            except IOError:
+                sys.stderr.write('Failed to open input .xlsx file: ' + fullpath + '\n')
+                return 1
+            # end_try
+            name = args.name if args.name != None else os.path.basename(fullpath)
+        # end_if
+        errors = stream_exhibits(source, name, args.exhibit, args.archive, args.sheet, binary_mode(sys.stdout), args.json, args.inline_css,
+                                 args.ex1_page_units)
+        if errors != '':
+            sys.stderr.write('HTML generation aborted.\nErrors found when reading ' + 
+                             ('stdin' if fullpath == '-' else fullpath) + ':\n' + errors)
+            return 1
+        # end_if
+        return 0
+    # end_if
+    retval = 0
+    pool = None
+    if args.processes > 1:
+        pool = multiprocessing.Pool(args.processes)
+    # end_if
+    try:
+        for fullpath in args.paths:
+            retval = max(retval, main(fullpath, 1, args.json, args.compress, args.inline_css,
+                                      args.report_memory, args.ex1_page_units, pool))
+        # end_for
+    finally:
+        if pool != None:
+            pool.close()
+            pool.join()
+        # end_if
+    # end_try
+    return retval
+# end_def cli_main()
+
 # If this module has been invoked from the command line, the following statement
 # ensures that the function "main" is called with the first parameter that was 
 # passed on the command line, e.g.,
 #     c:\Python27\python.exe -m workscope_exhibit_generator full_path_to_xlsx_file
+# If the '--validate' option is given, the .xlsx file(s) named on the command line are
+# only checked for the presence of the required worksheet and defined names, which is
+# much faster than generating the exhibits (see 'workbookValidator.py'), e.g.,
+#     c:\Python27\python.exe -m workscope_exhibit_generator --validate full_path_to_xlsx_file ...
+# If the '--stdout' option is given, or the path is '-' (i.e., the .xlsx file is read from 
+# stdin), the HTML is written to stdout, and error messages to stderr (see stream_exhibits), e.g.,
+#     cat foo.xlsx | python workscope_exhibit_tool.py --exhibit 2 - > foo_Exhibit_2.html
+#     cat foo.xlsx | python workscope_exhibit_tool.py --name foo.xlsx - | tar xf -
+# Run with '--help' for all the options.
+# Scripts that run this tool once per workbook can instead run 'workscope_exhibit_client.py',
+# which takes the same command line, and hands it to a daemon that has already loaded the tool
+# (see 'workscope_exhibit_daemon.py').
 if __name__== "__main__":
-    main(sys.argv[1])
+    sys.exit(cli_main(sys.argv[1:]))
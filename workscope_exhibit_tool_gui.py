@@ -11,7 +11,8 @@
 #
 
 import wx, wx.html
-from workscope_exhibit_tool import main
+# N.B. workscope_exhibit_tool's 'main' is imported when it is first needed (see OnGenerate),
+#      so that the window appears without waiting for the libraries it uses to be imported.
 
 # Code for the application's GUI begins here.
 #
@@ -122,6 +123,7 @@ class Frame(wx.Frame):
         result = dlg.ShowModal()
         dlg.Destroy()
         if result == wx.ID_OK:
+            from workscope_exhibit_tool import main
             main(self.xlsxFileName)
             message = "HTML for workscope exhibits generated."
             caption = "Work Scope Exhibit Tool"